@@ -0,0 +1,387 @@
+"""
+Compressed audio codecs and the uploaded-audio store.
+
+Uploads and synthesized speech used to be kept as uncompressed WAV. This
+module decodes any supported container (WAV/FLAC/OGG/Opus via libsndfile,
+anything else such as browser WebM/MP3 through an ffmpeg pipe) straight into
+memory for ASR, encodes audio to Opus/FLAC for storage and delivery, and
+keeps data/audio within a retention period and size budget.
+"""
+import io
+import os
+import time
+import uuid
+import shutil
+import logging
+import threading
+import subprocess
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+logger = logging.getLogger("audio_codecs")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DEFAULT_AUDIO_DIR = os.path.join(DATA_DIR, "audio")
+
+# Storage and delivery settings
+AUDIO_STORE_FORMAT = os.getenv("AUDIO_STORE_FORMAT", "opus").lower()
+AUDIO_RETENTION_DAYS = float(os.getenv("AUDIO_RETENTION_DAYS", "30"))
+AUDIO_STORE_MAX_MB = float(os.getenv("AUDIO_STORE_MAX_MB", "1024"))
+# Files modified more recently than this are never re-encoded or evicted (may still be in use)
+AUDIO_STORE_MIN_AGE_SECONDS = float(os.getenv("AUDIO_STORE_MIN_AGE_SECONDS", "300"))
+AUDIO_OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", "24k")
+TTS_DELIVERY_CODEC = os.getenv("TTS_DELIVERY_CODEC", "opus").lower()
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+
+# ASR models in this project all expect 16 kHz mono
+ASR_SAMPLE_RATE = 16000
+
+# codec -> (libsndfile format, libsndfile subtype, file extension, media type)
+CODECS: Dict[str, Tuple[str, str, str, str]] = {
+    "opus": ("OGG", "OPUS", ".ogg", "audio/ogg; codecs=opus"),
+    "ogg": ("OGG", "VORBIS", ".ogg", "audio/ogg"),
+    "flac": ("FLAC", "PCM_16", ".flac", "audio/flac"),
+    "wav": ("WAV", "PCM_16", ".wav", "audio/wav"),
+}
+
+# Opus only runs at these rates; anything else is resampled before encoding
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# Formats that are already compressed and can be stored as uploaded
+_COMPRESSED_FORMATS = {"opus", "ogg", "flac", "webm", "mp3"}
+
+
+def codec_extension(codec: str) -> str:
+    """File extension used for a codec"""
+    return CODECS.get(codec, CODECS["wav"])[2]
+
+
+def codec_media_type(codec: str) -> str:
+    """HTTP media type used for a codec"""
+    return CODECS.get(codec, CODECS["wav"])[3]
+
+
+def sniff_format(data: bytes) -> Optional[str]:
+    """
+    Identify an audio container from its magic bytes.
+
+    Args:
+        data: Encoded audio
+
+    Returns:
+        "wav", "flac", "opus", "ogg", "webm", "mp3" or None if unknown
+    """
+    head = data[:64]
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        return "opus" if b"OpusHead" in head else "ogg"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if head[:3] == b"ID3" or head[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "mp3"
+    return None
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    Resample a mono float signal.
+
+    Uses polyphase filtering from scipy when installed, linear interpolation
+    otherwise (adequate for speech going into ASR).
+    """
+    if orig_sr == target_sr or audio.size == 0:
+        return audio
+    try:
+        from math import gcd
+        from scipy.signal import resample_poly
+        divisor = gcd(int(orig_sr), int(target_sr))
+        return resample_poly(audio, target_sr // divisor, orig_sr // divisor).astype(np.float32)
+    except ImportError:
+        duration = audio.shape[0] / orig_sr
+        target_length = int(round(duration * target_sr))
+        positions = np.linspace(0, audio.shape[0] - 1, num=target_length)
+        return np.interp(positions, np.arange(audio.shape[0]), audio).astype(np.float32)
+
+
+def _run_ffmpeg(args, data: bytes) -> bytes:
+    if shutil.which(FFMPEG_BINARY) is None:
+        raise RuntimeError("ffmpeg is not installed; cannot process this audio format")
+    process = subprocess.run(
+        [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", *args],
+        input=data,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=False,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {process.stderr.decode('utf-8', 'ignore').strip()}")
+    return process.stdout
+
+
+def decode_audio(data: bytes, target_sr: Optional[int] = ASR_SAMPLE_RATE) -> Tuple[np.ndarray, int]:
+    """
+    Decode encoded audio to a mono float32 array without touching disk.
+
+    Args:
+        data: Encoded audio (WAV, FLAC, OGG/Opus, WebM, MP3, ...)
+        target_sr: Sample rate to resample to, or None to keep the original
+
+    Returns:
+        Tuple of (samples, sample_rate)
+    """
+    if SOUNDFILE_AVAILABLE and sniff_format(data) in ("wav", "flac", "ogg", "opus", None):
+        try:
+            audio, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=False)
+            if audio.ndim > 1:
+                audio = audio.mean(axis=1)
+            if target_sr:
+                audio, sr = resample(audio, sr, target_sr), target_sr
+            return audio.astype(np.float32, copy=False), sr
+        except Exception as e:
+            # Older libsndfile builds lack Opus; let ffmpeg try
+            logger.debug(f"soundfile could not decode audio ({e}); falling back to ffmpeg")
+
+    sr = target_sr or 48000
+    pcm = _run_ffmpeg(["-i", "pipe:0", "-f", "f32le", "-ac", "1", "-ar", str(sr), "pipe:1"], data)
+    return np.frombuffer(pcm, dtype=np.float32), sr
+
+
+def encode_audio(samples: np.ndarray, sample_rate: int, codec: str = "opus") -> bytes:
+    """
+    Encode a mono float signal.
+
+    Args:
+        samples: Float samples in [-1, 1]
+        sample_rate: Sample rate of the samples
+        codec: One of CODECS
+
+    Returns:
+        Encoded audio bytes
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unsupported codec '{codec}'. Available: {', '.join(CODECS)}")
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    if codec == "opus" and sample_rate not in OPUS_SAMPLE_RATES:
+        target_sr = min(rate for rate in OPUS_SAMPLE_RATES if rate >= min(sample_rate, 48000))
+        samples, sample_rate = resample(samples, sample_rate, target_sr), target_sr
+
+    container, subtype, _, _ = CODECS[codec]
+    if SOUNDFILE_AVAILABLE:
+        try:
+            buffer = io.BytesIO()
+            sf.write(buffer, samples, sample_rate, format=container, subtype=subtype)
+            return buffer.getvalue()
+        except Exception as e:
+            logger.debug(f"soundfile could not encode {codec} ({e}); falling back to ffmpeg")
+
+    codec_args = {
+        "opus": ["-c:a", "libopus", "-b:a", AUDIO_OPUS_BITRATE, "-application", "voip", "-f", "ogg"],
+        "ogg": ["-c:a", "libvorbis", "-f", "ogg"],
+        "flac": ["-c:a", "flac", "-f", "flac"],
+        "wav": ["-c:a", "pcm_s16le", "-f", "wav"],
+    }[codec]
+    return _run_ffmpeg(
+        ["-f", "f32le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0", *codec_args, "pipe:1"],
+        samples.tobytes(),
+    )
+
+
+def transcode(data: bytes, codec: str = "opus", target_sr: Optional[int] = None) -> bytes:
+    """Decode audio and re-encode it with another codec"""
+    samples, sr = decode_audio(data, target_sr=target_sr)
+    return encode_audio(samples, sr, codec)
+
+
+class AudioStore:
+    """
+    Compressed store for uploaded audio under data/audio.
+
+    Uploads are saved in AUDIO_STORE_FORMAT (Opus by default, downmixed to
+    16 kHz mono since they only feed ASR); already-compressed uploads are kept
+    as-is. compact() enforces the retention period and size budget and
+    re-encodes legacy WAV files. Subdirectories (e.g. the TTS cache) are left
+    to their owners.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_AUDIO_DIR,
+        store_format: str = AUDIO_STORE_FORMAT,
+        retention_days: float = AUDIO_RETENTION_DAYS,
+        max_mb: float = AUDIO_STORE_MAX_MB,
+        min_age_seconds: float = AUDIO_STORE_MIN_AGE_SECONDS,
+    ):
+        self.directory = directory
+        self.min_age_seconds = min_age_seconds
+        self.store_format = store_format if store_format in CODECS else "opus"
+        self.retention_seconds = retention_days * 86400
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, filename: str) -> str:
+        """Absolute path of a stored file (basename only, no traversal)"""
+        return os.path.join(self.directory, os.path.basename(filename))
+
+    def save(self, data: bytes, original_name: Optional[str] = None) -> str:
+        """
+        Store uploaded audio, compressing it when it arrives uncompressed.
+
+        Args:
+            data: Uploaded audio bytes
+            original_name: Client file name, used for the extension when the
+                audio is stored unchanged
+
+        Returns:
+            File name of the stored audio inside the store directory
+        """
+        detected = sniff_format(data)
+        payload, extension = data, None
+        if detected in _COMPRESSED_FORMATS:
+            extension = ".ogg" if detected == "opus" else f".{detected}"
+        else:
+            try:
+                payload = transcode(data, self.store_format, target_sr=ASR_SAMPLE_RATE)
+                extension = codec_extension(self.store_format)
+            except Exception as e:
+                logger.warning(f"Could not compress uploaded audio, storing original: {e}")
+                payload = data
+        if extension is None:
+            extension = os.path.splitext(original_name or "")[1].lower() or ".wav"
+
+        filename = f"{uuid.uuid4().hex}{extension}"
+        path = self.path_for(filename)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        logger.info(f"Stored audio {filename}: {len(data)} -> {len(payload)} bytes")
+        return filename
+
+    def resolve(self, filename: str) -> Optional[str]:
+        """
+        Find a stored file, following WAV files that compaction re-encoded.
+
+        Args:
+            filename: File name returned by save() or an older upload
+
+        Returns:
+            Path of the file, or None if it no longer exists
+        """
+        path = self.path_for(filename)
+        if os.path.isfile(path):
+            return path
+        recompressed = os.path.splitext(path)[0] + codec_extension(self.store_format)
+        return recompressed if os.path.isfile(recompressed) else None
+
+    def read(self, filename: str) -> bytes:
+        """Read a stored file"""
+        path = self.resolve(filename)
+        if path is None:
+            raise FileNotFoundError(filename)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def compact(self, recompress: bool = True) -> Dict[str, Any]:
+        """
+        Apply retention, re-encode legacy WAV files and enforce the size budget.
+        Files modified within min_age_seconds are left alone.
+
+        Args:
+            recompress: Re-encode top-level .wav files to the store format
+
+        Returns:
+            Counts of expired, recompressed and evicted files and bytes freed
+        """
+        stats = {"expired": 0, "recompressed": 0, "evicted": 0, "bytes_freed": 0}
+        with self._lock:
+            now = time.time()
+            files = []
+            for entry in os.scandir(self.directory):
+                if not entry.is_file() or entry.name.endswith(".tmp"):
+                    continue
+                st = entry.stat()
+                if now - st.st_mtime < self.min_age_seconds:
+                    continue
+                if self.retention_seconds > 0 and now - st.st_mtime > self.retention_seconds:
+                    self._remove(entry.path, st.st_size, stats, "expired")
+                    continue
+                if recompress and entry.name.lower().endswith(".wav") and self.store_format != "wav":
+                    new_path, new_size = self._recompress(entry.path, st)
+                    if new_path:
+                        stats["recompressed"] += 1
+                        stats["bytes_freed"] += st.st_size - new_size
+                        files.append((st.st_mtime, new_size, new_path))
+                        continue
+                files.append((st.st_mtime, st.st_size, entry.path))
+
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path, size, stats, "evicted")
+                total -= size
+
+        if any(stats[k] for k in ("expired", "recompressed", "evicted")):
+            logger.info(f"Audio store compaction: {stats}")
+        return stats
+
+    def _recompress(self, path: str, st) -> Tuple[Optional[str], int]:
+        # Keeps the original name's stem so existing links only change extension
+        try:
+            with open(path, "rb") as f:
+                encoded = transcode(f.read(), self.store_format, target_sr=ASR_SAMPLE_RATE)
+        except Exception as e:
+            logger.warning(f"Could not recompress {os.path.basename(path)}: {e}")
+            return None, 0
+        new_path = os.path.splitext(path)[0] + codec_extension(self.store_format)
+        with open(f"{new_path}.tmp", "wb") as f:
+            f.write(encoded)
+        os.replace(f"{new_path}.tmp", new_path)
+        os.utime(new_path, (st.st_atime, st.st_mtime))
+        os.remove(path)
+        return new_path, len(encoded)
+
+    @staticmethod
+    def _remove(path: str, size: int, stats: Dict[str, Any], reason: str):
+        try:
+            os.remove(path)
+            stats[reason] += 1
+            stats["bytes_freed"] += size
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Current file count and size of the store"""
+        files = [e for e in os.scandir(self.directory) if e.is_file()]
+        return {
+            "directory": self.directory,
+            "format": self.store_format,
+            "files": len(files),
+            "size_mb": round(sum(e.stat().st_size for e in files) / (1024 * 1024), 2),
+            "max_mb": self.max_bytes / (1024 * 1024),
+            "retention_days": self.retention_seconds / 86400,
+        }
+
+
+_store: Optional[AudioStore] = None
+_store_lock = threading.Lock()
+
+
+def get_audio_store() -> AudioStore:
+    """Return the shared audio store for data/audio"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AudioStore()
+        return _store
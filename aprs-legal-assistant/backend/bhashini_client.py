@@ -0,0 +1,357 @@
+"""
+Async client for the Bhashini (Dhruva) inference pipeline.
+
+One pooled aiohttp session is shared by all requests, every call has connect
+and total timeouts and is retried with exponential backoff on timeouts,
+connection errors, 429 and 5xx responses. Concurrent translation requests
+with the same task config are micro-batched: at most
+BHASHINI_MAX_INFLIGHT_BATCHES calls per config are in flight, and texts that
+arrive meanwhile queue up and go out together as one pipeline call with
+several "input" items. An idle client sends immediately, so batching adds no
+latency at low load.
+"""
+import os
+import json
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger("bhashini_client")
+
+BHASHINI_API_URL = os.getenv(
+    "BHASHINI_API_URL",
+    "https://dhruva-api.bhashini.gov.in/services/inference/pipeline"
+)
+BHASHINI_API_KEY = os.getenv("BHASHINI_API_KEY", "")
+BHASHINI_TIMEOUT_SECONDS = float(os.getenv("BHASHINI_TIMEOUT_SECONDS", "30"))
+BHASHINI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("BHASHINI_CONNECT_TIMEOUT_SECONDS", "5"))
+BHASHINI_MAX_RETRIES = int(os.getenv("BHASHINI_MAX_RETRIES", "3"))
+BHASHINI_MAX_CONNECTIONS = int(os.getenv("BHASHINI_MAX_CONNECTIONS", "20"))
+BHASHINI_MAX_INFLIGHT_BATCHES = int(os.getenv("BHASHINI_MAX_INFLIGHT_BATCHES", "8"))
+BHASHINI_MAX_BATCH_SIZE = int(os.getenv("BHASHINI_MAX_BATCH_SIZE", "32"))
+
+# IndicTrans2 via Dhruva
+TRANSLATION_SERVICE_ID = os.getenv("BHASHINI_TRANSLATION_SERVICE_ID", "ai4bharat/indictrans-v2-all-gpu--t4")
+TRANSLATION_MODEL_IDS = {
+    ("te", "en"): "641d1ca98ecee6735a1b3707",
+    ("en", "te"): "641d1cab8ecee6735a1b370b",
+}
+
+SCRIPT_CODES = {
+    "en": "Latn", "te": "Telu", "hi": "Deva", "mr": "Deva", "ta": "Taml",
+    "kn": "Knda", "ml": "Mlym", "bn": "Beng", "gu": "Gujr", "pa": "Guru", "or": "Orya",
+}
+
+# Status codes worth retrying
+_RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class BhashiniError(Exception):
+    """Raised when the pipeline fails or returns an unexpected payload"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def language_config(source: str, target: Optional[str] = None) -> Dict[str, str]:
+    """Build the "language" block of a pipeline task"""
+    config = {"sourceLanguage": source, "sourceScriptCode": SCRIPT_CODES.get(source, "Latn")}
+    if target:
+        config.update({"targetLanguage": target, "targetScriptCode": SCRIPT_CODES.get(target, "Latn")})
+    return config
+
+
+def translation_task(source: str, target: str, model_id: Optional[str] = None,
+                     service_id: Optional[str] = None) -> Dict[str, Any]:
+    """Pipeline task for text translation"""
+    config = {"language": language_config(source, target), "serviceId": service_id or TRANSLATION_SERVICE_ID}
+    model_id = model_id or TRANSLATION_MODEL_IDS.get((source, target))
+    if model_id:
+        config["modelId"] = model_id
+    return {"taskType": "translation", "config": config}
+
+
+def asr_task(source: str, service_id: str, model_id: Optional[str] = None) -> Dict[str, Any]:
+    """Pipeline task for speech recognition"""
+    config = {"language": language_config(source), "serviceId": service_id, "domain": ["general"]}
+    if model_id:
+        config["modelId"] = model_id
+    return {"taskType": "asr", "config": config}
+
+
+def tts_task(source: str, service_id: str, model_id: Optional[str] = None, voice: str = "default") -> Dict[str, Any]:
+    """Pipeline task for speech synthesis"""
+    config = {"language": language_config(source), "serviceId": service_id, "voice": voice}
+    if model_id:
+        config["modelId"] = model_id
+    return {"taskType": "tts", "config": config}
+
+
+def task_output(data: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """
+    Return the response of one pipeline task.
+
+    Understands the Dhruva "pipelineResponse" format and the older "outputs"
+    format the service returned previously.
+
+    Args:
+        data: Parsed JSON response
+        index: Position of the task in pipelineTasks
+
+    Returns:
+        Task response dict ({"output": [...]} or {"audio": [...]})
+    """
+    pipeline = data.get("pipelineResponse")
+    if pipeline and len(pipeline) > index:
+        return pipeline[index]
+    outputs = data.get("outputs")
+    if outputs and len(outputs) > index:
+        return outputs[index]
+    raise BhashiniError(f"Pipeline response has no output for task {index}")
+
+
+def output_texts(task: Dict[str, Any], field: str = "target") -> List[str]:
+    """Extract text outputs ("target" for translation, "source" for ASR) from a task response"""
+    output = task.get("output")
+    if isinstance(output, str):
+        return [output]
+    if isinstance(output, list):
+        texts = []
+        for item in output:
+            text = item.get(field) or ""
+            # Falling back to the source would pass untranslated text off as a translation
+            if not text and field != "source" and (item.get("source") or "").strip():
+                raise BhashiniError(f"Task returned an empty {field} for {item.get('source')!r}")
+            texts.append(text)
+        return texts
+    raise BhashiniError(f"Unexpected task output: {output!r}")
+
+
+def output_audio(task: Dict[str, Any]) -> List[str]:
+    """Extract base64 audio contents from a TTS task response"""
+    audio = task.get("audio")
+    if isinstance(audio, list):
+        return [item.get("audioContent", "") for item in audio]
+    output = task.get("output")
+    if isinstance(output, dict) and output.get("audio"):
+        return [output["audio"]]
+    raise BhashiniError("TTS task returned no audio")
+
+
+class BhashiniClient:
+    """Pooled, retrying, batching Dhruva pipeline client"""
+
+    def __init__(
+        self,
+        api_url: str = BHASHINI_API_URL,
+        api_key: str = BHASHINI_API_KEY,
+        timeout: float = BHASHINI_TIMEOUT_SECONDS,
+        connect_timeout: float = BHASHINI_CONNECT_TIMEOUT_SECONDS,
+        max_retries: int = BHASHINI_MAX_RETRIES,
+        max_connections: int = BHASHINI_MAX_CONNECTIONS,
+        max_inflight_batches: int = BHASHINI_MAX_INFLIGHT_BATCHES,
+        max_batch_size: int = BHASHINI_MAX_BATCH_SIZE,
+    ):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self.max_inflight_batches = max(1, max_inflight_batches)
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Per task config: queued (text, future) pairs and calls in flight
+        self._queues: Dict[str, deque] = {}
+        self._inflight: Dict[str, int] = {}
+        # Batch calls in flight, referenced until they finish
+        self._batch_tasks: set = set()
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "batched_items": 0, "batches": 0}
+
+    # -------------------------------------------------------------- session
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60, ttl_dns_cache=300)
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = self.api_key
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=headers)
+            self._session_loop = loop
+            self._queues, self._inflight = {}, {}
+        return self._session
+
+    async def close(self):
+        """Close the pooled session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ------------------------------------------------------------- pipeline
+
+    async def run_pipeline(self, tasks: List[Dict[str, Any]], inputs: Optional[List[str]] = None,
+                           audio: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Run a pipeline call with retries.
+
+        Args:
+            tasks: pipelineTasks entries
+            inputs: Text inputs (one "source" item each)
+            audio: Base64 audio inputs
+
+        Returns:
+            Parsed JSON response
+        """
+        payload = {
+            "pipelineTasks": tasks,
+            "inputData": {
+                "input": [{"source": text} for text in (inputs or [])],
+                "audio": [{"audioContent": content} for content in (audio or [])],
+            },
+        }
+        session = await self._get_session()
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                await asyncio.sleep(min(0.25 * (2 ** (attempt - 1)), 4.0) * (0.5 + random.random()))
+            try:
+                self.stats["calls"] += 1
+                async with session.post(self.api_url, json=payload) as resp:
+                    if resp.status in _RETRY_STATUSES:
+                        last_error = BhashiniError(f"Bhashini returned {resp.status}", resp.status)
+                        continue
+                    if resp.status >= 400:
+                        detail = await resp.text()
+                        raise BhashiniError(f"Bhashini returned {resp.status}: {detail[:200]}", resp.status)
+                    return await resp.json(content_type=None)
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
+                last_error = e
+                logger.warning(f"Bhashini call failed (attempt {attempt + 1}): {e!r}")
+        self.stats["failures"] += 1
+        raise BhashiniError(f"Bhashini pipeline failed after {self.max_retries + 1} attempts: {last_error!r}",
+                            getattr(last_error, "status", None))
+
+    # ---------------------------------------------------------- translation
+
+    async def translate(self, text: str, source: str, target: str, task: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Translate one text; concurrent calls with the same config share a pipeline call.
+
+        Args:
+            text: Text to translate
+            source: Source language code
+            target: Target language code
+            task: Explicit translation task (defaults to translation_task(source, target))
+
+        Returns:
+            Translated text
+        """
+        if not text or not text.strip():
+            return text
+        task = task or translation_task(source, target)
+        await self._get_session()
+        key = json.dumps(task, sort_keys=True)
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append((text, future))
+        self._dispatch(key)
+        return await future
+
+    async def translate_many(self, texts: List[str], source: str, target: str,
+                             task: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Translate several texts in one pipeline call"""
+        if not texts:
+            return []
+        task = task or translation_task(source, target)
+        data = await self.run_pipeline([task], inputs=list(texts))
+        results = output_texts(task_output(data, 0), "target")
+        if len(results) != len(texts):
+            raise BhashiniError(f"Expected {len(texts)} translations, got {len(results)}")
+        return results
+
+    def _dispatch(self, key: str):
+        # Start calls while there is capacity; the rest waits for a free slot
+        queue = self._queues.get(key)
+        while queue and self._inflight.get(key, 0) < self.max_inflight_batches:
+            items = [queue.popleft() for _ in range(min(self.max_batch_size, len(queue)))]
+            self._inflight[key] = self._inflight.get(key, 0) + 1
+            batch = asyncio.ensure_future(self._send_batch(key, items, self._inflight))
+            self._batch_tasks.add(batch)
+            batch.add_done_callback(self._batch_tasks.discard)
+
+    async def _send_batch(self, key: str, items: List[Tuple[str, asyncio.Future]], inflight: Dict[str, int]):
+        # Identical texts in the same batch are translated once
+        task = json.loads(key)
+        unique = list(dict.fromkeys(text for text, _ in items))
+        self.stats["batches"] += 1
+        self.stats["batched_items"] += len(items)
+        try:
+            source = task["config"]["language"]["sourceLanguage"]
+            target = task["config"]["language"]["targetLanguage"]
+            translated = dict(zip(unique, await self.translate_many(unique, source, target, task)))
+            for text, future in items:
+                if not future.done():
+                    future.set_result(translated[text])
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            # inflight is the counter the batch was started under; a session on
+            # a new event loop starts fresh counters and queues, so a batch
+            # from before the switch releases its old slot and dispatches nothing
+            inflight[key] = inflight.get(key, 1) - 1
+            if inflight is self._inflight:
+                self._dispatch(key)
+
+    # ---------------------------------------------------------- speech tasks
+
+    async def asr(self, audio_b64: str, source: str, service_id: str, model_id: Optional[str] = None,
+                  translate_to: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Transcribe audio and optionally translate the transcript in the same call.
+
+        Returns:
+            Tuple of (transcript, translation); translation equals the
+            transcript when translate_to is not given
+        """
+        tasks = [asr_task(source, service_id, model_id)]
+        if translate_to:
+            tasks.append(translation_task(source, translate_to))
+        data = await self.run_pipeline(tasks, audio=[audio_b64])
+        transcript = output_texts(task_output(data, 0), "source")[0]
+        if not translate_to:
+            return transcript, transcript
+        return transcript, output_texts(task_output(data, 1), "target")[0]
+
+    async def tts(self, text: str, source: str, service_id: str, model_id: Optional[str] = None,
+                  voice: str = "default") -> str:
+        """
+        Synthesize text that is already in the target language.
+
+        Returns:
+            Base64 audio
+        """
+        data = await self.run_pipeline([tts_task(source, service_id, model_id, voice)], inputs=[text])
+        return output_audio(task_output(data, 0))[0]
+
+    async def translate_tts(self, text: str, source: str, target: str, service_id: str,
+                            model_id: Optional[str] = None, voice: str = "default") -> Tuple[str, str]:
+        """
+        Translate text and synthesize the translation in one call.
+
+        Returns:
+            Tuple of (translated text, base64 audio)
+        """
+        tasks = [translation_task(source, target), tts_task(target, service_id, model_id, voice)]
+        data = await self.run_pipeline(tasks, inputs=[text])
+        translated = output_texts(task_output(data, 0), "target")[0]
+        return translated, output_audio(task_output(data, 1))[0]
+
@@ -6,8 +6,8 @@ FastAPI router for Telugu conversational AI using Bhashini pipeline and Gemini.
 Removes all Azure logic. Uses Bhashini pipeline for translation + TTS, and Google Gemini for AI.
 """
 import os
-import requests
 import base64
+import asyncio
 import logging
 from dotenv import load_dotenv
 from pathlib import Path
@@ -16,6 +16,10 @@ from fastapi.responses import JSONResponse
 import google.generativeai as genai
 from typing import Tuple
 
+from bhashini_client import BhashiniClient, BhashiniError, translation_task
+from backend.translation_memory import get_translation_memory
+from tts_cache import get_tts_cache
+
 # Load environment variables from project .env
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(env_path)
@@ -33,10 +37,16 @@ BHASHINI_API_KEY = os.getenv(
     "BHASHINI_API_KEY",
     "ULCndVHFuQrOY6zFecDIx7sA2YlfujzTjeO0xIViNV8Pia_6TyunIVzfITYQvhyx"
 )
-HEADERS = {
-    "Authorization": BHASHINI_API_KEY,
-    "Content-Type": "application/json"
-}
+
+# Pooled, retrying client; concurrent translations are batched into one call
+bhashini_client = BhashiniClient(api_url=BHASHINI_API_URL, api_key=BHASHINI_API_KEY)
+
+# Sentence-level translation memory; only unseen sentences reach Bhashini
+translation_memory = get_translation_memory()
+
+@router.on_event("shutdown")
+async def close_bhashini_client():
+    await bhashini_client.close()
 
 # Gemini API key
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -61,35 +71,23 @@ BHASHINI_TTS_MODEL_ID = os.getenv("BHASHINI_TTS_MODEL_ID", "6348db37fb796d5e100d
 BHASHINI_TTS_SERVICE_ID = os.getenv("BHASHINI_TTS_SERVICE_ID", "ai4bharat/indic-tts-coqui-dravidian-gpu--t4")
 
 # Task: Telugu→English translation via Bhashini pipeline
-def translate_telugu_to_english(telugu_text: str) -> str:
-    payload = {
-        "pipelineTasks": [
-            {
-                "taskType": "translation",
-                "config": {
-                    "language": {
-                        "sourceLanguage": "te",
-                        "sourceScriptCode": "Telu",
-                        "targetLanguage": "en",
-                        "targetScriptCode": "Latn"
-                    },
-                    "modelId": "641d1ca98ecee6735a1b3707",
-                    "serviceId": "ai4bharat/indictrans-v2-all-gpu--t4"
-                }
-            }
-        ],
-        "inputData": {"input": [{"source": telugu_text}], "audio": []}
-    }
-    resp = requests.post(BHASHINI_API_URL, headers=HEADERS, json=payload)
-    resp.raise_for_status()
-    data = resp.json()
-    pipeline = data.get("pipelineResponse", [])
-    if pipeline and pipeline[0].get("output"):
-        out = pipeline[0]["output"]
-        if out and out[0].get("target"):
-            return out[0]["target"]
-    logger.error("Translation pipeline returned no output: %s", data)
-    raise HTTPException(status_code=502, detail="Translation pipeline error")
+TE_EN_TRANSLATION_TASK = translation_task("te", "en", model_id="641d1ca98ecee6735a1b3707")
+EN_TE_TRANSLATION_TASK = translation_task("en", "te", model_id="641d1cab8ecee6735a1b370b")
+
+async def translate_segments(segments, source: str, target: str, task) -> list:
+    """Translate segments concurrently; the client batches them into pipeline calls"""
+    return await asyncio.gather(*(bhashini_client.translate(s, source, target, task=task) for s in segments))
+
+async def translate_telugu_to_english(telugu_text: str) -> str:
+    try:
+        return await translation_memory.translate_async(
+            telugu_text, "te", "en",
+            lambda segments: translate_segments(segments, "te", "en", TE_EN_TRANSLATION_TASK),
+            engine="bhashini",
+        )
+    except BhashiniError as e:
+        logger.error("Translation pipeline error: %s", e)
+        raise HTTPException(status_code=502, detail="Translation pipeline error")
 
 # Task: call Gemini AI via chat-bison-001
 def call_gemini_api(english_text: str) -> str:
@@ -110,109 +108,51 @@ def call_gemini_api(english_text: str) -> str:
         logger.error("Chat completion failed: %s", e)
         raise HTTPException(status_code=502, detail="AI service error")
 
+# Telugu speech for repeated English lines (disclaimers, greetings) is cached
+telugu_tts_cache = get_tts_cache("bhashini-te")
+
 # Task: English→Telugu translation + TTS
-def translate_english_to_telugu_tts(english_text: str) -> Tuple[str, bytes]:
-    payload = {
-        "pipelineTasks": [
-            {
-                "taskType": "translation",
-                "config": {
-                    "language": {
-                        "sourceLanguage": "en",
-                        "sourceScriptCode": "Latn",
-                        "targetLanguage": "te",
-                        "targetScriptCode": "Telu"
-                    },
-                    "modelId": "641d1cab8ecee6735a1b370b",
-                    "serviceId": "ai4bharat/indictrans-v2-all-gpu--t4"
-                }
-            },
-            {
-                "taskType": "tts",
-                "config": {
-                    "language": {"sourceLanguage": "te", "sourceScriptCode": "Telu"},
-                    "voice": "default",
-                    "modelId": BHASHINI_TTS_MODEL_ID,
-                    "serviceId": BHASHINI_TTS_SERVICE_ID
-                }
-            }
-        ],
-        "inputData": {"input": [{"source": english_text}]}
-    }
-    resp = requests.post(BHASHINI_API_URL, headers=HEADERS, json=payload)
-    resp.raise_for_status()
-    data = resp.json()
-    telugu_text = data["outputs"][0]["output"]
-    audio_b64 = data["outputs"][1]["output"]["audio"]
-    return telugu_text, base64.b64decode(audio_b64)
+async def translate_english_to_telugu_tts(english_text: str) -> Tuple[str, bytes]:
+    cache_key = telugu_tts_cache.key_for(english_text, BHASHINI_TTS_MODEL_ID, "te")
+    cached_audio = telugu_tts_cache.get_bytes(cache_key)
+    if cached_audio is not None:
+        return telugu_tts_cache.get_metadata(cache_key).get("telugu_text", ""), cached_audio
+
+    # Reuse sentence translations, then synthesize the full Telugu text
+    telugu_text = await translation_memory.translate_async(
+        english_text, "en", "te",
+        lambda segments: translate_segments(segments, "en", "te", EN_TE_TRANSLATION_TASK),
+        engine="bhashini",
+    )
+    audio_b64 = await bhashini_client.tts(
+        telugu_text, "te",
+        service_id=BHASHINI_TTS_SERVICE_ID,
+        model_id=BHASHINI_TTS_MODEL_ID,
+    )
+    audio = base64.b64decode(audio_b64)
+    telugu_tts_cache.put(cache_key, audio, {"english_text": english_text, "telugu_text": telugu_text})
+    return telugu_text, audio
 
 # Task: Speech-to-text + Telugu→English translation
-def speech_to_text_translate_telugu_to_english(audio_b64: str) -> Tuple[str, str]:
-    payload = {
-        "pipelineTasks": [
-            {
-                "taskType": "asr",
-                "config": {
-                    "serviceId": BHASHINI_ASR_SERVICE_ID,
-                    "modelId": BHASHINI_ASR_MODEL_ID,
-                    "language": {
-                        "sourceLanguage": "te",
-                        "sourceScriptCode": "Telu"
-                    },
-                    "domain": ["general"]
-                }
-            },
-            {
-                "taskType": "translation",
-                "config": {
-                    "language": {
-                        "sourceLanguage": "te",
-                        "sourceScriptCode": "Telu",
-                        "targetLanguage": "en",
-                        "targetScriptCode": "Latn"
-                    },
-                    "modelId": "641d1ca98ecee6735a1b3707",
-                    "serviceId": "ai4bharat/indictrans-v2-all-gpu--t4"
-                }
-            }
-        ],
-        "inputData": {
-            "input": [],
-            "audio": [audio_b64]
-        }
-    }
-    resp = requests.post(BHASHINI_API_URL, headers=HEADERS, json=payload)
-    resp.raise_for_status()
-    data = resp.json()
-    asr_text = data["outputs"][0]["output"]
-    en_text = data["outputs"][1]["output"]
-    return asr_text, en_text
+async def speech_to_text_translate_telugu_to_english(audio_b64: str) -> Tuple[str, str]:
+    return await bhashini_client.asr(
+        audio_b64, "te",
+        service_id=BHASHINI_ASR_SERVICE_ID,
+        model_id=BHASHINI_ASR_MODEL_ID,
+        translate_to="en",
+    )
 
 # Task: Speech-to-text for English input
-def speech_to_text_translate_english(audio_b64: str) -> Tuple[str, str]:
-    payload = {
-        "pipelineTasks": [
-            {
-                "taskType": "asr",
-                "config": {
-                    "serviceId": BHASHINI_ASR_EN_SERVICE_ID,
-                    "modelId": BHASHINI_ASR_EN_MODEL_ID,
-                    "language": {"sourceLanguage": "en", "sourceScriptCode": "Latn"},
-                    "domain": ["general"]
-                }
-            }
-        ],
-        "inputData": {"input": [], "audio": [audio_b64]}
-    }
-    resp = requests.post(BHASHINI_API_URL, headers=HEADERS, json=payload)
-    resp.raise_for_status()
-    data = resp.json()
-    asr_text = data["outputs"][0]["output"]
-    return asr_text, asr_text
+async def speech_to_text_translate_english(audio_b64: str) -> Tuple[str, str]:
+    return await bhashini_client.asr(
+        audio_b64, "en",
+        service_id=BHASHINI_ASR_EN_SERVICE_ID,
+        model_id=BHASHINI_ASR_EN_MODEL_ID,
+    )
 
 # Endpoint: receive Telugu text or audio, return translated response & audio
 @router.post("/voice-query")
-def voice_query(
+async def voice_query(
     audio_base64: str = Form(None, description="Base64-encoded audio data (multipart/form-data field 'audio_base64')"),
     language: str = Form("te", description="Language code: 'te' or 'en'"),
     telugu_text: str = Form(None, description="Raw Telugu text input if audio not provided"),
@@ -221,9 +161,9 @@ def voice_query(
         # Determine input mode
         if audio_base64:
             if language == "te":
-                asr_text, en = speech_to_text_translate_telugu_to_english(audio_base64)
+                asr_text, en = await speech_to_text_translate_telugu_to_english(audio_base64)
             elif language == "en":
-                asr_text, en = speech_to_text_translate_english(audio_base64)
+                asr_text, en = await speech_to_text_translate_english(audio_base64)
             else:
                 raise HTTPException(
                     status_code=400,
@@ -231,7 +171,7 @@ def voice_query(
                 )
         elif telugu_text:
             asr_text = telugu_text
-            en = translate_telugu_to_english(telugu_text)
+            en = await translate_telugu_to_english(telugu_text)
         else:
             raise HTTPException(
                 status_code=400,
@@ -243,6 +183,11 @@ def voice_query(
             "asr_text": asr_text,
             "translated_text": en
         })
+    except HTTPException:
+        raise
+    except BhashiniError as e:
+        logger.error("Bhashini pipeline error in voice_query: %s", e)
+        raise HTTPException(status_code=502, detail="Bhashini pipeline error")
     except Exception:
         logger.exception("Error in voice_query")
         raise HTTPException(status_code=500, detail="Internal server error in voice_query")
\ No newline at end of file
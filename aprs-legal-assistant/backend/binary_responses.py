@@ -0,0 +1,201 @@
+"""
+Binary HTTP responses for audio and documents.
+
+The voice services and PDF endpoints historically returned base64 strings
+inside JSON, which is ~33% larger on the wire and needs a full in-memory encode
+on the server and decode on the client. These helpers serve the raw bytes
+instead, with single-range HTTP Range support, and hand files to the server
+with the ASGI zero-copy extensions when it offers them.
+"""
+import os
+import re
+import stat
+from typing import Dict, Optional, Tuple
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 64 * 1024
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def wants_base64(request: Request, response_format: Optional[str] = None) -> bool:
+    """
+    Decide whether the client asked for the legacy base64-in-JSON format.
+
+    Args:
+        request: Incoming request
+        response_format: Value of the ?format= query parameter, if any
+
+    Returns:
+        True for "base64"/"json" formats or an Accept header of application/json
+    """
+    if response_format:
+        return response_format.lower() in ("base64", "json")
+    accept = request.headers.get("accept", "")
+    return accept.split(",")[0].strip().lower() == "application/json"
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range "Range: bytes=..." header.
+
+    Args:
+        range_header: Raw header value
+        size: Total size of the resource
+
+    Returns:
+        Inclusive (start, end) tuple, or None when the whole body should be sent
+
+    Raises:
+        ValueError: If the range cannot be satisfied
+    """
+    if not range_header:
+        return None
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        # Multiple or malformed ranges: serving the full body is allowed
+        return None
+
+    start_text, end_text = match.groups()
+    if not start_text and not end_text:
+        return None
+    if size == 0:
+        # An empty body has no byte to start a range at
+        raise ValueError("Range of an empty resource")
+    if not start_text:
+        suffix = int(end_text)
+        if suffix == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - suffix, 0), size - 1
+
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def _content_disposition(filename: Optional[str]) -> Dict[str, str]:
+    if not filename:
+        return {}
+    return {"content-disposition": f'inline; filename="{os.path.basename(filename)}"'}
+
+
+class RangeFileResponse(Response):
+    """
+    Serve a file (or one byte range of it) without loading it into memory.
+
+    Uses the ASGI "http.response.zerocopysend" extension (sendfile) or
+    "http.response.pathsend" when the server supports them, and falls back to
+    chunked reads in a worker thread otherwise.
+    """
+
+    def __init__(self, path: str, start: int, end: int, size: int, status_code: int = 200,
+                 media_type: Optional[str] = None, headers: Optional[Dict[str, str]] = None):
+        super().__init__(content=None, status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.count = end - start + 1 if size else 0
+        self.full_file = start == 0 and self.count == size
+        self.headers["content-length"] = str(self.count)
+        self.headers["accept-ranges"] = "bytes"
+        if status_code == 206:
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.count,
+                    "more_body": False,
+                })
+            return
+        if "http.response.pathsend" in extensions and self.full_file:
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(self.start)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def file_response(request: Request, path: str, media_type: str, filename: Optional[str] = None,
+                  headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Build a binary response for a file on disk, honouring Range requests.
+
+    Args:
+        request: Incoming request (for the Range header)
+        path: File to serve
+        media_type: Content type of the file
+        filename: Optional download filename
+        headers: Extra response headers
+
+    Returns:
+        200 or 206 streaming file response, or 416 for unsatisfiable ranges
+    """
+    file_stat = os.stat(path)
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise FileNotFoundError(path)
+    size = file_stat.st_size
+    all_headers = {**_content_disposition(filename), **(headers or {})}
+
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={"content-range": f"bytes */{size}"})
+
+    if byte_range is None:
+        return RangeFileResponse(path, 0, size - 1, size, media_type=media_type, headers=all_headers)
+    start, end = byte_range
+    return RangeFileResponse(path, start, end, size, status_code=206, media_type=media_type, headers=all_headers)
+
+
+def bytes_response(request: Request, data: bytes, media_type: str, filename: Optional[str] = None,
+                   headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Build a binary response for in-memory bytes, honouring Range requests.
+
+    Args:
+        request: Incoming request (for the Range header)
+        data: Response body
+        media_type: Content type of the body
+        filename: Optional download filename
+        headers: Extra response headers
+
+    Returns:
+        200 or 206 response, or 416 for unsatisfiable ranges
+    """
+    size = len(data)
+    all_headers = {"accept-ranges": "bytes", **_content_disposition(filename), **(headers or {})}
+
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={"content-range": f"bytes */{size}"})
+
+    if byte_range is None:
+        return Response(content=data, media_type=media_type, headers=all_headers)
+    start, end = byte_range
+    all_headers["content-range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=data[start:end + 1], status_code=206, media_type=media_type, headers=all_headers)
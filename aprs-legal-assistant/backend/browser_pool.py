@@ -0,0 +1,324 @@
+"""
+Shared pool of headless browsers for the crawler and the document scraper.
+
+Starting Chrome/Edge costs seconds and hundreds of MB, so instead of one
+browser per crawl() call or scraper run, a bounded pool of instances is kept
+warm and leased one page load at a time. Each instance reuses a single tab
+(reset to about:blank between leases), blocks images, fonts, media and ad/
+analytics hosts through the DevTools protocol, and is recycled after
+BROWSER_MAX_PAGES pages or BROWSER_MAX_AGE_MINUTES to cap memory growth.
+Idle instances are health-checked in the background and shut down after
+BROWSER_IDLE_SECONDS. The driver binary is resolved once per process.
+"""
+import os
+import time
+import atexit
+import random
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("browser_pool")
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_TYPE = os.getenv("BROWSER_TYPE", "chrome").lower()
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "true").lower() == "true"
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "50"))
+BROWSER_MAX_AGE_MINUTES = float(os.getenv("BROWSER_MAX_AGE_MINUTES", "30"))
+BROWSER_IDLE_SECONDS = float(os.getenv("BROWSER_IDLE_SECONDS", "300"))
+BROWSER_HEALTH_INTERVAL_SECONDS = float(os.getenv("BROWSER_HEALTH_INTERVAL_SECONDS", "60"))
+BROWSER_PAGE_LOAD_TIMEOUT_SECONDS = float(os.getenv("BROWSER_PAGE_LOAD_TIMEOUT_SECONDS", "30"))
+
+# Requests the crawler never needs: images, fonts, media and ad/analytics hosts
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    "*doubleclick.net*", "*googlesyndication.com*", "*googleadservices.com*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*adservice.google.*",
+    "*facebook.net*", "*connect.facebook.*", "*scorecardresearch.com*", "*taboola.com*", "*outbrain.com*",
+]
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+]
+
+
+class PooledBrowser:
+    """One browser instance and its usage counters"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.pages = 0
+
+
+class BrowserPool:
+    """Bounded pool of reusable browser instances, leased one page at a time"""
+
+    _driver_paths: Dict[str, str] = {}
+    _driver_path_lock = threading.Lock()
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        browser: str = BROWSER_TYPE,
+        headless: bool = BROWSER_HEADLESS,
+        max_pages: int = BROWSER_MAX_PAGES,
+        max_age_minutes: float = BROWSER_MAX_AGE_MINUTES,
+        idle_seconds: float = BROWSER_IDLE_SECONDS,
+        blocked_urls: Optional[List[str]] = None,
+    ):
+        """
+        Args:
+            size: Maximum concurrent browser instances
+            browser: "chrome" or "edge"
+            headless: Run without a window (False helps when debugging selectors)
+            max_pages: Page loads after which an instance is replaced
+            max_age_minutes: Age after which an instance is replaced
+            idle_seconds: Idle time after which an instance is shut down
+            blocked_urls: URL patterns blocked via DevTools (defaults to BLOCKED_URL_PATTERNS)
+        """
+        if browser not in ("chrome", "edge"):
+            raise ValueError(f"Unsupported browser: {browser}")
+        self.size = max(1, size)
+        self.browser = browser
+        self.headless = headless
+        self.max_pages = max(1, max_pages)
+        self.max_age = max_age_minutes * 60
+        self.idle_seconds = idle_seconds
+        self.blocked_urls = BLOCKED_URL_PATTERNS if blocked_urls is None else blocked_urls
+
+        self._idle: List[PooledBrowser] = []
+        self._leased: List[PooledBrowser] = []
+        self._lock = threading.Lock()
+        self._loop = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._maintenance: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {"started": 0, "recycled": 0, "unhealthy": 0, "pages": 0}
+        atexit.register(self.close_sync)
+
+    # ------------------------------------------------------------ instances
+
+    def _driver_path(self) -> str:
+        with BrowserPool._driver_path_lock:
+            if self.browser not in BrowserPool._driver_paths:
+                if self.browser == "edge":
+                    from webdriver_manager.microsoft import EdgeChromiumDriverManager
+                    BrowserPool._driver_paths[self.browser] = EdgeChromiumDriverManager().install()
+                else:
+                    from webdriver_manager.chrome import ChromeDriverManager
+                    BrowserPool._driver_paths[self.browser] = ChromeDriverManager().install()
+            return BrowserPool._driver_paths[self.browser]
+
+    def _create(self) -> PooledBrowser:
+        """Start a browser instance (blocking)"""
+        from selenium import webdriver
+
+        if self.browser == "edge":
+            from selenium.webdriver.edge.options import Options
+            from selenium.webdriver.edge.service import Service
+        else:
+            from selenium.webdriver.chrome.options import Options
+            from selenium.webdriver.chrome.service import Service
+
+        options = Options()
+        if self.headless:
+            options.add_argument("--headless=new")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_argument(f"--user-agent={random.choice(USER_AGENTS)}")
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.fonts": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+        # Do not wait for every subresource; callers wait for their selector
+        options.page_load_strategy = "eager"
+
+        service = Service(self._driver_path())
+        driver = webdriver.Edge(service=service, options=options) if self.browser == "edge" \
+            else webdriver.Chrome(service=service, options=options)
+        driver.set_page_load_timeout(BROWSER_PAGE_LOAD_TIMEOUT_SECONDS)
+        if self.blocked_urls:
+            try:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_urls})
+            except Exception as e:
+                logger.warning(f"Request blocking unavailable: {e}")
+
+        self.stats["started"] += 1
+        logger.info(f"Started {self.browser} instance ({'headless' if self.headless else 'visible'})")
+        return PooledBrowser(driver)
+
+    @staticmethod
+    def _healthy(browser: PooledBrowser) -> bool:
+        """Whether the instance still answers commands (blocking)"""
+        try:
+            browser.driver.execute_script("return 1")
+            return len(browser.driver.window_handles) > 0
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(browser: PooledBrowser):
+        """Close extra tabs and blank the remaining one for the next lease (blocking)"""
+        driver = browser.driver
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.get("about:blank")
+
+    def _quit(self, browser: PooledBrowser):
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.debug(f"Error quitting browser: {e}")
+
+    def _expired(self, browser: PooledBrowser) -> bool:
+        return browser.pages >= self.max_pages or time.time() - browser.created_at >= self.max_age
+
+    # --------------------------------------------------------------- leases
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # asyncio primitives belong to one loop (e.g. successive asyncio.run calls)
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.size)
+            self._maintenance = None
+        if self._maintenance is None or self._maintenance.done():
+            self._maintenance = loop.create_task(self._maintain())
+
+    async def _checkout(self) -> PooledBrowser:
+        while True:
+            with self._lock:
+                browser = self._idle.pop() if self._idle else None
+            if browser is None:
+                browser = await asyncio.to_thread(self._create)
+            elif time.time() - browser.last_used > 30 and not await asyncio.to_thread(self._healthy, browser):
+                self.stats["unhealthy"] += 1
+                await asyncio.to_thread(self._quit, browser)
+                continue
+            with self._lock:
+                self._leased.append(browser)
+            return browser
+
+    async def _checkin(self, browser: PooledBrowser, broken: bool):
+        with self._lock:
+            if browser in self._leased:
+                self._leased.remove(browser)
+        if broken or self._expired(browser):
+            self.stats["unhealthy" if broken else "recycled"] += 1
+            await asyncio.to_thread(self._quit, browser)
+            return
+        try:
+            await asyncio.to_thread(self._reset, browser)
+        except Exception as e:
+            logger.warning(f"Discarding browser that failed to reset: {e}")
+            self.stats["unhealthy"] += 1
+            await asyncio.to_thread(self._quit, browser)
+            return
+        browser.last_used = time.time()
+        with self._lock:
+            self._idle.append(browser)
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        Lease a browser for one page load.
+
+        Usage:
+            async with pool.page() as driver:
+                await asyncio.to_thread(driver.get, url)
+
+        Yields:
+            Selenium WebDriver (blocking: call it from a worker thread)
+        """
+        self._bind_loop()
+        async with self._slots:
+            browser = await self._checkout()
+            broken = False
+            try:
+                yield browser.driver
+            except Exception:
+                # The page may have crashed the tab; only keep the instance if it still responds
+                broken = not await asyncio.to_thread(self._healthy, browser)
+                raise
+            finally:
+                browser.pages += 1
+                self.stats["pages"] += 1
+                await self._checkin(browser, broken)
+
+    # ---------------------------------------------------------- maintenance
+
+    async def health_check(self):
+        """Shut down idle instances that are unresponsive, expired or idle too long"""
+        with self._lock:
+            candidates, self._idle = self._idle, []
+        keep = []
+        for browser in candidates:
+            idle_for = time.time() - browser.last_used
+            if idle_for >= self.idle_seconds or self._expired(browser):
+                await asyncio.to_thread(self._quit, browser)
+            elif await asyncio.to_thread(self._healthy, browser):
+                keep.append(browser)
+            else:
+                self.stats["unhealthy"] += 1
+                await asyncio.to_thread(self._quit, browser)
+        with self._lock:
+            self._idle.extend(keep)
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(BROWSER_HEALTH_INTERVAL_SECONDS)
+            try:
+                await self.health_check()
+            except Exception as e:
+                logger.warning(f"Browser health check failed: {e}")
+
+    async def close(self):
+        """Shut down all idle instances and stop maintenance"""
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            self._maintenance = None
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for browser in idle:
+            await asyncio.to_thread(self._quit, browser)
+
+    def close_sync(self):
+        """Quit every instance (process exit)"""
+        with self._lock:
+            browsers, self._idle = self._idle + self._leased, []
+            self._leased = []
+        for browser in browsers:
+            self._quit(browser)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Pool counters"""
+        with self._lock:
+            return {**self.stats, "idle": len(self._idle), "leased": len(self._leased), "size": self.size}
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the shared browser pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+        return _pool
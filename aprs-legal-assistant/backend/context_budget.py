@@ -0,0 +1,277 @@
+"""
+Token-budgeted context assembly for RAG prompts.
+
+Retrieved chunks used to be pasted into the prompt whole, with no token
+accounting, so a handful of 1000-character chunks plus web snippets could
+exceed the model's context window (truncating the query or failing the call)
+and made every prefill slower than it needed to be. Before generation the
+assembler
+  - counts tokens with the target model's tokenizer (falling back to a
+    characters-per-token estimate when it cannot be loaded),
+  - trims the text that neighbouring chunks share (the text splitter
+    overlaps chunks by 200 characters) and drops repeated sentences,
+  - packs the highest-scoring passages into the token budget, and
+  - extracts the sentences most relevant to the query from a passage that
+    does not fit whole.
+"""
+import os
+import re
+import logging
+import threading
+import unicodedata
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional
+
+from backend.llm_gateway import LLM_MAX_TOKENS
+
+logger = logging.getLogger("context_budget")
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+LLM_CONTEXT_WINDOW = int(os.getenv("LLM_CONTEXT_WINDOW", "4096"))
+# Instructions and headers around the retrieved context
+CONTEXT_PROMPT_OVERHEAD_TOKENS = int(os.getenv("CONTEXT_PROMPT_OVERHEAD_TOKENS", "200"))
+CONTEXT_MIN_PASSAGE_TOKENS = int(os.getenv("CONTEXT_MIN_PASSAGE_TOKENS", "48"))
+CONTEXT_MIN_OVERLAP_CHARS = int(os.getenv("CONTEXT_MIN_OVERLAP_CHARS", "40"))
+CONTEXT_MAX_OVERLAP_CHARS = int(os.getenv("CONTEXT_MAX_OVERLAP_CHARS", "400"))
+
+# Tokens reserved per passage for its "Document i:" / "Source:" lines
+_PASSAGE_OVERHEAD_TOKENS = 12
+_CHARS_PER_TOKEN = 4
+_SENTENCE = re.compile(r"(?<=[.!?;:])\s+|\n+")
+_WORD = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "by", "with", "is", "are", "was",
+    "be", "what", "which", "who", "how", "can", "i", "my", "me", "it", "this", "that", "under", "as",
+    "at", "from", "if", "do", "does", "any", "there", "their", "they", "will", "shall",
+}
+
+
+@dataclass
+class Passage:
+    """A retrieved text with its relevance score and caller metadata"""
+    text: str
+    score: float = 0.0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    compressed: bool = False
+
+
+@dataclass
+class PackedContext:
+    """Passages chosen for a prompt, highest score first"""
+    passages: List[Passage]
+    tokens: int
+    budget: int
+    dropped: int = 0
+    compressed: int = 0
+
+
+class TokenCounter:
+    """Counts tokens with a Hugging Face tokenizer, loaded on first use"""
+
+    def __init__(self, tokenizer_name: Optional[str] = None):
+        """
+        Args:
+            tokenizer_name: Tokenizer to load (defaults to CONTEXT_TOKENIZER,
+                then HF_MODEL); None or a failed load uses an estimate
+        """
+        self.tokenizer_name = tokenizer_name or os.getenv("CONTEXT_TOKENIZER") or os.getenv("HF_MODEL")
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _get_tokenizer(self):
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                if self.tokenizer_name:
+                    try:
+                        from transformers import AutoTokenizer
+
+                        self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name)
+                    except Exception as e:
+                        logger.warning(f"Could not load tokenizer {self.tokenizer_name}, estimating token counts: {e}")
+            return self._tokenizer
+
+    def count(self, text: str) -> int:
+        """Number of tokens in a text"""
+        if not text:
+            return 0
+        tokenizer = self._get_tokenizer()
+        if tokenizer is None:
+            return max(1, -(-len(text) // _CHARS_PER_TOKEN))
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def _normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences (and lines), dropping empty pieces"""
+    return [sentence.strip() for sentence in _SENTENCE.split(text) if sentence and sentence.strip()]
+
+
+def _overlap(head: str, tail: str, min_chars: int, max_chars: int) -> int:
+    """Length of the longest suffix of head that is a prefix of tail"""
+    if len(head) < min_chars or len(tail) < min_chars:
+        return 0
+    window_start = max(0, len(head) - max_chars)
+    probe = tail[:min_chars]
+    best = 0
+    position = head.find(probe, window_start)
+    while position != -1:
+        length = len(head) - position
+        if length <= len(tail) and tail.startswith(head[position:]):
+            best = max(best, length)
+            break  # earlier positions give longer overlaps, so the first match wins
+        position = head.find(probe, position + 1)
+    return best
+
+
+def remove_overlaps(passages: List[Passage], min_chars: int = CONTEXT_MIN_OVERLAP_CHARS,
+                    max_chars: int = CONTEXT_MAX_OVERLAP_CHARS) -> List[Passage]:
+    """
+    Drop passages contained in a kept one, trim text shared with a kept
+    passage at either end, and drop sentences already kept.
+
+    Args:
+        passages: Passages in priority order
+        min_chars: Shortest shared text treated as chunk overlap
+        max_chars: Longest chunk overlap looked for
+
+    Returns:
+        Remaining passages in the same order
+    """
+    kept: List[Passage] = []
+    seen_sentences = set()
+    for passage in passages:
+        text = passage.text.strip()
+        normalized = _normalize(text)
+        if not normalized or any(normalized in _normalize(other.text) for other in kept):
+            continue
+        for other in kept:
+            # other ... | shared | ... text   and   text ... | shared | ... other
+            cut = _overlap(other.text, text, min_chars, max_chars)
+            if cut:
+                text = text[cut:].lstrip()
+            cut = _overlap(text, other.text, min_chars, max_chars)
+            if cut:
+                text = text[:-cut].rstrip()
+        sentences = []
+        for sentence in split_sentences(text):
+            key = _normalize(sentence)
+            if len(key) >= min_chars and key in seen_sentences:
+                continue
+            seen_sentences.add(key)
+            sentences.append(sentence)
+        text = " ".join(sentences)
+        if text:
+            kept.append(replace(passage, text=text))
+    return kept
+
+
+class ContextAssembler:
+    """Selects and trims retrieved passages to fit a token budget"""
+
+    def __init__(self, counter: Optional[TokenCounter] = None, token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 context_window: int = LLM_CONTEXT_WINDOW, max_new_tokens: int = LLM_MAX_TOKENS,
+                 min_passage_tokens: int = CONTEXT_MIN_PASSAGE_TOKENS):
+        """
+        Args:
+            counter: Token counter for the target model
+            token_budget: Most tokens of retrieved context per prompt
+            context_window: Model context window in tokens
+            max_new_tokens: Tokens reserved for the answer
+            min_passage_tokens: Smallest remainder worth filling with extracted sentences
+        """
+        self.counter = counter or TokenCounter()
+        self.token_budget = token_budget
+        self.context_window = context_window
+        self.max_new_tokens = max_new_tokens
+        self.min_passage_tokens = min_passage_tokens
+
+    def budget_for(self, query: str) -> int:
+        """Context tokens available next to this query, its instructions and the answer"""
+        available = (self.context_window - self.max_new_tokens - CONTEXT_PROMPT_OVERHEAD_TOKENS
+                     - self.counter.count(query))
+        return max(0, min(self.token_budget, available))
+
+    def extract(self, query: str, text: str, budget: int) -> str:
+        """
+        Keep the sentences of a text that share the most terms with the query.
+
+        Args:
+            query: The user's query
+            text: Passage text
+            budget: Tokens the result may use
+
+        Returns:
+            Selected sentences in their original order ("" if none fit)
+        """
+        query_terms = {word for word in _WORD.findall(query.lower()) if word not in _STOPWORDS}
+        sentences = split_sentences(text)
+        ranked = []
+        for position, sentence in enumerate(sentences):
+            terms = set(_WORD.findall(sentence.lower()))
+            # Query terms first; ties go to earlier sentences, which usually state the rule
+            ranked.append((-len(query_terms & terms), position))
+        chosen, used = [], 0
+        for _, position in sorted(ranked):
+            cost = self.counter.count(sentences[position]) + 1
+            if used + cost <= budget:
+                chosen.append(position)
+                used += cost
+        return " ".join(sentences[position] for position in sorted(chosen))
+
+    def pack(self, query: str, passages: List[Passage], budget: Optional[int] = None) -> PackedContext:
+        """
+        Choose the passages that go into the prompt.
+
+        Args:
+            query: The user's query
+            passages: Retrieved passages (any order)
+            budget: Context tokens (defaults to budget_for(query))
+
+        Returns:
+            PackedContext with passages in descending score order
+        """
+        budget = self.budget_for(query) if budget is None else budget
+        ranked = sorted(passages, key=lambda passage: passage.score, reverse=True)
+        candidates = remove_overlaps(ranked)
+
+        packed: List[Passage] = []
+        used = compressed = 0
+        for passage in candidates:
+            cost = self.counter.count(passage.text) + _PASSAGE_OVERHEAD_TOKENS
+            if used + cost <= budget:
+                packed.append(passage)
+                used += cost
+                continue
+            remaining = budget - used - _PASSAGE_OVERHEAD_TOKENS
+            if remaining < self.min_passage_tokens:
+                continue
+            extracted = self.extract(query, passage.text, remaining)
+            if extracted:
+                cost = self.counter.count(extracted) + _PASSAGE_OVERHEAD_TOKENS
+                packed.append(replace(passage, text=extracted, compressed=True))
+                used += cost
+                compressed += 1
+
+        result = PackedContext(passages=packed, tokens=used, budget=budget,
+                               dropped=len(passages) - len(packed), compressed=compressed)
+        logger.debug(f"Packed {len(packed)}/{len(passages)} passages into {used}/{budget} tokens "
+                     f"({compressed} compressed)")
+        return result
+
+
+_assembler_instance: Optional[ContextAssembler] = None
+_assembler_lock = threading.Lock()
+
+
+def get_context_assembler() -> ContextAssembler:
+    """Return the shared context assembler"""
+    global _assembler_instance
+    with _assembler_lock:
+        if _assembler_instance is None:
+            _assembler_instance = ContextAssembler()
+        return _assembler_instance
@@ -0,0 +1,373 @@
+"""
+Persistent crawl state shared by the scraper, the crawler and the document
+processor.
+
+One SQLite database holds
+  - the URL frontier: every search page, document and PDF with its status,
+    so an interrupted session resumes where it stopped; queued and running
+    items are leased by the session that owns them, so concurrent sessions
+    (several ingestion workers) only resume items whose owner went away,
+  - dedup by canonical URL (tracking parameters, fragments, default ports,
+    "www." and parameter order do not create new entries),
+  - HTTP validators (ETag / Last-Modified) for conditional GETs and the
+    content hash of the last fetch, so unchanged documents are not saved,
+    downloaded or embedded again,
+  - hashes of files the document processor has already processed.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import urllib.parse
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger("crawl_state")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+CRAWL_STATE_DB = os.getenv("CRAWL_STATE_DB", os.path.join(DATA_DIR, "crawl_state.sqlite"))
+# Documents fetched more recently than this are not requested again at all
+CRAWL_REVALIDATE_AFTER_HOURS = float(os.getenv("CRAWL_REVALIDATE_AFTER_HOURS", "24"))
+# Queued or running items whose owner has not renewed its lease for this long are resumed by other sessions
+CRAWL_LEASE_SECONDS = float(os.getenv("CRAWL_LEASE_SECONDS", "300"))
+
+# Kinds whose results change between visits; they are always fetched again
+VOLATILE_KINDS = {"search"}
+
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "ref", "ref_src", "sessionid", "phpsessid"}
+
+PENDING, IN_PROGRESS, DONE, FAILED = "pending", "in_progress", "done", "failed"
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of a URL used as its dedup key.
+
+    Lower-cases scheme and host, drops "www.", default ports, fragments and
+    tracking parameters, sorts the query and collapses duplicate slashes.
+
+    Args:
+        url: Absolute URL
+
+    Returns:
+        Canonical URL
+    """
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+
+    path = urllib.parse.quote(urllib.parse.unquote(parts.path or "/"), safe="/:@!$&'()*+,;=-._~")
+    while "//" in path:
+        path = path.replace("//", "/")
+    if len(path) > 1 and path.endswith("/"):
+        path = path[:-1]
+
+    query = sorted(
+        (key, value)
+        for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    # Scheme is not part of the identity: http and https serve the same document
+    return urllib.parse.urlunsplit(("https" if scheme in ("http", "https") else scheme, host, path,
+                                    urllib.parse.urlencode(query), ""))
+
+
+def url_key(url: str) -> str:
+    """Short stable identifier of a URL (used for file names and document ids)"""
+    return hashlib.sha1(canonicalize_url(url).encode("utf-8")).hexdigest()[:20]
+
+
+def content_hash(content: Union[str, bytes]) -> str:
+    """SHA-256 of text or bytes"""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CrawlState:
+    """SQLite-backed frontier, validators and content hashes"""
+
+    def __init__(self, db_path: str = CRAWL_STATE_DB, revalidate_after_hours: float = CRAWL_REVALIDATE_AFTER_HOURS,
+                 lease_seconds: float = CRAWL_LEASE_SECONDS):
+        """
+        Initialize the crawl state.
+
+        Args:
+            db_path: SQLite database file
+            revalidate_after_hours: Minimum age before a finished document is requested again
+            lease_seconds: Age of a lease after which another session may resume the item
+        """
+        self.db_path = db_path
+        self.revalidate_after = revalidate_after_hours * 3600
+        self.lease_seconds = lease_seconds
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS urls (
+                canonical TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                source TEXT NOT NULL,
+                data TEXT NOT NULL DEFAULT '{}',
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                file_path TEXT,
+                error TEXT,
+                queued_at REAL NOT NULL,
+                fetched_at REAL,
+                changed_at REAL,
+                owner TEXT,
+                leased_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS urls_status ON urls (status);
+            CREATE TABLE IF NOT EXISTS processed (
+                content_hash TEXT PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                processed_at REAL NOT NULL
+            );
+            """
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(urls)")}
+        for column, column_type in (("owner", "TEXT"), ("leased_at", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE urls ADD COLUMN {column} {column_type}")
+        self._conn.commit()
+
+    # -------------------------------------------------------------- frontier
+
+    def enqueue(self, kind: str, source: str, url: str, data: Optional[Dict[str, Any]] = None,
+                owner: Optional[str] = None) -> bool:
+        """
+        Add a URL to the frontier.
+
+        Args:
+            kind: Work item kind ("search", "document", "pdf", ...)
+            source: Source name
+            url: URL to fetch
+            data: Extra item data (JSON-serializable)
+            owner: Session that will fetch it (holds the lease)
+
+        Returns:
+            False if the URL should not be fetched now (already queued, or a
+            document finished less than revalidate_after ago)
+        """
+        canonical = canonicalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT status, fetched_at FROM urls WHERE canonical = ?", (canonical,)).fetchone()
+            if row is not None:
+                if row["status"] in (PENDING, IN_PROGRESS):
+                    return False
+                fresh = row["fetched_at"] is not None and now - row["fetched_at"] < self.revalidate_after
+                if row["status"] == DONE and kind not in VOLATILE_KINDS and fresh:
+                    return False
+                self._conn.execute(
+                    "UPDATE urls SET status = ?, attempts = 0, error = NULL, data = ?, queued_at = ?, owner = ?, "
+                    "leased_at = ? WHERE canonical = ?",
+                    (PENDING, json.dumps(data or {}), now, owner, now, canonical),
+                )
+            else:
+                self._conn.execute(
+                    "INSERT INTO urls (canonical, url, kind, source, data, status, queued_at, owner, leased_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (canonical, url, kind, source, json.dumps(data or {}), PENDING, now, owner, now),
+                )
+            self._conn.commit()
+        return True
+
+    def pending(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Take over the items left pending or in progress by sessions that went
+        away: unowned items and items whose lease expired. Items of a live
+        session (another ingestion worker) are left alone.
+
+        Args:
+            owner: Session resuming the items (takes over their leases)
+
+        Returns:
+            The items, oldest first
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT canonical, kind, source, url, data FROM urls WHERE status IN (?, ?) "
+                "AND (owner IS NULL OR leased_at IS NULL OR leased_at < ?) ORDER BY queued_at",
+                (PENDING, IN_PROGRESS, now - self.lease_seconds),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE urls SET owner = ?, leased_at = ? WHERE canonical = ?",
+                [(owner, now, row["canonical"]) for row in rows],
+            )
+            self._conn.commit()
+        return [{"kind": row["kind"], "source": row["source"], "url": row["url"], "data": json.loads(row["data"])}
+                for row in rows]
+
+    def renew(self, owner: str) -> int:
+        """
+        Extend the leases of a session's queued and running items.
+
+        Returns:
+            Number of items renewed
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE urls SET leased_at = ? WHERE owner = ? AND status IN (?, ?)",
+                (time.time(), owner, PENDING, IN_PROGRESS),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def _set_status(self, url: str, status: str, error: Optional[str] = None, owner: Optional[str] = None):
+        now = time.time()
+        running = status == IN_PROGRESS
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE urls SET status = ?, error = ?, attempts = attempts + ?,
+                    fetched_at = CASE WHEN ? THEN ? ELSE fetched_at END,
+                    owner = CASE WHEN ? THEN ? ELSE NULL END,
+                    leased_at = CASE WHEN ? THEN ? ELSE NULL END
+                WHERE canonical = ?
+                """,
+                (status, error, 1 if running else 0, status == DONE, now, running, owner, running, now,
+                 canonicalize_url(url)),
+            )
+            self._conn.commit()
+
+    def start(self, url: str, owner: Optional[str] = None):
+        """Mark a URL as being fetched by a session"""
+        self._set_status(url, IN_PROGRESS, owner=owner)
+
+    def finish(self, url: str):
+        """Mark a URL as done"""
+        self._set_status(url, DONE)
+
+    def fail(self, url: str, error: str):
+        """Mark a URL as failed after its last retry"""
+        self._set_status(url, FAILED, error[:500])
+
+    # ----------------------------------------------------- validators/hashes
+
+    def record(self, url: str) -> Optional[Dict[str, Any]]:
+        """Stored validators, content hash and file of a URL (None if never seen)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_hash, file_path, fetched_at, changed_at FROM urls WHERE canonical = ?",
+                (canonicalize_url(url),),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a conditional GET"""
+        record = self.record(url) or {}
+        headers = {}
+        if record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+        return headers
+
+    def record_fetch(self, url: str, kind: str, source: str, etag: Optional[str] = None,
+                     last_modified: Optional[str] = None, digest: Optional[str] = None,
+                     file_path: Optional[str] = None) -> bool:
+        """
+        Store the result of a fetch.
+
+        Args:
+            url: Fetched URL
+            kind: Work item kind
+            source: Source name
+            etag: ETag response header
+            last_modified: Last-Modified response header
+            digest: Content hash (None for a 304 response: the previous hash is kept)
+            file_path: Where the content was saved
+
+        Returns:
+            True if the content changed since the previous fetch (or is new)
+        """
+        canonical = canonicalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM urls WHERE canonical = ?", (canonical,)).fetchone()
+            changed = digest is not None and (row is None or row["content_hash"] != digest)
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO urls (canonical, url, kind, source, status, queued_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (canonical, url, kind, source, DONE, now),
+                )
+            self._conn.execute(
+                """
+                UPDATE urls SET
+                    etag = COALESCE(?, etag),
+                    last_modified = COALESCE(?, last_modified),
+                    content_hash = COALESCE(?, content_hash),
+                    file_path = COALESCE(?, file_path),
+                    fetched_at = ?,
+                    changed_at = CASE WHEN ? THEN ? ELSE changed_at END
+                WHERE canonical = ?
+                """,
+                (etag, last_modified, digest, file_path, now, changed, now, canonical),
+            )
+            self._conn.commit()
+        return changed
+
+    # ------------------------------------------------------ processed files
+
+    def is_processed(self, digest: str) -> bool:
+        """Whether a file with this content hash was already processed"""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM processed WHERE content_hash = ?", (digest,)).fetchone() is not None
+
+    def mark_processed(self, digest: str, file_path: str):
+        """Remember that a file's content has been processed and embedded"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO processed (content_hash, file_path, processed_at) VALUES (?, ?, ?)",
+                (digest, file_path, time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """URL counts by status and number of processed files"""
+        with self._lock:
+            by_status = dict(self._conn.execute("SELECT status, COUNT(*) FROM urls GROUP BY status").fetchall())
+            processed = self._conn.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+        return {"urls": by_status, "processed_files": processed}
+
+
+_state: Optional[CrawlState] = None
+_state_lock = threading.Lock()
+
+
+def get_crawl_state() -> CrawlState:
+    """Return the shared crawl state"""
+    global _state
+    with _state_lock:
+        if _state is None:
+            _state = CrawlState()
+        return _state
@@ -3,23 +3,19 @@ import json
 import time
 import asyncio
 from typing import List, Optional, Dict, Any
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service
-from selenium.webdriver.edge.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
 from bs4 import BeautifulSoup
 import requests
 import uuid
 
+from backend.crawl_state import content_hash, get_crawl_state, url_key
+from backend.fetch_strategy import FetchStrategy, ParsedPage
+
 # Import RAG system for vectorizing
 from backend.rag import RAGSystem
 
 class LegalCrawler:
     def __init__(self):
-        """Initialize the legal crawler with Selenium and Chrome."""
+        """Initialize the legal crawler (HTTP first, pooled headless browsers as fallback)."""
         self.data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
         self.raw_data_dir = os.path.join(self.data_dir, "raw")
         os.makedirs(self.raw_data_dir, exist_ok=True)
@@ -27,34 +23,62 @@ class LegalCrawler:
         # Initialize RAG system for vectorizing
         self.rag_system = RAGSystem()
         
+        # Validators and content hashes of crawled pages (shared with the scraper)
+        self.state = get_crawl_state()
+        
+        # Pages are fetched over plain HTTP; a browser is leased from the shared
+        # pool only when the content selector is missing from the raw HTML
+        self.fetcher = FetchStrategy()
+        
         # Legal websites to crawl
         self.legal_websites = {
             "indiankanoon": {
                 "base_url": "https://indiankanoon.org",
                 "search_url": "https://indiankanoon.org/search/?formInput={}",
-                "parser": self._parse_indiankanoon
+                "selectors": {
+                    "search_results": "a.result_title",
+                    "content": "#doc_content",
+                    "title": "div.docTitle",
+                    "meta": "div.docsource_main"
+                },
+                "meta_label": "Metadata",
+                "untitled": "Untitled Document"
             },
             "legislative": {
                 "base_url": "https://legislative.gov.in",
                 "search_url": "https://legislative.gov.in/en/search/node/{}",
-                "parser": self._parse_legislative
+                "selectors": {
+                    "search_results": "h3.title a",
+                    "content": "#main-content",
+                    "title": "h1.page-title"
+                },
+                "untitled": "Untitled Document"
             },
             "barandbench": {
                 "base_url": "https://www.barandbench.com",
                 "search_url": "https://www.barandbench.com/search?q={}",
-                "parser": self._parse_barandbench
+                "selectors": {
+                    "search_results": "h2.entry-title a",
+                    "content": ".entry-content",
+                    "title": "h1.entry-title",
+                    "meta": "time.entry-date"
+                },
+                "meta_label": "Date",
+                "untitled": "Untitled Article"
             },
             "latestlaws": {
                 "base_url": "https://www.latestlaws.com",
                 "search_url": "https://www.latestlaws.com/search?q={}",
-                "parser": self._parse_latestlaws
+                "selectors": {
+                    "search_results": "h3.entry-title a",
+                    "content": ".entry-content",
+                    "title": "h1.entry-title"
+                },
+                "untitled": "Untitled Document"
             }
         }
 
     
-    # Cache the Edge driver path to prevent repeated downloads
-    _edge_driver_path = None
-
     def _human_like_mouse_move_and_click(self, driver, element):
         """
         Move the mouse in a human-like jittery way to the element and click using ActionChains.
@@ -93,29 +117,6 @@ class LegalCrawler:
         from backend.google_search import get_top_google_results
         return get_top_google_results(query, num_results)
 
-    def _setup_driver(self):
-        """Set up Edge driver (visible window for debugging, random user-agent). Cache driver binary to avoid repeated downloads."""
-        import random
-        edge_options = Options()
-        # REMOVE headless for visible browser
-        # edge_options.add_argument("--headless")
-        edge_options.add_argument("--no-sandbox")
-        edge_options.add_argument("--disable-dev-shm-usage")
-        # Randomize user-agent to mimic real users
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.1 Safari/605.1.15",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/117.0"
-        ]
-        user_agent = random.choice(user_agents)
-        edge_options.add_argument(f"--user-agent={user_agent}")
-        if LegalCrawler._edge_driver_path is None:
-            LegalCrawler._edge_driver_path = EdgeChromiumDriverManager().install()
-        service = Service(LegalCrawler._edge_driver_path)
-        driver = webdriver.Edge(service=service, options=edge_options)
-        return driver
-    
     async def crawl(self, urls: Optional[List[str]] = None, query: Optional[str] = None):
         """
         Crawl legal websites for content.
@@ -124,51 +125,62 @@ class LegalCrawler:
             urls: List of specific URLs to crawl
             query: Search query to use for finding legal content
         """
-        driver = self._setup_driver()
-        
         try:
             if urls:
                 # Crawl specific URLs
                 for url in urls:
-                    await self._crawl_url(driver, url)
+                    await self._crawl_url(url)
             
             if query:
                 # Search and crawl results from legal websites
-                await self._search_and_crawl(driver, query)
+                await self._search_and_crawl(query)
         
         finally:
-            driver.quit()
+            await self.fetcher.close()
+            print(f"Page fetches: {self.fetcher.stats}")
     
-    async def _crawl_url(self, driver, url: str):
+    async def _crawl_url(self, url: str):
         """
         Crawl a specific URL and extract legal content.
         
+        A pooled browser is only used if plain HTTP does not return the
+        site's content element.
+        
         Args:
-            driver: Selenium WebDriver
             url: URL to crawl
         """
         try:
             print(f"Crawling URL: {url}")
-            driver.get(url)
-            
-            # Wait for page to load
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
             
-            # Extract domain to determine which parser to use
+            # Extract domain to determine which selectors to use
             domain = self._extract_domain(url)
+            site_info = self.legal_websites.get(domain)
+            required = site_info["selectors"]["content"] if site_info else None
+            
+            page = await self.fetcher.fetch(url, required,
+                                            validators=self.state.conditional_headers(url))
+            if page.not_modified:
+                self.state.record_fetch(url, "page", domain, page.etag, page.last_modified)
+                print(f"Not modified since last crawl: {url}")
+                return True
             
             # Parse content based on domain
-            if domain in self.legal_websites:
-                content = self.legal_websites[domain]["parser"](driver)
+            if site_info:
+                content = self._parse_site(page, site_info)
             else:
                 # Use generic parser
-                content = self._parse_generic(driver)
+                content = self._parse_generic(page)
             
             if content:
-                # Save content to file
-                file_id = str(uuid.uuid4())
+                # Skip pages whose content is unchanged since the last crawl
+                digest = content_hash(content)
+                if digest == (self.state.record(url) or {}).get("content_hash"):
+                    self.state.record_fetch(url, "page", domain, page.etag, page.last_modified, digest)
+                    print(f"Content unchanged since last crawl: {url}")
+                    return True
+                
+                # Save content to file (one file per canonical URL)
+                file_id = url_key(url)
                 file_path = os.path.join(self.raw_data_dir, f"{file_id}.json")
                 
                 with open(file_path, "w", encoding="utf-8") as f:
@@ -186,6 +198,7 @@ class LegalCrawler:
                     "file_id": file_id
                 }
                 await self.rag_system.vectorize_text(content, metadata)
+                self.state.record_fetch(url, "page", domain, page.etag, page.last_modified, digest, file_path)
                 
                 print(f"Successfully crawled and vectorized content from {url}")
                 return True
@@ -197,12 +210,11 @@ class LegalCrawler:
             print(f"Error crawling {url}: {e}")
             return False
     
-    async def _search_and_crawl(self, driver, query: str):
+    async def _search_and_crawl(self, query: str):
         """
         Search legal websites and crawl results.
         
         Args:
-            driver: Selenium WebDriver
             query: Search query
         """
         for site_name, site_info in self.legal_websites.items():
@@ -210,27 +222,17 @@ class LegalCrawler:
                 search_url = site_info["search_url"].format(query.replace(" ", "+"))
                 print(f"Searching {site_name} with query: {query}")
                 
-                driver.get(search_url)
+                selector = site_info["selectors"]["search_results"]
+                page = await self.fetcher.fetch(search_url, selector)
                 
-                # Wait for search results
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
-                
-                # Extract result links
-                result_links = self._extract_search_results(driver, site_name)
+                # Extract result links (resolved against the page URL)
+                result_links = page.select_links(selector)
                 
                 print(f"Found {len(result_links)} results on {site_name}")
                 
                 # Crawl top results (limit to 5 per site to avoid overloading)
-                for i, link in enumerate(result_links[:5]):
-                    if not link.startswith("http"):
-                        if link.startswith("/"):
-                            link = site_info["base_url"] + link
-                        else:
-                            link = site_info["base_url"] + "/" + link
-                    
-                    await self._crawl_url(driver, link)
+                for link in result_links[:5]:
+                    await self._crawl_url(link)
                     
                     # Add a small delay between requests
                     await asyncio.sleep(2)
@@ -244,50 +246,6 @@ class LegalCrawler:
             except Exception as e:
                 print(f"Error searching {site_name}: {e}")
     
-    def _extract_search_results(self, driver, site_name: str) -> List[str]:
-        """
-        Extract search result links from a search page.
-        
-        Args:
-            driver: Selenium WebDriver
-            site_name: Name of the legal website
-            
-        Returns:
-            List of URLs from search results
-        """
-        links = []
-        
-        try:
-            if site_name == "indiankanoon":
-                # Extract links from Indian Kanoon search results
-                elements = driver.find_elements(By.CSS_SELECTOR, "a.result_title")
-                links = [elem.get_attribute("href") for elem in elements]
-            
-            elif site_name == "legislative":
-                # Extract links from Legislative.gov.in search results
-                elements = driver.find_elements(By.CSS_SELECTOR, "h3.title a")
-                links = [elem.get_attribute("href") for elem in elements]
-            
-            elif site_name == "barandbench":
-                # Extract links from Bar and Bench search results
-                elements = driver.find_elements(By.CSS_SELECTOR, "h2.entry-title a")
-                links = [elem.get_attribute("href") for elem in elements]
-            
-            elif site_name == "latestlaws":
-                # Extract links from Latest Laws search results
-                elements = driver.find_elements(By.CSS_SELECTOR, "h3.entry-title a")
-                links = [elem.get_attribute("href") for elem in elements]
-            
-            else:
-                # Generic extraction of links
-                elements = driver.find_elements(By.TAG_NAME, "a")
-                links = [elem.get_attribute("href") for elem in elements if elem.get_attribute("href")]
-        
-        except Exception as e:
-            print(f"Error extracting search results from {site_name}: {e}")
-        
-        return [link for link in links if link]  # Filter out None values
-    
     def _extract_domain(self, url: str) -> str:
         """
         Extract domain from URL.
@@ -304,164 +262,44 @@ class LegalCrawler:
         
         return "generic"
     
-    def _parse_indiankanoon(self, driver) -> str:
+    def _parse_site(self, page: ParsedPage, site_info: Dict[str, Any]) -> str:
         """
-        Parse content from Indian Kanoon.
+        Parse content from a configured legal website.
         
         Args:
-            driver: Selenium WebDriver
+            page: Parsed page (plain HTTP or browser-rendered)
+            site_info: Entry from self.legal_websites
             
         Returns:
             Extracted text content
         """
-        try:
-            # Wait for content to load
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "doc_content"))
-            )
-            
-            # Extract document content
-            doc_content = driver.find_element(By.ID, "doc_content")
-            
-            # Extract title
-            title_elem = driver.find_elements(By.CSS_SELECTOR, "div.docTitle")
-            title = title_elem[0].text if title_elem else "Untitled Document"
-            
-            # Extract metadata
-            metadata_elem = driver.find_elements(By.CSS_SELECTOR, "div.docsource_main")
-            metadata = metadata_elem[0].text if metadata_elem else ""
-            
-            # Combine content
-            content = f"Title: {title}\n\nMetadata: {metadata}\n\nContent:\n{doc_content.text}"
-            
-            return content
-        
-        except Exception as e:
-            print(f"Error parsing Indian Kanoon content: {e}")
-            
+        selectors = site_info["selectors"]
+        content_text = page.select_text(selectors["content"])
+        if not content_text:
             # Fallback to generic parser
-            return self._parse_generic(driver)
-    
-    def _parse_legislative(self, driver) -> str:
-        """
-        Parse content from Legislative.gov.in.
+            return self._parse_generic(page)
         
-        Args:
-            driver: Selenium WebDriver
-            
-        Returns:
-            Extracted text content
-        """
-        try:
-            # Wait for content to load
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "main-content"))
-            )
-            
-            # Extract main content
-            main_content = driver.find_element(By.ID, "main-content")
-            
-            # Extract title
-            title_elem = driver.find_elements(By.CSS_SELECTOR, "h1.page-title")
-            title = title_elem[0].text if title_elem else "Untitled Document"
-            
-            # Combine content
-            content = f"Title: {title}\n\nContent:\n{main_content.text}"
-            
-            return content
-        
-        except Exception as e:
-            print(f"Error parsing Legislative.gov.in content: {e}")
-            
-            # Fallback to generic parser
-            return self._parse_generic(driver)
-    
-    def _parse_barandbench(self, driver) -> str:
-        """
-        Parse content from Bar and Bench.
-        
-        Args:
-            driver: Selenium WebDriver
-            
-        Returns:
-            Extracted text content
-        """
-        try:
-            # Wait for content to load
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "entry-content"))
-            )
-            
-            # Extract article content
-            article_content = driver.find_element(By.CLASS_NAME, "entry-content")
-            
-            # Extract title
-            title_elem = driver.find_elements(By.CSS_SELECTOR, "h1.entry-title")
-            title = title_elem[0].text if title_elem else "Untitled Article"
-            
-            # Extract date
-            date_elem = driver.find_elements(By.CSS_SELECTOR, "time.entry-date")
-            date = date_elem[0].text if date_elem else ""
-            
-            # Combine content
-            content = f"Title: {title}\n\nDate: {date}\n\nContent:\n{article_content.text}"
-            
-            return content
+        title = page.select_text(selectors["title"]) or site_info["untitled"]
+        parts = [f"Title: {title}"]
+        if "meta" in selectors:
+            parts.append(f"{site_info['meta_label']}: {page.select_text(selectors['meta'])}")
+        parts.append(f"Content:\n{content_text}")
         
-        except Exception as e:
-            print(f"Error parsing Bar and Bench content: {e}")
-            
-            # Fallback to generic parser
-            return self._parse_generic(driver)
-    
-    def _parse_latestlaws(self, driver) -> str:
-        """
-        Parse content from Latest Laws.
-        
-        Args:
-            driver: Selenium WebDriver
-            
-        Returns:
-            Extracted text content
-        """
-        try:
-            # Wait for content to load
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "entry-content"))
-            )
-            
-            # Extract article content
-            article_content = driver.find_element(By.CLASS_NAME, "entry-content")
-            
-            # Extract title
-            title_elem = driver.find_elements(By.CSS_SELECTOR, "h1.entry-title")
-            title = title_elem[0].text if title_elem else "Untitled Document"
-            
-            # Combine content
-            content = f"Title: {title}\n\nContent:\n{article_content.text}"
-            
-            return content
-        
-        except Exception as e:
-            print(f"Error parsing Latest Laws content: {e}")
-            
-            # Fallback to generic parser
-            return self._parse_generic(driver)
+        return "\n\n".join(parts)
     
-    def _parse_generic(self, driver) -> str:
+    def _parse_generic(self, page: ParsedPage) -> str:
         """
         Generic parser for any website.
         
         Args:
-            driver: Selenium WebDriver
+            page: Parsed page
             
         Returns:
             Extracted text content
         """
         try:
             # Extract title
-            title_elem = driver.find_elements(By.TAG_NAME, "h1")
-            title = title_elem[0].text if title_elem else "Untitled Document"
+            title = page.select_text("h1") or "Untitled Document"
             
             # Extract main content
             # Try common content selectors
@@ -472,27 +310,13 @@ class LegalCrawler:
             
             content_text = ""
             for selector in content_selectors:
-                try:
-                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    if elements:
-                        content_text = elements[0].text
-                        break
-                except:
-                    continue
+                content_text = page.select_text(selector)
+                if content_text:
+                    break
             
             # If no content found with selectors, extract body text
             if not content_text:
-                body = driver.find_element(By.TAG_NAME, "body")
-                
-                # Use BeautifulSoup to clean up the HTML and extract text
-                soup = BeautifulSoup(driver.page_source, "html.parser")
-                
-                # Remove script and style elements
-                for script in soup(["script", "style", "nav", "footer", "header"]):
-                    script.extract()
-                
-                # Get text
-                content_text = soup.get_text(separator="\n")
+                content_text = page.body_text()
             
             # Combine content
             content = f"Title: {title}\n\nContent:\n{content_text}"
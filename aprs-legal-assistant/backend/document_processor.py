@@ -14,12 +14,14 @@ except ImportError:
     logger = logging.getLogger("document_processor")
     logger.warning("PyMuPDF not installed. PDF extraction will be disabled.")
 import docx
-import uuid
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
 
 from dotenv import load_dotenv
 
+from backend.crawl_state import file_hash, get_crawl_state
+from backend.near_duplicates import get_near_duplicate_index
+from backend.model_optimizer import load_embedding_model
+
 # Load environment variables
 load_dotenv()
 
@@ -63,7 +65,14 @@ class DocumentProcessor:
         
         # Initialize embedding model
         self.embedding_model_name = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-        self.embedding_model = SentenceTransformer(self.embedding_model_name)
+        # ONNX int8 export when available (backend/model_optimizer.py)
+        self.embedding_model = load_embedding_model(self.embedding_model_name)
+        
+        # Content hashes of files already processed (skipped on later runs)
+        self.state = get_crawl_state()
+        
+        # Copies of a document from different sources are linked, not re-embedded
+        self.near_duplicates = get_near_duplicate_index()
     async def process_all_documents(self):
         """Process all documents in the documents directory."""
         # Get all document directories
@@ -80,9 +89,30 @@ class DocumentProcessor:
             for filename in os.listdir(dir_path):
                 file_path = os.path.join(dir_path, filename)
                 
-                if os.path.isfile(file_path):
+                if os.path.isfile(file_path) and not filename.endswith(".part"):
                     await self.process_document(file_path, document_type=dir_name)
     
+    async def process_queue(self, queue: "asyncio.Queue"):
+        """
+        Process documents as they arrive until a None sentinel is received.
+        
+        Args:
+            queue: Queue of (file path, document type) tuples, e.g. filled by
+                the scraper's on_document callback
+        """
+        processed = 0
+        while True:
+            entry = await queue.get()
+            try:
+                if entry is None:
+                    break
+                file_path, document_type = entry
+                await self.process_document(file_path, document_type=document_type)
+                processed += 1
+            finally:
+                queue.task_done()
+        logger.info(f"Extraction queue drained: {processed} documents")
+    
     async def process_document(self, file_path: str, document_type: str = None):
         """
         Process a single document.
@@ -92,6 +122,12 @@ class DocumentProcessor:
             document_type: Type of document (optional)
         """
         try:
+            # Skip content that has already been processed under any file name
+            digest = await asyncio.to_thread(file_hash, file_path)
+            if self.state.is_processed(digest):
+                logger.info(f"Already processed, skipping: {file_path}")
+                return None, None
+            
             logger.info(f"Processing document: {file_path}")
             
             # Extract text from the document
@@ -105,6 +141,20 @@ class DocumentProcessor:
             if document_type:
                 metadata["document_type"] = document_type
             
+            # Link near-duplicates to the copy that is already embedded
+            doc_id = metadata.get("id") or Path(file_path).stem
+            canonical_id, similarity = await asyncio.to_thread(
+                self.near_duplicates.add, doc_id, text, metadata.get("source")
+            )
+            metadata["canonical_id"] = canonical_id
+            if canonical_id != doc_id:
+                metadata["duplicate_of"] = canonical_id
+                metadata["duplicate_similarity"] = round(similarity, 3)
+                processed_path = self._save_processed_text(text, file_path, metadata)
+                self.state.mark_processed(digest, file_path)
+                logger.info(f"Skipping embedding of {file_path}: near-duplicate of {canonical_id}")
+                return processed_path, None
+            
             # Save the processed text
             processed_path = self._save_processed_text(text, file_path, metadata)
             
@@ -116,7 +166,8 @@ class DocumentProcessor:
             chunks_path = self._save_chunks(chunks, file_path, metadata)
             
             # Embed and store chunks
-            await self._embed_and_store(chunks, metadata)
+            if await self._embed_and_store(chunks, metadata) is not None:
+                self.state.mark_processed(digest, file_path)
             
             return processed_path, chunks_path
         
@@ -300,10 +351,10 @@ class DocumentProcessor:
             # Set the save path
             save_path = os.path.join(self.chunks_dir, filename)
             
-            # Prepare chunks with IDs
+            # Prepare chunks with the IDs their vectors are stored under
             chunks_with_ids = [
-                {"id": str(uuid.uuid4()), "text": chunk, "metadata": metadata}
-                for chunk in chunks
+                {"id": f"{metadata['canonical_id']}:{i}", "text": chunk, "metadata": metadata}
+                for i, chunk in enumerate(chunks)
             ]
             
             # Save chunks
@@ -329,8 +380,8 @@ class DocumentProcessor:
         try:
             logger.info(f"Embedding and storing {len(chunks)} chunks")
             
-            # Generate IDs for chunks
-            ids = [str(uuid.uuid4()) for _ in range(len(chunks))]
+            # Stable IDs: re-processing a document overwrites its chunks instead of adding copies
+            ids = [f"{metadata['canonical_id']}:{i}" for i in range(len(chunks))]
             
             # Embed chunks
             embeddings = self.embedding_model.encode(chunks)
@@ -0,0 +1,334 @@
+"""
+Async download manager for legal PDFs.
+
+- Downloads run concurrently (DOWNLOAD_CONCURRENCY) over one pooled aiohttp
+  session, all drawing from a global bandwidth token bucket
+  (DOWNLOAD_BANDWIDTH_KBPS, 0 = unlimited).
+- Large files on servers that accept byte ranges (gazette PDFs run to
+  hundreds of MB) are fetched as parallel segments written into one
+  preallocated file.
+- Partial downloads live in "<name>.part" with a "<name>.part.json" sidecar
+  recording the validator and completed byte ranges, so an interrupted
+  download resumes with Range/If-Range instead of starting over.
+- The SHA-256 is computed on completion and checked against an expected
+  hash when one is given. The file is then renamed into place atomically.
+- A completion callback receives every new or changed file (e.g. to feed
+  the extraction queue).
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import inspect
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+
+from backend.scrape_engine import TokenBucket
+
+logger = logging.getLogger("download_manager")
+
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", "4"))
+DOWNLOAD_BANDWIDTH_KBPS = float(os.getenv("DOWNLOAD_BANDWIDTH_KBPS", "0"))
+DOWNLOAD_SEGMENTS = int(os.getenv("DOWNLOAD_SEGMENTS", "4"))
+DOWNLOAD_SEGMENT_MIN_MB = float(os.getenv("DOWNLOAD_SEGMENT_MIN_MB", "8"))
+DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("DOWNLOAD_TIMEOUT_SECONDS", "120"))
+DOWNLOAD_MAX_RETRIES = int(os.getenv("DOWNLOAD_MAX_RETRIES", "3"))
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+# Resume state is written at least this often while a segment downloads
+DOWNLOAD_CHECKPOINT_BYTES = 4 * 1024 * 1024
+
+
+class DownloadError(Exception):
+    """A download failed after all retries"""
+
+
+class ChecksumError(DownloadError):
+    """The downloaded file does not match the expected SHA-256"""
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of one download"""
+    url: str
+    path: str
+    status: str  # "downloaded", "unchanged" or "not_modified"
+    sha256: Optional[str] = None
+    size: int = 0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    resumed_bytes: int = 0
+    segments: int = 1
+    seconds: float = 0.0
+
+
+class DownloadManager:
+    """Concurrent, bandwidth-capped, resumable downloads"""
+
+    def __init__(
+        self,
+        concurrency: int = DOWNLOAD_CONCURRENCY,
+        bandwidth_kbps: float = DOWNLOAD_BANDWIDTH_KBPS,
+        segments: int = DOWNLOAD_SEGMENTS,
+        segment_min_mb: float = DOWNLOAD_SEGMENT_MIN_MB,
+        timeout: float = DOWNLOAD_TIMEOUT_SECONDS,
+        max_retries: int = DOWNLOAD_MAX_RETRIES,
+        on_complete: Optional[Callable[[DownloadResult], Any]] = None,
+    ):
+        """
+        Args:
+            concurrency: Files downloaded at once
+            bandwidth_kbps: Global cap in KiB/s across all downloads (0 = unlimited)
+            segments: Parallel range requests for one large file
+            segment_min_mb: Files smaller than this are fetched in one request
+            timeout: Socket read timeout in seconds (no total timeout: large files take long)
+            max_retries: Retries per request; each retry resumes where the last stopped
+            on_complete: Called (or awaited) with the result of every new or changed file
+        """
+        self.concurrency = max(1, concurrency)
+        rate = bandwidth_kbps * 1024
+        self.bandwidth = TokenBucket(rate, int(max(rate, DOWNLOAD_CHUNK_BYTES))) if rate > 0 else None
+        self.segments = max(1, segments)
+        self.segment_min_bytes = int(segment_min_mb * 1024 * 1024)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.on_complete = on_complete
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency * self.segments),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=self.timeout),
+            )
+            self._session_loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def close(self):
+        """Close the HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ---------------------------------------------------------------- public
+
+    async def download(self, url: str, dest_path: str, headers: Optional[Dict[str, str]] = None,
+                       expected_sha256: Optional[str] = None,
+                       previous_sha256: Optional[str] = None) -> DownloadResult:
+        """
+        Download a URL to dest_path.
+
+        Args:
+            url: File URL
+            dest_path: Final path; replaced atomically only when the content changed
+            headers: Conditional GET headers (If-None-Match / If-Modified-Since)
+            expected_sha256: Raise ChecksumError unless the content has this hash
+            previous_sha256: Hash of the existing file; equal content is reported as "unchanged"
+
+        Returns:
+            Download result
+
+        Raises:
+            DownloadError: If the download failed after retries
+        """
+        session = await self._get_session()
+        async with self._semaphore:
+            started = time.monotonic()
+            result = await self._download(session, url, dest_path, headers or {}, expected_sha256, previous_sha256)
+            result.seconds = round(time.monotonic() - started, 3)
+
+        if result.status == "downloaded" and self.on_complete is not None:
+            outcome = self.on_complete(result)
+            if inspect.isawaitable(outcome):
+                await outcome
+        return result
+
+    async def download_many(self, jobs: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Download several files concurrently.
+
+        Args:
+            jobs: Keyword arguments for download() per file
+
+        Returns:
+            DownloadResult or the exception per job, in order
+        """
+        return await asyncio.gather(*(self.download(**job) for job in jobs), return_exceptions=True)
+
+    # -------------------------------------------------------------- internal
+
+    async def _download(self, session, url, dest_path, headers, expected_sha256, previous_sha256) -> DownloadResult:
+        part_path = f"{dest_path}.part"
+        sidecar_path = f"{part_path}.json"
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+
+        probe = await self._probe(session, url, headers)
+        if probe["status"] == 304:
+            return DownloadResult(url, dest_path, "not_modified", previous_sha256,
+                                  etag=probe["etag"], last_modified=probe["last_modified"])
+
+        size, validator = probe["size"], probe["etag"] or probe["last_modified"]
+        state = self._load_sidecar(sidecar_path, part_path, validator, size)
+        resumed = sum(done for _, _, done in state["ranges"]) if state else 0
+
+        if probe["ranges"] and size:
+            if state is None:
+                count = self.segments if size >= self.segment_min_bytes else 1
+                bounds = [size * i // count for i in range(count + 1)]
+                state = {"validator": validator, "size": size,
+                         "ranges": [[bounds[i], bounds[i + 1] - 1, 0] for i in range(count)]}
+                await asyncio.to_thread(self._preallocate, part_path, size)
+            self._save_sidecar(sidecar_path, state)
+            if resumed:
+                logger.info(f"Resuming {url} at {resumed}/{size} bytes")
+            await asyncio.gather(*(
+                self._fetch_range(session, url, part_path, sidecar_path, state, index, validator)
+                for index in range(len(state["ranges"]))
+            ))
+            segments = len(state["ranges"])
+        else:
+            # No range support: one streamed request from the start
+            resumed = 0
+            await self._fetch_whole(session, url, part_path)
+            segments = 1
+
+        digest = await asyncio.to_thread(self._sha256, part_path)
+        file_size = os.path.getsize(part_path)
+        if size and file_size != size:
+            raise DownloadError(f"{url}: expected {size} bytes, got {file_size}")
+        if expected_sha256 and digest != expected_sha256.lower():
+            self._discard(part_path, sidecar_path)
+            raise ChecksumError(f"{url}: SHA-256 {digest} does not match expected {expected_sha256}")
+
+        result = DownloadResult(url, dest_path, "downloaded", digest, file_size, probe["etag"],
+                                probe["last_modified"], resumed, segments)
+        if digest == previous_sha256 and os.path.exists(dest_path):
+            self._discard(part_path, sidecar_path)
+            result.status = "unchanged"
+        else:
+            os.replace(part_path, dest_path)
+            self._discard(sidecar_path)
+        return result
+
+    async def _probe(self, session, url: str, headers: Dict[str, str]) -> Dict[str, Any]:
+        """HEAD the URL for size, range support and validators"""
+        info = {"status": 200, "size": 0, "ranges": False, "etag": None, "last_modified": None}
+        try:
+            async with session.head(url, headers=headers, allow_redirects=True) as response:
+                if response.status == 304 or response.status < 400:
+                    info.update(
+                        status=response.status,
+                        size=int(response.headers.get("Content-Length", 0) or 0),
+                        ranges=response.headers.get("Accept-Ranges", "").lower() == "bytes",
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    )
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            # Some servers reject HEAD; the GET path still works
+            logger.debug(f"HEAD {url} failed: {e}")
+        return info
+
+    async def _fetch_range(self, session, url, part_path, sidecar_path, state, index, validator):
+        start, end, _ = state["ranges"][index]
+        for attempt in range(self.max_retries + 1):
+            done = state["ranges"][index][2]
+            if start + done > end:
+                return
+            headers = {"Range": f"bytes={start + done}-{end}"}
+            if validator:
+                headers["If-Range"] = validator
+            try:
+                async with session.get(url, headers=headers) as response:
+                    if response.status != 206:
+                        raise DownloadError(f"{url}: range request answered with {response.status}")
+                    unsaved = 0
+                    with open(part_path, "r+b") as f:
+                        f.seek(start + done)
+                        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_BYTES):
+                            if self.bandwidth is not None:
+                                await self.bandwidth.acquire(len(chunk))
+                            f.write(chunk)
+                            state["ranges"][index][2] += len(chunk)
+                            unsaved += len(chunk)
+                            if unsaved >= DOWNLOAD_CHECKPOINT_BYTES:
+                                # Data must be on disk before the sidecar claims it
+                                f.flush()
+                                self._save_sidecar(sidecar_path, state)
+                                unsaved = 0
+                    self._save_sidecar(sidecar_path, state)
+                if start + state["ranges"][index][2] > end:
+                    return
+            except (aiohttp.ClientError, asyncio.TimeoutError, DownloadError) as e:
+                self._save_sidecar(sidecar_path, state)
+                if attempt >= self.max_retries:
+                    raise DownloadError(f"{url}: segment {index} failed: {e}") from e
+                logger.warning(f"Retrying segment {index} of {url} after error: {e}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+
+    async def _fetch_whole(self, session, url, part_path):
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    with open(part_path, "wb") as f:
+                        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_BYTES):
+                            if self.bandwidth is not None:
+                                await self.bandwidth.acquire(len(chunk))
+                            f.write(chunk)
+                return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise DownloadError(f"{url}: {e}") from e
+                logger.warning(f"Retrying {url} after error: {e}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+
+    # --------------------------------------------------------------- helpers
+
+    @staticmethod
+    def _load_sidecar(sidecar_path: str, part_path: str, validator: Optional[str], size: int) -> Optional[Dict[str, Any]]:
+        """Resume state of a partial download, if it belongs to the same remote file"""
+        if not (os.path.exists(sidecar_path) and os.path.exists(part_path)):
+            return None
+        try:
+            with open(sidecar_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not validator or state.get("validator") != validator or state.get("size") != size:
+            return None
+        return state
+
+    @staticmethod
+    def _save_sidecar(sidecar_path: str, state: Dict[str, Any]):
+        tmp_path = f"{sidecar_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, sidecar_path)
+
+    @staticmethod
+    def _preallocate(path: str, size: int):
+        with open(path, "wb") as f:
+            f.truncate(size)
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _discard(*paths: str):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,277 @@
+"""
+HTTP-first page fetching for the crawler and the document scraper.
+
+Most legal sources (Indian Kanoon judgments, legislative.gov.in acts) are
+static HTML, so a page is first fetched with a pooled aiohttp session and
+parsed with the same CSS selectors the browser path uses. Only when the
+required selector is missing from the raw HTML (the content is rendered by
+JavaScript, or the site served a bot wall) is the page loaded in Selenium,
+and the rendered DOM is parsed the same way. Browsers are leased per page
+from the shared BrowserPool, so a session that never falls back never
+starts one.
+
+Callers may pass stored validators (If-None-Match / If-Modified-Since); a 304
+response is returned as a page with `not_modified` set and no browser is used.
+
+Parsing uses selectolax when installed and BeautifulSoup (with lxml when
+available) otherwise.
+"""
+import os
+import re
+import asyncio
+import logging
+import urllib.parse
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from backend.browser_pool import BrowserPool, get_browser_pool
+
+try:
+    from selectolax.parser import HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    BS4_PARSER = "lxml"
+except ImportError:
+    BS4_PARSER = "html.parser"
+
+logger = logging.getLogger("fetch_strategy")
+
+FETCH_HTTP_FIRST = os.getenv("FETCH_HTTP_FIRST", "true").lower() == "true"
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "20"))
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "20"))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(20 * 1024 * 1024)))
+FETCH_USER_AGENT = os.getenv(
+    "FETCH_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+)
+
+# Elements whose text is never document content
+_NON_CONTENT_TAGS = ["script", "style", "noscript", "template"]
+
+
+def _clean_text(text: str) -> str:
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+class ParsedPage:
+    """HTML document queried with CSS selectors"""
+
+    def __init__(self, url: str, html: str, status: int = 200, rendered: bool = False,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """
+        Args:
+            url: Final URL of the page (after redirects); relative links resolve against it
+            html: Page markup
+            status: HTTP status (200 for browser-rendered pages)
+            rendered: True if the page came from the browser
+            etag: ETag response header
+            last_modified: Last-Modified response header
+        """
+        self.url = url
+        self.html = html
+        self.status = status
+        self.rendered = rendered
+        self.etag = etag
+        self.last_modified = last_modified
+        if SELECTOLAX_AVAILABLE:
+            self._tree = HTMLParser(html)
+            self._tree.strip_tags(_NON_CONTENT_TAGS)
+        else:
+            self._tree = BeautifulSoup(html, BS4_PARSER)
+            for element in self._tree(_NON_CONTENT_TAGS):
+                element.decompose()
+
+    @property
+    def not_modified(self) -> bool:
+        """True for a 304 answer to a conditional GET (the page has no content)"""
+        return self.status == 304
+
+    def _select(self, selector: str) -> list:
+        try:
+            if SELECTOLAX_AVAILABLE:
+                return self._tree.css(selector)
+            return self._tree.select(selector)
+        except Exception as e:
+            logger.warning(f"Invalid selector {selector!r}: {e}")
+            return []
+
+    @staticmethod
+    def _text_of(element) -> str:
+        if SELECTOLAX_AVAILABLE:
+            return _clean_text(element.text(separator="\n"))
+        return _clean_text(element.get_text(separator="\n"))
+
+    def has(self, selector: str) -> bool:
+        """Whether the selector matches an element with text"""
+        return any(self._text_of(element) for element in self._select(selector))
+
+    def select_text(self, selector: str) -> str:
+        """Text of the first element matching the selector ("" if none)"""
+        elements = self._select(selector)
+        return self._text_of(elements[0]) if elements else ""
+
+    def select_links(self, selector: str, attribute: str = "href") -> List[str]:
+        """Absolute URLs from an attribute of every matching element, in page order"""
+        links = []
+        for element in self._select(selector):
+            value = element.attributes.get(attribute) if SELECTOLAX_AVAILABLE else element.get(attribute)
+            if value and not value.startswith(("javascript:", "mailto:", "#")):
+                links.append(urllib.parse.urljoin(self.url, value))
+        return list(dict.fromkeys(links))
+
+    def body_text(self) -> str:
+        """Whole-page text without navigation chrome (generic fallback)"""
+        html = BeautifulSoup(self.html, BS4_PARSER)
+        for element in html(_NON_CONTENT_TAGS + ["nav", "footer", "header"]):
+            element.decompose()
+        return _clean_text(html.get_text(separator="\n"))
+
+
+class FetchStrategy:
+    """Fetch pages over plain HTTP, falling back to a browser when needed"""
+
+    def __init__(self, http_first: bool = FETCH_HTTP_FIRST, timeout: float = FETCH_TIMEOUT_SECONDS,
+                 max_connections: int = FETCH_MAX_CONNECTIONS, user_agent: str = FETCH_USER_AGENT,
+                 browser_pool: Optional[BrowserPool] = None):
+        """
+        Args:
+            http_first: Try plain HTTP before the browser (False always uses the browser)
+            timeout: Total timeout for one HTTP fetch in seconds
+            max_connections: Connection pool size
+            user_agent: User-Agent header for HTTP fetches
+            browser_pool: Pool used for fallbacks (the shared pool by default)
+        """
+        self.http_first = http_first
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.user_agent = user_agent
+        self._browser_pool = browser_pool
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+        self.stats: Dict[str, int] = {"http": 0, "browser": 0, "not_modified": 0, "http_errors": 0}
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={
+                    "User-Agent": self.user_agent,
+                    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+                    "Accept-Language": "en-IN,en;q=0.9",
+                },
+            )
+            self._session_loop = loop
+        return self._session
+
+    @property
+    def browser_pool(self) -> BrowserPool:
+        """Pool used for browser fallbacks"""
+        if self._browser_pool is None:
+            self._browser_pool = get_browser_pool()
+        return self._browser_pool
+
+    async def close(self):
+        """Close the HTTP session (pooled browsers stay up for other users)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def fetch_http(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[ParsedPage]:
+        """
+        Fetch and parse a page without a browser.
+
+        Args:
+            url: Page URL
+            headers: Extra request headers (e.g. conditional GET validators)
+
+        Returns:
+            Parsed page, or None if the fetch failed or the response is not HTML
+        """
+        try:
+            session = await self._get_session()
+            async with session.get(url, allow_redirects=True, headers=headers) as response:
+                validators = {"etag": response.headers.get("ETag"),
+                              "last_modified": response.headers.get("Last-Modified")}
+                if response.status == 304:
+                    return ParsedPage(str(response.url), "", status=304, **validators)
+                content_type = response.headers.get("Content-Type", "")
+                if response.status >= 400 or "html" not in content_type.lower():
+                    logger.debug(f"HTTP fetch of {url} unusable: {response.status} {content_type}")
+                    self.stats["http_errors"] += 1
+                    return None
+                body = await response.content.read(FETCH_MAX_BYTES)
+                html = body.decode(response.get_encoding() if response.charset else "utf-8", errors="replace")
+                final_url = str(response.url)
+        except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError, LookupError) as e:
+            logger.debug(f"HTTP fetch of {url} failed: {e}")
+            self.stats["http_errors"] += 1
+            return None
+        # Parsing is CPU work; keep it off the event loop
+        return await asyncio.to_thread(ParsedPage, final_url, html, response.status, False, **validators)
+
+    @staticmethod
+    def render(driver, url: str, wait_selector: Optional[str] = None, wait_seconds: float = 10) -> ParsedPage:
+        """
+        Load a page in Selenium and parse the rendered DOM (blocking).
+
+        Args:
+            driver: Selenium WebDriver
+            url: Page URL
+            wait_selector: CSS selector to wait for (the body if None)
+            wait_seconds: Maximum wait for the selector
+
+        Returns:
+            Parsed page
+        """
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver.get(url)
+        try:
+            WebDriverWait(driver, wait_seconds).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, wait_selector or "body"))
+            )
+        except TimeoutException:
+            logger.info(f"Timed out waiting for {wait_selector!r} on {url}")
+        return ParsedPage(driver.current_url, driver.page_source, rendered=True)
+
+    async def fetch(self, url: str, required_selector: Optional[str],
+                    validators: Optional[Dict[str, str]] = None) -> ParsedPage:
+        """
+        Fetch a page, using the browser only if HTTP does not yield the required element.
+
+        Args:
+            url: Page URL
+            required_selector: CSS selector that must match for the HTTP result to be used
+                (None accepts any HTML response)
+            validators: Conditional GET headers from a previous fetch
+
+        Returns:
+            Parsed page (check `not_modified` when validators were given)
+        """
+        if self.http_first:
+            page = await self.fetch_http(url, validators)
+            if page is not None and page.not_modified:
+                self.stats["not_modified"] += 1
+                return page
+            if page is not None and (required_selector is None or page.has(required_selector)):
+                self.stats["http"] += 1
+                return page
+            logger.info(f"Falling back to browser for {url}")
+
+        async with self.browser_pool.page() as driver:
+            page = await asyncio.to_thread(self.render, driver, url, required_selector)
+        self.stats["browser"] += 1
+        return page
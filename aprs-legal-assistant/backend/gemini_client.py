@@ -0,0 +1,302 @@
+"""
+Shared async client for the Gemini generateContent REST API.
+
+The PDF summarizer, the web-search answerer and the course generator used to
+call Gemini in three different ways: the blocking SDK inside async handlers,
+an SDK model rebuilt on every request, and blocking requests.post. This
+client replaces them:
+
+  - one pooled aiohttp session per event loop, no blocking calls,
+  - at most GEMINI_MAX_CONCURRENCY requests in flight; callers beyond that
+    wait for a slot,
+  - every call has a deadline covering the wait for a slot, retries and the
+    response,
+  - retries with exponential backoff on connection errors, 429 and 5xx
+    responses, within the deadline,
+  - token usage (from usageMetadata) and latency metrics.
+
+Point GEMINI_API_BASE at mock_gemini_server.py for local tests.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+import aiohttp
+
+logger = logging.getLogger("gemini_client")
+
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+GEMINI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("GEMINI_CONNECT_TIMEOUT_SECONDS", "5"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+
+# Status codes worth retrying
+_RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+# Latency samples kept for percentiles
+_LATENCY_WINDOW = 500
+
+Contents = Union[str, List[str], List[Dict[str, Any]]]
+
+
+class GeminiError(Exception):
+    """Raised when a Gemini call fails, times out or returns no text"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class GeminiResult:
+    """Generated text with its token usage and latency"""
+    text: str
+    model: str
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    latency: float = 0.0
+    finish_reason: Optional[str] = None
+    raw: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+
+def build_contents(contents: Contents) -> List[Dict[str, Any]]:
+    """
+    Normalize a prompt into the REST "contents" field.
+
+    Args:
+        contents: A prompt string, a list of text parts (one user turn, as
+            accepted by the SDK's generate_content) or ready-made content dicts
+
+    Returns:
+        List of {"role", "parts"} contents
+    """
+    if isinstance(contents, str):
+        return [{"role": "user", "parts": [{"text": contents}]}]
+    if contents and all(isinstance(item, dict) for item in contents):
+        return list(contents)
+    return [{"role": "user", "parts": [{"text": str(part)} for part in contents]}]
+
+
+def response_text(data: Dict[str, Any]) -> str:
+    """Concatenated text parts of the first candidate"""
+    candidates = data.get("candidates") or []
+    if not candidates:
+        reason = (data.get("promptFeedback") or {}).get("blockReason")
+        raise GeminiError(f"Gemini returned no candidates{f' (blocked: {reason})' if reason else ''}")
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts)
+
+
+class GeminiClient:
+    """Pooled, concurrency-limited, deadline-bounded Gemini client"""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        api_base: str = GEMINI_API_BASE,
+        model: str = GEMINI_MODEL,
+        timeout: float = GEMINI_TIMEOUT_SECONDS,
+        connect_timeout: float = GEMINI_CONNECT_TIMEOUT_SECONDS,
+        max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+        max_retries: int = GEMINI_MAX_RETRIES,
+    ):
+        """
+        Args:
+            api_key: Gemini API key (GEMINI_API_KEY, read when the client is
+                created so a .env loaded after import is honoured)
+            api_base: API root (…/v1beta), or a mock server
+            model: Default model for generate()
+            timeout: Default deadline per call in seconds
+            connect_timeout: TCP connect timeout in seconds
+            max_concurrency: Calls in flight at once
+            max_retries: Retries of a failed call within its deadline
+        """
+        self.api_key = api_key if api_key is not None else os.getenv("GEMINI_API_KEY", "")
+        self.api_base = api_base.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._latencies: deque = deque(maxlen=_LATENCY_WINDOW)
+        self.metrics = {
+            "calls": 0, "failures": 0, "retries": 0, "timeouts": 0,
+            "prompt_tokens": 0, "output_tokens": 0, "cached_tokens": 0, "waiting": 0, "in_flight": 0,
+        }
+
+    @property
+    def configured(self) -> bool:
+        """Whether an API key is set"""
+        return bool(self.api_key)
+
+    # -------------------------------------------------------------- session
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency * 2, keepalive_timeout=60, ttl_dns_cache=300)
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["x-goog-api-key"] = self.api_key
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout),
+            )
+            self._session_loop = loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self):
+        """Close the pooled session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ------------------------------------------------------------- generate
+
+    def model_url(self, model: str) -> str:
+        """generateContent URL of a model ("gemini-pro" or "models/gemini-pro")"""
+        if not model.startswith("models/"):
+            model = f"models/{model}"
+        return f"{self.api_base}/{model}:generateContent"
+
+    async def generate(
+        self,
+        contents: Contents,
+        model: Optional[str] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> GeminiResult:
+        """
+        Generate text.
+
+        Args:
+            contents: Prompt string, list of text parts, or REST contents
+            model: Model name (defaults to the client's model)
+            generation_config: REST generationConfig (temperature, maxOutputTokens, ...)
+            system_instruction: Optional system instruction text
+            timeout: Deadline in seconds for the whole call, including the
+                wait for a concurrency slot and retries
+
+        Returns:
+            GeminiResult
+
+        Raises:
+            GeminiError: If the key is missing, the deadline passes, or the
+                call keeps failing
+        """
+        if not self.api_key:
+            raise GeminiError("GEMINI_API_KEY not configured")
+        model = model or self.model
+        payload: Dict[str, Any] = {"contents": build_contents(contents)}
+        if generation_config:
+            payload["generationConfig"] = generation_config
+        if system_instruction:
+            payload["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+
+        deadline = timeout or self.timeout
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(self._generate(model, payload, started), deadline)
+        except asyncio.TimeoutError:
+            self.metrics["timeouts"] += 1
+            self.metrics["failures"] += 1
+            raise GeminiError(f"Gemini call exceeded its {deadline:g}s deadline", 504)
+
+    async def _generate(self, model: str, payload: Dict[str, Any], started: float) -> GeminiResult:
+        session = await self._get_session()
+        self.metrics["waiting"] += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.metrics["waiting"] -= 1
+        self.metrics["in_flight"] += 1
+        try:
+            data = await self._post(session, self.model_url(model), payload)
+        finally:
+            self.metrics["in_flight"] -= 1
+            self._slots.release()
+
+        usage = data.get("usageMetadata") or {}
+        candidates = data.get("candidates") or [{}]
+        result = GeminiResult(
+            text=response_text(data),
+            model=model,
+            prompt_tokens=int(usage.get("promptTokenCount", 0)),
+            output_tokens=int(usage.get("candidatesTokenCount", 0)),
+            cached_tokens=int(usage.get("cachedContentTokenCount", 0)),
+            latency=time.monotonic() - started,
+            finish_reason=candidates[0].get("finishReason"),
+            raw=data,
+        )
+        self.metrics["prompt_tokens"] += result.prompt_tokens
+        self.metrics["output_tokens"] += result.output_tokens
+        self.metrics["cached_tokens"] += result.cached_tokens
+        self._latencies.append(result.latency)
+        return result
+
+    async def _post(self, session: aiohttp.ClientSession, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.metrics["retries"] += 1
+                await asyncio.sleep(min(0.5 * (2 ** (attempt - 1)), 8.0) * (0.5 + random.random()))
+            try:
+                self.metrics["calls"] += 1
+                async with session.post(url, json=payload) as resp:
+                    if resp.status in _RETRY_STATUSES:
+                        last_error = GeminiError(f"Gemini returned {resp.status}", resp.status)
+                        continue
+                    if resp.status >= 400:
+                        detail = await resp.text()
+                        self.metrics["failures"] += 1
+                        raise GeminiError(f"Gemini returned {resp.status}: {detail[:200]}", resp.status)
+                    return await resp.json(content_type=None)
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
+                last_error = e
+                logger.warning(f"Gemini call failed (attempt {attempt + 1}): {e!r}")
+        self.metrics["failures"] += 1
+        raise GeminiError(f"Gemini call failed after {self.max_retries + 1} attempts: {last_error!r}",
+                          getattr(last_error, "status", None))
+
+    # -------------------------------------------------------------- metrics
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters, token totals and latency percentiles (seconds) of recent calls"""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+        return {
+            **self.metrics,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "latency_max": round(latencies[-1], 3) if latencies else None,
+        }
+
+
+_client: Optional[GeminiClient] = None
+
+
+def get_gemini_client() -> GeminiClient:
+    """Return the shared Gemini client"""
+    global _client
+    if _client is None:
+        _client = GeminiClient()
+    return _client
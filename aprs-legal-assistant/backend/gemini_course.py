@@ -1,20 +1,22 @@
 import os
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-import requests
 from typing import Optional
 
+from gemini_client import GeminiError, get_gemini_client
+
 router = APIRouter()
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key="
+GEMINI_COURSE_MODEL = os.getenv("GEMINI_COURSE_MODEL", "gemini-pro")
+GEMINI_COURSE_TIMEOUT_SECONDS = float(os.getenv("GEMINI_COURSE_TIMEOUT_SECONDS", "60"))
 
 class GeminiPrompt(BaseModel):
     prompt: str
 
 @router.post("/gemini_course")
 async def gemini_course(prompt: GeminiPrompt):
-    if not GEMINI_API_KEY:
+    gemini = get_gemini_client()
+    if not gemini.configured:
         raise HTTPException(status_code=400, detail="Missing Gemini API key.")
     # Build detailed course prompt with subtle right-wing perspective
     course_title = prompt.prompt
@@ -30,24 +32,19 @@ Use clear headings for each module (e.g., Module 1: Introduction to {course_titl
 5. Recommended Resources
 At the end, provide a formal certification statement and guidance on earning completion credit.
 """
-    payload = {
-        "contents": [{"parts": [{"text": prompt_text}]}],
-        "generationConfig": {
-            "temperature": 0.6,
-            "maxOutputTokens": 2000
-        }
-    }
-    resp = requests.post(
-        GEMINI_API_URL + GEMINI_API_KEY,
-        json=payload,
-        timeout=60
-    )
-    if resp.status_code != 200:
-        raise HTTPException(status_code=502, detail="Gemini API error")
-    result = resp.json()
-    # Extract generated text
     try:
-        content = result["candidates"][0]["content"]["parts"][0]["text"]
-    except Exception:
+        result = await gemini.generate(
+            prompt_text,
+            model=GEMINI_COURSE_MODEL,
+            generation_config={
+                "temperature": 0.6,
+                "maxOutputTokens": 2000
+            },
+            timeout=GEMINI_COURSE_TIMEOUT_SECONDS,
+        )
+    except GeminiError as e:
+        status = 504 if e.status == 504 else 502
+        raise HTTPException(status_code=status, detail="Gemini API error")
+    if not result.text:
         raise HTTPException(status_code=500, detail="Malformed Gemini response")
-    return {"content": content}
+    return {"content": result.text}
@@ -0,0 +1,232 @@
+"""
+Ingestion worker processes.
+
+Workers claim crawl, legal-scrape and vectorize jobs from the persistent job
+queue (job_queue.py) and run them outside the API process. Each worker
+process runs one job at a time, reports progress with periodic heartbeats,
+stops a job when its cancellation is requested, and puts its current job
+back in the queue on SIGTERM/SIGINT so a restart does not lose it.
+
+Usage:
+    python backend/ingestion_worker.py --workers 2
+    python backend/ingestion_worker.py --kinds vectorize --once
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import asyncio
+import logging
+import argparse
+import traceback
+import multiprocessing
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Allow running as a script: backend modules are imported as "backend.xxx"
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.job_queue import JobQueue, get_job_queue
+
+logger = logging.getLogger("ingestion_worker")
+
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "1"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "5"))
+
+JOB_KINDS = ("crawl", "legal_scrape", "vectorize")
+
+
+class JobContext:
+    """Progress of the job a worker is running; flushed to the queue by the heartbeat"""
+
+    def __init__(self, job: Dict[str, Any]):
+        self.job = job
+        self.progress: Dict[str, Any] = {}
+
+    def report(self, progress: Dict[str, Any]):
+        """Merge a progress snapshot (e.g. a ScrapeProgress snapshot)"""
+        self.progress.update(progress)
+
+
+class IngestionWorker:
+    """Runs queued ingestion jobs in the current process"""
+
+    def __init__(self, worker_id: str, kinds: Optional[List[str]] = None, queue: Optional[JobQueue] = None):
+        """
+        Args:
+            worker_id: Identifier stored on claimed jobs
+            kinds: Job kinds this worker handles (all if None)
+            queue: Job queue (the process's shared queue if None)
+        """
+        self.worker_id = worker_id
+        self.kinds = list(kinds or JOB_KINDS)
+        self.queue = queue or get_job_queue()
+        self.handlers: Dict[str, Callable[[Dict[str, Any], JobContext], Awaitable[Any]]] = {
+            "crawl": self._crawl,
+            "legal_scrape": self._legal_scrape,
+            "vectorize": self._vectorize,
+        }
+        self._stopping = False
+        self._current: Optional[asyncio.Task] = None
+        # Heavy systems are created on first use and kept for the life of the process
+        self._crawler = None
+        self._legal_rag = None
+        self._rag = None
+
+    # ------------------------------------------------------------- handlers
+
+    async def _crawl(self, payload: Dict[str, Any], context: JobContext) -> Dict[str, Any]:
+        if self._crawler is None:
+            from backend.crawler import LegalCrawler
+            self._crawler = LegalCrawler()
+        context.report({"stage": "crawling"})
+        await self._crawler.crawl(payload.get("urls"), payload.get("query"))
+        return {"fetches": dict(self._crawler.fetcher.stats)}
+
+    async def _legal_scrape(self, payload: Dict[str, Any], context: JobContext) -> Dict[str, Any]:
+        if self._legal_rag is None:
+            from backend.legal_rag import LegalRAG
+            self._legal_rag = LegalRAG()
+        context.report({"stage": "scraping"})
+        summary = await self._legal_rag.scrape_and_process(
+            keywords=payload.get("keywords"),
+            max_results=payload.get("max_results", 10),
+            progress_callback=context.report,
+        )
+        return summary if isinstance(summary, dict) else {}
+
+    async def _vectorize(self, payload: Dict[str, Any], context: JobContext) -> Dict[str, Any]:
+        if self._rag is None:
+            from backend.rag import RAGSystem
+            self._rag = RAGSystem()
+        context.report({"stage": "embedding", "characters": len(payload.get("text", ""))})
+        ids = await self._rag.vectorize_text(payload["text"], payload.get("metadata"))
+        return {"vectors": len(ids or [])}
+
+    # ---------------------------------------------------------------- loop
+
+    async def _heartbeat(self, job_id: str, context: JobContext, task: asyncio.Task):
+        """Flush progress periodically and cancel the job when requested"""
+        while not task.done():
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            cancel_requested = await asyncio.to_thread(self.queue.heartbeat, job_id, dict(context.progress))
+            if cancel_requested and not task.done():
+                logger.info(f"Cancelling job {job_id}")
+                task.cancel()
+
+    async def run_job(self, job: Dict[str, Any]):
+        """
+        Run one claimed job to completion, failure or cancellation.
+
+        Args:
+            job: Job returned by JobQueue.claim()
+        """
+        job_id, kind = job["id"], job["kind"]
+        handler = self.handlers.get(kind)
+        if handler is None:
+            await asyncio.to_thread(self.queue.fail, job_id, f"Unknown job kind: {kind}")
+            return
+
+        context = JobContext(job)
+        started = time.time()
+        logger.info(f"[{self.worker_id}] Running {kind} job {job_id}")
+        task = asyncio.create_task(handler(job["payload"] or {}, context))
+        self._current = task
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, context, task))
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if self._stopping:
+                await asyncio.to_thread(self.queue.release, job_id)
+                logger.info(f"[{self.worker_id}] Released job {job_id} for another worker")
+            else:
+                await asyncio.to_thread(self.queue.heartbeat, job_id, dict(context.progress))
+                await asyncio.to_thread(self.queue.mark_cancelled, job_id)
+                logger.info(f"[{self.worker_id}] Cancelled job {job_id}")
+        except Exception as e:
+            logger.error(f"[{self.worker_id}] Job {job_id} failed: {e}")
+            await asyncio.to_thread(self.queue.heartbeat, job_id, dict(context.progress))
+            await asyncio.to_thread(self.queue.fail, job_id, f"{e}\n{traceback.format_exc()}")
+        else:
+            await asyncio.to_thread(self.queue.heartbeat, job_id, dict(context.progress))
+            await asyncio.to_thread(self.queue.complete, job_id, result)
+            logger.info(f"[{self.worker_id}] Finished {kind} job {job_id} in {time.time() - started:.1f}s")
+        finally:
+            self._current = None
+            heartbeat.cancel()
+
+    def stop(self):
+        """Stop after releasing the current job back to the queue"""
+        self._stopping = True
+        if self._current is not None and not self._current.done():
+            self._current.cancel()
+
+    async def run(self, once: bool = False):
+        """
+        Claim and run jobs until stopped.
+
+        Args:
+            once: Return when the queue is empty instead of polling
+        """
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows, or not the main thread
+
+        logger.info(f"[{self.worker_id}] Waiting for {', '.join(self.kinds)} jobs")
+        while not self._stopping:
+            job = await asyncio.to_thread(self.queue.claim, self.worker_id, self.kinds)
+            if job is not None:
+                await self.run_job(job)
+                continue
+            if once:
+                break
+            await asyncio.to_thread(self.queue.requeue_stale)
+            try:
+                await asyncio.sleep(JOB_POLL_SECONDS)
+            except asyncio.CancelledError:
+                break
+
+
+def _run_process(index: int, kinds: Optional[List[str]], once: bool):
+    """Entry point of one worker process"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    worker = IngestionWorker(f"{socket.gethostname()}-{os.getpid()}-{index}", kinds)
+    asyncio.run(worker.run(once=once))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ingestion jobs from the job queue")
+    parser.add_argument("--workers", type=int, default=INGESTION_WORKERS, help="Number of worker processes")
+    parser.add_argument("--kinds", nargs="*", choices=JOB_KINDS, help="Only run these job kinds")
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    if workers == 1:
+        _run_process(0, args.kinds, args.once)
+        return
+
+    # Each process loads its own models; spawn avoids forking the parent's state
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_run_process, args=(i, args.kinds, args.once), daemon=False)
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
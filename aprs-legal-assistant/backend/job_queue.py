@@ -0,0 +1,295 @@
+"""
+Persistent job queue for long-running ingestion work.
+
+Crawling, scraping and embedding take minutes and used to run in FastAPI
+BackgroundTasks inside the API process, where they competed with request
+handling and were lost on restart. The API now only enqueues a job row in a
+local SQLite database; separate worker processes (ingestion_worker.py) claim
+jobs by priority, report progress and heartbeats, honour cancellation, and
+jobs left running by a crashed worker are re-queued.
+
+SQLite in WAL mode with BEGIN IMMEDIATE claims is safe across processes on
+one host.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("job_queue")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", os.path.join(DATA_DIR, "jobs.sqlite"))
+# A running job whose worker has not sent a heartbeat for this long is re-queued
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "300"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueue:
+    """SQLite-backed priority queue of ingestion jobs"""
+
+    def __init__(self, db_path: str = JOB_QUEUE_DB):
+        """
+        Args:
+            db_path: SQLite database file (shared by the API and the workers)
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode; multi-statement updates use explicit transactions
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                progress TEXT NOT NULL DEFAULT '{}',
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 1,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                worker_id TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, created_at);
+            """
+        )
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        for key in ("payload", "progress", "result"):
+            job[key] = json.loads(job[key]) if job[key] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    # ------------------------------------------------------------------ API
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], priority: int = 0, max_attempts: int = 1) -> Dict[str, Any]:
+        """
+        Add a job.
+
+        Args:
+            kind: Job type handled by a worker ("crawl", "legal_scrape", "vectorize")
+            payload: JSON-serializable job arguments
+            priority: Higher runs first; equal priorities run oldest first
+            max_attempts: Attempts before a failing job is marked failed
+
+        Returns:
+            The new job
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, priority, status, max_attempts, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), priority, QUEUED, max(1, max_attempts), time.time()),
+            )
+        logger.info(f"Enqueued {kind} job {job_id} (priority {priority})")
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job by id (None if unknown)"""
+        with self._lock:
+            return self._to_dict(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, status: Optional[str] = None, kind: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Recent jobs, newest first.
+
+        Args:
+            status: Only jobs with this status
+            kind: Only jobs of this kind
+            limit: Maximum number of jobs
+        """
+        query, params = "SELECT * FROM jobs WHERE 1 = 1", []
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(max(1, min(limit, 500)))
+        with self._lock:
+            return [self._to_dict(row) for row in self._conn.execute(query, params).fetchall()]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a job: queued jobs are cancelled at once, running jobs are
+        flagged and stopped by their worker.
+
+        Returns:
+            The updated job (None if unknown)
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, now, job_id, QUEUED),
+            )
+            self._conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+        return self.get(job_id)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    # -------------------------------------------------------------- workers
+
+    def claim(self, worker_id: str, kinds: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take the highest-priority queued job.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+            kinds: Only claim these job kinds (all if None)
+
+        Returns:
+            The claimed job, or None if the queue is empty
+        """
+        query = "SELECT id FROM jobs WHERE status = ?"
+        params: List[Any] = [QUEUED]
+        if kinds:
+            query += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+        query += " ORDER BY priority DESC, created_at LIMIT 1"
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(query, params).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = ?, attempts = attempts + 1, started_at = ?, "
+                    "heartbeat_at = ?, error = NULL WHERE id = ?",
+                    (RUNNING, worker_id, now, now, row["id"]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"])
+
+    def heartbeat(self, job_id: str, progress: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Record that a job is alive, optionally with new progress.
+
+        Returns:
+            True if cancellation has been requested
+        """
+        with self._lock:
+            if progress is None:
+                self._conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET heartbeat_at = ?, progress = ? WHERE id = ?",
+                    (time.time(), json.dumps(progress), job_id),
+                )
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+            )
+
+    def complete(self, job_id: str, result: Any = None):
+        """Mark a job as succeeded"""
+        self._finish(job_id, SUCCEEDED, result=result)
+
+    def mark_cancelled(self, job_id: str):
+        """Mark a running job as stopped after a cancellation request"""
+        self._finish(job_id, CANCELLED)
+
+    def fail(self, job_id: str, error: str):
+        """Re-queue a failed job if it has attempts left, otherwise mark it failed"""
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE jobs SET
+                    status = CASE WHEN attempts < max_attempts AND cancel_requested = 0 THEN ? ELSE ? END,
+                    error = ?,
+                    finished_at = CASE WHEN attempts < max_attempts AND cancel_requested = 0 THEN NULL ELSE ? END
+                WHERE id = ?
+                """,
+                (QUEUED, FAILED, error[:2000], time.time(), job_id),
+            )
+
+    def release(self, job_id: str):
+        """Put a running job back in the queue without counting the attempt (worker shutdown)"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = NULL, attempts = MAX(attempts - 1, 0) WHERE id = ? AND status = ?",
+                (QUEUED, job_id, RUNNING),
+            )
+
+    def requeue_stale(self, stale_seconds: float = JOB_STALE_SECONDS) -> int:
+        """
+        Re-queue running jobs whose worker stopped sending heartbeats (crash or
+        restart). Jobs that have used all their attempts are marked failed and
+        jobs with a pending cancellation request are marked cancelled instead.
+
+        Returns:
+            Number of jobs re-queued
+        """
+        now = time.time()
+        cutoff = now - stale_seconds
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cancelled = self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = NULL, finished_at = ? "
+                    "WHERE status = ? AND heartbeat_at < ? AND cancel_requested = 1",
+                    (CANCELLED, now, RUNNING, cutoff),
+                ).rowcount
+                failed = self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = NULL, error = ?, finished_at = ? "
+                    "WHERE status = ? AND heartbeat_at < ? AND attempts >= max_attempts",
+                    (FAILED, "Worker stopped sending heartbeats", now, RUNNING, cutoff),
+                ).rowcount
+                requeued = self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = NULL WHERE status = ? AND heartbeat_at < ?",
+                    (QUEUED, RUNNING, cutoff),
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if cancelled or failed or requeued:
+            logger.warning(f"Stale jobs: {requeued} re-queued, {failed} failed (no attempts left), {cancelled} cancelled")
+        return requeued
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return this process's job queue connection"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -2,12 +2,9 @@ import os
 import json
 import asyncio
 import logging
-import aiohttp
-from typing import List, Dict, Any, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline
 import requests
 from urllib.parse import quote_plus
 import uuid
@@ -15,6 +12,11 @@ import uuid
 # Import our custom modules
 from backend.legal_scraper import LegalDocumentScraper
 from backend.document_processor import DocumentProcessor
+from backend.near_duplicates import dedupe_results, get_near_duplicate_index
+from backend.translation_engine import get_translation_engine
+from backend.llm_gateway import LLM_MAX_TOKENS, LLMError, LLMOverloadedError, get_llm_gateway
+from backend.context_budget import Passage, get_context_assembler
+from backend.model_optimizer import load_embedding_model
 
 # Load environment variables
 load_dotenv()
@@ -30,6 +32,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger("legal_rag")
 
+# Sent identically before every prompt so backends can reuse its prefill
+LEGAL_SYSTEM_PROMPT = """You are a legal assistant specializing in Indian law.
+When legal information is provided with the query, use it to provide an accurate response. If the information doesn't fully answer the query, acknowledge the limitations and provide the best possible advice based on what's available. Always cite the sources of your information when possible.
+When no legal information is provided, answer based on your knowledge of Indian law. If you're unsure about specific details, acknowledge the limitations and suggest where the user might find more information.
+Provide a clear, accurate, and helpful response."""
+
 class LegalRAG:
     def __init__(self):
         """Initialize the Legal RAG system."""
@@ -44,6 +52,7 @@ class LegalRAG:
         # Initialize scraper and processor
         self.scraper = LegalDocumentScraper(base_dir=self.base_dir)
         self.processor = DocumentProcessor(base_dir=self.base_dir)
+        self.near_duplicates = get_near_duplicate_index()
         
         # Initialize Bing Search API (optional fallback)
         self.bing_search_api_key = os.getenv("BING_SEARCH_API_KEY")
@@ -57,41 +66,12 @@ class LegalRAG:
         try:
             # Initialize sentence transformer for embeddings
             self.embedding_model_name = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-            self.embedding_model = SentenceTransformer(self.embedding_model_name)
-            
-            # Initialize LLM for generation
-            self.llm_model_name = os.getenv("HF_MODEL", "mistralai/Mixtral-8x7B-Instruct-v0.1")
-            
-            # Check if we have a Hugging Face API key
-            self.hf_api_key = os.getenv("HF_API_KEY")
-            
-            # Check if Ollama is available
-            self.use_ollama = os.getenv("USE_OLLAMA", "false").lower() == "true"
-            self.ollama_model = os.getenv("OLLAMA_MODEL", "gemma3:1b")
-            self.ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
+            # ONNX int8 export when available (backend/model_optimizer.py)
+            self.embedding_model = load_embedding_model(self.embedding_model_name)
             
-            if self.hf_api_key and not self.use_ollama:
-                # Use Hugging Face Inference API instead of loading model locally
-                logger.info("Using Hugging Face Inference API")
-                self.use_hf_api = True
-                self.use_local_model = False
-            elif self.use_ollama:
-                # Use Ollama for local inference
-                logger.info(f"Using Ollama with model: {self.ollama_model}")
-                self.use_hf_api = False
-                self.use_local_model = False
-            else:
-                # Fallback to a small local model
-                logger.info(f"Loading model locally: {self.llm_model_name}")
-                self.use_hf_api = False
-                self.use_local_model = True
-                self.llm = pipeline(
-                    "text-generation",
-                    model=self.llm_model_name,
-                    max_length=2048,
-                    temperature=0.7,
-                    top_p=0.95
-                )
+            # LLM calls go through the shared gateway (routing, limits, batching)
+            self.llm_gateway = get_llm_gateway()
+            self.context_assembler = get_context_assembler()
             
             self.models_initialized = True
             logger.info("Models initialized successfully")
@@ -100,19 +80,35 @@ class LegalRAG:
             logger.error(f"Error initializing models: {e}")
             self.models_initialized = False
     
-    async def scrape_and_process(self, keywords: List[str] = None, max_results: int = 10):
+    async def scrape_and_process(self, keywords: List[str] = None, max_results: int = 10, progress_callback=None):
         """
         Scrape legal documents and process them for RAG.
-        
+
         Args:
             keywords: List of keywords to search for
             max_results: Maximum number of results per keyword
+            progress_callback: Optional callable receiving scraper progress snapshots
+
+        Returns:
+            Scraping summary from the scraper
         """
-        # Scrape documents
-        await self.scraper.scrape_all_sources(keywords=keywords, max_results_per_keyword=max_results)
-        
-        # Process documents
-        await self.processor.process_all_documents()
+        # Documents are extracted and embedded as soon as they are saved,
+        # while the scraper keeps fetching
+        queue: asyncio.Queue = asyncio.Queue()
+        extraction = asyncio.create_task(self.processor.process_queue(queue))
+        try:
+            return await self.scraper.scrape_all_sources(
+                keywords=keywords,
+                max_results_per_keyword=max_results,
+                progress_callback=progress_callback,
+                on_document=lambda path, doc_type: queue.put_nowait((path, doc_type)),
+            )
+        finally:
+            queue.put_nowait(None)
+            await extraction
+            # Pick up files saved by an earlier run that stopped before
+            # embedding them; processed files are skipped by hash
+            await self.processor.process_all_documents()
     
     async def search_legal_documents(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
@@ -133,9 +129,10 @@ class LegalRAG:
             query_embedding = self.embedding_model.encode(query).tolist()
             
 
+            # Over-fetch so near-duplicate copies can be dropped
             results = self.index.query(
                 vector=query_embedding,
-                top_k=top_k,
+                top_k=top_k * 3,
                 include_metadata=True
             )
             
@@ -149,7 +146,7 @@ class LegalRAG:
                     "metadata": {k: v for k, v in match["metadata"].items() if k != "text"}
                 })
             
-            return formatted_results
+            return dedupe_results(formatted_results, top_k, index=self.near_duplicates)
         
         except Exception as e:
             logger.error(f"Error searching legal documents: {e}")
@@ -223,35 +220,7 @@ class LegalRAG:
             Generated response
         """
         try:
-            # Search for relevant documents
-            legal_docs = await self.search_legal_documents(query)
-            
-            # If no relevant documents found, try web search fallback
-            web_results = []
-            if not legal_docs:
-                logger.info("No relevant documents found in vector DB, trying web search fallback")
-                web_results = await self.web_search_fallback(query)
-            
-            # Prepare context from legal documents
-            legal_context = ""
-            if legal_docs:
-                legal_context = "LEGAL DOCUMENT CONTEXT:\n\n"
-                for i, doc in enumerate(legal_docs):
-                    legal_context += f"Document {i+1}:\n{doc['text']}\n\n"
-                    if "source_file" in doc["metadata"]:
-                        legal_context += f"Source: {doc['metadata']['source_file']}\n\n"
-            
-            # Prepare context from web search
-            web_context = ""
-            if web_results:
-                web_context = "WEB SEARCH RESULTS:\n\n"
-                for i, result in enumerate(web_results):
-                    web_context += f"Result {i+1}: {result['title']}\n"
-                    web_context += f"URL: {result['url']}\n"
-                    web_context += f"Summary: {result['snippet']}\n\n"
-            
-            # Combine contexts
-            context = legal_context + web_context
+            context = await self.build_context(query)
             
             # Generate response with context
             response = await self._generate_response(query, context, language)
@@ -262,6 +231,92 @@ class LegalRAG:
             logger.error(f"Error generating legal response: {e}")
             return f"I apologize, but I encountered an error while processing your query. Please try again or rephrase your question. Error details: {str(e)}"
     
+    async def build_context(self, query: str) -> str:
+        """
+        Retrieve and pack the context for a query.
+        
+        Args:
+            query: The legal query
+            
+        Returns:
+            Context text for the prompt (empty if nothing relevant was found)
+        """
+        # Search for relevant documents
+        legal_docs = await self.search_legal_documents(query)
+        
+        # If no relevant documents found, try web search fallback
+        web_results = []
+        if not legal_docs:
+            logger.info("No relevant documents found in vector DB, trying web search fallback")
+            web_results = await self.web_search_fallback(query)
+        
+        # Keep the best passages that fit the model's context budget
+        passages = [
+            Passage(text=doc["text"], score=doc["score"], metadata=doc["metadata"]) for doc in legal_docs
+        ] + [
+            # Web results are already ranked; keep that order below the vector matches
+            Passage(text=result["snippet"], score=-i, metadata=result) for i, result in enumerate(web_results)
+        ]
+        packed = self.context_assembler.pack(query, passages)
+        logger.info(f"Context: {len(packed.passages)}/{len(passages)} passages, {packed.tokens}/{packed.budget} tokens")
+        legal_docs = [passage for passage in packed.passages if passage.metadata.get("source") != "web_search"]
+        web_results = [passage for passage in packed.passages if passage.metadata.get("source") == "web_search"]
+        
+        # Prepare context from legal documents
+        legal_context = ""
+        if legal_docs:
+            legal_context = "LEGAL DOCUMENT CONTEXT:\n\n"
+            for i, doc in enumerate(legal_docs):
+                legal_context += f"Document {i+1}:\n{doc.text}\n\n"
+                if "source_file" in doc.metadata:
+                    legal_context += f"Source: {doc.metadata['source_file']}\n\n"
+        
+        # Prepare context from web search
+        web_context = ""
+        if web_results:
+            web_context = "WEB SEARCH RESULTS:\n\n"
+            for i, result in enumerate(web_results):
+                web_context += f"Result {i+1}: {result.metadata['title']}\n"
+                web_context += f"URL: {result.metadata['url']}\n"
+                web_context += f"Summary: {result.text}\n\n"
+        
+        # Combine contexts
+        return legal_context + web_context
+    
+    async def stream_legal_response(self, query: str, context: str) -> AsyncIterator[str]:
+        """
+        Stream the English response to a query as the LLM generates it.
+        
+        Args:
+            query: The legal query
+            context: Context from build_context()
+            
+        Yields:
+            Response text chunks
+        """
+        if not self.models_initialized:
+            logger.error("Models not initialized properly")
+            yield "I apologize, but the language models are not initialized properly. Please try again later."
+            return
+        
+        prompt = f"{context}\n\nUSER QUERY:\n{query}" if context else f"USER QUERY:\n{query}"
+        first = True
+        try:
+            async for chunk in self.llm_gateway.stream(prompt, system=LEGAL_SYSTEM_PROMPT, max_tokens=LLM_MAX_TOKENS):
+                # Backends that cannot stream return everything in one chunk, possibly with the prompt
+                if first and prompt in chunk:
+                    chunk = chunk[chunk.find(prompt) + len(prompt):].lstrip()
+                first = False
+                yield chunk
+        except LLMOverloadedError as e:
+            logger.warning(f"LLM backends saturated: {e}")
+            if first:
+                yield "I apologize, but the assistant is handling too many requests right now. Please try again in a moment."
+        except LLMError as e:
+            logger.error(f"Error generating response: {e}")
+            if first:
+                yield "I apologize, but I encountered an error while generating a response. Please try again."
+    
     async def _generate_response(self, query: str, context: str, language: str) -> str:
         """
         Generate a response using the LLM.
@@ -278,123 +333,31 @@ class LegalRAG:
             logger.error("Models not initialized properly")
             return "I apologize, but the language models are not initialized properly. Please try again later."
         
-        # Prepare prompt
-        if context:
-            prompt = f"""
-            You are a legal assistant specializing in Indian law. Use the following legal information to provide an accurate response.
-            
-            {context}
-            
-            USER QUERY:
-            {query}
-            
-            Provide a clear, accurate, and helpful response based on the legal information provided above. 
-            If the information doesn't fully answer the query, acknowledge the limitations and provide the best possible advice based on what's available.
-            Always cite the sources of your information when possible.
-            """
-        else:
-            prompt = f"""
-            You are a legal assistant specializing in Indian law.
-            
-            USER QUERY:
-            {query}
-            
-            Provide a clear, accurate, and helpful response based on your knowledge of Indian law.
-            If you're unsure about specific details, acknowledge the limitations and suggest where the user might find more information.
-            """
+        # Prepare prompt: fixed instructions first, then the request-specific part
+        prompt = f"{context}\n\nUSER QUERY:\n{query}" if context else f"USER QUERY:\n{query}"
         
         # Generate response
-        if hasattr(self, 'use_hf_api') and self.use_hf_api:
-            # Use Hugging Face Inference API
-            try:
-                api_url = f"https://api-inference.huggingface.co/models/{self.llm_model_name}"
-                headers = {"Authorization": f"Bearer {self.hf_api_key}"}
-                payload = {"inputs": prompt, "parameters": {"max_length": 2048, "temperature": 0.7, "top_p": 0.95}}
-                
-                # Make async request to Hugging Face API
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(api_url, json=payload, headers=headers) as resp:
-                        if resp.status == 200:
-                            result = await resp.json()
-                            if isinstance(result, list) and len(result) > 0:
-                                response = result[0].get('generated_text', '')
-                            else:
-                                response = result.get('generated_text', '')
-                        else:
-                            error_text = await resp.text()
-                            logger.error(f"Hugging Face API error: {resp.status}, {error_text}")
-                            # Fallback to a simple response
-                            return "I apologize, but I'm having trouble generating a response. Please try again later."
-            except Exception as e:
-                logger.error(f"Error using Hugging Face API: {e}")
-                return f"I apologize, but I encountered an error while generating a response. Error: {str(e)}"
-        elif hasattr(self, 'use_ollama') and self.use_ollama:
-            # Use Ollama for local inference
-            try:
-                # Ollama API endpoint for generation
-                api_url = f"{self.ollama_url}/api/generate"
-                
-                # Prepare payload for Ollama
-                payload = {
-                    "model": self.ollama_model,
-                    "prompt": prompt,
-                    "options": {
-                        "temperature": 0.7,
-                        "top_p": 0.95,
-                        "max_length": 2048
-                    }
-                }
-                
-                # Make async request to Ollama API
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(api_url, json=payload) as resp:
-                        if resp.status == 200:
-                            result = await resp.json()
-                            response = result.get('response', '')
-                        else:
-                            error_text = await resp.text()
-                            logger.error(f"Ollama API error: {resp.status}, {error_text}")
-                            # Fallback to a simple response
-                            return "I apologize, but I'm having trouble generating a response. Please try again later."
-            except Exception as e:
-                logger.error(f"Error using Ollama: {e}")
-                return f"I apologize, but I encountered an error while generating a response. Error: {str(e)}"
-        elif hasattr(self, 'use_local_model') and self.use_local_model:
-            # Use local Hugging Face model
-            try:
-                result = self.llm(prompt)
-                if isinstance(result, list) and len(result) > 0:
-                    response = result[0].get('generated_text', '')
-                else:
-                    response = result.get('generated_text', '')
-            except Exception as e:
-                logger.error(f"Error using local model: {e}")
-                return f"I apologize, but I encountered an error while generating a response. Error: {str(e)}"
-        else:
-            return "I apologize, but no language model is available. Please check your configuration."
+        try:
+            result = await self.llm_gateway.generate(prompt, system=LEGAL_SYSTEM_PROMPT, max_tokens=LLM_MAX_TOKENS)
+            response = result.text
+        except LLMOverloadedError as e:
+            logger.warning(f"LLM backends saturated: {e}")
+            return "I apologize, but the assistant is handling too many requests right now. Please try again in a moment."
+        except LLMError as e:
+            logger.error(f"Error generating response: {e}")
+            return f"I apologize, but I encountered an error while generating a response. Error: {str(e)}"
         
         # Extract the generated response (remove the prompt if present in the response)
         if prompt in response:
             response = response[response.find(prompt) + len(prompt):].strip()
         
-        # If language is not English, translate the response
+        # If language is not English, translate the response with the
+        # dedicated seq2seq engine instead of a second LLM pass
         if language.lower() != "english":
-            # For now, we'll use a simple prompt to ask the model to translate
-            # In a production app, you might want to use a dedicated translation model
-            translation_prompt = f"""
-            Translate the following text to {language}:
-            
-            {response}
-            
-            Translation:
-            """
-            
-            translated_response = self.llm(translation_prompt)[0]["generated_text"]
-            
-            # Extract the translated response
-            translated_response = translated_response[len(translation_prompt):].strip()
-            
-            return translated_response
+            try:
+                return await get_translation_engine().translate_async(response, "english", language)
+            except Exception as e:
+                logger.error(f"Error translating response to {language}: {e}")
         
         return response
 
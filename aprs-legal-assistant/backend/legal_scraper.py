@@ -6,18 +6,20 @@ import requests
 import urllib.parse
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
 import uuid
+import inspect
 import logging
 from pathlib import Path
 
+from backend.crawl_state import content_hash, file_hash, get_crawl_state, url_key
+from backend.download_manager import DownloadManager
+from backend.fetch_strategy import FetchStrategy, ParsedPage
+from backend.scrape_engine import (
+    SCRAPER_BURST, SCRAPER_RATE_PER_DOMAIN, SCRAPER_WORKERS,
+    DomainRateLimiter, ScrapeEngine, WorkerContext, WorkItem,
+)
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -62,6 +64,16 @@ class LegalDocumentScraper:
         self.metadata_dir = os.path.join(self.documents_dir, "metadata")
         os.makedirs(self.metadata_dir, exist_ok=True)
         
+        # Persistent frontier, URL dedup and HTTP validators across sessions
+        self.state = get_crawl_state()
+        
+        # Plain HTTP first; browsers only for pages that need JavaScript
+        self.fetcher = FetchStrategy()
+        
+        # Concurrent, bandwidth-capped, resumable PDF downloads
+        self.downloads = DownloadManager()
+        self._on_document = None
+        
         # Sources configuration
         self.sources = {
             "indiankanoon": {
@@ -99,24 +111,33 @@ class LegalDocumentScraper:
             }
         }
     
-    def _setup_driver(self):
-        """Set up Chrome driver with headless option."""
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        return driver
-    
-    async def scrape_all_sources(self, keywords: List[str] = None, max_results_per_keyword: int = 10):
+    async def scrape_all_sources(self, keywords: List[str] = None, max_results_per_keyword: int = 10,
+                                 workers: int = SCRAPER_WORKERS, progress_callback=None,
+                                 on_document=None) -> Dict[str, Any]:
         """
         Scrape all configured legal sources.
         
+        Every (source, keyword) search, result document and PDF is an item on
+        one shared queue served by a pool of workers. Pages are fetched over
+        plain HTTP and only pages whose content selector needs JavaScript
+        lease a browser from the shared pool; requests to a domain are paced by a token bucket
+        (SCRAPER_RATE_PER_DOMAIN per second, bursts of SCRAPER_BURST).
+        
+        The frontier is persisted in the crawl state: documents fetched within
+        CRAWL_REVALIDATE_AFTER_HOURS are skipped, older ones are revalidated
+        with conditional GETs, and an interrupted session is resumed.
+        
         Args:
             keywords: List of keywords to search for
             max_results_per_keyword: Maximum number of results to scrape per keyword
+            workers: Number of concurrent workers
+            progress_callback: Optional callable receiving progress snapshots
+            on_document: Optional callable (or coroutine function) receiving
+                (file path, document type) for every new or changed document,
+                e.g. to feed the extraction queue while scraping continues
+            
+        Returns:
+            Final progress counters
         """
         if keywords is None:
             # Default keywords covering major legal areas
@@ -127,164 +148,167 @@ class LegalDocumentScraper:
                 "supreme court", "high court", "district court"
             ]
         
-        driver = self._setup_driver()
-        
+        searches = [
+            WorkItem(
+                kind="search",
+                source=source_name,
+                url=source_info["search_url"].format(urllib.parse.quote(keyword)),
+                data={"keyword": keyword, "max_results": max_results_per_keyword},
+            )
+            for source_name, source_info in self.sources.items()
+            for keyword in keywords
+        ]
+        logger.info(f"Scraping {len(self.sources)} sources for {len(keywords)} keywords with {workers} workers")
+        
+        engine = ScrapeEngine(
+            handler=self._handle_work_item,
+            workers=workers,
+            rate_limiter=DomainRateLimiter(SCRAPER_RATE_PER_DOMAIN, SCRAPER_BURST),
+            progress_callback=progress_callback,
+            frontier=self.state,
+        )
+        self._on_document = on_document
         try:
-            for source_name, source_info in self.sources.items():
-                logger.info(f"Scraping source: {source_name}")
-                
-                for keyword in keywords:
-                    logger.info(f"Searching for keyword: {keyword}")
-                    
-                    # Format the search URL
-                    search_url = source_info["search_url"].format(urllib.parse.quote(keyword))
-                    
-                    # Scrape search results
-                    await self._scrape_search_results(
-                        driver=driver,
-                        source_name=source_name,
-                        search_url=search_url,
-                        max_results=max_results_per_keyword
-                    )
-        
+            return await engine.run(searches)
         finally:
-            driver.quit()
+            self._on_document = None
+            logger.info(f"Page fetches: {self.fetcher.stats}")
+            await self.fetcher.close()
+            await self.downloads.close()
     
-    async def _scrape_search_results(self, driver, source_name: str, search_url: str, max_results: int):
+    async def _handle_work_item(self, item: WorkItem, ctx: WorkerContext) -> List[WorkItem]:
         """
-        Scrape search results from a legal source.
+        Process one queued item and return the work it leads to.
+        
+        Args:
+            item: Search page, document page or PDF to process
+            ctx: Worker context
+            
+        Returns:
+            Follow-up work items
+        """
+        if item.kind == "search":
+            urls = await self._scrape_search_results(item.source, item.url, item.data["max_results"])
+            return [WorkItem(kind="document", source=item.source, url=url) for url in urls]
+        
+        if item.kind == "document":
+            pdf_urls = await self._scrape_document(item.source, item.url)
+            return [WorkItem(kind="pdf", source=item.source, url=url) for url in pdf_urls]
+        
+        if item.kind == "pdf":
+            await self._download_pdf(item.url, item.source)
+            return []
+        
+        raise ValueError(f"Unknown work item kind: {item.kind}")
+    
+    async def _scrape_search_results(self, source_name: str, search_url: str, max_results: int) -> List[str]:
+        """
+        Collect result links from a search page.
         
         Args:
-            driver: Selenium WebDriver
             source_name: Name of the source
             search_url: URL to search
             max_results: Maximum number of results to scrape
-        """
-        source_info = self.sources[source_name]
-        
-        try:
-            # Navigate to search URL
-            driver.get(search_url)
-            
-            # Wait for search results
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
             
-            # Extract result links
-            selector = source_info["selectors"]["search_results"]
-            result_elements = driver.find_elements(By.CSS_SELECTOR, selector)
-            
-            # Limit results
-            result_elements = result_elements[:max_results]
-            
-            # Extract URLs
-            result_urls = []
-            for elem in result_elements:
-                url = elem.get_attribute("href")
-                if url:
-                    result_urls.append(url)
-            
-            logger.info(f"Found {len(result_urls)} results for {source_name}")
-            
-            # Scrape each result
-            for url in result_urls:
-                await self._scrape_document(driver, source_name, url)
-                
-                # Add a small delay between requests
-                await asyncio.sleep(2)
+        Returns:
+            Result URLs
+        """
+        selector = self.sources[source_name]["selectors"]["search_results"]
+        page = await self.fetcher.fetch(search_url, selector)
         
-        except Exception as e:
-            logger.error(f"Error scraping search results from {source_name}: {e}")
+        result_urls = page.select_links(selector)[:max_results]
+        logger.info(f"Found {len(result_urls)} results for {source_name} ({'browser' if page.rendered else 'http'})")
+        return result_urls
     
-    async def _scrape_document(self, driver, source_name: str, url: str):
+    async def _scrape_document(self, source_name: str, url: str) -> List[str]:
         """
         Scrape a legal document.
         
         Args:
-            driver: Selenium WebDriver
             source_name: Name of the source
             url: URL of the document
-        """
-        source_info = self.sources[source_name]
-        
-        try:
-            logger.info(f"Scraping document: {url}")
-            
-            # Navigate to document URL
-            driver.get(url)
-            
-            # Wait for page to load
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # Check for PDF links first
-            if "pdf_links" in source_info["selectors"]:
-                pdf_links = driver.find_elements(By.CSS_SELECTOR, source_info["selectors"]["pdf_links"])
-                
-                for pdf_link in pdf_links:
-                    pdf_url = pdf_link.get_attribute("href")
-                    if pdf_url:
-                        await self._download_pdf(pdf_url, source_name)
             
-            # Extract document content
-            document_data = await self._extract_document_data(driver, source_name)
-            
-            if document_data:
-                # Determine document type
-                doc_type = self._determine_document_type(document_data["title"], source_name)
-                
-                # Save document
-                await self._save_document(document_data, doc_type, source_name)
-        
-        except Exception as e:
-            logger.error(f"Error scraping document {url}: {e}")
+        Returns:
+            PDF links found on the page (downloaded as separate work items)
+        """
+        logger.info(f"Scraping document: {url}")
+        selectors = self.sources[source_name]["selectors"]
+        page = await self.fetcher.fetch(url, selectors.get("document_content"),
+                                        validators=self.state.conditional_headers(url))
+        if page.not_modified:
+            # PDFs found on the previous visit are already in the frontier
+            self.state.record_fetch(url, "document", source_name, page.etag, page.last_modified)
+            logger.info(f"Document not modified: {url}")
+            await self._notify_if_unprocessed(url)
+            return []
+        
+        # Check for PDF links first
+        pdf_urls = page.select_links(selectors["pdf_links"]) if "pdf_links" in selectors else []
+        
+        document_data = self._extract_document_data(page, source_name, url)
+        if document_data:
+            digest = content_hash(f"{document_data['title']}\n{document_data['content']}")
+            previous = self.state.record(url) or {}
+            if digest == previous.get("content_hash"):
+                self.state.record_fetch(url, "document", source_name, page.etag, page.last_modified, digest)
+                logger.info(f"Document unchanged: {url}")
+                await self._notify_if_unprocessed(url)
+                return pdf_urls
+            document_data["metadata"]["content_hash"] = digest
+            
+            # Determine document type
+            doc_type = self._determine_document_type(document_data["title"], source_name)
+            
+            # Save document
+            save_path = await self._save_document(document_data, doc_type, source_name)
+            if save_path:
+                self.state.record_fetch(url, "document", source_name, page.etag, page.last_modified, digest, save_path)
+                await self._notify_document(save_path, doc_type)
+        
+        return pdf_urls
     
-    async def _extract_document_data(self, driver, source_name: str) -> Dict[str, Any]:
+    def _extract_document_data(self, page: ParsedPage, source_name: str, url: str) -> Dict[str, Any]:
         """
         Extract data from a legal document.
         
         Args:
-            driver: Selenium WebDriver
+            page: Parsed document page
             source_name: Name of the source
+            url: Requested URL (its canonical form identifies the document)
             
         Returns:
             Dictionary with document data
         """
-        source_info = self.sources[source_name]
+        selectors = self.sources[source_name]["selectors"]
         
         try:
             # Extract title
             title = "Untitled Document"
-            if "document_title" in source_info["selectors"]:
-                title_elements = driver.find_elements(By.CSS_SELECTOR, source_info["selectors"]["document_title"])
-                if title_elements:
-                    title = title_elements[0].text.strip()
+            if "document_title" in selectors:
+                title = page.select_text(selectors["document_title"]) or title
             
             # Extract content
             content = ""
-            if "document_content" in source_info["selectors"]:
-                content_elements = driver.find_elements(By.CSS_SELECTOR, source_info["selectors"]["document_content"])
-                if content_elements:
-                    content = content_elements[0].text.strip()
+            if "document_content" in selectors:
+                content = page.select_text(selectors["document_content"])
             
             # Extract metadata
             metadata = {}
-            if "document_meta" in source_info["selectors"]:
-                meta_elements = driver.find_elements(By.CSS_SELECTOR, source_info["selectors"]["document_meta"])
-                if meta_elements:
-                    metadata["source_metadata"] = meta_elements[0].text.strip()
+            if "document_meta" in selectors:
+                source_metadata = page.select_text(selectors["document_meta"])
+                if source_metadata:
+                    metadata["source_metadata"] = source_metadata
             
             # Add common metadata
             metadata.update({
                 "source": source_name,
-                "url": driver.current_url,
+                "url": page.url,
+                "fetched_with": "browser" if page.rendered else "http",
                 "scraped_at": datetime.now().isoformat()
             })
             
             return {
-                "id": str(uuid.uuid4()),
+                "id": url_key(url),
                 "title": title,
                 "content": content,
                 "metadata": metadata
@@ -298,52 +322,94 @@ class LegalDocumentScraper:
         """
         Download a PDF document.
         
+        The download manager resumes partial downloads, splits large files into
+        parallel range requests and renames the file into place atomically. A
+        conditional GET with the stored validators skips unchanged PDFs, and
+        the file name is derived from the canonical URL, so a PDF is stored
+        once however often it is found.
+        
         Args:
             pdf_url: URL of the PDF
             source_name: Name of the source
-        """
-        try:
-            logger.info(f"Downloading PDF: {pdf_url}")
-            
-            # Generate a unique filename
-            filename = f"{source_name}_{str(uuid.uuid4())}.pdf"
-            
-            # Determine document type from URL
-            doc_type = self._determine_document_type_from_url(pdf_url, source_name)
-            
-            # Set the save path
-            save_path = os.path.join(self.dirs[doc_type], filename)
-            
-            # Download the PDF
-            response = requests.get(pdf_url, stream=True)
-            response.raise_for_status()
             
-            with open(save_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            # Save metadata
-            metadata = {
-                "id": str(uuid.uuid4()),
-                "title": self._extract_title_from_url(pdf_url),
-                "source": source_name,
-                "url": pdf_url,
-                "file_path": save_path,
-                "document_type": doc_type,
-                "scraped_at": datetime.now().isoformat()
-            }
-            
-            metadata_path = os.path.join(self.metadata_dir, f"{Path(save_path).stem}.json")
-            with open(metadata_path, "w", encoding="utf-8") as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"PDF downloaded: {save_path}")
+        Returns:
+            Tuple of (save path, metadata); metadata is None when the PDF was
+            not downloaded again
             
-            return save_path, metadata
+        Raises:
+            DownloadError: If the download fails (the engine retries the item)
+        """
+        logger.info(f"Downloading PDF: {pdf_url}")
+        
+        # Stable filename from the canonical URL
+        doc_id = url_key(pdf_url)
+        filename = f"{source_name}_{doc_id}.pdf"
+        
+        # Determine document type from URL
+        doc_type = self._determine_document_type_from_url(pdf_url, source_name)
+        
+        # Set the save path
+        save_path = os.path.join(self.dirs[doc_type], filename)
+        
+        # Conditional, resumable download straight to its final name
+        previous = self.state.record(pdf_url) or {}
+        headers = self.state.conditional_headers(pdf_url) if os.path.exists(save_path) else {}
+        result = await self.downloads.download(pdf_url, save_path, headers=headers,
+                                               previous_sha256=previous.get("content_hash"))
+        digest = result.sha256
+        self.state.record_fetch(pdf_url, "pdf", source_name, result.etag, result.last_modified,
+                                digest if result.status != "not_modified" else None, save_path)
+        if result.status != "downloaded":
+            logger.info(f"PDF {result.status.replace('_', ' ')}, skipped: {pdf_url}")
+            await self._notify_if_unprocessed(pdf_url)
+            return save_path, None
+        
+        # Save metadata
+        metadata = {
+            "id": doc_id,
+            "title": self._extract_title_from_url(pdf_url),
+            "source": source_name,
+            "url": pdf_url,
+            "file_path": save_path,
+            "content_hash": digest,
+            "document_type": doc_type,
+            "scraped_at": datetime.now().isoformat()
+        }
+        
+        metadata_path = os.path.join(self.metadata_dir, f"{Path(save_path).stem}.json")
+        with open(metadata_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
         
+        logger.info(f"PDF downloaded: {save_path} ({result.size} bytes in {result.seconds}s)")
+        await self._notify_document(save_path, doc_type)
+        
+        return save_path, metadata
+    
+    async def _notify_document(self, path: str, doc_type: str):
+        """Hand a new or changed document to the on_document callback, if any"""
+        if self._on_document is None:
+            return
+        try:
+            outcome = self._on_document(path, doc_type)
+            if inspect.isawaitable(outcome):
+                await outcome
         except Exception as e:
-            logger.error(f"Error downloading PDF {pdf_url}: {e}")
-            return None, None
+            logger.error(f"on_document callback failed for {path}: {e}")
+    
+    async def _notify_if_unprocessed(self, url: str):
+        """
+        Hand an unchanged document to on_document again if it was never
+        processed: its hash is stored before extraction, so a failed or
+        interrupted extraction would otherwise never be retried.
+        """
+        if self._on_document is None:
+            return
+        path = (self.state.record(url) or {}).get("file_path")
+        if not path or not os.path.exists(path):
+            return
+        if not self.state.is_processed(await asyncio.to_thread(file_hash, path)):
+            logger.info(f"Unchanged but not processed yet, queueing: {path}")
+            await self._notify_document(path, os.path.basename(os.path.dirname(path)))
     
     def _determine_document_type(self, title: str, source_name: str) -> str:
         """
@@ -475,11 +541,13 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Scrape legal documents from Indian legal websites")
     parser.add_argument("--keywords", nargs="+", help="Keywords to search for")
     parser.add_argument("--max-results", type=int, default=10, help="Maximum results per keyword")
+    parser.add_argument("--workers", type=int, default=SCRAPER_WORKERS, help="Concurrent workers")
     args = parser.parse_args()
     
     # Run the scraper
     scraper = LegalDocumentScraper()
     asyncio.run(scraper.scrape_all_sources(
         keywords=args.keywords,
-        max_results_per_keyword=args.max_results
+        max_results_per_keyword=args.max_results,
+        workers=args.workers
     ))
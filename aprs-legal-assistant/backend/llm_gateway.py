@@ -0,0 +1,767 @@
+"""
+LLM gateway: routing, admission control and batching across LLM backends.
+
+LegalRAG used to pick exactly one of the Hugging Face Inference API, Ollama
+or a local transformers pipeline, and every request made a fresh, unbounded
+call, so a burst of questions piled up on the model server until every
+request was slow. The gateway puts each backend behind
+  - a concurrency limit and a bounded wait queue: requests beyond the queue
+    are routed elsewhere or rejected at once (LLMOverloadedError) instead of
+    making every other request slower,
+  - a circuit breaker that takes a failing backend out of rotation for a
+    cool-down period,
+and routes every request to the healthy backend with the lowest expected
+latency (latency EWMA scaled by current load), failing over to the next one
+on errors. The local pipeline batches concurrent prompts into one call,
+Ollama requests keep the model loaded between requests (OLLAMA_KEEP_ALIVE),
+and FakeLLMBackend simulates a capacity-limited model server for load tests.
+stream() yields text as it is generated: Ollama and the fake backend stream
+tokens, the others return the whole completion as one chunk.
+
+LLM_BACKENDS lists the backends in preference order, e.g.
+LLM_BACKENDS=ollama,hf_api,local.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+logger = logging.getLogger("llm_gateway")
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1024"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_FAILURE_THRESHOLD = int(os.getenv("LLM_FAILURE_THRESHOLD", "3"))
+LLM_COOLDOWN_SECONDS = float(os.getenv("LLM_COOLDOWN_SECONDS", "30"))
+
+OLLAMA_CONCURRENCY = int(os.getenv("OLLAMA_CONCURRENCY", "2"))
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+HF_API_CONCURRENCY = int(os.getenv("HF_API_CONCURRENCY", "4"))
+LOCAL_LLM_BATCH_SIZE = int(os.getenv("LOCAL_LLM_BATCH_SIZE", "8"))
+LOCAL_LLM_BATCH_WAIT_MS = float(os.getenv("LOCAL_LLM_BATCH_WAIT_MS", "20"))
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))
+FAKE_LLM_CAPACITY = int(os.getenv("FAKE_LLM_CAPACITY", "4"))
+FAKE_LLM_PREFILL_MS_PER_TOKEN = float(os.getenv("FAKE_LLM_PREFILL_MS_PER_TOKEN", "0"))
+LOCAL_LLM_PREFIX_CACHE = os.getenv("LOCAL_LLM_PREFIX_CACHE", "true").lower() == "true"
+LOCAL_LLM_QUANTIZE_INT8 = os.getenv("LOCAL_LLM_QUANTIZE_INT8", "false").lower() == "true"
+# Small model of the same family for assisted decoding (empty: off)
+LOCAL_LLM_DRAFT_MODEL = os.getenv("LOCAL_LLM_DRAFT_MODEL", "")
+
+# Latency assumed for a backend before its first response
+_PRIOR_LATENCY = 2.0
+_EWMA_ALPHA = 0.2
+_LATENCY_WINDOW = 500
+
+
+class LLMError(Exception):
+    """Raised when no backend produced a response"""
+
+
+class LLMOverloadedError(LLMError):
+    """Raised when every backend's queue is full"""
+
+
+@dataclass
+class LLMResult:
+    """Generated text and where it came from"""
+    text: str
+    backend: str
+    latency: float
+
+
+class LLMBackend:
+    """
+    One model endpoint behind a concurrency limit, a bounded queue and a
+    circuit breaker. Subclasses implement complete().
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int = LLM_MAX_QUEUE,
+                 failure_threshold: int = LLM_FAILURE_THRESHOLD, cooldown: float = LLM_COOLDOWN_SECONDS):
+        """
+        Args:
+            name: Backend name used in routing stats
+            max_concurrency: Calls sent to the model at once
+            max_queue: Requests allowed to wait for a slot
+            failure_threshold: Consecutive failures that open the circuit
+            cooldown: Seconds a backend with an open circuit is skipped
+        """
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.ewma_latency: Optional[float] = None
+        self._latencies: deque = deque(maxlen=_LATENCY_WINDOW)
+        self.counters = {"calls": 0, "failures": 0, "rejected": 0}
+
+    async def complete(self, prompt: str, options: Dict[str, Any]) -> str:
+        """
+        Raw model call (no limits).
+
+        Args:
+            prompt: Request-specific prompt text
+            options: max_tokens, temperature, top_p, and "system": the
+                instructions that precede every prompt (None if absent)
+        """
+        raise NotImplementedError
+
+    async def complete_stream(self, prompt: str, options: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Raw streaming call (no limits). Backends that cannot stream yield the
+        whole completion as one chunk.
+        """
+        yield await self.complete(prompt, options)
+
+    async def close(self):
+        """Release pooled connections"""
+
+    # -------------------------------------------------------------- routing
+
+    @property
+    def available(self) -> bool:
+        """Circuit closed and room in the queue"""
+        if time.monotonic() < self.open_until:
+            return False
+        return self.in_flight < self.max_concurrency or self.waiting < self.max_queue
+
+    def expected_latency(self) -> float:
+        """Latency estimate for a new request given the current load"""
+        base = self.ewma_latency if self.ewma_latency is not None else _PRIOR_LATENCY
+        return base * (1 + (self.in_flight + self.waiting) / self.max_concurrency)
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._slots_loop = loop
+        return self._slots
+
+    async def generate(self, prompt: str, options: Dict[str, Any]) -> str:
+        """
+        Call the model within this backend's limits.
+
+        Raises:
+            LLMOverloadedError: If the queue is full
+        """
+        return "".join([chunk async for chunk in self.generate_stream(prompt, options)])
+
+    async def generate_stream(self, prompt: str, options: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Stream the completion within this backend's limits; the slot is held
+        until the stream ends or is closed.
+
+        Raises:
+            LLMOverloadedError: If the queue is full
+        """
+        if not self.available:
+            self.counters["rejected"] += 1
+            raise LLMOverloadedError(f"{self.name} is saturated or cooling down")
+        slots = self._get_slots()
+        self.waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            self.counters["calls"] += 1
+            async for chunk in self.complete_stream(prompt, options):
+                yield chunk
+        except Exception:
+            self.counters["failures"] += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                self.open_until = time.monotonic() + self.cooldown
+                logger.warning(f"{self.name}: {self.consecutive_failures} failures, pausing for {self.cooldown:g}s")
+            raise
+        finally:
+            self.in_flight -= 1
+            slots.release()
+
+        latency = time.monotonic() - started
+        self.consecutive_failures = 0
+        self.ewma_latency = latency if self.ewma_latency is None else (
+            _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * self.ewma_latency)
+        self._latencies.append(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters, load and latency percentiles (seconds)"""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3) if latencies else None
+
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "circuit_open": time.monotonic() < self.open_until,
+            "ewma_latency": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+        }
+
+
+class _HTTPBackend(LLMBackend):
+    """Backend with a pooled aiohttp session (recreated per event loop)"""
+
+    def __init__(self, name: str, max_concurrency: int, **kwargs):
+        super().__init__(name, max_concurrency, **kwargs)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(sock_connect=5))
+            self._session_loop = loop
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _post_json(self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Any:
+        session = await self._get_session()
+        async with session.post(url, json=payload, headers=headers) as resp:
+            if resp.status != 200:
+                detail = await resp.text()
+                raise LLMError(f"{self.name} returned {resp.status}: {detail[:200]}")
+            return await resp.json(content_type=None)
+
+
+class HFInferenceBackend(_HTTPBackend):
+    """Hugging Face Inference API"""
+
+    def __init__(self, model: str, api_key: str, max_concurrency: int = HF_API_CONCURRENCY, **kwargs):
+        super().__init__("hf_api", max_concurrency, **kwargs)
+        self.api_url = f"https://api-inference.huggingface.co/models/{model}"
+        self.api_key = api_key
+
+    async def complete(self, prompt: str, options: Dict[str, Any]) -> str:
+        system = options.get("system")
+        payload = {
+            "inputs": f"{system}\n\n{prompt}" if system else prompt,
+            "parameters": {
+                "max_new_tokens": options.get("max_tokens", LLM_MAX_TOKENS),
+                "temperature": options.get("temperature", 0.7),
+                "top_p": options.get("top_p", 0.95),
+            },
+        }
+        result = await self._post_json(self.api_url, payload, {"Authorization": f"Bearer {self.api_key}"})
+        if isinstance(result, list) and result:
+            result = result[0]
+        return result.get("generated_text", "")
+
+
+class OllamaBackend(_HTTPBackend):
+    """Ollama /api/generate, keeping the model loaded between requests"""
+
+    def __init__(self, url: str, model: str, keep_alive: str = OLLAMA_KEEP_ALIVE,
+                 max_concurrency: int = OLLAMA_CONCURRENCY, **kwargs):
+        super().__init__("ollama", max_concurrency, **kwargs)
+        self.counters.update({"prompt_eval_tokens": 0, "prompt_eval_ms": 0.0})
+        self.url = url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+
+    def _payload(self, prompt: str, options: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            # The runner reuses the KV state of a prompt prefix it has already
+            # seen, so the instructions go first, identical every time
+            "system": options.get("system"),
+            "options": {
+                "temperature": options.get("temperature", 0.7),
+                "top_p": options.get("top_p", 0.95),
+                "num_predict": options.get("max_tokens", LLM_MAX_TOKENS),
+            },
+        }
+        if not payload["system"]:
+            del payload["system"]
+        return payload
+
+    def _count_prompt_eval(self, result: Dict[str, Any]):
+        # Prompt tokens actually evaluated; drops when a cached prefix is reused
+        self.counters["prompt_eval_tokens"] += result.get("prompt_eval_count", 0)
+        self.counters["prompt_eval_ms"] += result.get("prompt_eval_duration", 0) / 1e6
+
+    async def complete(self, prompt: str, options: Dict[str, Any]) -> str:
+        result = await self._post_json(f"{self.url}/api/generate", self._payload(prompt, options, stream=False))
+        self._count_prompt_eval(result)
+        return result.get("response", "")
+
+    async def complete_stream(self, prompt: str, options: Dict[str, Any]) -> AsyncIterator[str]:
+        session = await self._get_session()
+        async with session.post(f"{self.url}/api/generate", json=self._payload(prompt, options, stream=True)) as resp:
+            if resp.status != 200:
+                detail = await resp.text()
+                raise LLMError(f"{self.name} returned {resp.status}: {detail[:200]}")
+            # One JSON object per line; the last one carries the counters
+            async for line in resp.content:
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                if result.get("error"):
+                    raise LLMError(f"{self.name}: {result['error']}")
+                if result.get("response"):
+                    yield result["response"]
+                if result.get("done"):
+                    self._count_prompt_eval(result)
+                    break
+
+
+class TransformersBackend(LLMBackend):
+    """
+    Local transformers text-generation pipeline. Concurrent prompts are
+    collected for up to batch_wait_ms and generated in one batched call in a
+    worker thread. A prompt with system instructions that arrives alone is
+    generated from the cached KV state of those instructions instead
+    (PrefixKVCache); the cache generates one prompt at a time, so concurrent
+    prompts keep the batched path. With a draft model, every prompt is generated one at a time with
+    assisted decoding (SpeculativeDecoder). The model is loaded on first use.
+    """
+
+    def __init__(self, model: Optional[str] = None, pipeline: Optional[Callable] = None,
+                 batch_size: int = LOCAL_LLM_BATCH_SIZE, batch_wait_ms: float = LOCAL_LLM_BATCH_WAIT_MS,
+                 prefix_cache: bool = LOCAL_LLM_PREFIX_CACHE, draft_model: Optional[str] = LOCAL_LLM_DRAFT_MODEL,
+                 **kwargs):
+        """
+        Args:
+            model: Hugging Face model name, loaded on first use
+            pipeline: Ready-made text-generation pipeline (instead of model)
+            batch_size: Largest batch passed to the pipeline
+            batch_wait_ms: How long the first prompt of a batch waits for others
+            prefix_cache: Reuse the KV state of system instructions for unbatched prompts
+            draft_model: Draft model name for assisted decoding (None or "" for off)
+        """
+        kwargs.setdefault("max_queue", max(LLM_MAX_QUEUE, batch_size * 2))
+        super().__init__("local", max(1, batch_size), **kwargs)
+        self.model = model
+        self.pipeline = pipeline
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait_ms / 1000.0
+        self.use_prefix_cache = prefix_cache
+        self.prefix_cache = None
+        self.draft_model = draft_model or None
+        self.speculative = None
+        self._pending: List[Tuple[str, Dict[str, Any], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # Full batches run as tasks; referenced here until they finish
+        self._batch_tasks: set = set()
+        # The model runs one batch at a time
+        self._model_lock: Optional[asyncio.Lock] = None
+        self.batches = 0
+
+    async def complete(self, prompt: str, options: Dict[str, Any]) -> str:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((prompt, options, future))
+        if len(self._pending) >= self.batch_size:
+            task = asyncio.create_task(self._run_batch(self._take_batch()))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return await future
+
+    def _take_batch(self) -> List[Tuple[str, Dict[str, Any], asyncio.Future]]:
+        batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+        return batch
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.batch_wait)
+        while self._pending:
+            await self._run_batch(self._take_batch())
+
+    async def _run_batch(self, batch: List[Tuple[str, Dict[str, Any], asyncio.Future]]):
+        if not batch:
+            return
+        if self._model_lock is None:
+            self._model_lock = asyncio.Lock()
+        async with self._model_lock:
+            try:
+                if self.pipeline is None:
+                    self.pipeline = await asyncio.to_thread(self._load_pipeline)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            if self.draft_model and self.speculative is None and hasattr(self.pipeline, "model"):
+                await self._load_draft_model()
+            if (self.use_prefix_cache and self.speculative is None and self.prefix_cache is None
+                    and hasattr(self.pipeline, "model")):
+                from backend.prefix_cache import PrefixKVCache
+
+                self.prefix_cache = PrefixKVCache(self.pipeline.model, self.pipeline.tokenizer)
+
+            # Skipping the system prefill only pays off while nothing else is
+            # waiting: the cache decodes one prompt at a time, a batch decodes
+            # all of them in one pass
+            use_prefix_cache = self.prefix_cache is not None and len(batch) == 1
+            plain = []
+            for item in batch:
+                prompt, options, future = item
+                max_tokens, temperature, top_p = self._sampling(options)
+                try:
+                    if self.speculative is not None:
+                        system = options.get("system")
+                        text = await asyncio.to_thread(
+                            self.speculative.generate, f"{system}\n\n{prompt}" if system else prompt,
+                            max_tokens, temperature, top_p,
+                        )
+                    elif use_prefix_cache and options.get("system"):
+                        text = await asyncio.to_thread(
+                            self.prefix_cache.generate, options["system"] + "\n\n", prompt,
+                            max_tokens, temperature, top_p,
+                        )
+                    else:
+                        plain.append(item)
+                        continue
+                    if not future.done():
+                        future.set_result(text)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+            if plain:
+                await self._run_pipeline(plain)
+
+    @staticmethod
+    def _sampling(options: Dict[str, Any]) -> Tuple[int, float, float]:
+        return (options.get("max_tokens", LLM_MAX_TOKENS), options.get("temperature", 0.7),
+                options.get("top_p", 0.95))
+
+    async def _run_pipeline(self, batch: List[Tuple[str, Dict[str, Any], asyncio.Future]]):
+        # Generation settings apply to a whole pipeline call, so only prompts
+        # with the same max_tokens, temperature and top_p share one
+        groups: Dict[Tuple[int, float, float], List[Tuple[str, Dict[str, Any], asyncio.Future]]] = {}
+        for item in batch:
+            groups.setdefault(self._sampling(item[1]), []).append(item)
+        for sampling, group in groups.items():
+            await self._run_pipeline_group(group, *sampling)
+
+    async def _run_pipeline_group(self, batch: List[Tuple[str, Dict[str, Any], asyncio.Future]],
+                                  max_tokens: int, temperature: float, top_p: float):
+        prompts = [f"{options['system']}\n\n{prompt}" if options.get("system") else prompt
+                   for prompt, options, _ in batch]
+        try:
+            outputs = await asyncio.to_thread(
+                self.pipeline, prompts,
+                batch_size=len(prompts),
+                max_new_tokens=max_tokens,
+                do_sample=True,
+                temperature=temperature,
+                top_p=top_p,
+                return_full_text=False,
+            )
+            self.batches += 1
+            for (_, _, future), output in zip(batch, outputs):
+                if isinstance(output, list):
+                    output = output[0] if output else {}
+                if not future.done():
+                    future.set_result(output.get("generated_text", ""))
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _load_draft_model(self):
+        from backend.speculative_decoding import SpeculativeDecoder, load_draft_model
+
+        try:
+            draft = await asyncio.to_thread(load_draft_model, self.draft_model, self.pipeline.model)
+            self.speculative = SpeculativeDecoder(self.pipeline.model, self.pipeline.tokenizer, draft)
+            logger.info(f"Assisted decoding with draft model {self.draft_model}")
+        except Exception as e:
+            logger.error(f"Could not load draft model {self.draft_model}, decoding without it: {e}")
+            self.draft_model = None
+
+    def _load_pipeline(self) -> Callable:
+        from transformers import pipeline
+
+        logger.info(f"Loading model locally: {self.model}")
+        generator = pipeline("text-generation", model=self.model)
+        tokenizer = generator.tokenizer
+        # Batched generation pads prompts; decoder-only models pad on the left
+        if tokenizer.pad_token_id is None:
+            tokenizer.pad_token_id = generator.model.config.eos_token_id
+        tokenizer.padding_side = "left"
+        if LOCAL_LLM_QUANTIZE_INT8 and generator.device.type == "cpu":
+            from backend.model_optimizer import quantize_dynamic_int8
+
+            # int8 weights: less memory traffic per token on CPU
+            generator.model = quantize_dynamic_int8(generator.model)
+        return generator
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {**super().stats(), "batches": self.batches}
+        if self.prefix_cache is not None:
+            stats.update(self.prefix_cache.stats())
+        if self.speculative is not None:
+            stats.update(self.speculative.stats())
+        return stats
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Simulated model server for load tests: requests share capacity
+    processor-style, so each one slows down as more run at once, and a
+    fraction can fail. With prefill_ms_per_token set, prompt tokens (about
+    four characters each) add to the service time, except for system
+    instructions already seen when prefix_cache is on. Responses stream
+    word by word after the prefill.
+    """
+
+    def __init__(self, name: str = "fake", latency_ms: float = FAKE_LLM_LATENCY_MS,
+                 capacity: int = FAKE_LLM_CAPACITY, failure_rate: float = 0.0,
+                 prefill_ms_per_token: float = FAKE_LLM_PREFILL_MS_PER_TOKEN, prefix_cache: bool = True,
+                 max_concurrency: Optional[int] = None, **kwargs):
+        super().__init__(name, max_concurrency or capacity, **kwargs)
+        self.counters["prefill_tokens"] = 0
+        self.latency = latency_ms / 1000.0
+        self.capacity = max(1, capacity)
+        self.failure_rate = failure_rate
+        self.prefill_per_token = prefill_ms_per_token / 1000.0
+        self.prefix_cache = prefix_cache
+        self._cached_prefixes = set()
+        self.server_load = 0
+
+    def _prefill_tokens(self, prompt: str, system: Optional[str]) -> int:
+        tokens = len(prompt) // 4
+        if system and not (self.prefix_cache and system in self._cached_prefixes):
+            tokens += len(system) // 4
+            self._cached_prefixes.add(system)
+        return tokens
+
+    def _response_text(self, prompt: str) -> str:
+        return f"[{self.name}] response to: {' '.join(prompt.split()[-12:])}"
+
+    async def _serve(self, seconds: float):
+        # Service time grows once more requests run than the server has capacity for
+        while seconds > 0:
+            step = min(seconds, 0.01)
+            await asyncio.sleep(step * max(1.0, self.server_load / self.capacity))
+            seconds -= step
+
+    async def complete(self, prompt: str, options: Dict[str, Any]) -> str:
+        return "".join([chunk async for chunk in self.complete_stream(prompt, options)])
+
+    async def complete_stream(self, prompt: str, options: Dict[str, Any]) -> AsyncIterator[str]:
+        prefill_tokens = self._prefill_tokens(prompt, options.get("system"))
+        self.counters["prefill_tokens"] += prefill_tokens
+        words = self._response_text(prompt).split(" ")
+        self.server_load += 1
+        try:
+            # Prefill first, then the decode time spread over the words
+            await self._serve(prefill_tokens * self.prefill_per_token)
+            if self.failure_rate and random.random() < self.failure_rate:
+                raise LLMError(f"{self.name}: simulated failure")
+            for i, word in enumerate(words):
+                await self._serve(self.latency / len(words))
+                yield word if i == 0 else f" {word}"
+        finally:
+            self.server_load -= 1
+
+
+class LLMGateway:
+    """Routes prompts to the best available backend with failover"""
+
+    def __init__(self, backends: Sequence[LLMBackend], timeout: float = LLM_TIMEOUT_SECONDS):
+        """
+        Args:
+            backends: Backends in preference order (used to break ties)
+            timeout: Deadline per request across all attempts
+        """
+        self.backends = list(backends)
+        self.timeout = timeout
+
+    def _candidates(self) -> List[LLMBackend]:
+        ranked = sorted(enumerate(self.backends), key=lambda item: (item[1].expected_latency(), item[0]))
+        return [backend for _, backend in ranked if backend.available]
+
+    async def generate(self, prompt: str, system: Optional[str] = None, max_tokens: int = LLM_MAX_TOKENS,
+                       temperature: float = 0.7, top_p: float = 0.95, timeout: Optional[float] = None) -> LLMResult:
+        """
+        Generate a completion.
+
+        Args:
+            prompt: Request-specific prompt text
+            system: Instructions that precede the prompt; keep them identical
+                across requests so backends can reuse their prefill
+            max_tokens: Maximum new tokens
+            temperature: Sampling temperature
+            top_p: Nucleus sampling probability
+            timeout: Deadline in seconds (defaults to the gateway's)
+
+        Returns:
+            LLMResult
+
+        Raises:
+            LLMOverloadedError: Every backend is saturated
+            LLMError: Every available backend failed or the deadline passed
+        """
+        if not self.backends:
+            raise LLMError("No LLM backend configured")
+        options = {"system": system, "max_tokens": max_tokens, "temperature": temperature, "top_p": top_p}
+        try:
+            return await asyncio.wait_for(self._generate(prompt, options), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise LLMError(f"LLM request exceeded its {timeout or self.timeout:g}s deadline")
+
+    async def _generate(self, prompt: str, options: Dict[str, Any]) -> LLMResult:
+        errors = []
+        overloaded = True
+        candidates = self._candidates()
+        if not candidates:
+            raise LLMOverloadedError("All LLM backends are saturated")
+        for backend in candidates:
+            started = time.monotonic()
+            try:
+                text = await backend.generate(prompt, options)
+                return LLMResult(text=text, backend=backend.name, latency=time.monotonic() - started)
+            except LLMOverloadedError as e:
+                errors.append(str(e))
+            except Exception as e:
+                overloaded = False
+                logger.warning(f"LLM backend {backend.name} failed, trying the next one: {e}")
+                errors.append(f"{backend.name}: {e}")
+        if overloaded:
+            raise LLMOverloadedError("; ".join(errors))
+        raise LLMError("; ".join(errors))
+
+    async def stream(self, prompt: str, system: Optional[str] = None, max_tokens: int = LLM_MAX_TOKENS,
+                     temperature: float = 0.7, top_p: float = 0.95,
+                     timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Stream a completion as it is generated. Arguments as for generate().
+
+        A backend that fails before its first chunk is failed over like in
+        generate(); once text has been yielded, errors are raised.
+
+        Yields:
+            Text chunks
+
+        Raises:
+            LLMOverloadedError: Every backend is saturated
+            LLMError: Every available backend failed or the deadline passed
+        """
+        if not self.backends:
+            raise LLMError("No LLM backend configured")
+        options = {"system": system, "max_tokens": max_tokens, "temperature": temperature, "top_p": top_p}
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+        errors = []
+        overloaded = True
+        candidates = self._candidates()
+        if not candidates:
+            raise LLMOverloadedError("All LLM backends are saturated")
+        for backend in candidates:
+            chunks = backend.generate_stream(prompt, options)
+            yielded = False
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), deadline - time.monotonic())
+                    except StopAsyncIteration:
+                        return
+                    yielded = True
+                    yield chunk
+            except asyncio.TimeoutError:
+                raise LLMError(f"LLM request exceeded its {timeout:g}s deadline")
+            except LLMOverloadedError as e:
+                errors.append(str(e))
+            except Exception as e:
+                if yielded:
+                    raise
+                overloaded = False
+                logger.warning(f"LLM backend {backend.name} failed, trying the next one: {e}")
+                errors.append(f"{backend.name}: {e}")
+            finally:
+                await chunks.aclose()
+        if overloaded:
+            raise LLMOverloadedError("; ".join(errors))
+        raise LLMError("; ".join(errors))
+
+    async def close(self):
+        for backend in self.backends:
+            await backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-backend stats"""
+        return {backend.name: backend.stats() for backend in self.backends}
+
+
+def build_llm_gateway(backend_names: Optional[Sequence[str]] = None) -> LLMGateway:
+    """
+    Build a gateway from the environment.
+
+    Args:
+        backend_names: Backends in preference order, from "ollama",
+            "hf_api", "local" and "fake". Defaults to LLM_BACKENDS, or to the
+            single backend the USE_OLLAMA / HF_API_KEY settings select.
+
+    Returns:
+        LLMGateway
+    """
+    hf_api_key = os.getenv("HF_API_KEY")
+    hf_model = os.getenv("HF_MODEL", "mistralai/Mixtral-8x7B-Instruct-v0.1")
+    use_ollama = os.getenv("USE_OLLAMA", "false").lower() == "true"
+
+    if backend_names is None:
+        configured = os.getenv("LLM_BACKENDS", "")
+        backend_names = [name.strip() for name in configured.split(",") if name.strip()]
+    if not backend_names:
+        backend_names = ["ollama"] if use_ollama else ["hf_api"] if hf_api_key else ["local"]
+
+    backends: List[LLMBackend] = []
+    for name in backend_names:
+        if name == "ollama":
+            backends.append(OllamaBackend(os.getenv("OLLAMA_URL", "http://localhost:11434"),
+                                          os.getenv("OLLAMA_MODEL", "gemma3:1b")))
+        elif name == "hf_api":
+            if not hf_api_key:
+                logger.warning("hf_api backend requested but HF_API_KEY is not set; skipping it")
+                continue
+            backends.append(HFInferenceBackend(hf_model, hf_api_key))
+        elif name == "local":
+            backends.append(TransformersBackend(model=hf_model))
+        elif name == "fake":
+            backends.append(FakeLLMBackend())
+        else:
+            logger.warning(f"Unknown LLM backend {name!r}; skipping it")
+    logger.info(f"LLM backends: {', '.join(backend.name for backend in backends) or 'none'}")
+    return LLMGateway(backends)
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the shared LLM gateway"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = build_llm_gateway()
+        return _gateway
@@ -1,10 +1,15 @@
 import os
-import numpy as np
+import threading
+
 import torch
-import soundfile as sf
 from nemo.collections.asr.models import EncDecRNNTBPEModel
 
+from audio_codecs import decode_audio
+from backend.model_optimizer import quantize_dynamic_int8
+
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "indicconformer_stt_te_hybrid_rnnt_large.nemo")
+# int8 Linear layers on CPU; opt-in, compare WER with benchmarks/bench_model_optimization.py first
+ASR_QUANTIZE_INT8 = os.getenv("ASR_QUANTIZE_INT8", "false").lower() == "true"
 
 class LocalTeluguASR:
     def __init__(self):
@@ -14,6 +19,8 @@ class LocalTeluguASR:
             try:
                 self.model = EncDecRNNTBPEModel.restore_from(MODEL_PATH, map_location=self.device)
                 self.model.eval()
+                if ASR_QUANTIZE_INT8 and self.device == "cpu":
+                    self.model = quantize_dynamic_int8(self.model)
             except Exception as e:
                 print(f"Failed to load NeMo Telugu ASR model: {e}")
                 self.model = None
@@ -24,22 +31,21 @@ class LocalTeluguASR:
     def transcribe(self, wav_bytes: bytes) -> str:
         if self.model is None:
             raise RuntimeError("Local Telugu ASR model not loaded.")
-        # Write bytes to temp file
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            tmp.write(wav_bytes)
-            tmp_path = tmp.name
-        try:
-            # Read audio
-            audio, sr = sf.read(tmp_path)
-            # NeMo expects 16kHz mono
-            if sr != 16000:
-                import librosa
-                audio = librosa.resample(audio, orig_sr=sr, target_sr=16000)
-            if len(audio.shape) > 1:
-                audio = np.mean(audio, axis=1)  # Convert to mono
-            # Run inference
-            transcript = self.model.transcribe([audio])[0]
-            return transcript.strip()
-        finally:
-            os.unlink(tmp_path)
+        # Decode WAV/FLAC/Opus/WebM in memory; NeMo expects 16kHz mono
+        audio, _ = decode_audio(wav_bytes, target_sr=16000)
+        # Run inference
+        transcript = self.model.transcribe([audio])[0]
+        return transcript.strip()
+
+
+_asr_instance = None
+_asr_lock = threading.Lock()
+
+
+def get_local_telugu_asr() -> LocalTeluguASR:
+    """Return the shared Telugu ASR, loading (and quantizing) the model on first use"""
+    global _asr_instance
+    with _asr_lock:
+        if _asr_instance is None:
+            _asr_instance = LocalTeluguASR()
+        return _asr_instance
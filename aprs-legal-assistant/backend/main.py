@@ -1,9 +1,10 @@
-from fastapi import FastAPI, Request, File, UploadFile, Form, HTTPException, BackgroundTasks, Body, Response
+from fastapi import FastAPI, Request, File, UploadFile, Form, HTTPException, Body, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
+import asyncio
 import uuid
 import logging
 import requests  # for HTTP calls in chat endpoint
@@ -17,10 +18,19 @@ from pydantic import BaseModel
 # Import routers
 import sys
 import os
-# Add the current directory to the path so we can import local modules
+# Add the current directory to the path so we can import local modules,
+# and its parent for the modules shared as "backend.xxx"
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from lawyers import router as lawyers_router
 from bhashini_voice import router as voice_router
+from voice_pipeline import router as voice_pipeline_router
+from binary_responses import bytes_response, wants_base64
+from audio_codecs import AudioStore
+from backend.translation_engine import get_translation_engine
+from job_queue import get_job_queue
+from gemini_client import get_gemini_client
+from pdf_generator import LegalPDFGenerator
 
 # Setup logging
 logger = logging.getLogger("aprs_legal_assistant")
@@ -147,6 +157,7 @@ async def kavvy_search(request: Request):
 # Include routers
 app.include_router(lawyers_router)
 app.include_router(voice_router, prefix="/api")
+app.include_router(voice_pipeline_router, prefix="/api")
 
 # Add CORS middleware
 app.add_middleware(
@@ -213,6 +224,63 @@ audio_dir = os.path.join(data_dir, "audio")
 os.makedirs(audio_dir, exist_ok=True)
 app.mount("/audio", StaticFiles(directory=audio_dir), name="audio")
 
+# Uploaded audio is stored compressed and compacted periodically
+audio_store = AudioStore(audio_dir)
+
+# Gemini summaries rendered to PDF (/generate-pdf, /download_summary, /generate_document)
+pdf_generator = LegalPDFGenerator()
+AUDIO_COMPACT_INTERVAL_HOURS = float(os.getenv("AUDIO_COMPACT_INTERVAL_HOURS", "6"))
+
+async def compact_audio_store_periodically():
+    """Apply audio retention/size limits and re-encode legacy WAV uploads"""
+    while True:
+        try:
+            await asyncio.to_thread(audio_store.compact)
+        except Exception as e:
+            logger.error(f"Audio store compaction failed: {e}")
+        await asyncio.sleep(AUDIO_COMPACT_INTERVAL_HOURS * 3600)
+
+@app.on_event("startup")
+async def start_audio_compaction():
+    if AUDIO_COMPACT_INTERVAL_HOURS > 0:
+        asyncio.create_task(compact_audio_store_periodically())
+
+# Crawl/scrape/vectorize jobs run in separate worker processes; set
+# INGESTION_WORKERS=0 when workers are started on their own
+# (python backend/ingestion_worker.py --workers N)
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "1"))
+ingestion_process = None
+
+@app.on_event("startup")
+async def start_ingestion_workers():
+    global ingestion_process
+    if INGESTION_WORKERS > 0:
+        import subprocess
+        worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingestion_worker.py")
+        ingestion_process = subprocess.Popen([sys.executable, worker_script, "--workers", str(INGESTION_WORKERS)])
+        logger.info(f"Started {INGESTION_WORKERS} ingestion worker(s) (pid {ingestion_process.pid})")
+
+@app.on_event("shutdown")
+async def close_gemini_client():
+    await get_gemini_client().close()
+
+@app.get("/gemini/stats")
+async def gemini_stats():
+    """
+    Gemini call counts, token usage and latency percentiles.
+    """
+    return JSONResponse(content=get_gemini_client().stats())
+
+@app.on_event("shutdown")
+async def stop_ingestion_workers():
+    if ingestion_process is not None and ingestion_process.poll() is None:
+        # Workers put their current job back in the queue on SIGTERM
+        ingestion_process.terminate()
+        try:
+            await asyncio.to_thread(ingestion_process.wait, 30)
+        except Exception:
+            ingestion_process.kill()
+
 # Setup uploads directory for voice API
 uploads_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads", "audio")
 os.makedirs(uploads_dir, exist_ok=True)
@@ -274,14 +342,11 @@ async def chat(request: Request):
 async def upload_audio(request: Request, file: UploadFile = File(...)):
     """
     Uploads an audio file and returns URL and filename. No transcription.
+    
+    WAV uploads are stored as Opus (AUDIO_STORE_FORMAT); FLAC/OGG/Opus/WebM
+    uploads are stored as sent.
     """
-    # Generate unique filename
-    ext = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4().hex}{ext}"
-    audio_path = os.path.join(audio_dir, unique_filename)
-    # Save file
-    with open(audio_path, "wb") as f:
-        f.write(await file.read())
+    unique_filename = await asyncio.to_thread(audio_store.save, await file.read(), file.filename)
     # Return audio URL and filename
     return JSONResponse(content={"audioUrl": f"{request.base_url}audio/{unique_filename}", "filename": unique_filename})
 
@@ -290,14 +355,9 @@ async def nemo_transcribe(audio: UploadFile = File(...), language: str = Form("t
     """
     Upload audio and perform ASR transcription for Telugu or English using local models when available.
     """
-    # Save uploaded file
-    ext = os.path.splitext(audio.filename)[1]
-    unique_filename = f"{uuid.uuid4().hex}{ext}"
-    audio_path = os.path.join(audio_dir, unique_filename)
+    # Store the upload compressed; ASR decodes the original bytes in memory
     audio_bytes = await audio.read()
-    
-    with open(audio_path, "wb") as f:
-        f.write(audio_bytes)
+    unique_filename = await asyncio.to_thread(audio_store.save, audio_bytes, audio.filename)
     
     # Determine if we're transcribing Telugu or English
     is_telugu = language.lower() == "telugu"
@@ -310,14 +370,13 @@ async def nemo_transcribe(audio: UploadFile = File(...), language: str = Form("t
     try:
         if is_telugu:
             # Use our local Telugu ASR implementation
-            from backend.local_telugu_asr import LocalTeluguASR
+            from backend.local_telugu_asr import get_local_telugu_asr
             
-            # Create an instance if not already created
-            if not hasattr(nemo_transcribe, "telugu_asr"):
-                nemo_transcribe.telugu_asr = LocalTeluguASR()
+            # Shared model, loaded on first use
+            telugu_asr = await asyncio.to_thread(get_local_telugu_asr)
             
             # Transcribe using local model
-            raw_text = await asyncio.to_thread(nemo_transcribe.telugu_asr.transcribe, audio_bytes)
+            raw_text = await asyncio.to_thread(telugu_asr.transcribe, audio_bytes)
             logger.info(f"Local Telugu ASR result: {raw_text}")
             
             # Return both the Telugu text and model IDs
@@ -347,16 +406,12 @@ async def nemo_transcribe(audio: UploadFile = File(...), language: str = Form("t
                 # Use bhashini_voice API as fallback
                 logger.info("Falling back to Bhashini API for Telugu ASR")
                 try:
-                    # Read the audio file
-                    with open(audio_path, "rb") as f:
-                        audio_content = f.read()
-                    
-                    # Create a multipart form with the audio file
+                    # Create a multipart form with the uploaded audio
                     form_data = aiohttp.FormData()
                     form_data.add_field('audio',
-                                      audio_content,
-                                      filename=os.path.basename(audio_path),
-                                      content_type='audio/wav')
+                                      audio_bytes,
+                                      filename=audio.filename or unique_filename,
+                                      content_type=audio.content_type or 'audio/wav')
                     
                     # Make the request to the voice API
                     async with aiohttp.ClientSession() as session:
@@ -421,62 +476,87 @@ async def speech_to_text(audio: UploadFile = File(...), language: str = Form("en
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/crawl")
-async def crawl(background_tasks: BackgroundTasks, urls: List[str] = Form(None), query: str = Form(None)):
+@app.post("/crawl", status_code=202)
+async def crawl(urls: List[str] = Form(None), query: str = Form(None), priority: int = Form(0)):
     """
-    Crawl legal websites for content.
+    Queue a crawl of legal websites; poll /jobs/{job_id} for progress.
     """
     if not urls and not query:
         raise HTTPException(status_code=400, detail="Either URLs or a search query must be provided")
     
-    try:
-        # Run crawling in the background
-        background_tasks.add_task(legal_crawler.crawl, urls, query)
-        return JSONResponse(content={"message": "Crawling started in the background"})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    job = await asyncio.to_thread(get_job_queue().enqueue, "crawl", {"urls": urls, "query": query}, priority)
+    return JSONResponse(status_code=202, content={"message": "Crawl queued", "job_id": job["id"], "status": job["status"]})
 
-@app.post("/legal-scrape")
-async def legal_scrape(background_tasks: BackgroundTasks, keywords: List[str] = Form(None), max_results: int = Form(10)):
+@app.post("/legal-scrape", status_code=202)
+async def legal_scrape(keywords: List[str] = Form(None), max_results: int = Form(10), priority: int = Form(0)):
     """
-    Scrape legal documents from Indian legal websites.
+    Queue scraping and processing of legal documents from Indian legal websites.
     
     Args:
         keywords: Keywords to search for
         max_results: Maximum results per keyword
+        priority: Higher-priority jobs run first
     """
     if not keywords:
         raise HTTPException(status_code=400, detail="Keywords must be provided")
     
-    try:
-        # Run legal scraping in the background
-        async def scrape_and_process():
-            await legal_scraper.scrape_all_sources(keywords=keywords, max_results_per_keyword=max_results)
-            await document_processor.process_all_documents()
-        
-        background_tasks.add_task(scrape_and_process)
-        return JSONResponse(content={"message": "Legal document scraping started in the background"})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    job = await asyncio.to_thread(
+        get_job_queue().enqueue, "legal_scrape", {"keywords": keywords, "max_results": max_results}, priority
+    )
+    return JSONResponse(status_code=202, content={"message": "Legal document scraping queued", "job_id": job["id"], "status": job["status"]})
 
-@app.post("/vectorize")
-async def vectorize(background_tasks: BackgroundTasks, file: UploadFile = File(None), text: str = Form(None)):
+@app.post("/vectorize", status_code=202)
+async def vectorize(file: UploadFile = File(None), text: str = Form(None), priority: int = Form(5)):
     """
-    Embed legal content and store in Pinecone.
+    Queue embedding of legal content into the vector store.
     """
     if not file and not text:
         raise HTTPException(status_code=400, detail="Either a file or text must be provided")
     
-    try:
-        if file:
-            content = await file.read()
+    if file:
+        content = await file.read()
+        try:
             text = content.decode("utf-8")
-        
-        # Vectorize in the background
-        background_tasks.add_task(rag_system.vectorize_text, text)
-        return JSONResponse(content={"message": "Vectorization started in the background"})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="File must be UTF-8 text")
+    
+    metadata = {"source": file.filename} if file else None
+    job = await asyncio.to_thread(get_job_queue().enqueue, "vectorize", {"text": text, "metadata": metadata}, priority)
+    return JSONResponse(status_code=202, content={"message": "Vectorization queued", "job_id": job["id"], "status": job["status"]})
+
+def _job_summary(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job as returned by the API (payloads can hold whole documents)"""
+    return {key: value for key, value in job.items() if key != "payload"}
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None, kind: Optional[str] = None, limit: int = 50):
+    """
+    List recent ingestion jobs, newest first.
+    """
+    queue = get_job_queue()
+    jobs = await asyncio.to_thread(queue.list, status, kind, limit)
+    counts = await asyncio.to_thread(queue.counts)
+    return JSONResponse(content={"jobs": [_job_summary(job) for job in jobs], "counts": counts})
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Status, progress and result of an ingestion job.
+    """
+    job = await asyncio.to_thread(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=_job_summary(job))
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued job, or ask the worker running it to stop.
+    """
+    job = await asyncio.to_thread(get_job_queue().cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=_job_summary(job))
 
 @app.post("/search")
 async def search(query: str = Form(...), top_k: int = Form(5)):
@@ -572,30 +652,21 @@ async def get_document(doc_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/generate-pdf")
-async def generate_pdf(conversation: List[Dict[str, Any]], client_info: Optional[Dict[str, Any]] = None):
+async def generate_pdf(request: Request, conversation: List[Dict[str, Any]], client_info: Optional[Dict[str, Any]] = None,
+                       save: bool = Query(False)):
     """
     Generate a legal PDF summary from a conversation.
     
     Args:
         conversation: List of conversation messages
         client_info: Optional client information
+        save: Also keep a copy in data/pdf_exports (content-hashed name)
     """
+    summary = await pdf_generator.generate_legal_summary(conversation, client_info)
     try:
-        # Generate summary
-        summary = await pdf_generator.generate_legal_summary(conversation, client_info)
-        
-        # Generate PDF
-        pdf_path = await pdf_generator.generate_pdf(summary)
-        
-        if not pdf_path or not os.path.exists(pdf_path):
-            raise HTTPException(status_code=500, detail="Failed to generate PDF")
-        
-        # Return the PDF file
-        return FileResponse(
-            path=pdf_path,
-            filename=os.path.basename(pdf_path),
-            media_type="application/pdf"
-        )
+        return await pdf_download_response(request, summary, None, save)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating PDF: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -635,47 +706,61 @@ async def upload_documents(file: UploadFile = File(...)):
         f.write(contents)
     return JSONResponse(content={"detail": "File uploaded successfully."})
 
-# Download summary as base64 to Flutter
+async def pdf_download_response(request: Request, summary: Dict[str, Any], response_format: Optional[str],
+                                save: bool = False) -> Response:
+    """
+    Render a summary in memory and send it as binary (default, Range-capable)
+    or legacy base64 text; it is written to data/pdf_exports only if save is set.
+    """
+    data = await pdf_generator.render_pdf(summary)
+    if not data:
+        raise HTTPException(status_code=500, detail="Failed to generate PDF")
+    filename = pdf_generator.pdf_filename(summary, data)
+    if save:
+        await asyncio.to_thread(pdf_generator.save_pdf, data, summary, filename)
+    if wants_base64(request, response_format):
+        return Response(content=base64.b64encode(data).decode(), media_type="text/plain")
+    return bytes_response(request, data, media_type="application/pdf", filename=filename)
+
+# Download summary PDF to Flutter (?format=base64 for the legacy base64 body, ?save=true to keep a copy)
 @app.post("/download_summary")
-async def download_summary_alias(conversation: List[Dict[str, Any]] = Body(...)):
+async def download_summary_alias(request: Request, conversation: List[Dict[str, Any]] = Body(...),
+                                 response_format: Optional[str] = Query(None, alias="format"),
+                                 save: bool = Query(False)):
     summary = await pdf_generator.generate_legal_summary(conversation, None)
-    pdf_path = await pdf_generator.generate_pdf(summary)
-    with open(pdf_path, "rb") as f:
-        data = f.read()
-    encoded = base64.b64encode(data).decode()
-    return Response(content=encoded, media_type="text/plain")
+    return await pdf_download_response(request, summary, response_format, save)
 
-# Generate legal document from client info and return base64 PDF
+# Generate legal document from client info and return the PDF (?format=base64 for legacy clients, ?save=true to keep a copy)
 @app.post("/generate_document")
-async def generate_document_alias(client_info: Dict[str, Any] = Body(...)):
+async def generate_document_alias(request: Request, client_info: Dict[str, Any] = Body(...),
+                                  response_format: Optional[str] = Query(None, alias="format"),
+                                  save: bool = Query(False)):
     summary = await pdf_generator.generate_legal_summary([], client_info)
-    pdf_path = await pdf_generator.generate_pdf(summary)
-    with open(pdf_path, "rb") as f:
-        data = f.read()
-    encoded = base64.b64encode(data).decode()
-    return Response(content=encoded, media_type="text/plain")
+    return await pdf_download_response(request, summary, response_format, save)
 
 # Endpoint to transcribe and translate audio after user confirmation
 @app.post("/transcribe_audio")
 async def transcribe_audio(request: Request, filename: str = Form(...)):
     # Locate audio
-    audio_path = os.path.join(audio_dir, filename)
-    if not os.path.exists(audio_path):
+    audio_path = audio_store.resolve(filename)
+    if audio_path is None:
         raise HTTPException(status_code=404, detail="Audio file not found")
-    # Transcribe Telugu ASR
-    from nemo.collections.asr.models import ASRModel
-    model_path = os.path.join(models_dir, "indicconformer_stt_te_hybrid_rnnt_large.nemo")
-    asr_model = ASRModel.restore_from(model_path)
-    pred_text = asr_model.transcribe([audio_path], language_id="te")[0].strip()
+    filename = os.path.basename(audio_path)
+    with open(audio_path, "rb") as f:
+        audio_bytes = f.read()
+    # Transcribe with the shared Telugu ASR (loaded once; decodes Opus/FLAC/WAV/... in memory)
+    from backend.local_telugu_asr import get_local_telugu_asr
+    telugu_asr = await asyncio.to_thread(get_local_telugu_asr)
+    if telugu_asr.model is None:
+        raise HTTPException(status_code=503, detail="Telugu ASR model is not available")
+    pred_text = await asyncio.to_thread(telugu_asr.transcribe, audio_bytes)
     # Save Telugu text
     tel_file = f"{os.path.splitext(filename)[0]}_telugu.txt"
     tel_path = os.path.join(tel_text_dir, tel_file)
     with open(tel_path, "w", encoding="utf-8") as f:
         f.write(pred_text)
-    # Translate to English
-    from transformers import pipeline
-    translator = pipeline("translation", model="Helsinki-NLP/opus-mt-te-en")
-    eng_text = translator(pred_text, max_length=512)[0]["translation_text"].strip()
+    # Translate to English with the shared seq2seq engine (loaded once, translation memory first)
+    eng_text = (await get_translation_engine().translate_async(pred_text, "te", "en")).strip()
     # Save English text
     eng_file = f"{os.path.splitext(filename)[0]}_english.txt"
     eng_path = os.path.join(eng_text_dir, eng_file)
@@ -0,0 +1,120 @@
+"""
+Mock Dhruva (Bhashini) pipeline server for local development and load tests.
+
+Implements POST /services/inference/pipeline with the real response shape
+("pipelineResponse") for translation, ASR and TTS tasks. Each call costs a
+fixed overhead plus a per-item cost, and only MOCK_DHRUVA_CONCURRENCY calls are
+served at once, which approximates a shared GPU endpoint. Point the backend at
+it with BHASHINI_API_URL=http://localhost:8090/services/inference/pipeline.
+
+    python backend/mock_dhruva_server.py --port 8090
+"""
+import io
+import os
+import base64
+import wave
+import random
+import asyncio
+import logging
+import argparse
+from typing import Any, Dict, List, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger("mock_dhruva_server")
+
+MOCK_DHRUVA_CALL_LATENCY_MS = float(os.getenv("MOCK_DHRUVA_CALL_LATENCY_MS", "40"))
+MOCK_DHRUVA_ITEM_LATENCY_MS = float(os.getenv("MOCK_DHRUVA_ITEM_LATENCY_MS", "2"))
+MOCK_DHRUVA_CONCURRENCY = int(os.getenv("MOCK_DHRUVA_CONCURRENCY", "8"))
+MOCK_DHRUVA_FAILURE_RATE = float(os.getenv("MOCK_DHRUVA_FAILURE_RATE", "0"))
+
+app = FastAPI(title="Mock Dhruva Pipeline")
+app.state.calls = 0
+app.state.items = 0
+
+_slots = None
+
+
+def _silence_wav(seconds: float = 0.5, sample_rate: int = 22050) -> str:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+SILENCE_B64 = _silence_wav()
+
+
+def _run_task(task: Dict[str, Any], texts: List[str], audio_count: int) -> Tuple[Dict[str, Any], List[str]]:
+    task_type = task.get("taskType")
+    language = task.get("config", {}).get("language", {})
+    source = language.get("sourceLanguage", "")
+    target = language.get("targetLanguage", "")
+
+    if task_type == "asr":
+        outputs = [f"mock transcript {index}" for index in range(audio_count)]
+        return {"taskType": "asr", "output": [{"source": text} for text in outputs]}, outputs
+    if task_type == "translation":
+        outputs = [f"[{source}->{target}] {text}" for text in texts]
+        return {
+            "taskType": "translation",
+            "output": [{"source": text, "target": out} for text, out in zip(texts, outputs)],
+        }, outputs
+    if task_type == "tts":
+        return {
+            "taskType": "tts",
+            "audio": [{"audioContent": SILENCE_B64} for _ in texts],
+            "config": {"language": language, "audioFormat": "wav", "samplingRate": 22050},
+        }, texts
+    raise ValueError(f"Unsupported taskType: {task_type}")
+
+
+@app.post("/services/inference/pipeline")
+async def pipeline(request: Request):
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(MOCK_DHRUVA_CONCURRENCY)
+
+    body = await request.json()
+    tasks = body.get("pipelineTasks", [])
+    input_data = body.get("inputData", {})
+    texts = [item.get("source", "") for item in input_data.get("input", [])]
+    audio = input_data.get("audio", [])
+
+    async with _slots:
+        app.state.calls += 1
+        app.state.items += max(len(texts), len(audio))
+        delay = MOCK_DHRUVA_CALL_LATENCY_MS + MOCK_DHRUVA_ITEM_LATENCY_MS * max(len(texts), len(audio), 1)
+        await asyncio.sleep(delay / 1000.0)
+        if MOCK_DHRUVA_FAILURE_RATE and random.random() < MOCK_DHRUVA_FAILURE_RATE:
+            return JSONResponse(status_code=503, content={"detail": "Simulated overload"})
+
+    responses = []
+    current = texts
+    try:
+        for task in tasks:
+            response, current = _run_task(task, current, len(audio))
+            responses.append(response)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    return {"pipelineResponse": responses}
+
+
+@app.get("/stats")
+async def stats():
+    """Calls and items served since startup"""
+    return {"calls": app.state.calls, "items": app.state.items}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock Dhruva pipeline server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,136 @@
+"""
+Mock Gemini generateContent server for local development and tests.
+
+Implements POST /v1beta/models/{model}:generateContent with the real response
+shape (candidates, usageMetadata). Each call costs a fixed latency plus
+per-prompt-token and per-output-token costs, only MOCK_GEMINI_CONCURRENCY
+calls are served at once, and a fraction of calls can fail with 503 to
+exercise retries. Prompts that ask for the structured legal summary get one
+with all five sections. Like Gemini's implicit caching, a system instruction
+seen before is reported as cachedContentTokenCount and its tokens add no
+latency. Point the backend at it with
+GEMINI_API_BASE=http://localhost:8091/v1beta and any GEMINI_API_KEY.
+
+    python backend/mock_gemini_server.py --port 8091
+"""
+import os
+import random
+import asyncio
+import logging
+import argparse
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger("mock_gemini_server")
+
+MOCK_GEMINI_CALL_LATENCY_MS = float(os.getenv("MOCK_GEMINI_CALL_LATENCY_MS", "200"))
+MOCK_GEMINI_TOKEN_LATENCY_MS = float(os.getenv("MOCK_GEMINI_TOKEN_LATENCY_MS", "1"))
+MOCK_GEMINI_PROMPT_TOKEN_LATENCY_MS = float(os.getenv("MOCK_GEMINI_PROMPT_TOKEN_LATENCY_MS", "0"))
+MOCK_GEMINI_CONCURRENCY = int(os.getenv("MOCK_GEMINI_CONCURRENCY", "8"))
+MOCK_GEMINI_FAILURE_RATE = float(os.getenv("MOCK_GEMINI_FAILURE_RATE", "0"))
+
+app = FastAPI(title="Mock Gemini API")
+app.state.calls = 0
+app.state.prompt_tokens = 0
+app.state.output_tokens = 0
+app.state.cached_tokens = 0
+app.state.system_instructions = set()
+
+_slots = None
+
+LEGAL_SUMMARY = """SUMMARY OF ISSUE: The client reports a dispute described in the conversation.
+RELEVANT LAWS: Indian Penal Code, 1860; Code of Criminal Procedure, 1973.
+LEGAL ANALYSIS: Based on the facts given, the client may have a remedy under the cited provisions.
+POSSIBLE OUTCOMES: Settlement, a complaint before the magistrate, or civil proceedings.
+RECOMMENDED NEXT STEPS: Collect documents, send a legal notice and consult an advocate."""
+
+
+def _count_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def _system_text(body: Dict[str, Any]) -> str:
+    parts = (body.get("systemInstruction") or {}).get("parts", [])
+    return "\n".join(part.get("text", "") for part in parts)
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    parts: List[str] = [_system_text(body)]
+    for content in body.get("contents", []):
+        parts.extend(part.get("text", "") for part in content.get("parts", []))
+    return "\n".join(parts)
+
+
+def _reply(prompt: str, max_tokens: int) -> str:
+    if "SUMMARY OF ISSUE" in prompt:
+        return LEGAL_SUMMARY
+    words = " ".join(prompt.split()[:40])
+    return f"Mock answer to: {words}"[: max_tokens * 4]
+
+
+@app.post("/v1beta/models/{model_action}")
+async def generate_content(model_action: str, request: Request):
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(MOCK_GEMINI_CONCURRENCY)
+
+    model, _, action = model_action.partition(":")
+    if action != "generateContent":
+        return JSONResponse(status_code=404, content={"error": {"message": f"Unsupported action: {action}"}})
+    if not (request.headers.get("x-goog-api-key") or request.query_params.get("key")):
+        return JSONResponse(status_code=403, content={"error": {"message": "API key missing"}})
+
+    body = await request.json()
+    prompt = _prompt_text(body)
+    max_tokens = int((body.get("generationConfig") or {}).get("maxOutputTokens", 2048))
+    text = _reply(prompt, max_tokens)
+    prompt_tokens, output_tokens = _count_tokens(prompt), _count_tokens(text)
+    system = _system_text(body)
+    cached_tokens = _count_tokens(system) if system and system in app.state.system_instructions else 0
+    if system:
+        app.state.system_instructions.add(system)
+
+    async with _slots:
+        app.state.calls += 1
+        await asyncio.sleep((MOCK_GEMINI_CALL_LATENCY_MS + MOCK_GEMINI_PROMPT_TOKEN_LATENCY_MS * (prompt_tokens - cached_tokens)
+                             + MOCK_GEMINI_TOKEN_LATENCY_MS * output_tokens) / 1000.0)
+        if MOCK_GEMINI_FAILURE_RATE and random.random() < MOCK_GEMINI_FAILURE_RATE:
+            return JSONResponse(status_code=503, content={"error": {"message": "Simulated overload"}})
+
+    app.state.prompt_tokens += prompt_tokens
+    app.state.output_tokens += output_tokens
+    app.state.cached_tokens += cached_tokens
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+            "cachedContentTokenCount": cached_tokens,
+        },
+        "modelVersion": model,
+    }
+
+
+@app.get("/stats")
+async def stats():
+    """Calls and tokens served since startup"""
+    return {"calls": app.state.calls, "prompt_tokens": app.state.prompt_tokens, "output_tokens": app.state.output_tokens,
+            "cached_tokens": app.state.cached_tokens}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock Gemini API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8091)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
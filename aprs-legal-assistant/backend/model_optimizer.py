@@ -0,0 +1,323 @@
+"""
+CPU-optimized local models: ONNX Runtime int8 artifacts and dynamic int8
+quantization.
+
+All local models used to run as fp32 PyTorch. On a GPU-less box:
+  - the sentence embedder (MiniLM) and the opus-mt translation models are
+    exported once to ONNX with dynamic int8 quantization (optimum), and the
+    loaders below use those artifacts when they exist, falling back to the
+    PyTorch models otherwise,
+  - models that stay in PyTorch because their callers need the PyTorch
+    module (the local LLM: prefix KV cache and assisted decoding; the NeMo
+    IndicConformer ASR model; Coqui TTS) get their Linear layers dynamically
+    quantized to int8 at load time instead.
+
+Export the artifacts with
+
+    python backend/model_optimizer.py export            # embedder + translation models
+    python backend/model_optimizer.py export --kind embedding --model sentence-transformers/all-MiniLM-L6-v2
+
+benchmarks/bench_model_optimization.py compares latency, throughput and
+accuracy of the fp32 and optimized variants.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    import onnxruntime
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+logger = logging.getLogger("model_optimizer")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+OPTIMIZED_MODELS_DIR = os.getenv("OPTIMIZED_MODELS_DIR", os.path.join(DATA_DIR, "optimized_models"))
+USE_OPTIMIZED_MODELS = os.getenv("USE_OPTIMIZED_MODELS", "true").lower() == "true"
+# Instruction set the int8 kernels are tuned for: avx2, avx512, avx512_vnni or arm64
+QUANTIZATION_ISA = os.getenv("QUANTIZATION_ISA", "avx2")
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+
+KINDS = ("embedding", "seq2seq")
+_MANIFEST = "optimized.json"
+
+
+# ------------------------------------------------------------------ artifacts
+
+def artifact_dir(model_name: str, kind: str) -> str:
+    """Directory holding the optimized artifact of a model"""
+    return os.path.join(OPTIMIZED_MODELS_DIR, kind, model_name.replace("/", "--"))
+
+
+def read_manifest(model_name: str, kind: str) -> Optional[Dict[str, Any]]:
+    """Manifest of an exported model, or None if there is no usable artifact"""
+    path = os.path.join(artifact_dir(model_name, kind), _MANIFEST)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+        return None
+
+
+def _quantize_onnx_files(directory: str) -> Dict[str, str]:
+    """Dynamically quantize every ONNX file in a directory; returns {original: quantized}"""
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    config = getattr(AutoQuantizationConfig, QUANTIZATION_ISA)(is_static=False, per_channel=False)
+    quantized = {}
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(".onnx") or file_name.endswith("_quantized.onnx"):
+            continue
+        quantizer = ORTQuantizer.from_pretrained(directory, file_name=file_name)
+        quantizer.quantize(save_dir=directory, quantization_config=config)
+        quantized[file_name] = file_name[:-len(".onnx")] + "_quantized.onnx"
+    return quantized
+
+
+def export_model(model_name: str, kind: str, quantize: bool = True) -> str:
+    """
+    Export a model to ONNX and quantize it to int8.
+
+    Args:
+        model_name: Hugging Face model name
+        kind: "embedding" (sentence-transformers model) or "seq2seq" (translation model)
+        quantize: Apply dynamic int8 quantization
+
+    Returns:
+        The artifact directory
+    """
+    from transformers import AutoTokenizer
+
+    if kind not in KINDS:
+        raise ValueError(f"Unknown model kind {kind!r}; expected one of {KINDS}")
+    directory = artifact_dir(model_name, kind)
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    manifest: Dict[str, Any] = {"model": model_name, "kind": kind, "quantization": "int8-dynamic" if quantize else None,
+                                "isa": QUANTIZATION_ISA if quantize else None}
+
+    if kind == "embedding":
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize
+
+        # Pooling and normalization live in sentence-transformers modules, not in the ONNX graph
+        reference = SentenceTransformer(model_name, device="cpu")
+        manifest.update(
+            pooling=reference[1].get_pooling_mode_str() if len(reference) > 1 else "mean",
+            normalize=any(isinstance(module, Normalize) for module in reference),
+            max_seq_length=reference.max_seq_length,
+        )
+        ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(directory)
+    else:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+        ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True).save_pretrained(directory)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(directory)
+
+    files = {name: name for name in os.listdir(directory) if name.endswith(".onnx")}
+    if quantize:
+        files = _quantize_onnx_files(directory)
+    manifest.update(files=files, exported_at=datetime.now().isoformat(),
+                    export_seconds=round(time.perf_counter() - started, 1))
+    with open(os.path.join(directory, _MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Exported {model_name} ({kind}) to {directory}")
+    return directory
+
+
+# ------------------------------------------------------------------- runtime
+
+def _session_options():
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if ONNX_THREADS > 0:
+        options.intra_op_num_threads = ONNX_THREADS
+    return options
+
+
+class OnnxSentenceEncoder:
+    """ONNX Runtime replacement for SentenceTransformer.encode"""
+
+    def __init__(self, directory: str, manifest: Dict[str, Any]):
+        """
+        Args:
+            directory: Artifact directory from export_model(kind="embedding")
+            manifest: Its manifest
+        """
+        from transformers import AutoTokenizer
+
+        file_name = manifest["files"].get("model.onnx", "model.onnx")
+        self.model_name = manifest["model"]
+        self.pooling = manifest.get("pooling", "mean")
+        self.normalize = manifest.get("normalize", False)
+        self.max_seq_length = manifest.get("max_seq_length") or 256
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        self.session = onnxruntime.InferenceSession(os.path.join(directory, file_name), _session_options(),
+                                                    providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """
+        Embed sentences.
+
+        Args:
+            sentences: A sentence or a list of sentences
+            batch_size: Sentences per ONNX Runtime call
+
+        Returns:
+            float32 array of shape (dim,) for one sentence, else (n, dim)
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=self.max_seq_length, return_tensors="np")
+            feed = {name: value.astype(np.int64) for name, value in inputs.items() if name in self._input_names}
+            hidden = self.session.run(None, feed)[0]
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            if self.pooling == "cls":
+                pooled = hidden[:, 0]
+            elif self.pooling == "max":
+                pooled = np.where(mask > 0, hidden, -1e9).max(axis=1)
+            else:
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32))
+        embeddings = np.concatenate(batches) if batches else np.empty((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+def load_embedding_model(model_name: str, prefer_optimized: bool = USE_OPTIMIZED_MODELS):
+    """
+    Load a sentence embedder, preferring its ONNX int8 artifact.
+
+    Args:
+        model_name: sentence-transformers model name
+        prefer_optimized: Use the exported artifact when there is one
+
+    Returns:
+        An object with SentenceTransformer's encode()
+    """
+    manifest = read_manifest(model_name, "embedding") if prefer_optimized and ONNXRUNTIME_AVAILABLE else None
+    if manifest:
+        try:
+            encoder = OnnxSentenceEncoder(artifact_dir(model_name, "embedding"), manifest)
+            logger.info(f"Using optimized ONNX embedder for {model_name}")
+            return encoder
+        except Exception as e:
+            logger.warning(f"Could not load optimized embedder for {model_name}, using PyTorch: {e}")
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+def load_seq2seq_model(model_name: str, prefer_optimized: bool = USE_OPTIMIZED_MODELS) -> Optional[Tuple[Any, Any]]:
+    """
+    Load the ONNX int8 artifact of a translation model.
+
+    Args:
+        model_name: Hugging Face seq2seq model name
+        prefer_optimized: False always returns None
+
+    Returns:
+        (tokenizer, ORTModelForSeq2SeqLM) or None when there is no usable artifact
+    """
+    manifest = read_manifest(model_name, "seq2seq") if prefer_optimized and ONNXRUNTIME_AVAILABLE else None
+    if not manifest:
+        return None
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        from transformers import AutoTokenizer
+
+        directory = artifact_dir(model_name, "seq2seq")
+        files = manifest["files"]
+        kwargs = {"session_options": _session_options(), "provider": "CPUExecutionProvider"}
+        for original, argument in (("encoder_model.onnx", "encoder_file_name"),
+                                   ("decoder_model.onnx", "decoder_file_name"),
+                                   ("decoder_with_past_model.onnx", "decoder_with_past_file_name")):
+            if original in files:
+                kwargs[argument] = files[original]
+        model = ORTModelForSeq2SeqLM.from_pretrained(directory, **kwargs)
+        logger.info(f"Using optimized ONNX translation model for {model_name}")
+        return AutoTokenizer.from_pretrained(directory), model
+    except Exception as e:
+        logger.warning(f"Could not load optimized translation model {model_name}, using PyTorch: {e}")
+        return None
+
+
+def quantize_dynamic_int8(module, layer_types: Optional[Sequence[type]] = None):
+    """
+    Quantize a PyTorch model's weights to int8 in place (activations stay float).
+
+    Args:
+        module: torch.nn.Module on the CPU
+        layer_types: Layer classes to quantize (default: torch.nn.Linear)
+
+    Returns:
+        The quantized module
+    """
+    import torch
+
+    layer_types = set(layer_types or {torch.nn.Linear})
+    return torch.quantization.quantize_dynamic(module, layer_types, dtype=torch.qint8, inplace=True)
+
+
+# ----------------------------------------------------------------------- CLI
+
+def default_models() -> List[Tuple[str, str]]:
+    """(model, kind) pairs used by the app: the embedder and every translation model"""
+    from backend.translation_engine import MODEL_MAP
+
+    models = [(os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"), "embedding")]
+    models += sorted({(name, "seq2seq") for name, _ in MODEL_MAP.values()})
+    return models
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export local models to ONNX with int8 quantization")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Export models (default: all models the app uses)")
+    export.add_argument("--kind", choices=KINDS, help="Model kind (with --model)")
+    export.add_argument("--model", help="Model name (with --kind)")
+    export.add_argument("--no-quantize", action="store_true", help="Export fp32 ONNX only")
+    subparsers.add_parser("list", help="List exported artifacts")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.command == "list":
+        for kind in KINDS:
+            root = os.path.join(OPTIMIZED_MODELS_DIR, kind)
+            for entry in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+                manifest = read_manifest(entry.replace("--", "/"), kind) or {}
+                print(f"{kind:<10} {manifest.get('model', entry):<45} {manifest.get('quantization') or 'fp32'}")
+        return
+
+    if bool(args.kind) != bool(args.model):
+        parser.error("--kind and --model go together")
+    models = [(args.model, args.kind)] if args.model else default_models()
+    for model_name, kind in models:
+        try:
+            export_model(model_name, kind, quantize=not args.no_quantize)
+        except Exception as e:
+            logger.error(f"Export of {model_name} failed: {e}")
+
+
+if __name__ == "__main__":
+    # Allow running as a script: backend modules are imported as "backend.xxx"
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
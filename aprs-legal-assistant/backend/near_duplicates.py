@@ -0,0 +1,355 @@
+"""
+Near-duplicate detection for ingested documents and retrieval results.
+
+The same judgment or act is published by several sources (Indian Kanoon,
+LatestLaws, Bar & Bench) with different headers, footers and whitespace.
+Documents are reduced to MinHash signatures over word shingles and indexed
+with LSH banding; a new document whose estimated Jaccard similarity with an
+indexed one reaches the threshold is linked to that canonical copy instead
+of being embedded again. Signatures and links are persisted in SQLite.
+
+The same signatures deduplicate top-k retrieval results, so copies that are
+already in the index do not crowd out other documents.
+"""
+import os
+import re
+import time
+import zlib
+import hashlib
+import sqlite3
+import logging
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("near_duplicates")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+NEAR_DUP_DB = os.getenv("NEAR_DUP_DB", os.path.join(DATA_DIR, "near_duplicates.sqlite"))
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+NEAR_DUP_RESULT_THRESHOLD = float(os.getenv("NEAR_DUP_RESULT_THRESHOLD", "0.7"))
+NEAR_DUP_NUM_PERM = int(os.getenv("NEAR_DUP_NUM_PERM", "128"))
+NEAR_DUP_BANDS = int(os.getenv("NEAR_DUP_BANDS", "16"))
+NEAR_DUP_SHINGLE_SIZE = int(os.getenv("NEAR_DUP_SHINGLE_SIZE", "5"))
+
+# Mersenne prime 2^31-1: a*x + b stays below 2^63 for x, a, b < p
+_PRIME = np.uint64((1 << 31) - 1)
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(unicodedata.normalize("NFKC", text or "").lower())
+
+
+def shingles(text: str, size: int = NEAR_DUP_SHINGLE_SIZE) -> np.ndarray:
+    """
+    32-bit hashes of the word n-grams of a text.
+
+    Args:
+        text: Text to shingle
+        size: Words per shingle (texts shorter than this give one shingle)
+
+    Returns:
+        Unique shingle hashes as uint64
+    """
+    words = _words(text)
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    size = max(1, min(size, len(words)))
+    grams = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+
+
+class MinHasher:
+    """MinHash signatures with universal hashing (a*x + b mod p)"""
+
+    def __init__(self, num_perm: int = NEAR_DUP_NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, int(_PRIME), size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, int(_PRIME), size=num_perm).astype(np.uint64)
+
+    def signature(self, hashes: np.ndarray, chunk_size: int = 4096) -> np.ndarray:
+        """
+        Signature of a set of shingle hashes.
+
+        Args:
+            hashes: Shingle hashes from shingles()
+            chunk_size: Shingles processed per numpy step (bounds memory)
+
+        Returns:
+            uint32 array of length num_perm (empty for an empty set)
+        """
+        if not len(hashes):
+            return np.empty(0, dtype=np.uint32)
+        signature = np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        for start in range(0, len(hashes), chunk_size):
+            block = hashes[start:start + chunk_size, None] % _PRIME
+            permuted = (block * self.a + self.b) % _PRIME
+            signature = np.minimum(signature, permuted.min(axis=0))
+        return signature.astype(np.uint32)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return float(np.mean(first == second))
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash-LSH index mapping documents to their canonical copy"""
+
+    def __init__(self, db_path: str = NEAR_DUP_DB, threshold: float = NEAR_DUP_THRESHOLD,
+                 num_perm: int = NEAR_DUP_NUM_PERM, bands: int = NEAR_DUP_BANDS):
+        """
+        Initialize the index and load stored signatures.
+
+        Args:
+            db_path: SQLite database file
+            threshold: Estimated Jaccard similarity at which documents are duplicates
+            num_perm: Signature length
+            bands: LSH bands (num_perm must be divisible by it); more bands find
+                candidates at lower similarity
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._canonical: Dict[str, str] = {}
+        self._content_hashes: Dict[str, Optional[str]] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[str]] = {}
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id TEXT PRIMARY KEY,
+                canonical_id TEXT NOT NULL,
+                similarity REAL NOT NULL,
+                signature BLOB NOT NULL,
+                source TEXT,
+                added_at REAL NOT NULL,
+                content_hash TEXT
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        if "content_hash" not in columns:
+            self._conn.execute("ALTER TABLE documents ADD COLUMN content_hash TEXT")
+        self._conn.commit()
+        for doc_id, canonical_id, blob, digest in self._conn.execute(
+                "SELECT doc_id, canonical_id, signature, content_hash FROM documents"):
+            signature = np.frombuffer(blob, dtype=np.uint32)
+            if len(signature) != self.hasher.num_perm:
+                continue
+            self._canonical[doc_id] = canonical_id
+            self._content_hashes[doc_id] = digest
+            if canonical_id == doc_id:
+                self._index(doc_id, signature)
+        logger.info(f"Loaded {len(self._canonical)} document signatures")
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _index(self, doc_id: str, signature: np.ndarray):
+        self._signatures[doc_id] = signature
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(doc_id)
+
+    def _unindex(self, doc_id: str):
+        signature = self._signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket and doc_id in bucket:
+                bucket.remove(doc_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _stored_signature(self, doc_id: str) -> Optional[np.ndarray]:
+        row = self._conn.execute("SELECT signature FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return np.frombuffer(row[0], dtype=np.uint32) if row is not None else None
+
+    def _relink_dependents(self, doc_id: str, canonical_id: str):
+        """
+        Re-check the documents linked to doc_id after its content changed.
+
+        Copies still similar to its new canonical are linked to that; the
+        others become canonical themselves (they were never embedded, so they
+        need re-processing to be searchable).
+        """
+        target = self._signatures[canonical_id]
+        for dependent in [d for d, c in self._canonical.items() if c == doc_id and d != doc_id]:
+            signature = self._stored_signature(dependent)
+            similarity = MinHasher.similarity(signature, target) if signature is not None else 0.0
+            if similarity >= self.threshold:
+                new_canonical = canonical_id
+            else:
+                new_canonical, similarity = dependent, 1.0
+                if signature is not None:
+                    self._index(dependent, signature)
+                logger.warning(f"{dependent} is no longer a near-duplicate of changed {doc_id}; re-process it to embed it")
+            self._canonical[dependent] = new_canonical
+            self._conn.execute("UPDATE documents SET canonical_id = ?, similarity = ? WHERE doc_id = ?",
+                               (new_canonical, similarity, dependent))
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of a document's text"""
+        return self.hasher.signature(shingles(text))
+
+    def find_duplicate(self, signature: np.ndarray) -> Tuple[Optional[str], float]:
+        """
+        Most similar canonical document at or above the threshold.
+
+        Args:
+            signature: Signature from signature()
+
+        Returns:
+            Tuple of (canonical doc id or None, similarity)
+        """
+        best_id, best_similarity = None, 0.0
+        with self._lock:
+            candidates = {doc_id for key in self._band_keys(signature) for doc_id in self._buckets.get(key, ())}
+            for doc_id in candidates:
+                similarity = MinHasher.similarity(signature, self._signatures[doc_id])
+                if similarity > best_similarity:
+                    best_id, best_similarity = doc_id, similarity
+        if best_similarity >= self.threshold:
+            return best_id, best_similarity
+        return None, best_similarity
+
+    def add(self, doc_id: str, text: str, source: Optional[str] = None) -> Tuple[str, float]:
+        """
+        Register a document and link it to an existing copy if there is one.
+
+        A known document is only looked up again while its text is unchanged;
+        changed text is re-signed and re-linked.
+
+        Args:
+            doc_id: Stable document id
+            text: Extracted document text
+            source: Where the document came from (for reporting)
+
+        Returns:
+            Tuple of (canonical doc id, similarity); the canonical id is doc_id
+            itself for a new document
+        """
+        digest = hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+        with self._lock:
+            known = doc_id in self._canonical
+            if known and self._content_hashes.get(doc_id) == digest:
+                return self._canonical[doc_id], 1.0
+            if known:
+                # Changed text: its old signature must not match new documents
+                self._unindex(doc_id)
+
+        signature = self.signature(text)
+        if not signature.size:
+            return doc_id, 0.0
+        canonical_id, similarity = self.find_duplicate(signature)
+        if canonical_id is None or canonical_id == doc_id:
+            canonical_id, similarity = doc_id, 1.0
+
+        with self._lock:
+            self._canonical[doc_id] = canonical_id
+            self._content_hashes[doc_id] = digest
+            if canonical_id == doc_id:
+                self._index(doc_id, signature)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_id, canonical_id, similarity, signature, source, added_at, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (doc_id, canonical_id, similarity, signature.tobytes(), source, time.time(), digest),
+            )
+            if known:
+                self._relink_dependents(doc_id, canonical_id)
+            self._conn.commit()
+        if canonical_id != doc_id:
+            logger.info(f"{doc_id} is a near-duplicate of {canonical_id} (similarity {similarity:.2f})")
+        return canonical_id, similarity
+
+    def canonical_of(self, doc_id: str) -> str:
+        """Canonical id of a document (the id itself if unknown or canonical)"""
+        with self._lock:
+            return self._canonical.get(doc_id, doc_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Numbers of canonical and linked duplicate documents"""
+        with self._lock:
+            canonical = len(self._signatures)
+            return {"canonical_documents": canonical, "duplicates": len(self._canonical) - canonical}
+
+
+def dedupe_results(results: List[Dict[str, Any]], top_k: int,
+                   threshold: float = NEAR_DUP_RESULT_THRESHOLD,
+                   index: Optional[NearDuplicateIndex] = None) -> List[Dict[str, Any]]:
+    """
+    Drop near-duplicate retrieval results, keeping the best-scored copy.
+
+    Results are duplicates if their documents share a canonical id, or if
+    their chunk texts are near-identical (chunks embedded before detection
+    existed, or crawled pages without document ids).
+
+    Args:
+        results: Search results ordered by score, each with "text" and "metadata"
+        top_k: Number of results to return
+        threshold: Estimated Jaccard similarity at which chunk texts are duplicates
+        index: Index used to map document ids to canonical ids
+
+    Returns:
+        At most top_k distinct results in the original order
+    """
+    hasher = _result_hasher()
+    kept: List[Dict[str, Any]] = []
+    kept_signatures: List[np.ndarray] = []
+    seen_documents = set()
+    for result in results:
+        metadata = result.get("metadata") or {}
+        doc_id = metadata.get("canonical_id") or metadata.get("id") or metadata.get("file_id")
+        if doc_id and index is not None:
+            doc_id = index.canonical_of(doc_id)
+        signature = hasher.signature(shingles(result.get("text", ""), size=3))
+        duplicate = signature.size > 0 and any(MinHasher.similarity(signature, other) >= threshold for other in kept_signatures)
+        # Different chunks of one document are fine; the same chunk from a linked copy is not
+        chunk_key = (doc_id, metadata.get("chunk_id")) if doc_id else None
+        if duplicate or (chunk_key and chunk_key in seen_documents):
+            continue
+        if chunk_key:
+            seen_documents.add(chunk_key)
+        kept.append(result)
+        kept_signatures.append(signature)
+        if len(kept) >= top_k:
+            break
+    return kept
+
+
+_result_hasher_instance: Optional[MinHasher] = None
+
+
+def _result_hasher() -> MinHasher:
+    global _result_hasher_instance
+    if _result_hasher_instance is None:
+        _result_hasher_instance = MinHasher(64)
+    return _result_hasher_instance
+
+
+_index_instance: Optional[NearDuplicateIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """Return the shared near-duplicate index"""
+    global _index_instance
+    with _index_lock:
+        if _index_instance is None:
+            _index_instance = NearDuplicateIndex()
+        return _index_instance
@@ -1,6 +1,14 @@
+import io
 import os
+import copy
+import hashlib
 import json
+import asyncio
 import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import uuid
@@ -13,10 +21,12 @@ from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 import re
-import google.generativeai as genai
 from dotenv import load_dotenv
 import requests
 
+from gemini_client import get_gemini_client
+from summary_cache import get_summary_cache
+
 # Load environment variables
 load_dotenv()
 
@@ -31,35 +41,59 @@ logging.basicConfig(
 )
 logger = logging.getLogger("pdf_generator")
 
-class LegalPDFGenerator:
-    def __init__(self, base_dir: str = None):
-        """
-        Initialize the legal PDF generator.
-        
-        Args:
-            base_dir: Base directory to store generated PDFs
-        """
-        if base_dir is None:
-            base_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
-        
-        self.base_dir = base_dir
-        self.pdf_dir = os.path.join(self.base_dir, "pdf_exports")
-        os.makedirs(self.pdf_dir, exist_ok=True)
-        
-        # Use Google Gemini API for summarization
-        self.gemini_api_key = os.getenv("GEMINI_API_KEY")
-        self.model_initialized = bool(self.gemini_api_key)
-        if self.model_initialized:
-            logger.info("Using Google Gemini API for summarization")
-            # Configure Gemini API
-            genai.configure(api_key=self.gemini_api_key)
-            self.gemini_model = genai.GenerativeModel('models/gemini-1.5-pro')
-        else:
-            logger.error("GEMINI_API_KEY not found. Summarization will not work.")
-        
-        # Setup PDF styles
+# ReportLab's doc.build is CPU-bound and holds the GIL, so PDFs are rendered
+# in a process pool (0 renders in a thread of the API process instead)
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+DISCLAIMER_TEXT = """
+            DISCLAIMER: This document is an AI-generated summary for reference purposes only.
+            The information provided does not constitute legal advice.
+            Please consult a qualified legal professional for advice specific to your situation.
+            """
+
+SUMMARY_SECTIONS = [
+    ("summary_of_issue", "SUMMARY OF ISSUE"),
+    ("relevant_laws", "RELEVANT LAWS"),
+    ("legal_analysis", "LEGAL ANALYSIS"),
+    ("possible_outcomes", "POSSIBLE OUTCOMES"),
+    ("recommended_next_steps", "RECOMMENDED NEXT STEPS"),
+]
+
+# Sent as Gemini's system instruction, identical on every call, so the
+# request-specific part of the prompt is all that changes between calls
+SUMMARY_SYSTEM_INSTRUCTION = """You are a legal assistant that writes and maintains formal legal summary documents of conversations between a user and a legal assistant.
+Please provide a structured legal summary with the following sections:
+1. SUMMARY OF ISSUE: A concise summary of the legal issue(s) discussed.
+2. RELEVANT LAWS: Identify any Indian Penal Code sections, laws, acts, or rules mentioned or relevant to the issue.
+3. LEGAL ANALYSIS: Provide a brief analysis of the legal situation based on the conversation.
+4. POSSIBLE OUTCOMES: Outline potential legal outcomes or consequences.
+5. RECOMMENDED NEXT STEPS: Suggest practical next steps the client should take.
+
+Format each section with a clear heading and detailed content. Be formal, precise, and comprehensive."""
+
+CLIENT_FIELDS = [
+    # (label, keys tried in order: modern first, then legacy)
+    ("Client", ("name", "party_details")),
+    ("Location", ("location", "background_info")),
+    ("Motion", ("motion",)),
+    ("Roles & Responsibilities", ("roles_responsibilities",)),
+    ("Breaches/Contingencies", ("breaches_contingencies",)),
+    ("Dates & Signatures", ("dates_signatures",)),
+]
+
+
+class PDFTemplate:
+    """
+    Document skeleton shared by every rendered PDF: registered fonts, styles
+    and the static title and disclaimer flowables are built once per process.
+    """
+
+    def __init__(self):
         self._setup_styles()
-    
+        self.title = Paragraph("Case Summary Document – APRS Legal Assistant", self.styles["LegalTitle"])
+        self.disclaimer = Paragraph(DISCLAIMER_TEXT, self.styles["Disclaimer"])
+        self.section_headings = {key: Paragraph(heading, self.styles["Heading1"]) for key, heading in SUMMARY_SECTIONS}
+
     def _setup_styles(self):
         """Set up PDF styles."""
         # Register fonts
@@ -129,10 +163,162 @@ class LegalPDFGenerator:
             textColor=colors.gray
         ))
     
+    def render(self, summary: Dict[str, Any]) -> bytes:
+        """
+        Render a structured legal summary to PDF bytes in memory.
+
+        Args:
+            summary: Structured legal summary
+
+        Returns:
+            The PDF document
+        """
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A4,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=72,
+            # No creation time or random document id: the same summary gives
+            # the same bytes, so content-hashed export names deduplicate
+            invariant=True
+        )
+
+        # Shallow copies keep the parsed text but not layout state from earlier builds
+        content = [copy.copy(self.title), Spacer(1, 12)]
+
+        # Add date
+        timestamp = datetime.fromisoformat(summary.get("timestamp", datetime.now().isoformat()))
+        content.append(Paragraph(f"Date: {timestamp.strftime('%d %B, %Y')}", self.styles["Normal"]))
+        content.append(Spacer(1, 12))
+
+        # Add client information if available
+        if "client_info" in summary:
+            client_info = summary["client_info"] or {}
+            for label, keys in CLIENT_FIELDS:
+                value = next((client_info[key] for key in keys if client_info.get(key)), "")
+                if value:
+                    content.append(Paragraph(f"{label}: {value}", self.styles["Normal"]))
+            content.append(Spacer(1, 12))
+
+        # Add the summary sections that have content
+        for key, _ in SUMMARY_SECTIONS:
+            if summary.get(key):
+                content.append(copy.copy(self.section_headings[key]))
+                content.append(Paragraph(summary[key], self.styles["Normal"]))
+                content.append(Spacer(1, 24 if key == "recommended_next_steps" else 12))
+
+        content.append(copy.copy(self.disclaimer))
+        doc.build(content)
+        return buffer.getvalue()
+
+
+_template: Optional[PDFTemplate] = None
+_template_lock = threading.Lock()
+# Serializes in-process builds: the template's flowables are shared
+_render_lock = threading.Lock()
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+
+
+def get_pdf_template() -> PDFTemplate:
+    """Return this process's PDF template"""
+    global _template
+    with _template_lock:
+        if _template is None:
+            _template = PDFTemplate()
+        return _template
+
+
+def render_summary_pdf(summary: Dict[str, Any]) -> bytes:
+    """Render a summary with this process's template (runs in the render pool)"""
+    template = get_pdf_template()
+    with _render_lock:
+        return template.render(summary)
+
+
+def get_render_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared PDF render pool (None if PDF_RENDER_WORKERS is 0)"""
+    global _render_pool
+    if PDF_RENDER_WORKERS <= 0:
+        return None
+    with _render_pool_lock:
+        if _render_pool is None:
+            # spawn: do not fork the API process's threads and sockets; each
+            # worker builds its template once, before its first PDF
+            _render_pool = ProcessPoolExecutor(
+                max_workers=PDF_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=get_pdf_template,
+            )
+        return _render_pool
+
+
+async def render_pdf_async(summary: Dict[str, Any]) -> bytes:
+    """
+    Render a PDF without blocking the event loop.
+
+    Args:
+        summary: Structured legal summary
+
+    Returns:
+        The PDF document
+    """
+    global _render_pool
+    loop = asyncio.get_running_loop()
+    pool = get_render_pool()
+    if pool is None:
+        return await asyncio.to_thread(render_summary_pdf, summary)
+    try:
+        return await loop.run_in_executor(pool, render_summary_pdf, summary)
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool and retry once
+        logger.error("PDF render pool broke; recreating it")
+        with _render_pool_lock:
+            if _render_pool is pool:
+                _render_pool = None
+        pool.shutdown(wait=False)
+        return await loop.run_in_executor(get_render_pool(), render_summary_pdf, summary)
+
+
+class LegalPDFGenerator:
+    def __init__(self, base_dir: str = None):
+        """
+        Initialize the legal PDF generator.
+        
+        Args:
+            base_dir: Base directory to store generated PDFs
+        """
+        if base_dir is None:
+            base_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+        
+        self.base_dir = base_dir
+        self.pdf_dir = os.path.join(self.base_dir, "pdf_exports")
+        os.makedirs(self.pdf_dir, exist_ok=True)
+        
+        # Use Google Gemini API for summarization (shared async client)
+        self.gemini = get_gemini_client()
+        self.gemini_model = os.getenv("GEMINI_SUMMARY_MODEL", "models/gemini-1.5-pro")
+        self.model_initialized = self.gemini.configured
+        if self.model_initialized:
+            logger.info("Using Google Gemini API for summarization")
+        else:
+            logger.error("GEMINI_API_KEY not found. Summarization will not work.")
+        
+        # Parsed summaries by conversation hash
+        self.summary_cache = get_summary_cache()
+    
     async def generate_legal_summary(self, conversation: List[Dict[str, Any]], client_info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Generate a structured legal summary from a conversation using Google Gemini API.
         
+        Summaries are cached by conversation: an unchanged conversation (e.g.
+        only client_info differs) is not sent to Gemini again, and when
+        messages were appended to a summarized conversation only the new
+        messages are sent, together with the previous summary.
+        
         Args:
             conversation: List of conversation messages
             client_info: Optional client information
@@ -140,33 +326,39 @@ class LegalPDFGenerator:
         Returns:
             Dictionary with structured legal summary
         """
+        cached = self.summary_cache.lookup(conversation)
+        if cached and cached["message_count"] == len(conversation):
+            logger.info("Using cached legal summary")
+            return self._finalize_summary(cached["summary"], client_info, cached["created_at"])
+        
         if not self.model_initialized:
             logger.error("Gemini model not initialized")
             return {"error": "Gemini model not initialized"}
         try:
-            # Format conversation for summarization
-            formatted_conversation = self._format_conversation(conversation)
-            # Generate summary prompt
-            prompt = f"""
-            You are a legal assistant tasked with creating a formal legal summary document.
-            Analyze the following conversation between a user and a legal assistant, and extract key information to create a structured legal summary.
-            
-            CONVERSATION:
-            {formatted_conversation}
-            
-            Please provide a structured legal summary with the following sections:
-            1. SUMMARY OF ISSUE: A concise summary of the legal issue(s) discussed.
-            2. RELEVANT LAWS: Identify any Indian Penal Code sections, laws, acts, or rules mentioned or relevant to the issue.
-            3. LEGAL ANALYSIS: Provide a brief analysis of the legal situation based on the conversation.
-            4. POSSIBLE OUTCOMES: Outline potential legal outcomes or consequences.
-            5. RECOMMENDED NEXT STEPS: Suggest practical next steps the client should take.
-            
-            Format each section with a clear heading and detailed content. Be formal, precise, and comprehensive.
-            """
+            if cached:
+                # Fold only the new messages into the cached summary
+                new_messages = conversation[cached["message_count"]:]
+                logger.info(f"Updating cached legal summary with {len(new_messages)} new messages")
+                prompt = (
+                    "Below is the current structured legal summary of a conversation, followed by new messages "
+                    "from the same conversation. Update the summary so that it reflects the whole conversation, "
+                    "including the new messages.\n\n"
+                    f"CURRENT SUMMARY:\n{cached['summary_text']}\n\n"
+                    f"NEW MESSAGES:\n{self._format_conversation(new_messages)}"
+                )
+            else:
+                # Format conversation for summarization
+                formatted_conversation = self._format_conversation(conversation)
+                prompt = (
+                    "Analyze the following conversation and extract key information to create a structured "
+                    "legal summary.\n\n"
+                    f"CONVERSATION:\n{formatted_conversation}"
+                )
             
             # Call Google Gemini API
             try:
-                response = self.gemini_model.generate_content(prompt)
+                response = await self.gemini.generate(prompt, model=self.gemini_model,
+                                                      system_instruction=SUMMARY_SYSTEM_INSTRUCTION)
                 summary_text = response.text.strip()
             except Exception as gemini_error:
                 logger.error(f"Google Gemini API error: {str(gemini_error)}")
@@ -174,16 +366,28 @@ class LegalPDFGenerator:
                 
             # Parse the summary into structured sections
             structured_summary = self._parse_summary(summary_text)
-            # Add client information if provided
-            if client_info:
-                structured_summary["client_info"] = client_info
-            # Add timestamp
-            structured_summary["timestamp"] = datetime.now().isoformat()
-            return structured_summary
+            created_at = datetime.now().isoformat()
+            self.summary_cache.store(conversation, structured_summary, summary_text, created_at)
+            return self._finalize_summary(structured_summary, client_info, created_at)
         except Exception as e:
             logger.error(f"Error generating legal summary: {e}")
             return {"error": str(e)}
     
+    def _finalize_summary(self, sections: Dict[str, Any], client_info: Optional[Dict[str, Any]], created_at: str) -> Dict[str, Any]:
+        """
+        Add client information and the summary's creation time to parsed sections.
+        
+        The timestamp is the time the summary was generated, not the time of
+        the request, so re-rendering a cached summary gives the same PDF.
+        """
+        structured_summary = dict(sections)
+        # Add client information if provided
+        if client_info:
+            structured_summary["client_info"] = client_info
+        # Add timestamp
+        structured_summary["timestamp"] = created_at
+        return structured_summary
+    
     def _format_conversation(self, conversation: List[Dict[str, Any]]) -> str:
         """
         Format conversation for summarization.
@@ -236,151 +440,87 @@ class LegalPDFGenerator:
         
         return structured_summary
     
-    async def generate_pdf(self, summary: Dict[str, Any], filename: Optional[str] = None) -> str:
+    async def render_pdf(self, summary: Dict[str, Any]) -> bytes:
         """
-        Generate a PDF from a structured legal summary.
+        Render a PDF from a structured legal summary in memory.
         
         Args:
             summary: Structured legal summary
-            filename: Optional filename
             
         Returns:
-            Path to the generated PDF
+            The PDF document (empty on failure)
         """
         try:
-            # Generate filename if not provided
-            if not filename:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                client_name = summary.get("client_info", {}).get("name", "client")
-                client_name = client_name.replace(" ", "_").lower()
-                filename = f"legal_summary_{client_name}_{timestamp}.pdf"
-            
-            # Ensure .pdf extension
-            if not filename.lower().endswith(".pdf"):
-                filename += ".pdf"
-            
-            # Set the output path
-            output_path = os.path.join(self.pdf_dir, filename)
-            
-            # Create PDF document
-            doc = SimpleDocTemplate(
-                output_path,
-                pagesize=A4,
-                rightMargin=72,
-                leftMargin=72,
-                topMargin=72,
-                bottomMargin=72
-            )
-            
-            # Build content
-            content = []
-            
-            # Add title
-            title = Paragraph("Case Summary Document – APRS Legal Assistant", self.styles["LegalTitle"])
-            content.append(title)
-            content.append(Spacer(1, 12))
-            
-            # Add date
-            timestamp = datetime.fromisoformat(summary.get("timestamp", datetime.now().isoformat()))
-            date_str = timestamp.strftime("%d %B, %Y")
-            date = Paragraph(f"Date: {date_str}", self.styles["Normal"])
-            content.append(date)
-            content.append(Spacer(1, 12))
-            
-            # Add client information if available
-            if "client_info" in summary:
-                client_info = summary["client_info"]
-                # Accept both modern and legacy keys
-                client_name = client_info.get("name") or client_info.get("party_details") or ""
-                client_location = client_info.get("location") or client_info.get("background_info") or ""
-                motion = client_info.get("motion") or ""
-                roles_responsibilities = client_info.get("roles_responsibilities") or ""
-                breaches_contingencies = client_info.get("breaches_contingencies") or ""
-                dates_signatures = client_info.get("dates_signatures") or ""
-
-                if client_name:
-                    client = Paragraph(f"Client: {client_name}", self.styles["Normal"])
-                    content.append(client)
-                if client_location:
-                    location = Paragraph(f"Location: {client_location}", self.styles["Normal"])
-                    content.append(location)
-                if motion:
-                    motion_par = Paragraph(f"Motion: {motion}", self.styles["Normal"])
-                    content.append(motion_par)
-                if roles_responsibilities:
-                    rr_par = Paragraph(f"Roles & Responsibilities: {roles_responsibilities}", self.styles["Normal"])
-                    content.append(rr_par)
-                if breaches_contingencies:
-                    bc_par = Paragraph(f"Breaches/Contingencies: {breaches_contingencies}", self.styles["Normal"])
-                    content.append(bc_par)
-                if dates_signatures:
-                    ds_par = Paragraph(f"Dates & Signatures: {dates_signatures}", self.styles["Normal"])
-                    content.append(ds_par)
-                content.append(Spacer(1, 12))
-            
-            # Add summary of issue
-            if "summary_of_issue" in summary and summary["summary_of_issue"]:
-                heading = Paragraph("SUMMARY OF ISSUE", self.styles["Heading1"])
-                content.append(heading)
-                
-                text = Paragraph(summary["summary_of_issue"], self.styles["Normal"])
-                content.append(text)
-                content.append(Spacer(1, 12))
-            
-            # Add relevant laws
-            if "relevant_laws" in summary and summary["relevant_laws"]:
-                heading = Paragraph("RELEVANT LAWS", self.styles["Heading1"])
-                content.append(heading)
-                
-                text = Paragraph(summary["relevant_laws"], self.styles["Normal"])
-                content.append(text)
-                content.append(Spacer(1, 12))
-            
-            # Add legal analysis
-            if "legal_analysis" in summary and summary["legal_analysis"]:
-                heading = Paragraph("LEGAL ANALYSIS", self.styles["Heading1"])
-                content.append(heading)
-                
-                text = Paragraph(summary["legal_analysis"], self.styles["Normal"])
-                content.append(text)
-                content.append(Spacer(1, 12))
-            
-            # Add possible outcomes
-            if "possible_outcomes" in summary and summary["possible_outcomes"]:
-                heading = Paragraph("POSSIBLE OUTCOMES", self.styles["Heading1"])
-                content.append(heading)
-                
-                text = Paragraph(summary["possible_outcomes"], self.styles["Normal"])
-                content.append(text)
-                content.append(Spacer(1, 12))
-            
-            # Add recommended next steps
-            if "recommended_next_steps" in summary and summary["recommended_next_steps"]:
-                heading = Paragraph("RECOMMENDED NEXT STEPS", self.styles["Heading1"])
-                content.append(heading)
-                
-                text = Paragraph(summary["recommended_next_steps"], self.styles["Normal"])
-                content.append(text)
-                content.append(Spacer(1, 24))
-            
-            # Add disclaimer
-            disclaimer_text = """
-            DISCLAIMER: This document is an AI-generated summary for reference purposes only. 
-            The information provided does not constitute legal advice. 
-            Please consult a qualified legal professional for advice specific to your situation.
-            """
-            disclaimer = Paragraph(disclaimer_text, self.styles["Disclaimer"])
-            content.append(disclaimer)
-            
-            # Build PDF
-            doc.build(content)
+            # Render in the process pool so other requests keep being served
+            return await render_pdf_async(summary)
+        except Exception as e:
+            logger.error(f"Error generating PDF: {e}")
+            return b""
+    
+    def pdf_filename(self, summary: Dict[str, Any], data: bytes) -> str:
+        """
+        Content-addressed file name for a rendered PDF: identical documents
+        share one file and concurrent exports never collide.
+        
+        Args:
+            summary: Structured legal summary (for the client name)
+            data: Rendered PDF
             
-            logger.info(f"PDF generated successfully: {output_path}")
+        Returns:
+            File name such as legal_summary_<client>_<sha256 prefix>.pdf
+        """
+        client_name = (summary.get("client_info") or {}).get("name") or "client"
+        client_name = re.sub(r"[^\w-]+", "_", client_name).strip("_").lower()[:40] or "client"
+        return f"legal_summary_{client_name}_{hashlib.sha256(data).hexdigest()[:16]}.pdf"
+    
+    def save_pdf(self, data: bytes, summary: Optional[Dict[str, Any]] = None, filename: Optional[str] = None) -> str:
+        """
+        Persist a rendered PDF in the exports directory.
+        
+        Args:
+            data: Rendered PDF
+            summary: Structured legal summary (used for the default file name)
+            filename: Optional file name instead of the content-hashed one
             
+        Returns:
+            Path to the saved PDF
+        """
+        content_named = not filename
+        if content_named:
+            filename = self.pdf_filename(summary or {}, data)
+        if not filename.lower().endswith(".pdf"):
+            filename += ".pdf"
+        output_path = os.path.join(self.pdf_dir, os.path.basename(filename))
+        
+        # A content-hashed name that exists already holds these bytes; a
+        # caller-chosen name may hold an older document and is overwritten
+        if content_named and os.path.exists(output_path):
             return output_path
+        temp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, output_path)
+        logger.info(f"PDF saved: {output_path}")
+        return output_path
+    
+    async def generate_pdf(self, summary: Dict[str, Any], filename: Optional[str] = None) -> str:
+        """
+        Generate a PDF from a structured legal summary and save it.
         
+        Args:
+            summary: Structured legal summary
+            filename: Optional filename (defaults to a content-hashed name)
+            
+        Returns:
+            Path to the generated PDF
+        """
+        data = await self.render_pdf(summary)
+        if not data:
+            return ""
+        try:
+            return await asyncio.to_thread(self.save_pdf, data, summary, filename)
         except Exception as e:
-            logger.error(f"Error generating PDF: {e}")
+            logger.error(f"Error saving PDF: {e}")
             return ""
 
 # Command-line interface
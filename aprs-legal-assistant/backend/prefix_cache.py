@@ -0,0 +1,104 @@
+"""
+Prompt-prefix KV cache for local causal language models.
+
+Every RAG and summary prompt starts with the same instruction block, and a
+local model used to re-run the forward pass over it (the prefill) for every
+request. PrefixKVCache runs the prefill of each distinct prefix once, keeps
+its past_key_values, and starts each generation from a copy of them so only
+the request-specific suffix is processed.
+
+Ollama needs no equivalent: with the instructions sent as the stable
+"system" part and the model kept loaded (keep_alive), its runner reuses the
+KV state of the matching prompt prefix by itself.
+"""
+import os
+import copy
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger("prefix_cache")
+
+PREFIX_CACHE_MAX_ENTRIES = int(os.getenv("PREFIX_CACHE_MAX_ENTRIES", "8"))
+
+
+class PrefixKVCache:
+    """past_key_values of prompt prefixes for one model"""
+
+    def __init__(self, model, tokenizer, max_entries: int = PREFIX_CACHE_MAX_ENTRIES):
+        """
+        Args:
+            model: A transformers causal LM
+            tokenizer: Its tokenizer
+            max_entries: Prefixes kept before the least recently used is evicted
+        """
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[Any, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+
+    def _prefix_state(self, prefix: str) -> Tuple[Any, Any]:
+        """Token ids and KV cache of a prefix, computed on first use"""
+        import torch
+        from transformers import DynamicCache
+
+        with self._lock:
+            entry = self._entries.get(prefix)
+            if entry is not None:
+                self._entries.move_to_end(prefix)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            input_ids = self.tokenizer(prefix, return_tensors="pt").input_ids.to(self.model.device)
+            with torch.no_grad():
+                cache = self.model(input_ids, past_key_values=DynamicCache(), use_cache=True).past_key_values
+            self._entries[prefix] = (input_ids, cache)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return input_ids, cache
+
+    def generate(self, prefix: str, suffix: str, max_new_tokens: int, temperature: float = 0.7,
+                 top_p: float = 0.95) -> str:
+        """
+        Generate a completion of prefix + suffix, prefilling only the suffix.
+
+        Args:
+            prefix: Stable start of the prompt (the instructions)
+            suffix: Request-specific rest of the prompt
+            max_new_tokens: Maximum new tokens
+            temperature: Sampling temperature
+            top_p: Nucleus sampling probability
+
+        Returns:
+            Generated text without the prompt
+        """
+        import torch
+
+        prefix_ids, cache = self._prefix_state(prefix)
+        # Tokenized separately so the prefix tokens match the cached ones exactly
+        suffix_ids = self.tokenizer(suffix, add_special_tokens=False, return_tensors="pt").input_ids.to(self.model.device)
+        input_ids = torch.cat([prefix_ids, suffix_ids], dim=-1)
+        with torch.no_grad():
+            output = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                # generate() extends the cache, so every request starts from a copy
+                past_key_values=copy.deepcopy(cache),
+                max_new_tokens=max_new_tokens,
+                do_sample=True,
+                temperature=temperature,
+                top_p=top_p,
+                pad_token_id=self.tokenizer.pad_token_id,
+            )
+        self.reused_tokens += prefix_ids.shape[-1]
+        return self.tokenizer.decode(output[0, input_ids.shape[-1]:], skip_special_tokens=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and prefix tokens not prefilled again"""
+        return {"prefix_hits": self.hits, "prefix_misses": self.misses,
+                "prefix_tokens_reused": self.reused_tokens, "cached_prefixes": len(self._entries)}
@@ -2,15 +2,24 @@ import os
 import json
 from dotenv import load_dotenv
 from typing import List, Dict, Any, Optional
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import asyncio
-import uuid
+import hashlib
+
+from backend.near_duplicates import dedupe_results, get_near_duplicate_index
+from backend.translation_engine import get_translation_engine
+from backend.llm_gateway import LLM_MAX_TOKENS, get_llm_gateway
+from backend.context_budget import Passage, get_context_assembler
+from backend.model_optimizer import load_embedding_model
 
 # Load environment variables
 load_dotenv()
 
+# Sent identically before every prompt so backends can reuse its prefill
+RAG_SYSTEM_PROMPT = """You are a legal assistant helping with a query.
+When legal context is provided, use it to provide an accurate response.
+Provide a clear, accurate, and helpful response."""
+
 class RAGSystem:
     def __init__(self):
 
@@ -25,22 +34,18 @@ class RAGSystem:
         # Initialize components
         self._init_models()
         self._init_text_splitter()
+        self.near_duplicates = get_near_duplicate_index()
     
     def _init_models(self):
         """Initialize embedding model and LLM."""
         try:
             # Initialize sentence transformer for embeddings
-            self.embedding_model = SentenceTransformer(self.embedding_model_name)
+            # ONNX int8 export when available (backend/model_optimizer.py)
+            self.embedding_model = load_embedding_model(self.embedding_model_name)
             
-            # Initialize LLM for generation
-            self.llm = pipeline(
-                "text-generation",
-                model=self.llm_model_name,
-                max_length=1024,
-                temperature=0.7,
-                top_p=0.95,
-                device_map="auto"  # Use GPU if available
-            )
+            # LLM calls go through the shared gateway (routing, limits, batching)
+            self.llm_gateway = get_llm_gateway()
+            self.context_assembler = get_context_assembler()
             
             self.models_initialized = True
         except Exception as e:
@@ -71,13 +76,23 @@ class RAGSystem:
         # Split text into chunks
         chunks = self.text_splitter.split_text(text)
         
-        # Generate IDs for chunks
-        ids = [str(uuid.uuid4()) for _ in range(len(chunks))]
-        
         # Create metadata if not provided
         if metadata is None:
             metadata = {}
         
+        # Text already embedded from another source is only linked to that copy
+        doc_id = metadata.get("id") or metadata.get("file_id")
+        if doc_id:
+            canonical_id, _ = await asyncio.to_thread(self.near_duplicates.add, doc_id, text, metadata.get("domain"))
+            if canonical_id != doc_id:
+                print(f"Not embedding {doc_id}: near-duplicate of {canonical_id}")
+                return []
+            metadata = {**metadata, "canonical_id": canonical_id}
+        
+        # Stable IDs: re-ingesting a document overwrites its chunks instead of adding copies
+        id_prefix = doc_id or hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        ids = [f"{id_prefix}:{i}" for i in range(len(chunks))]
+        
 
         embeddings = self.embedding_model.encode(chunks)
         
@@ -119,10 +134,10 @@ class RAGSystem:
         # Embed the query
         query_embedding = self.embedding_model.encode(query).tolist()
         
-        # Search Pinecone
+        # Search Pinecone (over-fetch so near-duplicate copies can be dropped)
         results = self.index.query(
             vector=query_embedding,
-            top_k=top_k,
+            top_k=top_k * 3,
             include_metadata=True
         )
         
@@ -136,7 +151,7 @@ class RAGSystem:
                 "metadata": {k: v for k, v in match["metadata"].items() if k != "text"}
             })
         
-        return formatted_results
+        return dedupe_results(formatted_results, top_k, index=self.near_duplicates)
     
     async def retrieve_and_generate(self, query: str) -> str:
         """
@@ -155,8 +170,11 @@ class RAGSystem:
             # If no results, generate response without context
             return await self._generate_response(query)
         
-        # Extract text from results
-        context = "\n\n".join([result["text"] for result in results])
+        # Keep the best passages that fit the model's context budget
+        packed = self.context_assembler.pack(
+            query, [Passage(text=result["text"], score=result["score"]) for result in results]
+        )
+        context = "\n\n".join(passage.text for passage in packed.passages)
         
         # Generate response with context
         return await self._generate_response(query, context)
@@ -175,34 +193,17 @@ class RAGSystem:
         if not self.models_initialized:
             raise Exception("Models not initialized properly")
         
-        # Prepare prompt
-        if context:
-            prompt = f"""
-            You are a legal assistant helping with a query. Use the following legal information to provide an accurate response.
-            
-            LEGAL CONTEXT:
-            {context}
-            
-            USER QUERY:
-            {query}
-            
-            Provide a clear, accurate, and helpful response based on the legal context provided:
-            """
-        else:
-            prompt = f"""
-            You are a legal assistant helping with a query.
-            
-            USER QUERY:
-            {query}
-            
-            Provide a clear, accurate, and helpful response:
-            """
+        # Prepare prompt: fixed instructions first, then the request-specific part
+        prompt = f"LEGAL CONTEXT:\n{context}\n\nUSER QUERY:\n{query}" if context else f"USER QUERY:\n{query}"
         
         # Generate response
-        response = self.llm(prompt)[0]["generated_text"]
+        result = await self.llm_gateway.generate(prompt, system=RAG_SYSTEM_PROMPT, max_tokens=LLM_MAX_TOKENS)
+        response = result.text
         
-        # Extract the generated response (remove the prompt)
-        response = response[len(prompt):].strip()
+        # Extract the generated response (remove the prompt if present)
+        if prompt in response:
+            response = response[response.find(prompt) + len(prompt):]
+        response = response.strip()
         
         return response
     
@@ -220,23 +221,12 @@ class RAGSystem:
         # First, get a response using RAG
         response = await self.retrieve_and_generate(query)
         
-        # If language is not English, translate the response
+        # If language is not English, translate the response with the
+        # dedicated seq2seq engine instead of a second LLM pass
         if language.lower() != "english":
-            # For now, we'll use a simple prompt to ask the model to translate
-            # In a production app, you might want to use a dedicated translation model
-            translation_prompt = f"""
-            Translate the following text to {language}:
-            
-            {response}
-            
-            Translation:
-            """
-            
-            translated_response = self.llm(translation_prompt)[0]["generated_text"]
-            
-            # Extract the translated response
-            translated_response = translated_response[len(translation_prompt):].strip()
-            
-            return translated_response
+            try:
+                return await get_translation_engine().translate_async(response, "english", language)
+            except Exception as e:
+                print(f"Error translating response to {language}: {e}")
         
         return response
@@ -5,11 +5,13 @@ import sys
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Now import and run the main app
-from backend.main import app
-import uvicorn
-
 if __name__ == "__main__":
+    # Imported here, not at module level: spawned worker processes (the PDF
+    # render pool) re-import this module as __mp_main__ and must not build
+    # the whole app again
+    from backend.main import app
+    import uvicorn
+
     # Set up logging
     import logging
     logging.basicConfig(
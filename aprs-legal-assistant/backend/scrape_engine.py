@@ -0,0 +1,303 @@
+"""
+Concurrent scraping engine.
+
+A bounded pool of async workers pulls items from one shared queue. Handling
+an item may enqueue more items (search page -> document pages -> PDFs), so a
+whole session is a single queue drained by all workers. Politeness is
+enforced per domain with token buckets instead of fixed sleeps, and progress
+is reported through a callback and the log.
+
+Blocking work (Selenium, requests) must be pushed to threads by the handler;
+each worker owns one lazily created resource (e.g. a WebDriver), created and
+closed in a worker thread.
+
+With a CrawlState frontier every queued item is persisted: URLs finished
+recently are not queued again, and items left over by an interrupted session
+are resumed on the next run. Each run leases its items and renews the leases
+while it runs, so concurrent runs in other processes do not resume them.
+"""
+import os
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from backend.crawl_state import CrawlState
+
+logger = logging.getLogger("scrape_engine")
+
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", "4"))
+SCRAPER_RATE_PER_DOMAIN = float(os.getenv("SCRAPER_RATE_PER_DOMAIN", "0.5"))
+SCRAPER_BURST = int(os.getenv("SCRAPER_BURST", "2"))
+SCRAPER_MAX_RETRIES = int(os.getenv("SCRAPER_MAX_RETRIES", "1"))
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, at most `burst` saved up"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until `tokens` are available and take them"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+def domain_of(url: str) -> str:
+    """Host of a URL without a leading "www." (rate limits are shared across it)"""
+    host = urllib.parse.urlparse(url).netloc.lower().split("@")[-1].split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+class DomainRateLimiter:
+    """One token bucket per domain"""
+
+    def __init__(self, rate: float = SCRAPER_RATE_PER_DOMAIN, burst: int = SCRAPER_BURST,
+                 overrides: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            rate: Requests per second allowed per domain
+            burst: Requests that may be made back to back
+            overrides: Per-domain rates that replace the default
+        """
+        self.rate = rate
+        self.burst = burst
+        self.overrides = overrides or {}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    async def acquire(self, url: str):
+        """Wait for permission to request a URL"""
+        domain = domain_of(url)
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            bucket = TokenBucket(self.overrides.get(domain, self.rate), self.burst)
+            self._buckets[domain] = bucket
+        await bucket.acquire()
+
+
+@dataclass
+class WorkItem:
+    """One unit of scraping work"""
+    kind: str
+    source: str
+    url: str
+    data: Dict[str, Any] = field(default_factory=dict)
+    attempt: int = 0
+
+
+@dataclass
+class ScrapeProgress:
+    """Live counters for a scraping session"""
+    queued: int = 0
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    in_progress: int = 0
+    by_kind: Dict[str, int] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.time)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus throughput, suitable for logging or a status endpoint"""
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        done = self.completed + self.failed
+        return {
+            "queued": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "in_progress": self.in_progress,
+            "pending": self.queued - done,
+            "by_kind": dict(self.by_kind),
+            "elapsed_seconds": round(elapsed, 1),
+            "items_per_minute": round(done * 60 / elapsed, 1),
+        }
+
+
+class WorkerContext:
+    """Per-worker state handed to the item handler"""
+
+    def __init__(self, worker_id: int, resource_factory: Optional[Callable[[], Any]]):
+        self.worker_id = worker_id
+        self._resource_factory = resource_factory
+        self.resource = None
+
+    async def get_resource(self):
+        """Create the worker's resource (e.g. a WebDriver) on first use"""
+        if self.resource is None and self._resource_factory is not None:
+            self.resource = await asyncio.to_thread(self._resource_factory)
+        return self.resource
+
+
+Handler = Callable[[WorkItem, WorkerContext], Awaitable[Optional[Iterable[WorkItem]]]]
+
+
+class ScrapeEngine:
+    """Bounded worker pool over a shared work queue with per-domain politeness"""
+
+    def __init__(
+        self,
+        handler: Handler,
+        workers: int = SCRAPER_WORKERS,
+        rate_limiter: Optional[DomainRateLimiter] = None,
+        resource_factory: Optional[Callable[[], Any]] = None,
+        resource_close: Optional[Callable[[Any], None]] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        max_retries: int = SCRAPER_MAX_RETRIES,
+        progress_every: int = 10,
+        frontier: Optional[CrawlState] = None,
+    ):
+        """
+        Args:
+            handler: Coroutine handling one item; returns follow-up items
+            workers: Number of concurrent workers
+            rate_limiter: Per-domain limiter applied before every item
+            resource_factory: Creates a per-worker resource in a thread
+            resource_close: Releases a per-worker resource in a thread
+            progress_callback: Called with a progress snapshot after every item
+            max_retries: Times a failed item is re-queued
+            progress_every: Log progress every N finished items
+            frontier: Persistent crawl state for dedup across sessions and resuming
+        """
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.rate_limiter = rate_limiter or DomainRateLimiter()
+        self.resource_factory = resource_factory
+        self.resource_close = resource_close
+        self.progress_callback = progress_callback
+        self.max_retries = max_retries
+        self.progress_every = max(1, progress_every)
+        self.frontier = frontier
+        self.progress = ScrapeProgress()
+        self._seen: set = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._owner: Optional[str] = None
+
+    def _enqueue(self, item: WorkItem, retry: bool = False, resumed: bool = False):
+        key = (item.kind, item.url)
+        if not retry:
+            if key in self._seen:
+                return
+            self._seen.add(key)
+            if self.frontier is not None and not resumed and not self.frontier.enqueue(
+                    item.kind, item.source, item.url, item.data, owner=self._owner):
+                self.progress.skipped += 1
+                return
+            self.progress.queued += 1
+            self.progress.by_kind[item.kind] = self.progress.by_kind.get(item.kind, 0) + 1
+        self._queue.put_nowait(item)
+
+    async def run(self, items: Iterable[WorkItem], resume: bool = True) -> Dict[str, Any]:
+        """
+        Process the items and everything they lead to.
+
+        Args:
+            items: Initial work items
+            resume: Also process items an interrupted session left in the frontier
+
+        Returns:
+            Final progress snapshot
+        """
+        self._queue = asyncio.Queue()
+        self.progress = ScrapeProgress()
+        self._seen = set()
+        self._owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        if self.frontier is not None and resume:
+            leftover = self.frontier.pending(self._owner)
+            if leftover:
+                logger.info(f"Resuming {len(leftover)} unfinished items")
+            for entry in leftover:
+                self._enqueue(WorkItem(**entry), resumed=True)
+        for item in items:
+            self._enqueue(item)
+
+        contexts = [WorkerContext(i, self.resource_factory) for i in range(self.workers)]
+        tasks = [asyncio.create_task(self._worker(ctx)) for ctx in contexts]
+        if self.frontier is not None:
+            tasks.append(asyncio.create_task(self._renew_leases()))
+        try:
+            await self._queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for ctx in contexts:
+                if ctx.resource is not None and self.resource_close is not None:
+                    try:
+                        await asyncio.to_thread(self.resource_close, ctx.resource)
+                    except Exception as e:
+                        logger.warning(f"Error closing worker {ctx.worker_id} resource: {e}")
+
+        snapshot = self.progress.snapshot()
+        logger.info(f"Scrape finished: {snapshot}")
+        return snapshot
+
+    async def _renew_leases(self):
+        """Keep this run's frontier items leased while it runs"""
+        while True:
+            await asyncio.sleep(max(1.0, self.frontier.lease_seconds / 3))
+            try:
+                await asyncio.to_thread(self.frontier.renew, self._owner)
+            except Exception as e:
+                logger.warning(f"Could not renew frontier leases: {e}")
+
+    async def _worker(self, ctx: WorkerContext):
+        while True:
+            item = await self._queue.get()
+            self.progress.in_progress += 1
+            try:
+                if self.frontier is not None:
+                    self.frontier.start(item.url, self._owner)
+                await self.rate_limiter.acquire(item.url)
+                follow_ups = await self.handler(item, ctx)
+                for follow_up in follow_ups or []:
+                    self._enqueue(follow_up)
+                if self.frontier is not None:
+                    self.frontier.finish(item.url)
+                self.progress.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if item.attempt < self.max_retries:
+                    item.attempt += 1
+                    logger.warning(f"Retrying {item.kind} {item.url} after error: {e}")
+                    self._enqueue(item, retry=True)
+                else:
+                    logger.error(f"Failed {item.kind} {item.url}: {e}")
+                    if self.frontier is not None:
+                        self.frontier.fail(item.url, str(e))
+                    self.progress.failed += 1
+            finally:
+                self.progress.in_progress -= 1
+                self._queue.task_done()
+                self._report()
+
+    def _report(self):
+        snapshot = self.progress.snapshot()
+        if (self.progress.completed + self.progress.failed) % self.progress_every == 0:
+            logger.info(f"Scrape progress: {snapshot}")
+        if self.progress_callback is not None:
+            try:
+                self.progress_callback(snapshot)
+            except Exception as e:
+                logger.warning(f"Progress callback failed: {e}")
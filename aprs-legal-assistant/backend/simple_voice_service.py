@@ -8,12 +8,14 @@ import base64
 import logging
 import tempfile
 from typing import Optional, Dict, Any, List
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import uvicorn
 
+from binary_responses import file_response, wants_base64
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,6 +30,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Duration-Seconds", "X-Sample-Rate", "X-Persona-Role", "Content-Range", "Accept-Ranges"],
 )
 
 # Paths
@@ -84,8 +87,14 @@ async def root():
     }
 
 @app.post("/tts", response_model=TTSResponse)
-async def text_to_speech(request: TTSRequest):
-    """Return a pre-recorded voice sample for the requested persona"""
+async def text_to_speech(request: TTSRequest, http_request: Request,
+                         response_format: Optional[str] = Query(None, alias="format")):
+    """
+    Return a pre-recorded voice sample for the requested persona.
+    
+    Responds with the raw WAV (Range requests supported); pass ?format=base64
+    or Accept: application/json for the legacy base64 JSON body.
+    """
     try:
         # Get voice sample path
         voice_path = get_voice_path(request.persona_role)
@@ -108,6 +117,23 @@ async def text_to_speech(request: TTSRequest):
                     detail=f"No voice samples available. Please add voice samples to {VOICES_DIR}"
                 )
         
+        # Estimate duration (assuming 16kHz sample rate, 16-bit audio)
+        file_size = os.path.getsize(voice_path)
+        duration = file_size / (16000 * 2)  # Approximate duration in seconds
+        
+        if not wants_base64(http_request, response_format):
+            return file_response(
+                http_request,
+                voice_path,
+                media_type="audio/wav",
+                filename=os.path.basename(voice_path),
+                headers={
+                    "X-Duration-Seconds": f"{duration:.3f}",
+                    "X-Sample-Rate": "16000",
+                    "X-Persona-Role": request.persona_role,
+                },
+            )
+        
         # Read the voice sample
         with open(voice_path, 'rb') as f:
             audio_data = f.read()
@@ -115,10 +141,6 @@ async def text_to_speech(request: TTSRequest):
         # Encode to base64
         audio_base64 = base64.b64encode(audio_data).decode("utf-8")
         
-        # Estimate duration (assuming 16kHz sample rate, 16-bit audio)
-        file_size = os.path.getsize(voice_path)
-        duration = file_size / (16000 * 2)  # Approximate duration in seconds
-        
         return TTSResponse(
             audio_base64=audio_base64,
             duration_seconds=float(duration),
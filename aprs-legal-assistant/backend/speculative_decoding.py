@@ -0,0 +1,142 @@
+"""
+Assisted (speculative) decoding for the local transformers model.
+
+On CPU the local fallback model produces one token per full forward pass,
+so long answers are very slow. With LOCAL_LLM_DRAFT_MODEL set, a small draft
+model from the same tokenizer family proposes LOCAL_LLM_DRAFT_TOKENS tokens
+at a time and the main model verifies them all in one forward pass, keeping
+the longest accepted run. The output distribution is the main model's (with
+greedy decoding the text is identical); the speed-up depends on how often
+the draft's guesses are accepted, which stats() reports together with
+tokens per second.
+"""
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict
+
+logger = logging.getLogger("speculative_decoding")
+
+LOCAL_LLM_DRAFT_TOKENS = int(os.getenv("LOCAL_LLM_DRAFT_TOKENS", "5"))
+
+
+class _ForwardCounter:
+    """Counts forward passes of a module"""
+
+    def __init__(self, module):
+        self.calls = 0
+        module.register_forward_hook(self._hook)
+
+    def _hook(self, module, inputs, output):
+        self.calls += 1
+
+
+def load_draft_model(name: str, main_model):
+    """
+    Load a draft model onto the main model's device.
+
+    Args:
+        name: Hugging Face model name of the draft model
+        main_model: The model it drafts for
+
+    Returns:
+        The draft model
+
+    Raises:
+        ValueError: If the vocabularies differ (the draft must share the tokenizer)
+    """
+    from transformers import AutoModelForCausalLM
+
+    draft = AutoModelForCausalLM.from_pretrained(name).to(main_model.device)
+    draft.eval()
+    if draft.config.vocab_size != main_model.config.vocab_size:
+        raise ValueError(f"Draft model {name} has a vocabulary of {draft.config.vocab_size} tokens, "
+                         f"the main model {main_model.config.vocab_size}; use a model of the same family")
+    return draft
+
+
+class SpeculativeDecoder:
+    """Generates with a main model, optionally assisted by a draft model"""
+
+    def __init__(self, model, tokenizer, draft_model=None, num_draft_tokens: int = LOCAL_LLM_DRAFT_TOKENS):
+        """
+        Args:
+            model: Main causal LM
+            tokenizer: Its tokenizer
+            draft_model: Smaller causal LM with the same vocabulary (None for plain decoding)
+            num_draft_tokens: Tokens the draft proposes per verification step
+        """
+        self.model = model
+        self.tokenizer = tokenizer
+        self.draft_model = draft_model
+        self.num_draft_tokens = max(1, num_draft_tokens)
+        if draft_model is not None:
+            # A fixed draft length keeps the acceptance rate comparable between requests
+            draft_model.generation_config.num_assistant_tokens = self.num_draft_tokens
+            draft_model.generation_config.num_assistant_tokens_schedule = "constant"
+        self._main_passes = _ForwardCounter(model)
+        self._draft_passes = _ForwardCounter(draft_model) if draft_model is not None else None
+        self._lock = threading.Lock()
+        self.metrics = {"requests": 0, "new_tokens": 0, "seconds": 0.0, "assisted_tokens": 0,
+                        "verify_steps": 0, "drafted": 0, "accepted": 0}
+
+    def generate(self, prompt: str, max_new_tokens: int, temperature: float = 0.7, top_p: float = 0.95,
+                 assisted: bool = True) -> str:
+        """
+        Generate a completion.
+
+        Args:
+            prompt: Full prompt text
+            max_new_tokens: Maximum new tokens
+            temperature: Sampling temperature (0 for greedy decoding)
+            top_p: Nucleus sampling probability
+            assisted: Use the draft model if there is one
+
+        Returns:
+            Generated text without the prompt
+        """
+        import torch
+
+        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+        kwargs: Dict[str, Any] = {"max_new_tokens": max_new_tokens, "pad_token_id": self.tokenizer.pad_token_id}
+        if temperature > 0:
+            kwargs.update(do_sample=True, temperature=temperature, top_p=top_p)
+        else:
+            kwargs["do_sample"] = False
+        draft = self.draft_model if assisted else None
+        if draft is not None:
+            kwargs["assistant_model"] = draft
+
+        with self._lock:
+            main_before = self._main_passes.calls
+            draft_before = self._draft_passes.calls if self._draft_passes else 0
+            started = time.perf_counter()
+            with torch.no_grad():
+                output = self.model.generate(**inputs, **kwargs)
+            elapsed = time.perf_counter() - started
+            new_tokens = output.shape[-1] - inputs["input_ids"].shape[-1]
+
+            self.metrics["requests"] += 1
+            self.metrics["new_tokens"] += new_tokens
+            self.metrics["seconds"] += elapsed
+            if draft is not None:
+                # Every verification pass yields the accepted draft tokens plus one from the main model
+                steps = self._main_passes.calls - main_before
+                self.metrics["assisted_tokens"] += new_tokens
+                self.metrics["verify_steps"] += steps
+                self.metrics["drafted"] += self._draft_passes.calls - draft_before
+                self.metrics["accepted"] += max(0, new_tokens - steps)
+        return self.tokenizer.decode(output[0, inputs["input_ids"].shape[-1]:], skip_special_tokens=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Tokens per second and the share of drafted tokens the main model accepted"""
+        metrics = self.metrics
+        return {
+            "draft_model": getattr(self.draft_model, "name_or_path", None),
+            "generated_tokens": metrics["new_tokens"],
+            "tokens_per_second": round(metrics["new_tokens"] / metrics["seconds"], 2) if metrics["seconds"] else None,
+            "acceptance_rate": round(metrics["accepted"] / metrics["drafted"], 3) if metrics["drafted"] else None,
+            "tokens_per_verify_step": (round(metrics["assisted_tokens"] / metrics["verify_steps"], 2)
+                                       if metrics["verify_steps"] else None),
+        }
@@ -0,0 +1,169 @@
+"""
+Cache of structured legal summaries keyed by conversation content.
+
+Summarizing a conversation with Gemini is the slow, paid part of every PDF
+export. The parsed summary is stored under a rolling hash of the
+conversation's messages: the hash after message i covers messages 0..i, so a
+lookup finds either the exact conversation (download clicked twice, or only
+the client details changed) or the longest summarized prefix, in which case
+only the appended messages need to be folded into the existing summary.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger("summary_cache")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+SUMMARY_CACHE_DB = os.getenv("SUMMARY_CACHE_DB", os.path.join(DATA_DIR, "summary_cache.sqlite"))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+
+
+def prefix_hashes(conversation: Sequence[Dict[str, Any]]) -> List[str]:
+    """
+    Rolling hashes of a conversation.
+
+    Args:
+        conversation: Messages with "role" and "content"
+
+    Returns:
+        One hash per prefix: element 0 is the empty conversation, element i
+        covers the first i messages
+    """
+    digest = hashlib.sha256(b"conversation").hexdigest()
+    hashes = [digest]
+    for message in conversation:
+        role = str(message.get("role", "unknown")).lower()
+        content = " ".join(unicodedata.normalize("NFC", str(message.get("content", ""))).split())
+        digest = hashlib.sha256(f"{digest}\x1f{role}\x1f{content}".encode("utf-8")).hexdigest()
+        hashes.append(digest)
+    return hashes
+
+
+class SummaryCache:
+    """SQLite store of parsed summaries and the model output they came from"""
+
+    def __init__(self, db_path: str = SUMMARY_CACHE_DB, max_entries: int = SUMMARY_CACHE_MAX_ENTRIES):
+        """
+        Initialize the summary cache.
+
+        Args:
+            db_path: SQLite database file
+            max_entries: Summaries kept before the least recently used are pruned
+        """
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summaries (
+                conversation_hash TEXT PRIMARY KEY,
+                message_count INTEGER NOT NULL,
+                summary TEXT NOT NULL,
+                summary_text TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+    def lookup(self, conversation: Sequence[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Find the cached summary of a conversation or of its longest prefix.
+
+        Args:
+            conversation: Messages with "role" and "content"
+
+        Returns:
+            None on a miss, otherwise a dict with "summary" (parsed sections),
+            "summary_text" (raw model output), "created_at" and
+            "message_count" (equal to len(conversation) for an exact hit)
+        """
+        # The empty prefix (element 0) is not a summary of this conversation:
+        # only the exact empty conversation may match it
+        hashes = prefix_hashes(conversation)
+        hashes = hashes[1:] or hashes
+        placeholders = ",".join("?" * len(hashes))
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT * FROM summaries WHERE conversation_hash IN ({placeholders}) ORDER BY message_count DESC LIMIT 1",
+                hashes,
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE summaries SET hits = hits + 1, last_used = ? WHERE conversation_hash = ?",
+                (time.time(), row["conversation_hash"]),
+            )
+            self._conn.commit()
+            if row["message_count"] == len(conversation):
+                self.hits += 1
+            else:
+                self.prefix_hits += 1
+        return {
+            "summary": json.loads(row["summary"]),
+            "summary_text": row["summary_text"],
+            "created_at": row["created_at"],
+            "message_count": row["message_count"],
+        }
+
+    def store(self, conversation: Sequence[Dict[str, Any]], summary: Dict[str, Any], summary_text: str,
+              created_at: str):
+        """
+        Cache the summary of a conversation.
+
+        Args:
+            conversation: Messages the summary covers
+            summary: Parsed summary sections (without client info or timestamp)
+            summary_text: Raw model output, used to extend the summary later
+            created_at: ISO timestamp printed on PDFs rendered from this summary
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (conversation_hash, message_count, summary, summary_text, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (prefix_hashes(conversation)[-1], len(conversation), json.dumps(summary), summary_text, created_at, now),
+            )
+            self._conn.execute(
+                "DELETE FROM summaries WHERE conversation_hash IN ("
+                "SELECT conversation_hash FROM summaries ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and store size"""
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        return {"hits": self.hits, "prefix_hits": self.prefix_hits, "misses": self.misses, "stored_summaries": stored}
+
+
+_cache_instance: Optional[SummaryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> SummaryCache:
+    """Return the shared summary cache"""
+    global _cache_instance
+    with _cache_lock:
+        if _cache_instance is None:
+            _cache_instance = SummaryCache()
+        return _cache_instance
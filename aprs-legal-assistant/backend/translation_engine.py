@@ -0,0 +1,250 @@
+"""
+Local translation engine backed by compact seq2seq (MarianMT / opus-mt) models.
+
+Replaces LLM-prompted translation: each language pair's model is loaded once,
+text is translated sentence by sentence in length-sorted batches, and all
+inference runs on one dedicated worker thread (optionally pinned to a CPU set
+and with int8 dynamic quantization of the Linear layers, or the ONNX int8
+export from model_optimizer.py when there is one). Sentences already in the
+translation memory are never sent to the model.
+"""
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from backend.translation_memory import get_translation_memory
+from backend.model_optimizer import load_seq2seq_model, quantize_dynamic_int8
+
+try:
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+    TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    TRANSFORMERS_AVAILABLE = False
+
+logger = logging.getLogger("translation_engine")
+
+TRANSLATION_DEVICE = os.getenv("TRANSLATION_DEVICE", "")
+TRANSLATION_THREADS = int(os.getenv("TRANSLATION_THREADS", "0"))
+TRANSLATION_CPU_AFFINITY = os.getenv("TRANSLATION_CPU_AFFINITY", "")
+TRANSLATION_QUANTIZE_INT8 = os.getenv("TRANSLATION_QUANTIZE_INT8", "false").lower() == "true"
+TRANSLATION_BATCH_SIZE = int(os.getenv("TRANSLATION_BATCH_SIZE", "16"))
+TRANSLATION_NUM_BEAMS = int(os.getenv("TRANSLATION_NUM_BEAMS", "2"))
+TRANSLATION_MAX_LENGTH = int(os.getenv("TRANSLATION_MAX_LENGTH", "512"))
+
+LANGUAGE_CODES = {
+    "english": "en", "telugu": "te", "hindi": "hi", "tamil": "ta", "kannada": "kn",
+    "malayalam": "ml", "marathi": "mr", "bengali": "bn", "gujarati": "gu",
+}
+
+# (source, target) -> (model, target-language token for multilingual models)
+# Override a pair with TRANSLATION_MODEL_<SRC>_<TGT>, e.g. TRANSLATION_MODEL_TE_EN
+MODEL_MAP: Dict[Tuple[str, str], Tuple[str, Optional[str]]] = {
+    ("en", "te"): ("Helsinki-NLP/opus-mt-en-dra", ">>tel<<"),
+    ("en", "ta"): ("Helsinki-NLP/opus-mt-en-dra", ">>tam<<"),
+    ("en", "kn"): ("Helsinki-NLP/opus-mt-en-dra", ">>kan<<"),
+    ("en", "ml"): ("Helsinki-NLP/opus-mt-en-dra", ">>mal<<"),
+    ("te", "en"): ("Helsinki-NLP/opus-mt-dra-en", None),
+    ("ta", "en"): ("Helsinki-NLP/opus-mt-dra-en", None),
+    ("kn", "en"): ("Helsinki-NLP/opus-mt-dra-en", None),
+    ("ml", "en"): ("Helsinki-NLP/opus-mt-dra-en", None),
+    ("en", "hi"): ("Helsinki-NLP/opus-mt-en-hi", None),
+    ("hi", "en"): ("Helsinki-NLP/opus-mt-hi-en", None),
+    ("en", "mr"): ("Helsinki-NLP/opus-mt-en-mr", None),
+    ("mr", "en"): ("Helsinki-NLP/opus-mt-mr-en", None),
+}
+
+
+def language_code(language: str) -> str:
+    """Map a language name ("telugu") or code ("te") to its ISO 639-1 code"""
+    language = (language or "").strip().lower()
+    return LANGUAGE_CODES.get(language, language)
+
+
+def _parse_cpu_set(spec: str) -> Set[int]:
+    cpus: Set[int] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.update(range(int(start), int(end) + 1))
+        elif part:
+            cpus.add(int(part))
+    return cpus
+
+
+class TranslationEngine:
+    """Batched sentence-level translation with one model per language pair"""
+
+    def __init__(
+        self,
+        device: str = TRANSLATION_DEVICE,
+        num_threads: int = TRANSLATION_THREADS,
+        cpu_affinity: str = TRANSLATION_CPU_AFFINITY,
+        quantize: bool = TRANSLATION_QUANTIZE_INT8,
+        batch_size: int = TRANSLATION_BATCH_SIZE,
+        num_beams: int = TRANSLATION_NUM_BEAMS,
+        max_length: int = TRANSLATION_MAX_LENGTH,
+    ):
+        """
+        Initialize the engine; models are loaded on first use of a pair.
+
+        Args:
+            device: "cpu", "cuda" or empty for automatic selection
+            num_threads: torch intra-op threads (process-wide); 0 leaves the default
+            cpu_affinity: CPU list for the translation thread, e.g. "0-3" or "0,2"
+            quantize: Apply int8 dynamic quantization when running on CPU
+            batch_size: Sentences per generate() call
+            num_beams: Beam size for decoding
+            max_length: Maximum tokens per sentence
+        """
+        if not TRANSFORMERS_AVAILABLE:
+            raise RuntimeError("transformers/torch are required for the translation engine")
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.num_threads = num_threads
+        self.cpu_affinity = _parse_cpu_set(cpu_affinity) if cpu_affinity else set()
+        self.quantize = quantize and self.device == "cpu"
+        self.batch_size = max(1, batch_size)
+        self.num_beams = max(1, num_beams)
+        self.max_length = max_length
+
+        self._models: Dict[str, Tuple["AutoTokenizer", "AutoModelForSeq2SeqLM"]] = {}
+        self._load_lock = threading.Lock()
+        # All inference on one thread: no oversubscription against the LLM and embedder
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translation",
+                                            initializer=self._init_worker)
+        self.memory = get_translation_memory()
+
+    def _init_worker(self):
+        if self.cpu_affinity and hasattr(os, "sched_setaffinity"):
+            try:
+                # pid 0 is the calling thread on Linux
+                os.sched_setaffinity(0, self.cpu_affinity)
+            except OSError as e:
+                logger.warning(f"Could not pin translation thread to CPUs {sorted(self.cpu_affinity)}: {e}")
+        if self.num_threads > 0:
+            torch.set_num_threads(self.num_threads)
+
+    # ---------------------------------------------------------------- models
+
+    @staticmethod
+    def model_for(source: str, target: str) -> Tuple[str, Optional[str]]:
+        """
+        Resolve the model for a language pair.
+
+        Raises:
+            ValueError: If no model is configured for the pair
+        """
+        source, target = language_code(source), language_code(target)
+        override = os.getenv(f"TRANSLATION_MODEL_{source.upper()}_{target.upper()}")
+        if override:
+            name, _, token = override.partition("|")
+            return name, token or None
+        if (source, target) not in MODEL_MAP:
+            raise ValueError(f"No translation model configured for {source}->{target}")
+        return MODEL_MAP[(source, target)]
+
+    def supports(self, source: str, target: str) -> bool:
+        """Whether a model is configured for the language pair"""
+        try:
+            self.model_for(source, target)
+            return True
+        except ValueError:
+            return False
+
+    def _load(self, model_name: str):
+        with self._load_lock:
+            if model_name not in self._models:
+                # On CPU, prefer the ONNX int8 export from model_optimizer.py
+                optimized = load_seq2seq_model(model_name) if self.device == "cpu" else None
+                if optimized:
+                    self._models[model_name] = optimized
+                    return optimized
+                logger.info(f"Loading translation model {model_name} on {self.device}")
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                model = AutoModelForSeq2SeqLM.from_pretrained(model_name).to(self.device).eval()
+                if self.quantize:
+                    model = quantize_dynamic_int8(model)
+                self._models[model_name] = (tokenizer, model)
+            return self._models[model_name]
+
+    # ----------------------------------------------------------- translation
+
+    def translate_batch(self, segments: List[str], source: str, target: str) -> List[str]:
+        """
+        Translate sentences with the pair's model, bypassing the translation memory.
+
+        Args:
+            segments: Sentences to translate
+            source: Source language name or code
+            target: Target language name or code
+
+        Returns:
+            Translations in input order
+        """
+        if not segments:
+            return []
+        model_name, target_token = self.model_for(source, target)
+        tokenizer, model = self._load(model_name)
+
+        # Sort by length so each batch pads as little as possible
+        order = sorted(range(len(segments)), key=lambda i: len(segments[i]))
+        results: List[str] = [""] * len(segments)
+        for start in range(0, len(order), self.batch_size):
+            batch_ids = order[start:start + self.batch_size]
+            batch = [f"{target_token} {segments[i]}" if target_token else segments[i] for i in batch_ids]
+            inputs = tokenizer(batch, return_tensors="pt", padding=True, truncation=True,
+                               max_length=self.max_length).to(self.device)
+            with torch.inference_mode():
+                generated = model.generate(**inputs, num_beams=self.num_beams, max_new_tokens=self.max_length)
+            for index, text in zip(batch_ids, tokenizer.batch_decode(generated, skip_special_tokens=True)):
+                results[index] = text.strip()
+        return results
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        """
+        Translate text sentence by sentence, reusing the translation memory.
+
+        Args:
+            text: Text to translate
+            source: Source language name or code
+            target: Target language name or code
+
+        Returns:
+            Translated text with the original line structure
+        """
+        source, target = language_code(source), language_code(target)
+        if source == target or not text or not text.strip():
+            return text
+        model_name, _ = self.model_for(source, target)
+        return self.memory.translate(
+            text, source, target,
+            lambda segments: self.translate_batch(segments, source, target),
+            engine=model_name,
+        )
+
+    async def translate_async(self, text: str, source: str, target: str) -> str:
+        """Run translate() on the dedicated translation thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.translate, text, source, target)
+
+    def warmup(self, pairs: List[Tuple[str, str]]):
+        """Load the models for the given pairs ahead of the first request"""
+        for source, target in pairs:
+            self._executor.submit(self._load, self.model_for(source, target)[0])
+
+
+_engine: Optional[TranslationEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_translation_engine() -> TranslationEngine:
+    """Return the shared translation engine"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = TranslationEngine()
+        return _engine
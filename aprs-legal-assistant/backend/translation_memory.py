@@ -0,0 +1,252 @@
+"""
+Translation memory for Telugu↔English (and other) segments.
+
+Text is split into lines and sentences; each normalized sentence is looked up
+exactly in an in-memory LRU backed by SQLite. Only the misses are sent to the
+translator (in one batch), the results are stored, and the translation is
+reassembled in the original order and line structure. Legal boilerplate,
+disclaimers and common questions are therefore translated once.
+"""
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.text_segmentation import split_sentences
+
+logger = logging.getLogger("translation_memory")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DEFAULT_DB_PATH = os.getenv("TRANSLATION_MEMORY_DB", os.path.join(DATA_DIR, "translation_memory.sqlite"))
+DEFAULT_MAX_MEMORY_ENTRIES = int(os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", "20000"))
+
+TranslateFn = Callable[[List[str]], List[str]]
+AsyncTranslateFn = Callable[[List[str]], Awaitable[List[str]]]
+
+
+def normalize_segment(text: str) -> str:
+    """Unicode-normalize a segment and collapse whitespace"""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def segment_text(text: str) -> List[List[str]]:
+    """
+    Split text into lines of normalized sentences.
+
+    Args:
+        text: Text to segment
+
+    Returns:
+        One list of sentences per input line (empty list for blank lines)
+    """
+    return [[normalize_segment(s) for s in split_sentences(line)] for line in (text or "").split("\n")]
+
+
+class TranslationMemory:
+    """Exact-match segment cache with an LRU front and a SQLite store"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_memory_entries: int = DEFAULT_MAX_MEMORY_ENTRIES):
+        """
+        Initialize the translation memory.
+
+        Args:
+            db_path: SQLite database file
+            max_memory_entries: Number of segments kept in the in-memory LRU
+        """
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS segments (
+                key TEXT PRIMARY KEY,
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                source_text TEXT NOT NULL,
+                target_text TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(segment: str, source: str, target: str, engine: str) -> str:
+        """Content address of a normalized segment for a language pair and engine"""
+        payload = "\x1f".join([source.lower(), target.lower(), engine, segment])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --------------------------------------------------------------- lookups
+
+    def lookup(self, segments: Sequence[str], source: str, target: str, engine: str = "default") -> List[Optional[str]]:
+        """
+        Look up normalized segments.
+
+        Args:
+            segments: Normalized source segments
+            source: Source language code
+            target: Target language code
+            engine: Translator identifier (translations from different engines are kept apart)
+
+        Returns:
+            Translation per segment, None for misses
+        """
+        keys = [self.key_for(segment, source, target, engine) for segment in segments]
+        results: Dict[str, str] = {}
+        missing: List[str] = []
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    results[key] = self._memory[key]
+                elif key not in missing:
+                    missing.append(key)
+
+            if missing:
+                now = time.time()
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._conn.execute(
+                        f"SELECT key, target_text FROM segments WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    for key, target_text in rows:
+                        results[key] = target_text
+                        self._remember(key, target_text)
+                    if rows:
+                        self._conn.executemany(
+                            "UPDATE segments SET hits = hits + 1, last_used = ? WHERE key = ?",
+                            [(now, key) for key, _ in rows],
+                        )
+                self._conn.commit()
+
+        found = [results.get(key) for key in keys]
+        hit_count = sum(1 for value in found if value is not None)
+        self.hits += hit_count
+        self.misses += len(found) - hit_count
+        return found
+
+    def store(self, pairs: Sequence[Tuple[str, str]], source: str, target: str, engine: str = "default"):
+        """
+        Store translated segments.
+
+        Args:
+            pairs: (normalized source segment, translation) tuples
+            source: Source language code
+            target: Target language code
+            engine: Translator identifier
+        """
+        now = time.time()
+        rows = [
+            (self.key_for(segment, source, target, engine), source.lower(), target.lower(), engine,
+             segment, translation, now, now)
+            for segment, translation in pairs if segment and translation
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO segments
+                    (key, source_lang, target_lang, engine, source_text, target_text, hits, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)
+                """,
+                rows,
+            )
+            self._conn.commit()
+            for row in rows:
+                self._remember(row[0], row[5])
+
+    # ----------------------------------------------------------- translation
+
+    def translate(self, text: str, source: str, target: str, translate_fn: TranslateFn,
+                  engine: str = "default") -> str:
+        """
+        Translate text, sending only uncached segments to the translator.
+
+        Args:
+            text: Text to translate
+            source: Source language code
+            target: Target language code
+            translate_fn: Translates a list of segments, returning a list of the same length
+            engine: Translator identifier
+
+        Returns:
+            Translated text with the original line structure
+        """
+        lines, segments, cached = self._prepare(text, source, target, engine)
+        misses = self._misses(segments, cached)
+        translations = list(translate_fn(misses)) if misses else []
+        return self._finish(lines, segments, cached, misses, translations, source, target, engine)
+
+    async def translate_async(self, text: str, source: str, target: str, translate_fn: AsyncTranslateFn,
+                              engine: str = "default") -> str:
+        """Async variant of translate() for coroutine translators; SQLite reads and writes run in a thread"""
+        lines, segments, cached = await asyncio.to_thread(self._prepare, text, source, target, engine)
+        misses = self._misses(segments, cached)
+        translations = list(await translate_fn(misses)) if misses else []
+        return await asyncio.to_thread(self._finish, lines, segments, cached, misses, translations, source, target, engine)
+
+    def _prepare(self, text: str, source: str, target: str, engine: str):
+        lines = segment_text(text)
+        segments = [segment for line in lines for segment in line]
+        cached = self.lookup(segments, source, target, engine) if segments else []
+        return lines, segments, cached
+
+    @staticmethod
+    def _misses(segments: List[str], cached: List[Optional[str]]) -> List[str]:
+        # Each distinct miss is translated once
+        return list(dict.fromkeys(segment for segment, hit in zip(segments, cached) if hit is None))
+
+    def _finish(self, lines, segments, cached, misses, translations, source, target, engine) -> str:
+        if len(translations) != len(misses):
+            raise ValueError(f"Translator returned {len(translations)} results for {len(misses)} segments")
+        translated = dict(zip(misses, translations))
+        self.store(list(translated.items()), source, target, engine)
+
+        merged = iter(hit if hit is not None else translated[segment] for segment, hit in zip(segments, cached))
+        return "\n".join(" ".join(next(merged) for _ in line) for line in lines)
+
+    # ---------------------------------------------------------------- helpers
+
+    def _remember(self, key: str, translation: str):
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and store size"""
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory), "stored_segments": stored}
+
+
+_memory_instance: Optional[TranslationMemory] = None
+_memory_lock = threading.Lock()
+
+
+def get_translation_memory() -> TranslationMemory:
+    """Return the shared translation memory"""
+    global _memory_instance
+    with _memory_lock:
+        if _memory_instance is None:
+            _memory_instance = TranslationMemory()
+        return _memory_instance
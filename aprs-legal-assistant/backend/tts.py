@@ -1,10 +1,17 @@
 import os
 import tempfile
 import uuid
-from typing import Optional
+from typing import List, Optional
 from fastapi import UploadFile
 import asyncio
 
+from audio_codecs import TTS_DELIVERY_CODEC, codec_extension, transcode
+from tts_cache import get_tts_cache, load_phrases
+
+# int8 Linear layers on CPU; off by default because the attention alignment
+# of Tacotron is sensitive to it (listen before enabling)
+TTS_QUANTIZE_INT8 = os.getenv("TTS_QUANTIZE_INT8", "false").lower() == "true"
+
 # For offline TTS
 try:
     import torch
@@ -25,13 +32,26 @@ class TextToSpeech:
         """Initialize the TTS system using Coqui TTS."""
         self.data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
         self.audio_dir = os.path.join(self.data_dir, "audio")
-        os.makedirs(self.audio_dir, exist_ok=True)
+        # Raw synthesis output lives outside the top level of data/audio,
+        # which AudioStore.compact() re-encodes and evicts
+        self.work_dir = os.path.join(self.audio_dir, "tts_tmp")
+        os.makedirs(self.work_dir, exist_ok=True)
+        
+        # Synthesized audio is cached by (text, voice, language, speed),
+        # encoded with the delivery codec (Opus by default)
+        self.model_name = "tts_models/en/ljspeech/tacotron2-DDC"
+        self.codec = TTS_DELIVERY_CODEC
+        namespace = "coqui" if self.codec == "wav" else f"coqui-{self.codec}"
+        self.cache = get_tts_cache(namespace, extension=codec_extension(self.codec))
         
         # Initialize TTS model
         self.tts_initialized = False
         try:
             # Use Coqui TTS
-            self.tts = TTS("tts_models/en/ljspeech/tacotron2-DDC")
+            self.tts = TTS(self.model_name)
+            if TTS_QUANTIZE_INT8 and not torch.cuda.is_available():
+                from backend.model_optimizer import quantize_dynamic_int8
+                self.tts.synthesizer.tts_model = quantize_dynamic_int8(self.tts.synthesizer.tts_model)
             self.tts_initialized = True
             print("TTS system initialized successfully")
         except Exception as e:
@@ -46,19 +66,61 @@ class TextToSpeech:
             language: Language of the text
             
         Returns:
-            Path to the generated audio file
+            Path to the generated audio file (encoded with TTS_DELIVERY_CODEC)
         """
+        # Serve repeated phrases straight from the cache
+        key = self.cache.key_for(text, self.model_name, language)
+        cached_path = self.cache.get_path(key)
+        if cached_path:
+            return cached_path
+        
         if not self.tts_initialized:
             raise Exception("TTS system not initialized")
         
         # Generate a unique filename
         filename = f"{uuid.uuid4()}.wav"
-        output_path = os.path.join(self.audio_dir, filename)
+        output_path = os.path.join(self.work_dir, filename)
         
         # Run TTS in a separate thread to avoid blocking
         await asyncio.to_thread(self._generate_speech_sync, text, output_path, language)
         
-        return output_path
+        metadata = {"text": text, "language": language}
+        if self.codec == "wav":
+            return self.cache.put_file(key, output_path, metadata)
+        
+        # Keep only the compressed encoding
+        try:
+            with open(output_path, "rb") as f:
+                encoded = await asyncio.to_thread(transcode, f.read(), self.codec)
+        finally:
+            os.remove(output_path)
+        return self.cache.put(key, encoded, metadata)
+    
+    async def prepopulate_cache(self, phrases: Optional[List[str]] = None, language: str = "english") -> int:
+        """
+        Synthesize frequently used phrases ahead of time.
+        
+        Args:
+            phrases: Phrases to cache (defaults to the TTS_CACHE_PHRASES file)
+            language: Language of the phrases
+            
+        Returns:
+            Number of phrases newly added to the cache
+        """
+        if not self.tts_initialized:
+            return 0
+        
+        phrases = phrases if phrases is not None else load_phrases()
+        added = 0
+        for phrase in phrases:
+            try:
+                key = self.cache.key_for(phrase, self.model_name, language)
+                if self.cache.get_path(key) is None:
+                    await self.generate_speech(phrase, language)
+                    added += 1
+            except Exception as e:
+                print(f"Error pre-populating TTS cache: {e}")
+        return added
     
     def _generate_speech_sync(self, text: str, output_path: str, language: str):
         """
@@ -0,0 +1,383 @@
+"""
+Content-addressed cache for synthesized speech.
+
+Every TTS engine in the backend (Coqui in tts.py, XTTS-v2 in xtts_service.py and
+the Bhashini pipeline in bhashini_voice.py) re-synthesizes the same disclaimers,
+greetings and persona lines over and over. This module stores the encoded audio
+on disk under a hash of (text, voice, language, speed) and keeps the hottest
+entries in an in-memory LRU so repeated requests never touch the model.
+"""
+import os
+import json
+import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("tts_cache")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DEFAULT_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(DATA_DIR, "audio", "tts_cache"))
+DEFAULT_MAX_DISK_MB = float(os.getenv("TTS_CACHE_MAX_DISK_MB", "512"))
+DEFAULT_MAX_MEMORY_MB = float(os.getenv("TTS_CACHE_MAX_MEMORY_MB", "64"))
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different strings share a cache entry."""
+    return " ".join((text or "").split())
+
+
+class _MemoryEntry:
+    """Encoded audio held in the in-memory LRU."""
+
+    __slots__ = ("data", "metadata", "b64")
+
+    def __init__(self, data: bytes, metadata: Dict[str, Any]):
+        self.data = data
+        self.metadata = metadata
+        self.b64: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.data) + (len(self.b64) if self.b64 else 0)
+
+
+class TTSCache:
+    def __init__(
+        self,
+        namespace: str = "default",
+        cache_dir: Optional[str] = None,
+        extension: str = ".wav",
+        max_disk_mb: Optional[float] = None,
+        max_memory_mb: Optional[float] = None,
+    ):
+        """
+        Initialize a TTS cache namespace.
+
+        Args:
+            namespace: Sub-directory for one engine/output format (e.g. "xtts")
+            cache_dir: Root cache directory (defaults to data/audio/tts_cache)
+            extension: File extension of the stored audio
+            max_disk_mb: Disk budget for this namespace before eviction
+            max_memory_mb: Budget for the in-memory LRU of encoded bytes
+        """
+        self.namespace = namespace
+        self.cache_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, namespace)
+        self.extension = extension if extension.startswith(".") else f".{extension}"
+        self.max_disk_bytes = int((DEFAULT_MAX_DISK_MB if max_disk_mb is None else max_disk_mb) * 1024 * 1024)
+        self.max_memory_bytes = int((DEFAULT_MAX_MEMORY_MB if max_memory_mb is None else max_memory_mb) * 1024 * 1024)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._memory: "OrderedDict[str, _MemoryEntry]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = self._scan_disk_usage()
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------ keys
+
+    def key_for(self, text: str, voice: str = "default", language: str = "en", speed: float = 1.0) -> str:
+        """
+        Build the content address for a synthesis request.
+
+        Args:
+            text: Text that is (or will be) synthesized
+            voice: Voice / persona / speaker identifier
+            language: Language code of the text
+            speed: Playback speed factor
+
+        Returns:
+            Hex digest identifying the audio
+        """
+        payload = json.dumps(
+            [normalize_text(text), (voice or "default").lower(), (language or "").lower(), round(float(speed), 3)],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        """Return the on-disk location for a cache key."""
+        return os.path.join(self.cache_dir, f"{key}{self.extension}")
+
+    def _metadata_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    # --------------------------------------------------------------- lookups
+
+    def get_path(self, key: str) -> Optional[str]:
+        """
+        Return the path of a cached file, refreshing its eviction age.
+
+        Args:
+            key: Cache key from key_for()
+
+        Returns:
+            Path to the cached audio, or None on a miss
+        """
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        self._touch(path)
+        return path
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Return cached audio bytes, serving from memory when possible."""
+        entry = self._get_entry(key)
+        return entry.data if entry else None
+
+    def get_base64(self, key: str) -> Optional[str]:
+        """Return cached audio as base64, encoding it at most once per entry."""
+        entry = self._get_entry(key)
+        if entry is None:
+            return None
+        with self._lock:
+            if entry.b64 is None:
+                entry.b64 = base64.b64encode(entry.data).decode("utf-8")
+                if key in self._memory:
+                    self._memory_bytes += len(entry.b64)
+                    self._evict_memory()
+            return entry.b64
+
+    def get_metadata(self, key: str) -> Dict[str, Any]:
+        """Return the metadata stored alongside a cached entry."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                return dict(entry.metadata)
+        return self._read_metadata(key)
+
+    def _get_entry(self, key: str) -> Optional[_MemoryEntry]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            logger.warning(f"Could not read cached audio {path}: {e}")
+            return None
+
+        entry = _MemoryEntry(data, self._read_metadata(key))
+        self._remember(key, entry)
+        return entry
+
+    # ---------------------------------------------------------------- stores
+
+    def put(self, key: str, audio: bytes, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Store encoded audio under a cache key.
+
+        Args:
+            key: Cache key from key_for()
+            audio: Encoded audio bytes
+            metadata: Optional JSON-serializable details (duration, text, ...)
+
+        Returns:
+            Path of the cached file
+        """
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        self._commit(key, tmp_path, path, len(audio), metadata)
+        self._remember(key, _MemoryEntry(audio, dict(metadata or {})))
+        return path
+
+    def put_file(self, key: str, src_path: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Move an already-written audio file into the cache.
+
+        Args:
+            key: Cache key from key_for()
+            src_path: File produced by the TTS engine (moved, not copied)
+            metadata: Optional JSON-serializable details
+
+        Returns:
+            Path of the cached file
+        """
+        path = self.path_for(key)
+        self._commit(key, src_path, path, os.path.getsize(src_path), metadata)
+        return path
+
+    def _commit(self, key: str, src_path: str, path: str, size: int, metadata: Optional[Dict[str, Any]]):
+        if metadata:
+            with open(self._metadata_path(key), "w", encoding="utf-8") as f:
+                json.dump(metadata, f, ensure_ascii=False)
+        with self._lock:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(src_path, path)
+            self._disk_bytes += size - previous
+            self._evict_disk()
+
+    def prepopulate(
+        self,
+        phrases: Iterable[str],
+        synthesize: Callable[[str], Any],
+        voice: str = "default",
+        language: str = "en",
+        speed: float = 1.0,
+    ) -> int:
+        """
+        Synthesize and cache a list of frequently used phrases.
+
+        Args:
+            phrases: Texts to warm the cache with
+            synthesize: Callable returning audio bytes, or (bytes, metadata), for a text
+            voice: Voice identifier used in the cache key
+            language: Language code used in the cache key
+            speed: Speed factor used in the cache key
+
+        Returns:
+            Number of phrases newly synthesized
+        """
+        added = 0
+        for phrase in phrases:
+            key = self.key_for(phrase, voice, language, speed)
+            if os.path.exists(self.path_for(key)):
+                continue
+            try:
+                result = synthesize(phrase)
+                audio, metadata = result if isinstance(result, tuple) else (result, None)
+                self.put(key, audio, metadata)
+                added += 1
+            except Exception as e:
+                logger.warning(f"Could not pre-populate TTS cache for '{phrase[:40]}': {e}")
+        logger.info(f"Pre-populated {added} phrases into TTS cache '{self.namespace}'")
+        return added
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current usage."""
+        with self._lock:
+            return {
+                "namespace": self.namespace,
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    # -------------------------------------------------------------- internals
+
+    def _read_metadata(self, key: str) -> Dict[str, Any]:
+        metadata_path = self._metadata_path(key)
+        if not os.path.exists(metadata_path):
+            return {}
+        try:
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Corrupt TTS cache metadata {metadata_path}: {e}")
+            return {}
+
+    def _remember(self, key: str, entry: _MemoryEntry):
+        if entry.size > self.max_memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= old.size
+            self._memory[key] = entry
+            self._memory_bytes += entry.size
+            self._evict_memory()
+
+    def _evict_memory(self):
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, entry = self._memory.popitem(last=False)
+            self._memory_bytes -= entry.size
+
+    def _scan_disk_usage(self) -> int:
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(self.extension):
+                total += os.path.getsize(os.path.join(self.cache_dir, name))
+        return total
+
+    def _evict_disk(self):
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(self.extension):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, name))
+        files.sort()
+
+        # Evict down to 90% of the budget so we don't rescan on every put
+        target = int(self.max_disk_bytes * 0.9)
+        for _, size, name in files:
+            if self._disk_bytes <= target:
+                break
+            key = name[: -len(self.extension)]
+            for stale in (os.path.join(self.cache_dir, name), self._metadata_path(key)):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+            self._disk_bytes -= size
+            entry = self._memory.pop(key, None)
+            if entry is not None:
+                self._memory_bytes -= entry.size
+        logger.info(f"Evicted TTS cache '{self.namespace}' down to {self._disk_bytes} bytes")
+
+    @staticmethod
+    def _touch(path: str):
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+
+_caches: Dict[str, TTSCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_tts_cache(namespace: str, extension: str = ".wav") -> TTSCache:
+    """
+    Return the shared cache for a namespace, creating it on first use.
+
+    Args:
+        namespace: Engine/output format name (e.g. "xtts", "coqui", "bhashini-te")
+        extension: File extension of the stored audio
+
+    Returns:
+        TTSCache instance
+    """
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = TTSCache(namespace=namespace, extension=extension)
+            _caches[namespace] = cache
+        return cache
+
+
+def load_phrases(path: Optional[str] = None) -> List[str]:
+    """
+    Load pre-population phrases, one per line.
+
+    Args:
+        path: Phrase file; defaults to the TTS_CACHE_PHRASES environment variable
+
+    Returns:
+        List of non-empty, non-comment lines
+    """
+    path = path or os.getenv("TTS_CACHE_PHRASES")
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
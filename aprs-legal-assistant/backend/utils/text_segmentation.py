@@ -0,0 +1,87 @@
+"""
+Sentence segmentation shared by the voice and translation pipelines.
+
+Handles English and Indic punctuation (the devanagari danda "।" and "॥" are
+used in Hindi/Marathi text and frequently in Telugu output from translators).
+"""
+import re
+from typing import List
+
+# Sentence-ending punctuation followed by whitespace, or a danda anywhere
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?।॥])\s+|(?<=[।॥])")
+
+# Abbreviations common in legal text that should not end a sentence
+_ABBREVIATIONS = {
+    "sec", "secs", "s", "ss", "art", "arts", "no", "nos", "vs", "v", "u/s", "r/w",
+    "mr", "mrs", "ms", "dr", "hon'ble", "st", "ltd", "pvt", "co", "govt", "etc",
+    "i.e", "e.g", "viz", "cl", "sub", "para", "paras", "ors", "anr", "j", "cj",
+}
+
+
+def split_sentences(text: str, max_chars: int = 0) -> List[str]:
+    """
+    Split text into sentences.
+
+    Args:
+        text: Text to split
+        max_chars: If set, sentences longer than this are further split on
+            commas/semicolons and then on whitespace so no piece exceeds it
+
+    Returns:
+        List of non-empty sentences with surrounding whitespace stripped
+    """
+    if not text or not text.strip():
+        return []
+
+    pieces = [p.strip() for p in _SENTENCE_BOUNDARY.split(text.strip()) if p and p.strip()]
+
+    # Re-join pieces that were split after an abbreviation ("Sec. 420 of IPC")
+    sentences: List[str] = []
+    for piece in pieces:
+        if sentences and _ends_with_abbreviation(sentences[-1]):
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+
+    if max_chars and max_chars > 0:
+        sentences = [part for sentence in sentences for part in _split_long(sentence, max_chars)]
+
+    return sentences
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split text on blank lines or single newlines, dropping empty lines."""
+    return [line.strip() for line in (text or "").splitlines() if line.strip()]
+
+
+def _ends_with_abbreviation(sentence: str) -> bool:
+    if not sentence.endswith("."):
+        return False
+    last_word = sentence.rstrip(".").split()[-1].lower() if sentence.rstrip(".").split() else ""
+    return last_word in _ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha())
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    if len(sentence) <= max_chars:
+        return [sentence]
+
+    parts: List[str] = []
+    current = ""
+    for clause in re.split(r"(?<=[,;:])\s+", sentence):
+        if len(clause) > max_chars:
+            # Fall back to word boundaries for very long clauses
+            for word in clause.split():
+                if current and len(current) + len(word) + 1 > max_chars:
+                    parts.append(current)
+                    current = word
+                else:
+                    current = f"{current} {word}".strip()
+            continue
+        if current and len(current) + len(clause) + 1 > max_chars:
+            parts.append(current)
+            current = clause
+        else:
+            current = f"{current} {clause}".strip()
+    if current:
+        parts.append(current)
+    return parts
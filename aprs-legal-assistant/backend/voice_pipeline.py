@@ -0,0 +1,548 @@
+"""
+Voice conversation pipeline: ASR -> retrieval -> LLM -> translation -> TTS
+in one process, over one WebSocket, with the stages overlapped.
+
+A spoken question used to take three round trips (/nemo_transcribe or
+/api/voice-query, then /chat or /rag, then /tts), each waiting for the
+previous one to finish completely. Here the client streams its recording
+and, once it signals the end of speech:
+  - the final transcript and its English translation go straight to
+    retrieval,
+  - the LLM answer is streamed and cut into sentences as it arrives,
+  - every sentence is translated and synthesized while the LLM keeps
+    generating, and its audio is sent as soon as it is ready, in order.
+Every answer ends with per-stage timings (start/end offsets from the end of
+speech, so overlap is visible) and the time to first audio, which should
+stay under VOICE_TTFA_TARGET_MS; /api/voice-conversation/stats aggregates
+them.
+
+Protocol (WebSocket /api/voice-conversation), repeatable per connection:
+    client: {"type": "start", "language": "te"}    optional; te or en, default te
+    client: binary frames                           the recording, any format decode_audio reads
+    client: {"type": "end"}                         end of speech
+        or  {"type": "text", "text": "..."}         typed question instead of audio
+    server: {"type": "transcript", "text": ..., "english": ...}
+    server: {"type": "sentence", "index": i, "english": ..., "text": ...}
+    server: {"type": "audio", "index": i, "media_type": ..., "bytes": n}, then one binary frame
+    server: {"type": "done", "timings": {...}}
+    server: {"type": "error", "stage": ..., "detail": ..., "timings": {...}}
+
+Neither ASR model produces interim hypotheses, so transcription starts at
+the end of speech; everything after it is pipelined.
+"""
+import os
+import re
+import json
+import time
+import base64
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import aclosing, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+
+from audio_codecs import CODECS, codec_media_type, sniff_format
+from backend.translation_engine import get_translation_engine, language_code
+from tts_cache import load_phrases
+
+router = APIRouter()
+logger = logging.getLogger("voice_pipeline")
+
+VOICE_TTFA_TARGET_MS = float(os.getenv("VOICE_TTFA_TARGET_MS", "3000"))
+# Sentences translated and synthesized at once while the LLM generates
+VOICE_TTS_CONCURRENCY = int(os.getenv("VOICE_TTS_CONCURRENCY", "2"))
+# Shorter pieces are merged with the next sentence ("1.", "Sec.")
+VOICE_MIN_SENTENCE_CHARS = int(os.getenv("VOICE_MIN_SENTENCE_CHARS", "24"))
+# Longer runs without a sentence end are cut at a comma or space
+VOICE_MAX_SENTENCE_CHARS = int(os.getenv("VOICE_MAX_SENTENCE_CHARS", "240"))
+VOICE_MAX_AUDIO_MB = float(os.getenv("VOICE_MAX_AUDIO_MB", "10"))
+# auto: local NeMo model for Telugu when it loads, Bhashini otherwise
+VOICE_ASR = os.getenv("VOICE_ASR", "auto").lower()
+# bhashini or local (translation_engine.py)
+VOICE_TRANSLATION_ENGINE = os.getenv("VOICE_TRANSLATION_ENGINE", "bhashini").lower()
+# Load the RAG models at startup instead of on the first question
+VOICE_PIPELINE_PRELOAD = os.getenv("VOICE_PIPELINE_PRELOAD", "true").lower() == "true"
+
+SUPPORTED_LANGUAGES = ("te", "en")
+
+_SENTENCE_END = re.compile(r"[.!?।]+[\"')\]]*\s+")
+_REPORT_WINDOW = 200
+
+Transcriber = Callable[[bytes, str], Awaitable[Tuple[str, Optional[str]]]]
+Retriever = Callable[[str], Awaitable[str]]
+Generator = Callable[[str, str], AsyncIterator[str]]
+Translator = Callable[[str, str, str], Awaitable[str]]
+Synthesizer = Callable[[str, str], Awaitable[Tuple[bytes, str]]]
+
+
+class StageError(Exception):
+    """A pipeline stage failed"""
+
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class StageTimer:
+    """Start/end offsets and busy time of each stage, relative to the start of the request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.marks: Dict[str, float] = {}
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time one run of a stage; stages that run several times (per sentence) accumulate"""
+        start = self.elapsed_ms()
+        try:
+            yield
+        except StageError:
+            raise
+        except Exception as e:
+            raise StageError(name, e) from e
+        finally:
+            end = self.elapsed_ms()
+            record = self.stages.setdefault(name, {"start_ms": start, "end_ms": end, "busy_ms": 0.0, "count": 0})
+            record["start_ms"] = min(record["start_ms"], start)
+            record["end_ms"] = max(record["end_ms"], end)
+            record["busy_ms"] += end - start
+            record["count"] += 1
+
+    def mark(self, name: str):
+        """Record the first time something happened"""
+        self.marks.setdefault(name, self.elapsed_ms())
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "stages": {name: {key: round(value, 1) for key, value in record.items()}
+                       for name, record in self.stages.items()},
+            **{f"{name}_ms": round(value, 1) for name, value in self.marks.items()},
+            "total_ms": round(self.elapsed_ms(), 1),
+        }
+
+
+def split_sentences(buffer: str, min_chars: int = VOICE_MIN_SENTENCE_CHARS,
+                    max_chars: int = VOICE_MAX_SENTENCE_CHARS) -> Tuple[List[str], str]:
+    """
+    Cut the complete sentences off streamed text.
+
+    Args:
+        buffer: Text received so far that has not been emitted
+        min_chars: Shorter pieces are kept together with the next sentence
+        max_chars: Longer text without a sentence end is cut at a comma or space
+
+    Returns:
+        Tuple of (complete sentences, remaining text)
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(buffer):
+        if match.end() - start >= min_chars:
+            sentences.append(buffer[start:match.end()].strip())
+            start = match.end()
+    rest = buffer[start:]
+    while len(rest) > max_chars:
+        cut = rest.rfind(", ", 0, max_chars)
+        cut = cut + 1 if cut > 0 else rest.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        sentences.append(rest[:cut].strip())
+        rest = rest[cut:].lstrip()
+    return [sentence for sentence in sentences if sentence], rest
+
+
+class VoicePipeline:
+    """Runs one spoken question through all stages, overlapping generation, translation and TTS"""
+
+    def __init__(self, transcribe: Transcriber, retrieve: Retriever, generate: Generator,
+                 translate: Translator, synthesize: Synthesizer, tts_concurrency: int = VOICE_TTS_CONCURRENCY):
+        """
+        Args:
+            transcribe: (audio, language) -> (transcript, English translation
+                or None to translate it separately)
+            retrieve: English query -> context for the prompt
+            generate: (English query, context) -> stream of English text chunks
+            translate: (text, source, target) -> translated text
+            synthesize: (text, language) -> (audio bytes, media type)
+            tts_concurrency: Sentences translated and synthesized at once
+        """
+        self.transcribe = transcribe
+        self.retrieve = retrieve
+        self.generate = generate
+        self.translate = translate
+        self.synthesize = synthesize
+        self.tts_concurrency = max(1, tts_concurrency)
+        self._reports: deque = deque(maxlen=_REPORT_WINDOW)
+        self.counters = {"requests": 0, "errors": 0}
+
+    async def run(self, language: str, audio: Optional[bytes] = None,
+                  text: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Answer one question.
+
+        Args:
+            language: Language spoken by the user and of the answer ("te" or "en")
+            audio: Recording of the question
+            text: Typed question (used when there is no audio)
+
+        Yields:
+            Protocol events; "audio" events carry the audio bytes under "audio"
+        """
+        timer = StageTimer()
+        self.counters["requests"] += 1
+        try:
+            async for event in self._run(timer, language_code(language), audio, text):
+                yield event
+        except StageError as e:
+            self.counters["errors"] += 1
+            logger.error(f"Voice pipeline failed in {e.stage}: {e.error}")
+            yield {"type": "error", "stage": e.stage, "detail": str(e.error), "timings": timer.report()}
+            return
+        report = timer.report()
+        self._reports.append(report)
+        logger.info(f"Voice answer: first audio {report.get('first_audio_ms')} ms, total {report['total_ms']} ms")
+        yield {"type": "done", "timings": report}
+
+    async def _run(self, timer: StageTimer, language: str, audio: Optional[bytes],
+                   text: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+        if language not in SUPPORTED_LANGUAGES:
+            raise StageError("input", ValueError(f"Unsupported language: {language}"))
+        english = None
+        if audio:
+            with timer.stage("asr"):
+                transcript, english = await self.transcribe(audio, language)
+        elif text and text.strip():
+            transcript = text.strip()
+        else:
+            raise StageError("input", ValueError("No audio or text received"))
+        if english is None:
+            if language == "en":
+                english = transcript
+            else:
+                with timer.stage("query_translation"):
+                    english = await self.translate(transcript, language, "en")
+        yield {"type": "transcript", "text": transcript, "english": english}
+
+        # Retrieval starts on the final transcript, without another round trip
+        with timer.stage("retrieval"):
+            context = await self.retrieve(english)
+
+        slots = asyncio.Semaphore(self.tts_concurrency)
+        # Translation/TTS tasks in sentence order; None ends the answer
+        speaking: asyncio.Queue = asyncio.Queue()
+
+        async def speak(sentence: str) -> Tuple[str, bytes, str]:
+            async with slots:
+                spoken = sentence
+                if language != "en":
+                    with timer.stage("translation"):
+                        spoken = await self.translate(sentence, "en", language)
+                with timer.stage("tts"):
+                    audio_bytes, media_type = await self.synthesize(spoken, language)
+            return spoken, audio_bytes, media_type
+
+        async def produce():
+            try:
+                buffer = ""
+                with timer.stage("llm"):
+                    async for chunk in self.generate(english, context):
+                        timer.mark("llm_first_token")
+                        sentences, buffer = split_sentences(buffer + chunk)
+                        for sentence in sentences:
+                            timer.mark("first_sentence")
+                            speaking.put_nowait((sentence, asyncio.create_task(speak(sentence))))
+                if buffer.strip():
+                    timer.mark("first_sentence")
+                    speaking.put_nowait((buffer.strip(), asyncio.create_task(speak(buffer.strip()))))
+            finally:
+                speaking.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        index = 0
+        try:
+            while True:
+                item = await speaking.get()
+                if item is None:
+                    break
+                sentence, task = item
+                try:
+                    spoken, audio_bytes, media_type = await task
+                except StageError as e:
+                    # One sentence failing does not end the answer
+                    logger.error(f"Voice pipeline: {e}")
+                    yield {"type": "error", "stage": e.stage, "detail": str(e.error), "index": index}
+                    yield {"type": "sentence", "index": index, "english": sentence, "text": sentence}
+                    index += 1
+                    continue
+                timer.mark("first_audio")
+                yield {"type": "sentence", "index": index, "english": sentence, "text": spoken}
+                yield {"type": "audio", "index": index, "media_type": media_type, "bytes": len(audio_bytes),
+                       "audio": audio_bytes}
+                index += 1
+            await producer
+        finally:
+            producer.cancel()
+            while not speaking.empty():
+                item = speaking.get_nowait()
+                if item is not None:
+                    item[1].cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Time to first audio and per-stage busy time over recent answers (ms)"""
+        reports = list(self._reports)
+
+        def percentile(values: List[float], p: float) -> Optional[float]:
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(p * len(values)))], 1) if values else None
+
+        first_audio = [report["first_audio_ms"] for report in reports if "first_audio_ms" in report]
+        stages = {}
+        for name in sorted({name for report in reports for name in report["stages"]}):
+            busy = [report["stages"][name]["busy_ms"] for report in reports if name in report["stages"]]
+            stages[name] = {"busy_p50": percentile(busy, 0.5), "busy_p95": percentile(busy, 0.95)}
+        return {
+            **self.counters,
+            "target_ms": VOICE_TTFA_TARGET_MS,
+            "first_audio_p50": percentile(first_audio, 0.5),
+            "first_audio_p95": percentile(first_audio, 0.95),
+            "within_target": (round(sum(ms <= VOICE_TTFA_TARGET_MS for ms in first_audio) / len(first_audio), 3)
+                              if first_audio else None),
+            "total_p50": percentile([report["total_ms"] for report in reports], 0.5),
+            "stages": stages,
+        }
+
+
+# ------------------------------------------------------------ default stages
+
+_legal_rag = None
+_local_asr = None
+_resource_lock = threading.Lock()
+
+
+def get_legal_rag():
+    """Return the LegalRAG instance used for voice answers (created on first use)"""
+    global _legal_rag
+    with _resource_lock:
+        if _legal_rag is None:
+            from backend.legal_rag import LegalRAG
+
+            _legal_rag = LegalRAG()
+        return _legal_rag
+
+
+def _get_local_asr():
+    """Local NeMo Telugu model, or False when it is unavailable"""
+    global _local_asr
+    with _resource_lock:
+        if _local_asr is None:
+            try:
+                from backend.local_telugu_asr import get_local_telugu_asr
+
+                asr = get_local_telugu_asr()
+                _local_asr = asr if asr.model is not None else False
+            except Exception as e:
+                logger.warning(f"Local Telugu ASR unavailable, using Bhashini: {e}")
+                _local_asr = False
+        return _local_asr
+
+
+async def transcribe_speech(audio: bytes, language: str) -> Tuple[str, Optional[str]]:
+    """Local NeMo model for Telugu when available, Bhashini otherwise (which also translates)"""
+    from bhashini_voice import speech_to_text_translate_english, speech_to_text_translate_telugu_to_english
+
+    if language == "te" and VOICE_ASR in ("auto", "local"):
+        asr = await asyncio.to_thread(_get_local_asr)
+        if asr:
+            return await asyncio.to_thread(asr.transcribe, audio), None
+    audio_b64 = base64.b64encode(audio).decode("ascii")
+    if language == "te":
+        return await speech_to_text_translate_telugu_to_english(audio_b64)
+    return await speech_to_text_translate_english(audio_b64)
+
+
+async def retrieve_context(query: str) -> str:
+    rag = await asyncio.to_thread(get_legal_rag)
+    return await rag.build_context(query)
+
+
+async def generate_answer(query: str, context: str) -> AsyncIterator[str]:
+    rag = await asyncio.to_thread(get_legal_rag)
+    async for chunk in rag.stream_legal_response(query, context):
+        yield chunk
+
+
+async def translate_text(text: str, source: str, target: str) -> str:
+    """Bhashini through the translation memory, or the local seq2seq engine"""
+    if VOICE_TRANSLATION_ENGINE == "local":
+        return await get_translation_engine().translate_async(text, source, target)
+    from bhashini_client import translation_task
+    from bhashini_voice import (EN_TE_TRANSLATION_TASK, TE_EN_TRANSLATION_TASK, translate_segments,
+                                translation_memory)
+
+    task = {("te", "en"): TE_EN_TRANSLATION_TASK, ("en", "te"): EN_TE_TRANSLATION_TASK}.get(
+        (source, target)) or translation_task(source, target)
+    return await translation_memory.translate_async(
+        text, source, target,
+        lambda segments: translate_segments(segments, source, target, task),
+        engine="bhashini",
+    )
+
+
+def _media_type(audio: bytes) -> str:
+    audio_format = sniff_format(audio) or "wav"
+    return codec_media_type(audio_format) if audio_format in CODECS else f"audio/{audio_format}"
+
+
+_english_tts = None
+_english_tts_lock = asyncio.Lock()
+
+
+async def get_english_tts():
+    """Return the local Coqui TextToSpeech, loading it in a thread on first use"""
+    global _english_tts
+    if _english_tts is None:
+        async with _english_tts_lock:
+            if _english_tts is None:
+                from tts import TextToSpeech
+
+                _english_tts = await asyncio.to_thread(TextToSpeech)
+    return _english_tts
+
+
+async def synthesize_speech(text: str, language: str) -> Tuple[bytes, str]:
+    """Bhashini TTS for Telugu, the local Coqui model for English; both cached"""
+    if language == "en":
+        tts = await get_english_tts()
+        path = await tts.generate_speech(text, "english")
+        with open(path, "rb") as f:
+            audio = f.read()
+        return audio, _media_type(audio)
+
+    from bhashini_voice import (BHASHINI_TTS_MODEL_ID, BHASHINI_TTS_SERVICE_ID, bhashini_client,
+                                telugu_tts_cache)
+
+    key = telugu_tts_cache.key_for(text, BHASHINI_TTS_MODEL_ID, language)
+    audio = telugu_tts_cache.get_bytes(key)
+    if audio is None:
+        audio_b64 = await bhashini_client.tts(text, language, service_id=BHASHINI_TTS_SERVICE_ID,
+                                              model_id=BHASHINI_TTS_MODEL_ID)
+        audio = base64.b64decode(audio_b64)
+        telugu_tts_cache.put(key, audio, {"telugu_text": text})
+    return audio, _media_type(audio)
+
+
+_pipeline: Optional[VoicePipeline] = None
+
+
+def get_voice_pipeline() -> VoicePipeline:
+    """Return the shared voice pipeline"""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = VoicePipeline(transcribe_speech, retrieve_context, generate_answer,
+                                  translate_text, synthesize_speech)
+    return _pipeline
+
+
+# -------------------------------------------------------------------- routes
+
+# Startup tasks are referenced until they finish so they are not garbage-collected
+_background_tasks: set = set()
+
+
+def _run_in_background(coro: Awaitable, name: str) -> asyncio.Task:
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+
+    def done(finished: asyncio.Task):
+        _background_tasks.discard(finished)
+        if not finished.cancelled() and finished.exception() is not None:
+            logger.error(f"Background task {name} failed: {finished.exception()}")
+
+    task.add_done_callback(done)
+    return task
+
+
+async def prepopulate_english_tts(phrases: List[str]):
+    """Synthesize the TTS_CACHE_PHRASES lines into the English TTS cache"""
+    try:
+        tts = await get_english_tts()
+        added = await tts.prepopulate_cache(phrases)
+        logger.info(f"Pre-populated English TTS cache with {added} new phrases")
+    except Exception as e:
+        logger.error(f"Could not pre-populate English TTS cache: {e}")
+
+
+@router.on_event("startup")
+async def preload_voice_pipeline():
+    if VOICE_PIPELINE_PRELOAD:
+        _run_in_background(asyncio.to_thread(get_legal_rag), "preload-legal-rag")
+    # Warm the English TTS cache with frequently repeated lines in the background
+    phrases = load_phrases()
+    if phrases:
+        _run_in_background(prepopulate_english_tts(phrases), "prepopulate-english-tts")
+
+
+@router.websocket("/voice-conversation")
+async def voice_conversation(websocket: WebSocket):
+    await websocket.accept()
+    pipeline = get_voice_pipeline()
+    language = "te"
+    audio = bytearray()
+    max_bytes = int(VOICE_MAX_AUDIO_MB * 1024 * 1024)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                if len(audio) + len(message["bytes"]) > max_bytes:
+                    audio.clear()
+                    await websocket.send_json({"type": "error", "stage": "input",
+                                               "detail": f"Recording exceeds {VOICE_MAX_AUDIO_MB:g} MB"})
+                    continue
+                audio.extend(message["bytes"])
+                continue
+
+            try:
+                data = json.loads(message.get("text") or "")
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                await websocket.send_json({"type": "error", "stage": "input", "detail": "Expected a JSON object"})
+                continue
+            kind = data.get("type")
+            if kind == "start":
+                language = data.get("language", language)
+                audio.clear()
+            elif kind in ("end", "text"):
+                events = pipeline.run(language, audio=bytes(audio) if kind == "end" else None, text=data.get("text"))
+                audio.clear()
+                # Closing the generator on a disconnect stops its stage tasks
+                async with aclosing(events):
+                    async for event in events:
+                        audio_bytes = event.pop("audio", None)
+                        await websocket.send_json(event)
+                        if audio_bytes is not None:
+                            await websocket.send_bytes(audio_bytes)
+            else:
+                await websocket.send_json({"type": "error", "stage": "input",
+                                           "detail": f"Unknown message type: {kind}"})
+    except WebSocketDisconnect:
+        pass
+
+
+@router.get("/voice-conversation/stats")
+async def voice_conversation_stats():
+    """
+    Time to first audio and per-stage timings of recent voice answers.
+    """
+    return JSONResponse(content=get_voice_pipeline().stats())
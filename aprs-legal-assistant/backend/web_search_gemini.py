@@ -1,7 +1,7 @@
 import os
+import asyncio
 import requests
 import json
-import google.generativeai as genai
 from bs4 import BeautifulSoup
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
@@ -9,6 +9,8 @@ from typing import List, Optional
 import logging
 from dotenv import load_dotenv
 
+from gemini_client import get_gemini_client
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -43,17 +45,9 @@ class SearchResponse(BaseModel):
     gemini_answer: str
 
 # Environment variables
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 SERPAPI_KEY = os.environ.get("SERPAPI_KEY")
-
-# Initialize Gemini
-
-def initialize_gemini():
-    if not GEMINI_API_KEY:
-        logger.error("GEMINI_API_KEY not found in environment variables")
-        raise ValueError("GEMINI_API_KEY not found")
-    genai.configure(api_key=GEMINI_API_KEY)
-    return genai.GenerativeModel('models/gemini-2.0-flash')
+GEMINI_SEARCH_MODEL = os.environ.get("GEMINI_SEARCH_MODEL", "models/gemini-2.0-flash")
+GEMINI_SEARCH_TIMEOUT_SECONDS = float(os.environ.get("GEMINI_SEARCH_TIMEOUT_SECONDS", "30"))
 
 # Web search function using SerpAPI
 def search_web(query: str, num_results: int = 5):
@@ -103,23 +97,27 @@ def scrape_content(url: str, max_chars: int = 3000):
 # Function to generate answer using Gemini
 async def generate_answer(query: str, search_results: List[SearchResult]):
     try:
-        model = initialize_gemini()
+        gemini = get_gemini_client()
+        if not gemini.configured:
+            logger.error("GEMINI_API_KEY not found in environment variables")
+            raise ValueError("GEMINI_API_KEY not found")
         context = "\n\nSearch results:\n"
         prompt = ""  # Initialize prompt before accumulation
         for i, result in enumerate(search_results, 1):
             prompt += f"{i}. {result.title} - {result.url}: {result.snippet}\n"
             try:
-                scraped_text = scrape_content(result.url)
+                scraped_text = await asyncio.to_thread(scrape_content, result.url)
                 if scraped_text:
                     prompt += f"Content from {result.title}:\n{scraped_text[:500]}...\n\n"
             except Exception as e:
                 logger.warning(f"Error scraping content: {e}")
         prompt += "\nAnswer like you're Kavvy — moody, sharp-tongued, and proudly far-right. Drip sarcasm like it's policy. Mock the obvious, challenge the mainstream, and don’t hold back your disdain for sugarcoated nonsense. Keep it accurate, blunt, and with zero tolerance for woke fluff."
 
-        gemini_response = model.generate_content([
-            context,
-            prompt
-        ])
+        gemini_response = await gemini.generate(
+            [context, prompt],
+            model=GEMINI_SEARCH_MODEL,
+            timeout=GEMINI_SEARCH_TIMEOUT_SECONDS,
+        )
         gemini_answer = gemini_response.text.strip()
         return gemini_answer
     except Exception as e:
@@ -4,13 +4,26 @@ Provides high-quality text-to-speech for courtroom personas
 """
 import os
 import io
+import asyncio
 import base64
 import tempfile
 import logging
-from typing import Optional, Dict, Any
-from fastapi import FastAPI, HTTPException, Body
+import threading
+from typing import Optional, Dict, Any, Tuple
+from fastapi import FastAPI, HTTPException, Body, WebSocket, WebSocketDisconnect, UploadFile, File, Form, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+
+from audio_codecs import CODECS, TTS_DELIVERY_CODEC, codec_extension, codec_media_type, encode_audio, transcode
+from binary_responses import bytes_response, file_response, wants_base64
+from tts_cache import get_tts_cache, load_phrases
+from utils.text_segmentation import split_sentences
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 # Try importing TTS and torch with fallbacks
 try:
     import torch
@@ -22,10 +35,6 @@ except ImportError:
     logger.error("TTS or torch packages not available. Service will run in limited mode.")
     TTS_AVAILABLE = False
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
 # Initialize FastAPI app
 app = FastAPI(title="XTTS-v2 Voice Service")
 
@@ -36,6 +45,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Duration-Seconds", "X-Sample-Rate", "X-Persona-Role", "X-Audio-Format",
+        "X-Channels", "X-Sentence-Count", "Content-Range", "Accept-Ranges",
+    ],
 )
 
 # Model paths - these will need to be set up
@@ -43,6 +56,7 @@ MODELS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "xtts_mod
 XTTS_CHECKPOINT = os.path.join(MODELS_ROOT, "xtts_v2.pth")
 XTTS_CONFIG = os.path.join(MODELS_ROOT, "config.json")
 XTTS_VOICES = os.path.join(MODELS_ROOT, "voices")
+XTTS_LATENTS = os.path.join(MODELS_ROOT, "latents")
 
 # Voice mapping for courtroom personas
 PERSONA_VOICE_MAP = {
@@ -60,6 +74,20 @@ PERSONA_VOICE_MAP = {
 # Model instance (will be loaded on first request)
 xtts_model = None
 
+# Speaker conditioning per voice file: {voice_file: (fingerprint, gpt_cond_latent, speaker_embedding)}
+speaker_latents: Dict[str, Tuple[Tuple[int, int], Any, Any]] = {}
+speaker_latents_lock = threading.Lock()
+
+# Synthesized audio caches keyed by (text, persona, language, speed); WAV
+# lives in "xtts", compressed codecs get their own namespace
+tts_cache = get_tts_cache("xtts")
+
+# Streaming output formats: raw PCM or one Ogg/Opus page stream per sentence
+STREAM_CODECS = {"pcm": "pcm_s16le", "opus": "ogg_opus"}
+
+# Longest sentence synthesized in one go by the streaming endpoints
+STREAM_MAX_SENTENCE_CHARS = int(os.getenv("XTTS_STREAM_MAX_SENTENCE_CHARS", "240"))
+
 class TTSRequest(BaseModel):
     """Request model for text-to-speech generation"""
     text: str
@@ -74,6 +102,7 @@ class TTSResponse(BaseModel):
     duration_seconds: float
     sample_rate: int
     persona_role: str
+    audio_format: str = "wav"
 
 def load_model():
     """Load the XTTS model if not already loaded"""
@@ -113,6 +142,9 @@ def load_model():
         xtts_model = model
         
         logger.info("XTTS-v2 model loaded successfully")
+        
+        # Compute conditioning for every persona once, up front
+        precompute_speaker_latents(model)
         return model
     except Exception as e:
         logger.error(f"Error loading XTTS model: {str(e)}")
@@ -129,6 +161,139 @@ def get_voice_path(persona_role: str) -> str:
         
     return voice_path
 
+def voice_fingerprint(voice_path: str) -> Tuple[int, int]:
+    """Identify a voice sample by modification time and size"""
+    stat = os.stat(voice_path)
+    return stat.st_mtime_ns, stat.st_size
+
+def voice_cache_id(persona_role: str) -> str:
+    """Persona identifier for the TTS cache that changes when its sample is replaced"""
+    voice_path = get_voice_path(persona_role)
+    if not os.path.exists(voice_path):
+        return persona_role
+    mtime_ns, size = voice_fingerprint(voice_path)
+    return f"{persona_role}@{os.path.basename(voice_path)}:{mtime_ns}:{size}"
+
+def _latents_path(voice_path: str) -> str:
+    return os.path.join(XTTS_LATENTS, f"{os.path.splitext(os.path.basename(voice_path))[0]}.pt")
+
+def get_speaker_latents(model, voice_path: str):
+    """
+    Return (gpt_cond_latent, speaker_embedding) for a voice sample.
+    
+    Looks in memory, then in the persisted latents directory, and only runs
+    the reference-audio encoder when neither matches the current sample.
+    """
+    voice_file = os.path.basename(voice_path)
+    fingerprint = voice_fingerprint(voice_path)
+    
+    with speaker_latents_lock:
+        cached = speaker_latents.get(voice_file)
+        if cached and cached[0] == fingerprint:
+            return cached[1], cached[2]
+        
+        device = next(model.parameters()).device
+        latents_path = _latents_path(voice_path)
+        if os.path.exists(latents_path):
+            try:
+                stored = torch.load(latents_path, map_location=device)
+                if tuple(stored["fingerprint"]) == fingerprint:
+                    speaker_latents[voice_file] = (fingerprint, stored["gpt_cond_latent"], stored["speaker_embedding"])
+                    return stored["gpt_cond_latent"], stored["speaker_embedding"]
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable speaker latents {latents_path}: {e}")
+        
+        logger.info(f"Computing speaker conditioning for {voice_file}")
+        with torch.no_grad():
+            gpt_cond_latent, speaker_embedding = model.get_conditioning_latents(audio_path=[voice_path])
+        
+        os.makedirs(XTTS_LATENTS, exist_ok=True)
+        torch.save({
+            "fingerprint": list(fingerprint),
+            "gpt_cond_latent": gpt_cond_latent.cpu(),
+            "speaker_embedding": speaker_embedding.cpu(),
+        }, latents_path)
+        speaker_latents[voice_file] = (fingerprint, gpt_cond_latent, speaker_embedding)
+        return gpt_cond_latent, speaker_embedding
+
+def invalidate_speaker_latents(voice_path: str):
+    """Drop in-memory and persisted conditioning for a voice sample"""
+    with speaker_latents_lock:
+        speaker_latents.pop(os.path.basename(voice_path), None)
+        try:
+            os.remove(_latents_path(voice_path))
+        except FileNotFoundError:
+            pass
+
+def precompute_speaker_latents(model):
+    """Compute conditioning for every persona voice sample that exists"""
+    for voice_file in sorted(set(PERSONA_VOICE_MAP.values())):
+        voice_path = os.path.join(XTTS_VOICES, voice_file)
+        if not os.path.exists(voice_path):
+            continue
+        try:
+            get_speaker_latents(model, voice_path)
+        except Exception as e:
+            logger.error(f"Failed to compute speaker latents for {voice_file}: {e}")
+
+def synthesize_speech(model, text: str, voice_path: str, language: str = "en",
+                      speed: float = 1.0, temperature: float = 0.7):
+    """Synthesize text with XTTS and apply the tempo effect; returns (wav, sample_rate)"""
+    gpt_cond_latent, speaker_embedding = get_speaker_latents(model, voice_path)
+    with torch.no_grad():
+        output = model.inference(
+            text,
+            language,
+            gpt_cond_latent,
+            speaker_embedding,
+            temperature=temperature,
+            speed=speed,
+        )
+    wav = torch.as_tensor(output["wav"]).float().cpu()
+    sr = output_sample_rate(model)
+    
+    # Adjust speed if needed
+    if speed != 1.0:
+        effects = [
+            ["tempo", str(speed)],
+        ]
+        wav, sr = torchaudio.sox_effects.apply_effects_tensor(wav.unsqueeze(0), sr, effects)
+        wav = wav.squeeze(0)
+    
+    return wav, sr
+
+def codec_cache(codec: str):
+    """TTS cache holding audio encoded with the given codec"""
+    if codec == "wav":
+        return tts_cache
+    return get_tts_cache(f"xtts-{codec}", extension=codec_extension(codec))
+
+def resolve_codec(codec: Optional[str], as_base64: bool) -> str:
+    """Pick the delivery codec; legacy base64 clients keep getting WAV unless they ask otherwise"""
+    if codec is None:
+        return "wav" if as_base64 else TTS_DELIVERY_CODEC
+    codec = codec.lower()
+    if codec not in CODECS:
+        raise HTTPException(status_code=400, detail=f"Unsupported codec '{codec}'. Available: {', '.join(CODECS)}")
+    return codec
+
+def encode_wav(wav, sr: int, codec: str) -> bytes:
+    """Encode a float waveform tensor with the given codec"""
+    if codec == "wav":
+        buffer = io.BytesIO()
+        torchaudio.save(buffer, wav.unsqueeze(0), sr, format="wav")
+        return buffer.getvalue()
+    return encode_audio(wav.cpu().numpy(), sr, codec)
+
+def wav_to_pcm16(wav) -> bytes:
+    """Convert a float waveform tensor to raw little-endian 16-bit PCM"""
+    return (wav.clamp(-1.0, 1.0) * 32767.0).to(torch.int16).cpu().numpy().tobytes()
+
+def output_sample_rate(model) -> int:
+    """Sample rate of the audio produced by the loaded model"""
+    audio_config = getattr(getattr(model, "config", None), "audio", None)
+    return int(getattr(audio_config, "output_sample_rate", 24000))
+
 @app.on_event("startup")
 async def startup_event():
     """Create necessary directories on startup"""
@@ -140,6 +305,28 @@ async def startup_event():
         logger.warning(
             f"XTTS model files not found. Please download XTTS-v2 model files and place them in {MODELS_ROOT}"
         )
+        return
+    
+    # Warm the cache with frequently repeated lines in the background
+    phrases = load_phrases()
+    if phrases and TTS_AVAILABLE:
+        asyncio.get_running_loop().run_in_executor(None, prepopulate_cache, phrases)
+    elif os.getenv("XTTS_PRELOAD", "false").lower() == "true" and TTS_AVAILABLE:
+        # Loading the model also computes every persona's speaker latents
+        asyncio.get_running_loop().run_in_executor(None, load_model)
+
+def prepopulate_cache(phrases, persona_role: str = "default", language: str = "en",
+                      codec: str = TTS_DELIVERY_CODEC) -> int:
+    """Synthesize a list of phrases for a persona into the TTS cache of a codec"""
+    model = load_model()
+    voice_path = get_voice_path(persona_role)
+    
+    def synthesize(text):
+        wav, sr = synthesize_speech(model, text, voice_path, language)
+        metadata = {"duration_seconds": float(wav.shape[0] / sr), "sample_rate": sr, "text": text}
+        return encode_wav(wav, sr, codec), metadata
+    
+    return codec_cache(codec).prepopulate(phrases, synthesize, voice=voice_cache_id(persona_role), language=language)
 
 @app.get("/")
 async def root():
@@ -149,11 +336,81 @@ async def root():
         "status": "running",
         "model_loaded": xtts_model is not None,
         "available_personas": list(PERSONA_VOICE_MAP.keys()),
+        "delivery_codec": TTS_DELIVERY_CODEC,
+        "cache": codec_cache(TTS_DELIVERY_CODEC).stats(),
     }
 
+def tts_headers(request: TTSRequest, codec: str, metadata: Dict[str, Any]) -> Dict[str, str]:
+    """Details of a raw audio response that the base64 body carries as fields"""
+    return {
+        "X-Duration-Seconds": f"{float(metadata.get('duration_seconds', 0.0)):.3f}",
+        "X-Sample-Rate": str(metadata.get("sample_rate", "")),
+        "X-Persona-Role": request.persona_role,
+        "X-Audio-Format": codec,
+    }
+
+def tts_json_response(request: TTSRequest, codec: str, metadata: Dict[str, Any], audio_base64: str) -> TTSResponse:
+    """Legacy base64 JSON body"""
+    return TTSResponse(
+        audio_base64=audio_base64,
+        duration_seconds=float(metadata.get("duration_seconds", 0.0)),
+        sample_rate=int(metadata.get("sample_rate", 0)),
+        persona_role=request.persona_role,
+        audio_format=codec,
+    )
+
+async def cached_tts_response(http_request: Request, request: TTSRequest, cache_key: str,
+                              as_base64: bool, codec: str = "wav"):
+    """
+    Serve a cached synthesis as raw audio (default) or legacy base64 JSON.
+    
+    Returns None on a miss, including an entry evicted while it is being
+    served, so the caller synthesizes the text again.
+    """
+    cache = codec_cache(codec)
+    path = cache.get_path(cache_key)
+    if path is None:
+        # Re-encode an existing WAV entry instead of synthesizing again
+        wav_bytes = tts_cache.get_bytes(cache_key) if codec != "wav" else None
+        if wav_bytes is None:
+            return None
+        encoded = await asyncio.to_thread(transcode, wav_bytes, codec)
+        path = cache.put(cache_key, encoded, tts_cache.get_metadata(cache_key))
+    
+    metadata = cache.get_metadata(cache_key)
+    if as_base64:
+        audio_base64 = cache.get_base64(cache_key)
+        if audio_base64 is None:
+            return None
+        return tts_json_response(request, codec, metadata, audio_base64)
+    
+    try:
+        return file_response(http_request, path, media_type=codec_media_type(codec),
+                             headers=tts_headers(request, codec, metadata))
+    except FileNotFoundError:
+        return None
+
 @app.post("/tts", response_model=TTSResponse)
-async def text_to_speech(request: TTSRequest):
-    """Generate speech from text using XTTS-v2"""
+async def text_to_speech(request: TTSRequest, http_request: Request,
+                         response_format: Optional[str] = Query(None, alias="format"),
+                         codec: Optional[str] = Query(None)):
+    """
+    Generate speech from text using XTTS-v2.
+    
+    Responds with raw audio encoded with ?codec= (opus, flac, ogg or wav;
+    TTS_DELIVERY_CODEC by default) and supports Range requests. Pass
+    ?format=base64 or Accept: application/json for the legacy base64 JSON
+    body, which stays WAV unless a codec is given.
+    """
+    as_base64 = wants_base64(http_request, response_format)
+    codec = resolve_codec(codec, as_base64)
+    
+    # Repeated lines are served from the cache without touching the model
+    cache_key = tts_cache.key_for(request.text, voice_cache_id(request.persona_role), request.language, request.speed)
+    cached = await cached_tts_response(http_request, request, cache_key, as_base64, codec)
+    if cached is not None:
+        return cached
+    
     if not TTS_AVAILABLE:
         raise HTTPException(
             status_code=503, 
@@ -163,7 +420,7 @@ async def text_to_speech(request: TTSRequest):
     try:
         # Load model if not already loaded
         try:
-            model = load_model()
+            model = await asyncio.to_thread(load_model)
         except RuntimeError as e:
             logger.error(f"Model loading error: {str(e)}")
             raise HTTPException(
@@ -183,40 +440,39 @@ async def text_to_speech(request: TTSRequest):
         logger.info(f"Generating speech for text: {request.text[:50]}...")
         
         try:
-            with torch.no_grad():
-                wav, sr = model.synthesize(
-                    text=request.text,
-                    language=request.language,
-                    speaker_wav=voice_path,
-                    temperature=request.temperature,
-                    speed=request.speed,
-                )
-            
-            # Adjust speed if needed
-            if request.speed != 1.0:
-                effects = [
-                    ["tempo", str(request.speed)],
-                ]
-                wav, sr = torchaudio.sox_effects.apply_effects_tensor(wav.unsqueeze(0), sr, effects)
-                wav = wav.squeeze(0)
+            wav, sr = await asyncio.to_thread(
+                synthesize_speech,
+                model,
+                request.text,
+                voice_path,
+                request.language,
+                request.speed,
+                request.temperature,
+            )
             
-            # Convert to bytes
-            buffer = io.BytesIO()
-            torchaudio.save(buffer, wav.unsqueeze(0), sr, format="wav")
-            buffer.seek(0)
+            # Encode with the delivery codec
+            audio_bytes = await asyncio.to_thread(encode_wav, wav, sr, codec)
             
             # Calculate duration
             duration = wav.shape[0] / sr
             
-            # Encode to base64
-            audio_base64 = base64.b64encode(buffer.read()).decode("utf-8")
+            # Cache the encoded audio before returning it
+            metadata = {
+                "duration_seconds": float(duration),
+                "sample_rate": sr,
+                "text": request.text,
+            }
+            codec_cache(codec).put(cache_key, audio_bytes, metadata)
             
-            return TTSResponse(
-                audio_base64=audio_base64,
-                duration_seconds=float(duration),
-                sample_rate=sr,
-                persona_role=request.persona_role,
-            )
+            # Serve from the cache entry just written (base64 is memoized there),
+            # or from memory if it was already evicted
+            response = await cached_tts_response(http_request, request, cache_key, as_base64, codec)
+            if response is not None:
+                return response
+            if as_base64:
+                return tts_json_response(request, codec, metadata, base64.b64encode(audio_bytes).decode("utf-8"))
+            return bytes_response(http_request, audio_bytes, codec_media_type(codec),
+                                  headers=tts_headers(request, codec, metadata))
         except Exception as e:
             logger.error(f"Speech generation error: {str(e)}")
             raise HTTPException(
@@ -228,6 +484,163 @@ async def text_to_speech(request: TTSRequest):
         logger.error(f"Error generating speech: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _prepare_stream(request: TTSRequest):
+    """Validate a streaming request and return (model, voice_path, sentences)"""
+    if not TTS_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="TTS service is not available. Please install the required packages."
+        )
+    try:
+        model = await asyncio.to_thread(load_model)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=f"Failed to load XTTS model: {str(e)}")
+    
+    voice_path = get_voice_path(request.persona_role)
+    if not os.path.exists(voice_path):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Voice sample for '{request.persona_role}' not found. Please add a voice sample."
+        )
+    
+    sentences = split_sentences(request.text, max_chars=STREAM_MAX_SENTENCE_CHARS)
+    if not sentences:
+        raise HTTPException(status_code=400, detail="Text is empty")
+    return model, voice_path, sentences
+
+async def _stream_audio(model, voice_path: str, sentences, request: TTSRequest, codec: str = "pcm"):
+    """
+    Yield audio for each sentence as soon as it is synthesized.
+    
+    With codec "pcm" each chunk is raw 16-bit PCM; with "opus" each chunk is a
+    complete Ogg/Opus stream, so the concatenation is a valid chained Ogg file.
+    The next sentence is synthesized in a worker thread while the current
+    chunk is being sent, so the model never waits on the network.
+    """
+    def synthesize(sentence):
+        wav, sr = synthesize_speech(model, sentence, voice_path, request.language,
+                                    request.speed, request.temperature)
+        if codec == "opus":
+            return encode_audio(wav.cpu().numpy(), sr, "opus")
+        return wav_to_pcm16(wav)
+    
+    pending = asyncio.ensure_future(asyncio.to_thread(synthesize, sentences[0]))
+    try:
+        for index in range(len(sentences)):
+            pcm = await pending
+            if index + 1 < len(sentences):
+                pending = asyncio.ensure_future(asyncio.to_thread(synthesize, sentences[index + 1]))
+            yield pcm
+    finally:
+        if not pending.done():
+            pending.cancel()
+
+@app.post("/tts/stream")
+async def text_to_speech_stream(request: TTSRequest, codec: str = Query("pcm")):
+    """
+    Stream speech sentence by sentence.
+    
+    ?codec=pcm (default) streams raw 16-bit mono PCM, ?codec=opus streams
+    chained Ogg/Opus. The sample rate is returned in the X-Sample-Rate header;
+    playback can begin as soon as the first sentence arrives.
+    """
+    codec = codec.lower()
+    if codec not in STREAM_CODECS:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream codec '{codec}'. Available: {', '.join(STREAM_CODECS)}")
+    model, voice_path, sentences = await _prepare_stream(request)
+    sample_rate = output_sample_rate(model)
+    logger.info(f"Streaming {len(sentences)} sentences for persona {request.persona_role}")
+    
+    media_type = codec_media_type("opus") if codec == "opus" else f"audio/L16; rate={sample_rate}; channels=1"
+    return StreamingResponse(
+        _stream_audio(model, voice_path, sentences, request, codec),
+        media_type=media_type,
+        headers={
+            "X-Sample-Rate": str(sample_rate),
+            "X-Audio-Format": STREAM_CODECS[codec],
+            "X-Channels": "1",
+            "X-Sentence-Count": str(len(sentences)),
+        },
+    )
+
+@app.websocket("/ws/tts")
+async def text_to_speech_websocket(websocket: WebSocket):
+    """
+    WebSocket streaming TTS.
+    
+    The client sends TTSRequest JSON messages, optionally with "codec":
+    "opus" for Ogg/Opus frames instead of raw PCM. For each one the server
+    replies with a "start" JSON frame, one binary audio frame per sentence and
+    an "end" JSON frame.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_json()
+            try:
+                codec = str(message.pop("codec", "pcm")).lower()
+                if codec not in STREAM_CODECS:
+                    raise ValueError(f"Unsupported stream codec '{codec}'")
+                request = TTSRequest(**message)
+                model, voice_path, sentences = await _prepare_stream(request)
+            except HTTPException as e:
+                await websocket.send_json({"event": "error", "status": e.status_code, "detail": e.detail})
+                continue
+            except Exception as e:
+                await websocket.send_json({"event": "error", "status": 400, "detail": str(e)})
+                continue
+            
+            await websocket.send_json({
+                "event": "start",
+                "format": STREAM_CODECS[codec],
+                "channels": 1,
+                "sample_rate": output_sample_rate(model),
+                "sentences": sentences,
+            })
+            index = 0
+            async for chunk in _stream_audio(model, voice_path, sentences, request, codec):
+                await websocket.send_bytes(chunk)
+                index += 1
+            await websocket.send_json({"event": "end", "chunks": index})
+    except WebSocketDisconnect:
+        logger.info("TTS WebSocket client disconnected")
+
+@app.post("/upload_voice")
+async def upload_voice(
+    persona_role: str = Form(...),
+    file: UploadFile = File(...)
+):
+    """Upload a voice sample for a persona and refresh its speaker conditioning"""
+    if not file.filename or not file.filename.lower().endswith('.wav'):
+        raise HTTPException(status_code=400, detail="Only WAV files are supported")
+    
+    if persona_role not in PERSONA_VOICE_MAP:
+        raise HTTPException(status_code=400, detail=f"Invalid persona role. Valid roles: {list(PERSONA_VOICE_MAP.keys())}")
+    
+    try:
+        os.makedirs(XTTS_VOICES, exist_ok=True)
+        file_path = os.path.join(XTTS_VOICES, PERSONA_VOICE_MAP[persona_role])
+        
+        with open(file_path, "wb") as f:
+            content = await file.read()
+            f.write(content)
+        
+        # Stale latents must never be used for the new sample
+        invalidate_speaker_latents(file_path)
+        latents_ready = False
+        if xtts_model is not None:
+            await asyncio.to_thread(get_speaker_latents, xtts_model, file_path)
+            latents_ready = True
+        
+        return {
+            "message": f"Voice sample for {persona_role} uploaded successfully",
+            "latents_ready": latents_ready,
+        }
+    
+    except Exception as e:
+        logger.error(f"Error uploading voice sample: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/voices")
 async def list_voices():
     """List available voice samples"""
@@ -260,6 +673,11 @@ async def check_model():
         "model_path": XTTS_CHECKPOINT,
         "config_path": XTTS_CONFIG,
         "voices_path": XTTS_VOICES,
+        "latents_path": XTTS_LATENTS,
+        "speaker_latents": {
+            role: os.path.exists(_latents_path(os.path.join(XTTS_VOICES, filename)))
+            for role, filename in PERSONA_VOICE_MAP.items()
+        },
     }
 
 if __name__ == "__main__":
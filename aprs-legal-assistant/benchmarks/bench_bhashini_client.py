@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Bhashini translation throughput at concurrency 1/10/100.
+
+Starts backend/mock_dhruva_server.py and compares
+  - blocking requests.post per translation from a thread pool (the previous
+    implementation, as run by sync FastAPI endpoints),
+  - BhashiniClient with pooling but no batching,
+  - BhashiniClient with micro-batching (the default).
+
+    python benchmarks/bench_bhashini_client.py [--requests 300] [--port 8090]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(APP_ROOT, "backend")
+sys.path.append(BACKEND_DIR)
+
+from bhashini_client import BhashiniClient, translation_task  # noqa: E402
+
+
+def start_mock_server(port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "mock_dhruva_server.py"), "--port", str(port)],
+        cwd=BACKEND_DIR,
+    )
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/stats", timeout=0.5)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Mock Dhruva server did not start")
+
+
+def server_calls(port: int) -> int:
+    return requests.get(f"http://127.0.0.1:{port}/stats", timeout=5).json()["calls"]
+
+
+def run_blocking(url: str, texts, concurrency: int):
+    task = translation_task("te", "en")
+
+    def translate(text):
+        payload = {"pipelineTasks": [task], "inputData": {"input": [{"source": text}], "audio": []}}
+        resp = requests.post(url, json=payload)
+        resp.raise_for_status()
+        return resp.json()["pipelineResponse"][0]["output"][0]["target"]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(translate, texts))
+
+
+async def run_client(client: BhashiniClient, texts, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def translate(text):
+        async with semaphore:
+            return await client.translate(text, "te", "en")
+
+    try:
+        return await asyncio.gather(*(translate(text) for text in texts))
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bhashini client throughput benchmark")
+    parser.add_argument("--requests", type=int, default=300, help="Translations per run")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}/services/inference/pipeline"
+    texts = [f"వాక్యం సంఖ్య {i}" for i in range(args.requests)]
+    server = start_mock_server(args.port)
+    try:
+        header = f"{'mode':<22}{'concurrency':>12}{'translations/s':>16}{'pipeline calls':>16}"
+        print(header)
+        print("-" * len(header))
+        for concurrency in args.concurrency:
+            modes = [
+                ("requests (blocking)", lambda: run_blocking(url, texts, concurrency)),
+                ("client, unbatched", lambda: asyncio.run(run_client(
+                    BhashiniClient(api_url=url, max_batch_size=1, max_inflight_batches=100), texts, concurrency))),
+                ("client, batched", lambda: asyncio.run(run_client(
+                    BhashiniClient(api_url=url), texts, concurrency))),
+            ]
+            for name, run in modes:
+                calls_before = server_calls(args.port)
+                start = time.perf_counter()
+                results = run()
+                elapsed = time.perf_counter() - start
+                assert len(results) == len(texts) and results[0].endswith(texts[0])
+                calls = server_calls(args.port) - calls_before
+                print(f"{name:<22}{concurrency:>12}{len(texts) / elapsed:>16.1f}{calls:>16}")
+    finally:
+        server.terminate()
+        server.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmark: base64-in-JSON vs raw binary responses over HTTP.
+
+Serves the voice samples shipped with the backend and a synthetic PDF-sized
+payload from an in-process uvicorn server. The benchmark builds its own small
+app rather than importing backend/main.py, with one route per response style,
+all built with the helpers the API routes use (backend/binary_responses.py):
+
+    base64 JSON   legacy body: {"audio_base64": ...}, decoded by the client
+    bytes         bytes_response() (PDF downloads, synthesized audio)
+    bytes Range   bytes_response() with "Range: bytes=<half>-" (206)
+    file          file_response() / RangeFileResponse (cached audio files)
+    file Range    file_response() with "Range: bytes=<half>-" (206)
+
+and reports, per payload and route, the body bytes received, the request
+latency and the client CPU time spent decoding. uvicorn does not offer the
+zero-copy send extension, so the file routes measure the chunked fallback;
+servers that do use sendfile for the same responses.
+
+    python benchmarks/bench_binary_responses.py [--iterations 50] [--pdf-kb 256] [files...]
+"""
+import os
+import sys
+import json
+import time
+import base64
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(APP_ROOT, "backend")
+DEFAULT_SAMPLES_DIR = os.path.join(BACKEND_DIR, "voice_samples")
+sys.path.append(BACKEND_DIR)
+
+from binary_responses import bytes_response, file_response  # noqa: E402
+
+MEDIA_TYPES = {".wav": "audio/wav", ".ogg": "audio/ogg", ".mp3": "audio/mpeg", ".pdf": "application/pdf"}
+
+
+def build_app(payloads):
+    """FastAPI app serving every payload in each response style"""
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.responses import JSONResponse
+
+    app = FastAPI()
+
+    def payload(name):
+        if name not in payloads:
+            raise HTTPException(status_code=404, detail=name)
+        return payloads[name]
+
+    @app.get("/b64/{name}")
+    async def b64_route(name: str):
+        path, data, media_type = payload(name)
+        return JSONResponse({
+            "audio_base64": base64.b64encode(data).decode("utf-8"),
+            "duration_seconds": 1.0,
+            "sample_rate": 16000,
+            "persona_role": "judge",
+        })
+
+    @app.get("/bytes/{name}")
+    async def bytes_route(name: str, request: Request):
+        path, data, media_type = payload(name)
+        return bytes_response(request, data, media_type, filename=name)
+
+    @app.get("/file/{name}")
+    async def file_route(name: str, request: Request):
+        path, data, media_type = payload(name)
+        return file_response(request, path, media_type, filename=name)
+
+    return app
+
+
+def start_server(app):
+    """Run uvicorn in a background thread on a free local port"""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Benchmark server failed to start")
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def routes(name, size):
+    half = f"bytes={size // 2}-"
+    return [
+        ("base64 JSON", f"/b64/{name}", {}, 200),
+        ("bytes", f"/bytes/{name}", {}, 200),
+        ("bytes Range", f"/bytes/{name}", {"Range": half}, 206),
+        ("file", f"/file/{name}", {}, 200),
+        ("file Range", f"/file/{name}", {"Range": half}, 206),
+    ]
+
+
+async def fetch(session, url, headers, expected_status, legacy):
+    """One request; returns (body bytes on the wire, decoded payload, client decode CPU seconds)"""
+    async with session.get(url, headers=headers) as response:
+        if response.status != expected_status:
+            raise RuntimeError(f"{url}: HTTP {response.status}, expected {expected_status}")
+        body = await response.read()
+    started = time.thread_time()
+    if legacy:
+        data = base64.b64decode(json.loads(body)["audio_base64"])
+    else:
+        data = body
+    return len(body), data, time.thread_time() - started
+
+
+async def bench(base_url, payloads, iterations):
+    import aiohttp
+
+    rows = []
+    async with aiohttp.ClientSession(auto_decompress=False) as session:
+        for name, (_, data, _) in payloads.items():
+            for label, path, headers, status in routes(name, len(data)):
+                legacy = path.startswith("/b64/")
+                expected = data[len(data) // 2:] if status == 206 else data
+                wire, decoded, _ = await fetch(session, base_url + path, headers, status, legacy)
+                if decoded != expected:
+                    raise RuntimeError(f"{label} {name}: body does not match the payload")
+                latencies, cpu = [], 0.0
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    _, _, decode_cpu = await fetch(session, base_url + path, headers, status, legacy)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    cpu += decode_cpu
+                rows.append((name, label, wire, statistics.median(latencies), statistics.mean(latencies),
+                             cpu * 1000 / iterations))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare base64 JSON and binary responses over HTTP")
+    parser.add_argument("files", nargs="*", help="Files to serve (defaults to backend/voice_samples/*.wav)")
+    parser.add_argument("--iterations", type=int, default=50, help="Requests per payload and route")
+    parser.add_argument("--pdf-kb", type=int, default=256, help="Size of the synthetic PDF payload")
+    args = parser.parse_args()
+
+    files = args.files
+    if not files and os.path.isdir(DEFAULT_SAMPLES_DIR):
+        files = sorted(
+            os.path.join(DEFAULT_SAMPLES_DIR, name)
+            for name in os.listdir(DEFAULT_SAMPLES_DIR) if name.endswith(".wav")
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        payloads = {}
+        for path in files:
+            with open(path, "rb") as f:
+                data = f.read()
+            media_type = MEDIA_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+            payloads[os.path.basename(path)] = (os.path.abspath(path), data, media_type)
+        pdf_name = f"synthetic_{args.pdf_kb}kb.pdf"
+        pdf_path = os.path.join(tmp, pdf_name)
+        with open(pdf_path, "wb") as f:
+            f.write(os.urandom(args.pdf_kb * 1024))
+        with open(pdf_path, "rb") as f:
+            payloads[pdf_name] = (pdf_path, f.read(), "application/pdf")
+
+        server, thread, base_url = start_server(build_app(payloads))
+        try:
+            rows = asyncio.run(bench(base_url, payloads, args.iterations))
+        finally:
+            server.should_exit = True
+            thread.join(timeout=5)
+
+    header = f"{'payload':<24}{'route':<14}{'body KB':>10}{'p50 ms':>10}{'mean ms':>10}{'decode ms':>11}"
+    print(f"{args.iterations} requests per route against {base_url}")
+    print(header)
+    print("-" * len(header))
+    for name, label, wire, p50, mean, decode_ms in rows:
+        print(f"{name:<24}{label:<14}{wire / 1024:>10.1f}{p50:>10.2f}{mean:>10.2f}{decode_ms:>11.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: LLM latency under bursty load, direct calls vs the LLM gateway.
+
+Sends bursts of prompts to simulated model servers (FakeLLMBackend: service
+time grows once more requests run than the server has capacity for) and
+reports latency percentiles of the answered requests and how many were
+rejected:
+
+    direct   every request goes straight to one server (previous behaviour)
+    gateway  the same server behind the gateway's concurrency limit and queue
+    failover two servers behind the gateway, one of them failing 30% of calls
+
+    python benchmarks/bench_llm_gateway.py [--bursts 5] [--burst-size 60] [--capacity 4]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.append(BACKEND_DIR)
+
+from llm_gateway import FakeLLMBackend, LLMGateway, LLMOverloadedError  # noqa: E402
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else float("nan")
+
+
+async def run_bursts(call, bursts: int, burst_size: int, gap: float):
+    latencies, rejected, failed = [], 0, 0
+
+    async def one(i: int):
+        nonlocal rejected, failed
+        started = time.perf_counter()
+        try:
+            await call(f"What is the punishment for offence {i} under the Indian Penal Code?")
+            latencies.append(time.perf_counter() - started)
+        except LLMOverloadedError:
+            rejected += 1
+        except Exception:
+            failed += 1
+
+    tasks = []
+    for burst in range(bursts):
+        tasks.extend(asyncio.create_task(one(burst * burst_size + i)) for i in range(burst_size))
+        await asyncio.sleep(gap)
+    await asyncio.gather(*tasks)
+    return latencies, rejected, failed
+
+
+async def main_async(args):
+    def server(name: str, failure_rate: float = 0.0) -> FakeLLMBackend:
+        return FakeLLMBackend(name, latency_ms=args.latency_ms, capacity=args.capacity,
+                              failure_rate=failure_rate, max_queue=args.queue)
+
+    direct = server("direct")
+    modes = {
+        "direct": lambda prompt: direct.complete(prompt, {}),
+        "gateway": LLMGateway([server("fake")]).generate,
+        "failover": LLMGateway([server("flaky", failure_rate=0.3), server("fake")]).generate,
+    }
+
+    total = args.bursts * args.burst_size
+    print(f"{args.bursts} bursts of {args.burst_size} every {args.gap:g}s, server capacity {args.capacity}, "
+          f"service time {args.latency_ms:g} ms, gateway queue {args.queue}")
+    print(f"{'mode':<9} {'answered':>9} {'rejected':>9} {'failed':>7} {'p50 (s)':>8} {'p95 (s)':>8} {'max (s)':>8}")
+    for mode, call in modes.items():
+        latencies, rejected, failed = await run_bursts(call, args.bursts, args.burst_size, args.gap)
+        print(f"{mode:<9} {len(latencies):>5}/{total:<3} {rejected:>9} {failed:>7} "
+              f"{percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.95):>8.2f} "
+              f"{max(latencies, default=float('nan')):>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM routing under bursty load")
+    parser.add_argument("--bursts", type=int, default=5, help="Number of bursts")
+    parser.add_argument("--burst-size", type=int, default=60, help="Requests per burst")
+    parser.add_argument("--gap", type=float, default=1.0, help="Seconds between bursts")
+    parser.add_argument("--capacity", type=int, default=4, help="Requests a simulated server runs at full speed")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Service time of one request")
+    parser.add_argument("--queue", type=int, default=16, help="Gateway wait queue per backend")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fp32 PyTorch against the CPU-optimized variants of the local
+models (backend/model_optimizer.py), on a GPU-less box.
+
+For every model whose dependencies and weights are available, reports the
+latency of one request, the batch throughput and how far the optimized
+output drifts from fp32:
+
+    embedding    SentenceTransformer fp32 | ONNX int8    cosine similarity to fp32
+    translation  MarianMT fp32 | PyTorch int8 | ONNX int8  output similarity, exact matches
+    llm          causal LM fp32 | PyTorch int8             greedy next-token agreement
+    asr          IndicConformer fp32 | PyTorch int8        WER against the fp32 transcript
+    tts          Coqui TTS fp32 | PyTorch int8             audio duration ratio
+
+ONNX artifacts are exported first when missing (--export) or read from
+OPTIMIZED_MODELS_DIR.
+
+    python benchmarks/bench_model_optimization.py [--models embedding translation llm asr tts]
+        [--export] [--llm-model distilgpt2] [--threads 4]
+"""
+import os
+import sys
+import time
+import difflib
+import argparse
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+# Backend modules import each other as "backend.xxx"
+sys.path.append(os.path.dirname(BACKEND_DIR))
+sys.path.append(BACKEND_DIR)
+
+import model_optimizer  # noqa: E402
+
+SENTENCES = [
+    "The accused was charged with cheating under Section 420 of the Indian Penal Code.",
+    "A police officer must register an FIR when a cognizable offence is reported.",
+    "The landlord cannot evict a tenant without due process of law.",
+    "A dishonoured cheque gives rise to liability under Section 138 of the Negotiable Instruments Act.",
+    "Anticipatory bail may be granted by the Sessions Court or the High Court.",
+    "The complainant should preserve all documents and electronic records as evidence.",
+    "Maintenance can be claimed by a wife, children and parents under Section 125 CrPC.",
+    "The consumer forum can award compensation for deficiency in service.",
+]
+
+
+def mean_ms(fn, repeat: int) -> float:
+    fn()  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def throughput(fn, items: int) -> float:
+    started = time.perf_counter()
+    fn()
+    return items / (time.perf_counter() - started)
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    ref, hyp = reference.split(), hypothesis.split()
+    distances = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        previous, distances[0] = distances[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            previous, distances[j] = distances[j], min(distances[j] + 1, distances[j - 1] + 1,
+                                                        previous + (ref_word != hyp_word))
+    return distances[-1] / max(1, len(ref))
+
+
+def report(rows, model, variant, latency_ms, rate, unit, accuracy):
+    rows.append((model, variant, latency_ms, f"{rate:.1f} {unit}", accuracy))
+
+
+# --------------------------------------------------------------------- models
+
+def bench_embedding(args, rows):
+    from sentence_transformers import SentenceTransformer
+
+    name = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    batch = SENTENCES * 32
+    reference = SentenceTransformer(name, device="cpu")
+    baseline = reference.encode(batch)
+    report(rows, "embedding", "fp32", mean_ms(lambda: reference.encode(SENTENCES[0]), 20),
+           throughput(lambda: reference.encode(batch), len(batch)), "sent/s", "-")
+
+    if args.export and not model_optimizer.read_manifest(name, "embedding"):
+        model_optimizer.export_model(name, "embedding")
+    optimized = model_optimizer.load_embedding_model(name)
+    if not isinstance(optimized, model_optimizer.OnnxSentenceEncoder):
+        rows.append(("embedding", "onnx-int8", None, "-", "no artifact (run with --export)"))
+        return
+    embeddings = optimized.encode(batch)
+    cosine = np.sum(baseline * embeddings, axis=1) / (
+        np.linalg.norm(baseline, axis=1) * np.linalg.norm(embeddings, axis=1))
+    report(rows, "embedding", "onnx-int8", mean_ms(lambda: optimized.encode(SENTENCES[0]), 20),
+           throughput(lambda: optimized.encode(batch), len(batch)), "sent/s",
+           f"cosine mean {cosine.mean():.4f} min {cosine.min():.4f}")
+
+
+def bench_translation(args, rows):
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+    name, token = "Helsinki-NLP/opus-mt-en-dra", ">>tel<<"
+    texts = [f"{token} {sentence}" for sentence in SENTENCES]
+    tokenizer = AutoTokenizer.from_pretrained(name)
+
+    def translator(model, tok):
+        def translate(batch):
+            inputs = tok(batch, return_tensors="pt", padding=True, truncation=True)
+            with torch.inference_mode():
+                generated = model.generate(**inputs, num_beams=2, max_new_tokens=128)
+            return tok.batch_decode(generated, skip_special_tokens=True)
+        return translate
+
+    variants = [("fp32", translator(AutoModelForSeq2SeqLM.from_pretrained(name).eval(), tokenizer)),
+                ("torch-int8", translator(model_optimizer.quantize_dynamic_int8(
+                    AutoModelForSeq2SeqLM.from_pretrained(name).eval()), tokenizer))]
+    if args.export and not model_optimizer.read_manifest(name, "seq2seq"):
+        model_optimizer.export_model(name, "seq2seq")
+    onnx = model_optimizer.load_seq2seq_model(name)
+    if onnx:
+        variants.append(("onnx-int8", translator(onnx[1], onnx[0])))
+    else:
+        rows.append(("translation", "onnx-int8", None, "-", "no artifact (run with --export)"))
+
+    baseline = None
+    for variant, translate in variants:
+        outputs = translate(texts)
+        if baseline is None:
+            baseline, accuracy = outputs, "-"
+        else:
+            similarity = np.mean([difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(baseline, outputs)])
+            exact = sum(a == b for a, b in zip(baseline, outputs))
+            accuracy = f"similarity {similarity:.3f}, {exact}/{len(texts)} identical"
+        report(rows, "translation", variant, mean_ms(lambda: translate(texts[:1]), 5),
+               throughput(lambda: translate(texts), len(texts)), "sent/s", accuracy)
+
+
+def bench_llm(args, rows):
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(args.llm_model)
+    prompts = [f"Question: {sentence} What should the client do?\nAnswer:" for sentence in SENTENCES]
+    new_tokens = 32
+
+    def next_tokens(model):
+        with torch.inference_mode():
+            return [int(model(**tokenizer(prompt, return_tensors="pt")).logits[0, -1].argmax()) for prompt in prompts]
+
+    def generate(model):
+        inputs = tokenizer(prompts[0], return_tensors="pt")
+        with torch.inference_mode():
+            model.generate(**inputs, max_new_tokens=new_tokens, min_new_tokens=new_tokens, do_sample=False,
+                           pad_token_id=tokenizer.eos_token_id)
+
+    baseline = None
+    for variant in ("fp32", "torch-int8"):
+        model = AutoModelForCausalLM.from_pretrained(args.llm_model).eval()
+        if variant == "torch-int8":
+            model = model_optimizer.quantize_dynamic_int8(model)
+        predictions = next_tokens(model)
+        if baseline is None:
+            baseline, accuracy = predictions, "-"
+        else:
+            agree = sum(a == b for a, b in zip(baseline, predictions))
+            accuracy = f"next-token agreement {agree}/{len(prompts)}"
+        latency = mean_ms(lambda: generate(model), 3)
+        report(rows, f"llm ({args.llm_model})", variant, latency, new_tokens / latency * 1000, "tok/s", accuracy)
+
+
+def bench_asr(args, rows):
+    from local_telugu_asr import MODEL_PATH
+    from nemo.collections.asr.models import EncDecRNNTBPEModel
+    from audio_codecs import decode_audio
+
+    if not os.path.exists(MODEL_PATH):
+        rows.append(("asr", "-", None, "-", f"model not found at {MODEL_PATH}"))
+        return
+    audio_dir = os.path.join(BACKEND_DIR, "test_audio")
+    clips = []
+    for file_name in sorted(os.listdir(audio_dir)):
+        with open(os.path.join(audio_dir, file_name), "rb") as f:
+            clips.append(decode_audio(f.read(), target_sr=16000)[0])
+    seconds_of_audio = sum(len(clip) for clip in clips) / 16000
+
+    baseline = None
+    for variant in ("fp32", "torch-int8"):
+        model = EncDecRNNTBPEModel.restore_from(MODEL_PATH, map_location="cpu").eval()
+        if variant == "torch-int8":
+            model = model_optimizer.quantize_dynamic_int8(model)
+        transcripts = [str(text) for text in model.transcribe(clips)]
+        if baseline is None:
+            baseline, accuracy = transcripts, "-"
+        else:
+            wer = np.mean([word_error_rate(a, b) for a, b in zip(baseline, transcripts)])
+            accuracy = f"WER vs fp32 {wer:.3f}"
+        latency = mean_ms(lambda: model.transcribe(clips[:1]), 3)
+        report(rows, "asr", variant, latency, throughput(lambda: model.transcribe(clips), 1) * seconds_of_audio,
+               "audio s/s", accuracy)
+
+
+def bench_tts(args, rows):
+    import torch
+    from TTS.api import TTS
+
+    text = SENTENCES[0]
+    baseline = None
+    for variant in ("fp32", "torch-int8"):
+        tts = TTS("tts_models/en/ljspeech/tacotron2-DDC")
+        if variant == "torch-int8":
+            tts.synthesizer.tts_model = model_optimizer.quantize_dynamic_int8(tts.synthesizer.tts_model)
+        torch.manual_seed(0)
+        samples = len(tts.tts(text=text))
+        if baseline is None:
+            baseline, accuracy = samples, "-"
+        else:
+            accuracy = f"duration ratio {samples / baseline:.3f} (listen to verify)"
+        latency = mean_ms(lambda: tts.tts(text=text), 3)
+        report(rows, "tts", variant, latency, 1000 / latency, "utt/s", accuracy)
+
+
+BENCHMARKS = {"embedding": bench_embedding, "translation": bench_translation, "llm": bench_llm,
+              "asr": bench_asr, "tts": bench_tts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fp32 against optimized local models on CPU")
+    parser.add_argument("--models", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--export", action="store_true", help="Export missing ONNX artifacts first")
+    parser.add_argument("--llm-model", default="distilgpt2", help="Causal LM for the llm benchmark")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0: default)")
+    args = parser.parse_args()
+
+    try:
+        import torch
+        torch.set_num_threads(args.threads or torch.get_num_threads())
+    except ImportError:
+        pass
+
+    rows = []
+    for name in args.models:
+        try:
+            BENCHMARKS[name](args, rows)
+        except ImportError as e:
+            rows.append((name, "-", None, "-", f"skipped: {e}"))
+        except Exception as e:
+            rows.append((name, "-", None, "-", f"failed: {e}"))
+
+    print(f"{'model':<22} {'variant':<11} {'latency (ms)':>12}  {'throughput':<16} accuracy vs fp32")
+    for model, variant, latency, rate, accuracy in rows:
+        latency_text = f"{latency:>12.1f}" if latency is not None else f"{'-':>12}"
+        print(f"{model:<22} {variant:<11} {latency_text}  {rate:<16} {accuracy}")
+
+
+if __name__ == "__main__":
+    main()
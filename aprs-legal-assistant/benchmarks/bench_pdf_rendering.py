@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark: PDF download throughput and event-loop responsiveness under
+concurrent load, through the real API routes.
+
+Sends N POST /download_summary requests, C at a time, to the FastAPI app
+from backend/main.py in-process (httpx ASGI transport, so requests and the
+app share one event loop). Gemini is replaced by a fake returning a fixed
+summary, and the summary cache answers every request after the first, so the
+time measured is rendering and delivery. Three rendering modes are compared,
+reporting PDFs per second and the longest event-loop stall (how long any
+other request would have waited):
+
+    inline  doc.build on the event loop (previous behaviour)
+    thread  PDF_RENDER_WORKERS=0: a thread of the API process
+    pool    the process pool used by LegalPDFGenerator.render_pdf
+
+    python benchmarks/bench_pdf_rendering.py [--pdfs 40] [--concurrency 8] [--workers 4]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(APP_ROOT, "backend")
+sys.path.append(APP_ROOT)
+sys.path.append(BACKEND_DIR)
+
+# Keep the benchmark's summaries and caches out of data/
+_TMP = tempfile.mkdtemp(prefix="bench-pdf-")
+for _name in ("SUMMARY_CACHE_DB", "TRANSLATION_MEMORY_DB", "JOB_QUEUE_DB", "CRAWL_STATE_DB", "NEAR_DUP_DB"):
+    os.environ.setdefault(_name, os.path.join(_TMP, f"{_name.lower()}.sqlite"))
+
+import httpx  # noqa: E402
+
+import pdf_generator  # noqa: E402
+
+# Per-request INFO logs would dominate the measurement
+logging.getLogger().setLevel(logging.WARNING)
+
+PARAGRAPH = (
+    "The complainant alleges that the accused dishonestly induced delivery of property under "
+    "Section 420 of the Indian Penal Code. The transaction records, the cheque dishonour notice "
+    "under Section 138 of the Negotiable Instruments Act and the correspondence between the "
+    "parties establish the sequence of events. "
+)
+
+CONVERSATION = [
+    {"role": "user", "content": "The accused took my money and the cheque he gave me bounced."},
+    {"role": "assistant", "content": "You can file a complaint under Section 138 of the NI Act."},
+]
+
+
+class FakeGemini:
+    """Stands in for the Gemini client with a fixed structured summary"""
+
+    configured = True
+
+    def __init__(self, paragraphs: int):
+        body = PARAGRAPH * paragraphs
+        self.text = (f"SUMMARY OF ISSUE: {body}\nRELEVANT LAWS: {body}\nLEGAL ANALYSIS: {body}\n"
+                     f"POSSIBLE OUTCOMES: {body}\nRECOMMENDED NEXT STEPS: {body}")
+
+    async def generate(self, prompt, **kwargs):
+        return SimpleNamespace(text=self.text)
+
+
+async def _monitor_loop(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Longest delay of a periodic timer beyond its interval, in seconds"""
+    worst = 0.0
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - before - interval)
+    return worst
+
+
+async def run_mode(client: httpx.AsyncClient, pdfs: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def download_one(i: int):
+        async with semaphore:
+            response = await client.post("/download_summary", json=CONVERSATION)
+        if response.status_code != 200 or not response.content.startswith(b"%PDF"):
+            raise RuntimeError(f"/download_summary returned {response.status_code}: {response.text[:200]}")
+
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(download_one(i) for i in range(pdfs)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_stall = await monitor
+    return pdfs / elapsed, worst_stall * 1000
+
+
+async def main_async(args):
+    # Imported here: the spawned render workers re-import this module and must not build the app
+    import main
+
+    main.pdf_generator.gemini = FakeGemini(args.paragraphs)
+    main.pdf_generator.model_initialized = True
+    pooled_render = pdf_generator.render_pdf_async
+
+    async def inline_render(summary):
+        return pdf_generator.render_summary_pdf(summary)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Warm up the summary cache, the template and the pool so start-up is not measured
+        pdf_generator.PDF_RENDER_WORKERS = args.workers
+        await asyncio.gather(*(client.post("/download_summary", json=CONVERSATION) for _ in range(args.workers)))
+
+        print(f"{args.pdfs} requests to POST /download_summary, concurrency {args.concurrency}, "
+              f"pool workers {args.workers}")
+        print(f"{'mode':<8} {'PDFs/s':>8} {'max loop stall (ms)':>20}")
+        for mode in ("inline", "thread", "pool"):
+            pdf_generator.render_pdf_async = inline_render if mode == "inline" else pooled_render
+            pdf_generator.PDF_RENDER_WORKERS = 0 if mode == "thread" else args.workers
+            rate, stall_ms = await run_mode(client, args.pdfs, args.concurrency)
+            print(f"{mode:<8} {rate:>8.1f} {stall_ms:>20.1f}")
+        pdf_generator.render_pdf_async = pooled_render
+
+    pool = pdf_generator.get_render_pool()
+    if pool is not None:
+        pool.shutdown()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent PDF downloads through the API")
+    parser.add_argument("--pdfs", type=int, default=40, help="Requests per mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent requests")
+    parser.add_argument("--workers", type=int, default=pdf_generator.PDF_RENDER_WORKERS or 4,
+                        help="Render pool processes")
+    parser.add_argument("--paragraphs", type=int, default=6, help="Paragraph repetitions per section")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prefill time saved by reusing the KV state of the fixed
+instructions that precede every prompt.
+
+Sends N requests that share the same system instructions and differ in the
+query, once without prefix reuse and once with it, and reports the mean
+latency and prompt tokens evaluated per request:
+
+    fake    FakeLLMBackend charging --prefill-ms per prompt token (runs anywhere)
+    ollama  OLLAMA_URL / OLLAMA_MODEL; "no reuse" starts every system prompt
+            with a unique line so the runner cannot match the prefix
+    local   transformers model (--model); "no reuse" disables PrefixKVCache
+
+Use a small --max-tokens so the prefill dominates the measured latency.
+
+    python benchmarks/bench_prefix_cache.py [--backend fake] [--requests 20] [--prefix-tokens 400]
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+# The local backend imports backend.prefix_cache
+sys.path.append(os.path.dirname(BACKEND_DIR))
+sys.path.append(BACKEND_DIR)
+
+from llm_gateway import FakeLLMBackend, OllamaBackend, TransformersBackend  # noqa: E402
+
+RULE = ("Cite the relevant sections of the Indian Penal Code, the Code of Criminal Procedure or the "
+        "applicable act, explain the procedure the client has to follow, and state the limitations of the advice. ")
+QUERIES = [
+    "What is the punishment for cheating under Section 420?",
+    "How do I file an FIR if the police refuse to register it?",
+    "Can a tenant be evicted without notice in Hyderabad?",
+    "What are the remedies for a dishonoured cheque?",
+    "Is anticipatory bail available for a non-bailable offence?",
+]
+
+
+def instructions(tokens: int) -> str:
+    """Stable instruction block of roughly the given token count"""
+    text = "You are a legal assistant specializing in Indian law. "
+    while len(text) // 4 < tokens:
+        text += RULE
+    return text
+
+
+def make_backend(kind: str, reuse: bool, args):
+    if kind == "fake":
+        return FakeLLMBackend(latency_ms=args.decode_ms, prefill_ms_per_token=args.prefill_ms, prefix_cache=reuse)
+    if kind == "ollama":
+        return OllamaBackend(os.getenv("OLLAMA_URL", "http://localhost:11434"), os.getenv("OLLAMA_MODEL", "gemma3:1b"))
+    return TransformersBackend(model=args.model, batch_size=1, prefix_cache=reuse)
+
+
+async def run(kind: str, reuse: bool, args, system: str):
+    backend = make_backend(kind, reuse, args)
+    # One untimed request loads the model (and, with reuse, caches the prefix)
+    await backend.generate(QUERIES[0], {"system": system, "max_tokens": args.max_tokens})
+    before = dict(backend.stats())
+    started = time.perf_counter()
+    for i in range(args.requests):
+        request_system = system if reuse or kind != "ollama" else f"Request {uuid.uuid4()}\n{system}"
+        prompt = f"USER QUERY:\n{QUERIES[i % len(QUERIES)]} (case {i})"
+        await backend.generate(prompt, {"system": request_system, "max_tokens": args.max_tokens})
+    elapsed = time.perf_counter() - started
+    stats = backend.stats()
+    await backend.close()
+
+    tokens_key = {"fake": "prefill_tokens", "ollama": "prompt_eval_tokens"}.get(kind)
+    tokens = (stats[tokens_key] - before[tokens_key]) / args.requests if tokens_key else None
+    return elapsed / args.requests * 1000, tokens
+
+
+async def main_async(args):
+    system = instructions(args.prefix_tokens)
+    print(f"{args.backend}: {args.requests} requests, ~{len(system) // 4}-token instructions, "
+          f"max {args.max_tokens} new tokens")
+    print(f"{'mode':<10} {'ms/request':>11} {'prompt tokens/request':>22}")
+    results = {}
+    for reuse in (False, True):
+        mode = "reuse" if reuse else "no reuse"
+        latency, tokens = await run(args.backend, reuse, args, system)
+        results[mode] = latency
+        print(f"{mode:<10} {latency:>11.1f} {tokens if tokens is not None else float('nan'):>22.0f}")
+    print(f"prefill saved: {results['no reuse'] - results['reuse']:.1f} ms/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prompt-prefix KV reuse")
+    parser.add_argument("--backend", choices=["fake", "ollama", "local"], default="fake")
+    parser.add_argument("--requests", type=int, default=20, help="Timed requests per mode")
+    parser.add_argument("--prefix-tokens", type=int, default=400, help="Approximate size of the instructions")
+    parser.add_argument("--max-tokens", type=int, default=8, help="New tokens per request")
+    parser.add_argument("--model", default=os.getenv("HF_MODEL", "distilgpt2"), help="Model for --backend local")
+    parser.add_argument("--prefill-ms", type=float, default=0.5, help="Fake backend: ms per prompt token")
+    parser.add_argument("--decode-ms", type=float, default=50, help="Fake backend: ms per request besides prefill")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: assisted (speculative) decoding against plain decoding of the
+local transformers model.
+
+Generates answers to a few legal prompts with the main model alone and with
+a draft model proposing tokens, and reports tokens per second, the speed-up
+and the draft acceptance rate. With greedy decoding (the default) both
+modes must produce identical text, which is checked.
+
+    python benchmarks/bench_speculative_decoding.py [--model gpt2-large] [--draft distilgpt2]
+        [--max-tokens 128] [--draft-tokens 5] [--temperature 0]
+"""
+import os
+import sys
+import argparse
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.append(BACKEND_DIR)
+
+from speculative_decoding import LOCAL_LLM_DRAFT_TOKENS, SpeculativeDecoder, load_draft_model  # noqa: E402
+
+PROMPTS = [
+    "Question: What is the punishment for cheating under Section 420 of the Indian Penal Code?\nAnswer:",
+    "Question: How can a person file a complaint if the police refuse to register an FIR?\nAnswer:",
+    "Question: What remedies are available when a cheque is dishonoured in India?\nAnswer:",
+]
+
+
+def run(decoder: SpeculativeDecoder, assisted: bool, args):
+    before = dict(decoder.metrics)
+    texts = [decoder.generate(prompt, args.max_tokens, args.temperature, assisted=assisted) for prompt in PROMPTS]
+    tokens = decoder.metrics["new_tokens"] - before["new_tokens"]
+    seconds = decoder.metrics["seconds"] - before["seconds"]
+    return texts, tokens / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark assisted decoding with a draft model")
+    parser.add_argument("--model", default="gpt2-large", help="Main model")
+    parser.add_argument("--draft", default="distilgpt2", help="Draft model of the same tokenizer family")
+    parser.add_argument("--max-tokens", type=int, default=128, help="New tokens per prompt")
+    parser.add_argument("--draft-tokens", type=int, default=LOCAL_LLM_DRAFT_TOKENS, help="Tokens drafted per step")
+    parser.add_argument("--temperature", type=float, default=0.0, help="0 for greedy decoding")
+    args = parser.parse_args()
+
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token_id = tokenizer.eos_token_id
+    model = AutoModelForCausalLM.from_pretrained(args.model)
+    model.eval()
+    draft = load_draft_model(args.draft, model)
+    decoder = SpeculativeDecoder(model, tokenizer, draft, num_draft_tokens=args.draft_tokens)
+
+    # Warm up both paths so one-off initialization is not measured
+    decoder.generate(PROMPTS[0], 8, args.temperature, assisted=False)
+    decoder.generate(PROMPTS[0], 8, args.temperature, assisted=True)
+
+    plain_texts, plain_rate = run(decoder, False, args)
+    drafted, accepted = decoder.metrics["drafted"], decoder.metrics["accepted"]
+    assisted_texts, assisted_rate = run(decoder, True, args)
+    acceptance = (decoder.metrics["accepted"] - accepted) / max(1, decoder.metrics["drafted"] - drafted)
+
+    print(f"main {args.model}, draft {args.draft}, {len(PROMPTS)} prompts x {args.max_tokens} tokens, "
+          f"{args.draft_tokens} drafted per step, temperature {args.temperature:g}")
+    print(f"{'mode':<9} {'tokens/s':>9}")
+    print(f"{'plain':<9} {plain_rate:>9.1f}")
+    print(f"{'assisted':<9} {assisted_rate:>9.1f}")
+    print(f"speed-up {assisted_rate / plain_rate:.2f}x, acceptance rate {acceptance:.1%}")
+    if args.temperature <= 0:
+        print("outputs identical" if plain_texts == assisted_texts else "WARNING: greedy outputs differ")
+
+
+if __name__ == "__main__":
+    main()
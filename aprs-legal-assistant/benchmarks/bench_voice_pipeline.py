@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to first audio of a spoken question, answered through the
+previous round trips (ASR, then the whole answer, then translation and TTS
+of the whole answer) against the overlapped voice pipeline.
+
+By default the stages are simulated with the latencies given on the command
+line (the LLM is a FakeLLMBackend behind the gateway, streaming word by
+word), so the effect of the overlap can be measured without models:
+
+    python benchmarks/bench_voice_pipeline.py [--requests 5] [--asr-ms 700] [--retrieval-ms 150]
+        [--llm-ms 3000] [--translate-ms 150] [--tts-ms 300] [--tts-ms-per-char 4]
+
+With --url it measures a running server instead, sending a recording over
+the WebSocket and reporting the server's stage timings:
+
+    python benchmarks/bench_voice_pipeline.py --url ws://localhost:8000/api/voice-conversation
+        --audio backend/test_audio/sample.wav --language te
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+# Backend modules import each other as "backend.xxx"
+sys.path.append(os.path.dirname(BACKEND_DIR))
+sys.path.append(BACKEND_DIR)
+
+from llm_gateway import FakeLLMBackend, LLMGateway  # noqa: E402
+from voice_pipeline import VOICE_TTFA_TARGET_MS, StageTimer, VoicePipeline  # noqa: E402
+
+ANSWER = (
+    "If the police refuse to register your complaint, you can send it in writing to the Superintendent of Police. "
+    "Under Section 154(3) of the Code of Criminal Procedure, the Superintendent may investigate the case or direct "
+    "an officer to do so. You can also file a complaint before the Judicial Magistrate under Section 156(3), who "
+    "can order the police to register the FIR. Keep copies of every complaint and the acknowledgement you receive. "
+    "Please note that this is general information and not legal advice."
+)
+
+
+class ScriptedLLMBackend(FakeLLMBackend):
+    """Fake backend that streams a fixed legal answer"""
+
+    def _response_text(self, prompt: str) -> str:
+        return ANSWER
+
+
+def simulated_stages(args):
+    gateway = LLMGateway([ScriptedLLMBackend(latency_ms=args.llm_ms, prefill_ms_per_token=args.prefill_ms_per_token)])
+
+    async def transcribe(audio, language):
+        await asyncio.sleep(args.asr_ms / 1000)
+        return "పోలీసులు FIR నమోదు చేయకపోతే ఏమి చేయాలి?", "What can I do if the police refuse to register an FIR?"
+
+    async def retrieve(query):
+        await asyncio.sleep(args.retrieval_ms / 1000)
+        return "LEGAL DOCUMENT CONTEXT: Section 154 CrPC ... " * 40
+
+    async def generate(query, context):
+        async for chunk in gateway.stream(f"{context}\n\nUSER QUERY:\n{query}", system="You are a legal assistant."):
+            yield chunk
+
+    async def translate(text, source, target):
+        await asyncio.sleep((args.translate_ms + len(text) * args.translate_ms_per_char) / 1000)
+        return text
+
+    async def synthesize(text, language):
+        await asyncio.sleep((args.tts_ms + len(text) * args.tts_ms_per_char) / 1000)
+        return b"\0" * len(text), "audio/wav"
+
+    return transcribe, retrieve, generate, translate, synthesize
+
+
+async def run_sequential(stages) -> dict:
+    """The previous flow: every stage waits for the complete output of the one before"""
+    transcribe, retrieve, generate, translate, synthesize = stages
+    timer = StageTimer()
+    with timer.stage("asr"):
+        _, english = await transcribe(b"", "te")
+    with timer.stage("retrieval"):
+        context = await retrieve(english)
+    with timer.stage("llm"):
+        answer = "".join([chunk async for chunk in generate(english, context)])
+    with timer.stage("translation"):
+        telugu = await translate(answer, "en", "te")
+    with timer.stage("tts"):
+        await synthesize(telugu, "te")
+    timer.mark("first_audio")
+    return timer.report()
+
+
+async def run_pipelined(pipeline: VoicePipeline) -> dict:
+    async for event in pipeline.run("te", audio=b"\0"):
+        if event["type"] == "error":
+            raise RuntimeError(f"{event['stage']}: {event['detail']}")
+        if event["type"] == "done":
+            return event["timings"]
+
+
+def print_reports(label: str, reports):
+    print(f"\n{label}")
+    stage_names = list(reports[0]["stages"])
+    print(f"  {'stage':<18} {'start (ms)':>10} {'end (ms)':>10} {'busy (ms)':>10}")
+    for name in stage_names:
+        values = [report["stages"][name] for report in reports if name in report["stages"]]
+        start, end, busy = (sum(value[key] for value in values) / len(values) for key in ("start_ms", "end_ms", "busy_ms"))
+        print(f"  {name:<18} {start:>10.0f} {end:>10.0f} {busy:>10.0f}")
+    first_audio = sorted(report["first_audio_ms"] for report in reports)
+    total = sum(report["total_ms"] for report in reports) / len(reports)
+    print(f"  time to first audio: p50 {first_audio[len(first_audio) // 2]:.0f} ms, "
+          f"max {first_audio[-1]:.0f} ms (target {VOICE_TTFA_TARGET_MS:.0f} ms); total {total:.0f} ms")
+
+
+async def bench_simulated(args):
+    stages = simulated_stages(args)
+    pipeline = VoicePipeline(*stages, tts_concurrency=args.tts_concurrency)
+    sequential = [await run_sequential(stages) for _ in range(args.requests)]
+    pipelined = [await run_pipelined(pipeline) for _ in range(args.requests)]
+    print(f"{args.requests} questions, simulated stages: ASR {args.asr_ms:g} ms, retrieval {args.retrieval_ms:g} ms, "
+          f"LLM {args.llm_ms:g} ms, translation {args.translate_ms:g} ms + {args.translate_ms_per_char:g} ms/char, "
+          f"TTS {args.tts_ms:g} ms + {args.tts_ms_per_char:g} ms/char")
+    print_reports("sequential round trips", sequential)
+    print_reports(f"overlapped pipeline ({args.tts_concurrency} sentences at once)", pipelined)
+
+
+async def bench_server(args):
+    import aiohttp
+
+    with open(args.audio, "rb") as f:
+        audio = f.read()
+    reports, client_first_audio = [], []
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(args.url, max_msg_size=0) as ws:
+            for _ in range(args.requests):
+                await ws.send_json({"type": "start", "language": args.language})
+                await ws.send_bytes(audio)
+                started = time.perf_counter()
+                await ws.send_json({"type": "end"})
+                first_audio = None
+                while True:
+                    message = await ws.receive()
+                    if message.type == aiohttp.WSMsgType.BINARY:
+                        first_audio = first_audio or (time.perf_counter() - started) * 1000
+                        continue
+                    if message.type != aiohttp.WSMsgType.TEXT:
+                        raise RuntimeError(f"Connection closed: {message.type}")
+                    event = json.loads(message.data)
+                    if event["type"] == "transcript":
+                        print(f"transcript: {event['text']} / {event['english']}")
+                    elif event["type"] == "error":
+                        print(f"error in {event['stage']}: {event['detail']}")
+                    if event["type"] == "done" or (event["type"] == "error" and "timings" in event):
+                        break
+                if event["type"] == "done":
+                    reports.append(event["timings"])
+                    client_first_audio.append(first_audio)
+    if not reports:
+        return
+    print_reports(f"server {args.url}", reports)
+    received = [ms for ms in client_first_audio if ms is not None]
+    if received:
+        print(f"  first audio frame at the client: mean {sum(received) / len(received):.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark time to first audio of the voice pipeline")
+    parser.add_argument("--requests", type=int, default=5, help="Questions to ask")
+    parser.add_argument("--url", help="WebSocket URL of a running server (instead of simulating)")
+    parser.add_argument("--audio", help="Recording to send with --url")
+    parser.add_argument("--language", default="te", help="Language of the recording")
+    parser.add_argument("--asr-ms", type=float, default=700)
+    parser.add_argument("--retrieval-ms", type=float, default=150)
+    parser.add_argument("--llm-ms", type=float, default=3000, help="Decode time of the whole answer")
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.5)
+    parser.add_argument("--translate-ms", type=float, default=150, help="Per translation call")
+    parser.add_argument("--translate-ms-per-char", type=float, default=0.5)
+    parser.add_argument("--tts-ms", type=float, default=300, help="Per synthesis call")
+    parser.add_argument("--tts-ms-per-char", type=float, default=4)
+    parser.add_argument("--tts-concurrency", type=int, default=2)
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.audio:
+            parser.error("--url needs --audio")
+        asyncio.run(bench_server(args))
+    else:
+        asyncio.run(bench_simulated(args))
+
+
+if __name__ == "__main__":
+    main()
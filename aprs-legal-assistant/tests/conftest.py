@@ -0,0 +1,22 @@
+"""
+Shared test setup: backend modules on sys.path and every SQLite store and
+generated file redirected to a temporary directory before anything is imported.
+"""
+import os
+import sys
+import tempfile
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(APP_ROOT, "backend")
+# Backend modules import each other both as "backend.xxx" and as siblings
+sys.path.insert(0, APP_ROOT)
+sys.path.insert(0, BACKEND_DIR)
+
+_TMP = tempfile.mkdtemp(prefix="aprs-tests-")
+for name, file_name in (("CRAWL_STATE_DB", "crawl_state.sqlite"), ("JOB_QUEUE_DB", "jobs.sqlite"),
+                        ("NEAR_DUP_DB", "near_duplicates.sqlite"), ("SUMMARY_CACHE_DB", "summary_cache.sqlite"),
+                        ("TRANSLATION_MEMORY_DB", "translation_memory.sqlite")):
+    os.environ.setdefault(name, os.path.join(_TMP, file_name))
+os.environ.setdefault("PDF_RENDER_WORKERS", "1")
+os.environ.setdefault("INGESTION_WORKERS", "0")
+os.environ.setdefault("VOICE_PIPELINE_PRELOAD", "false")
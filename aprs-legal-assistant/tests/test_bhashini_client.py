@@ -0,0 +1,70 @@
+"""
+Bhashini client: micro-batching of concurrent translations.
+"""
+import json
+import asyncio
+
+from backend.bhashini_client import BhashiniClient, translation_task
+
+
+class FakePipeline:
+    """Stands in for the Dhruva endpoint: "translates" by upper-casing each input"""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, tasks, inputs=None, audio=None):
+        self.calls.append(list(inputs))
+        await asyncio.sleep(self.delay)
+        return {"pipelineResponse": [{"output": [{"source": text, "target": text.upper()} for text in inputs]}]}
+
+
+def make_client(pipeline, **kwargs):
+    client = BhashiniClient(api_key="test", **kwargs)
+    client.run_pipeline = pipeline
+    return client
+
+
+def test_concurrent_translations_share_a_pipeline_call():
+    pipeline = FakePipeline()
+    client = make_client(pipeline, max_inflight_batches=1)
+
+    async def run():
+        try:
+            return await asyncio.gather(*(client.translate(text, "te", "en")
+                                          for text in ("first", "second", "third", "second")))
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == ["FIRST", "SECOND", "THIRD", "SECOND"]
+    # The idle client sends the first text at once; the rest queue behind it
+    # and go out together, the repeated text only once
+    assert pipeline.calls == [["first"], ["second", "third"]]
+    assert client.stats["batches"] == 2
+    assert not client._batch_tasks
+
+
+def test_batches_in_flight_survive_a_session_reset():
+    pipeline = FakePipeline(delay=0.05)
+    client = make_client(pipeline)
+    key = json.dumps(translation_task("te", "en"), sort_keys=True)
+    errors = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        first = asyncio.ensure_future(client.translate("before", "te", "en"))
+        await asyncio.sleep(0)
+        old_session = client._session
+        # As if the session had been opened from another event loop
+        client._session_loop = None
+        try:
+            return await asyncio.gather(first, client.translate("after", "te", "en"))
+        finally:
+            await old_session.close()
+            await client.close()
+
+    assert asyncio.run(run()) == ["BEFORE", "AFTER"]
+    assert errors == []
+    assert client._inflight[key] == 0
+    assert not client._batch_tasks
@@ -0,0 +1,44 @@
+"""Range handling of the binary response helpers"""
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from binary_responses import bytes_response, parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=0-1,5-9", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=-0", "bytes=5-2"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
+
+
+@pytest.mark.parametrize("header", ["bytes=0-", "bytes=0-0", "bytes=-1", "bytes=-100"])
+def test_any_range_of_an_empty_body_is_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 0)
+
+
+def test_empty_body_range_request_gets_416():
+    app = FastAPI()
+
+    @app.get("/empty")
+    async def empty(request: Request):
+        return bytes_response(request, b"", "application/pdf")
+
+    client = TestClient(app)
+    assert client.get("/empty").status_code == 200
+    response = client.get("/empty", headers={"Range": "bytes=-1"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */0"
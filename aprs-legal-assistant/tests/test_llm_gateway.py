@@ -0,0 +1,68 @@
+"""
+LLM gateway: batching of concurrent prompts on the local transformers backend.
+"""
+import asyncio
+
+from backend.llm_gateway import LLM_MAX_TOKENS, TransformersBackend
+
+
+class FakePipeline:
+    """Text-generation pipeline that echoes each prompt with the settings it was generated with"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, prompts, batch_size, max_new_tokens, do_sample, temperature, top_p, return_full_text):
+        self.calls.append((list(prompts), max_new_tokens, temperature, top_p))
+        return [[{"generated_text": f"{prompt}|{max_new_tokens}|{temperature}|{top_p}"}] for prompt in prompts]
+
+
+def run_concurrently(backend, requests):
+    async def run():
+        return await asyncio.gather(*(backend.complete(prompt, options) for prompt, options in requests))
+
+    return asyncio.run(run())
+
+
+def test_prompts_with_the_same_options_share_one_pipeline_call():
+    pipe = FakePipeline()
+    backend = TransformersBackend(pipeline=pipe, batch_size=8, batch_wait_ms=30, prefix_cache=False, draft_model=None)
+
+    outputs = run_concurrently(backend, [(f"q{i}", {"max_tokens": 64}) for i in range(4)])
+
+    assert len(pipe.calls) == 1
+    assert pipe.calls[0][0] == ["q0", "q1", "q2", "q3"]
+    assert outputs == [f"q{i}|64|0.7|0.95" for i in range(4)]
+
+
+def test_each_prompt_is_generated_with_its_own_options():
+    pipe = FakePipeline()
+    backend = TransformersBackend(pipeline=pipe, batch_size=8, batch_wait_ms=30, prefix_cache=False, draft_model=None)
+
+    outputs = run_concurrently(backend, [
+        ("short", {"max_tokens": 16}),
+        ("long", {"max_tokens": 512, "system": "Answer as a lawyer."}),
+        ("cold", {"max_tokens": 16, "temperature": 0.1}),
+        ("short again", {"max_tokens": 16}),
+    ])
+
+    assert outputs == [
+        "short|16|0.7|0.95",
+        "Answer as a lawyer.\n\nlong|512|0.7|0.95",
+        "cold|16|0.1|0.95",
+        "short again|16|0.7|0.95",
+    ]
+    assert sorted(call[0] for call in pipe.calls) == [
+        ["Answer as a lawyer.\n\nlong"], ["cold"], ["short", "short again"],
+    ]
+
+
+def test_full_batches_run_without_waiting_and_are_released():
+    pipe = FakePipeline()
+    backend = TransformersBackend(pipeline=pipe, batch_size=2, batch_wait_ms=1000, prefix_cache=False, draft_model=None)
+
+    outputs = run_concurrently(backend, [("a", {}), ("b", {})])
+
+    assert outputs == [f"a|{LLM_MAX_TOKENS}|0.7|0.95", f"b|{LLM_MAX_TOKENS}|0.7|0.95"]
+    assert len(pipe.calls) == 1
+    assert not backend._batch_tasks
@@ -0,0 +1,13 @@
+"""The export/list CLI of model_optimizer runs as a script"""
+import os
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+
+def test_list_cli_runs(tmp_path):
+    env = {**os.environ, "OPTIMIZED_MODELS_DIR": str(tmp_path)}
+    result = subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "model_optimizer.py"), "list"],
+                            capture_output=True, text=True, env=env, timeout=120)
+    assert result.returncode == 0, result.stderr
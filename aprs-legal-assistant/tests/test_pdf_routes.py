@@ -0,0 +1,87 @@
+"""The PDF endpoints render through the module-level generator and return the document"""
+import base64
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from pdf_generator import LegalPDFGenerator
+
+SUMMARY_TEXT = """SUMMARY OF ISSUE: The landlord refuses to return the security deposit.
+RELEVANT LAWS: Transfer of Property Act, 1882.
+LEGAL ANALYSIS: The deposit must be returned when the tenancy ends.
+POSSIBLE OUTCOMES: Refund with interest.
+RECOMMENDED NEXT STEPS: Send a legal notice."""
+
+CONVERSATION = [
+    {"role": "user", "content": "My landlord will not return my deposit."},
+    {"role": "assistant", "content": "You can send a legal notice under the Transfer of Property Act."},
+]
+
+
+class FakeGemini:
+    configured = True
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return SimpleNamespace(text=SUMMARY_TEXT)
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    gemini = FakeGemini()
+    monkeypatch.setattr(main.pdf_generator, "gemini", gemini)
+    monkeypatch.setattr(main.pdf_generator, "model_initialized", True)
+    monkeypatch.setattr(main.pdf_generator, "pdf_dir", str(tmp_path))
+    # No "with": startup hooks (ingestion workers, model preloading) stay off
+    test_client = TestClient(main.app)
+    test_client.gemini = gemini
+    return test_client
+
+
+def test_generate_pdf_returns_pdf(client, tmp_path):
+    response = client.post("/generate-pdf?save=true", json={"conversation": CONVERSATION,
+                                                            "client_info": {"name": "Ravi Kumar"}})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.content.startswith(b"%PDF")
+    assert [p.name for p in tmp_path.iterdir()][0].startswith("legal_summary_ravi_kumar_")
+
+
+def test_download_summary_binary_and_base64(client):
+    conversation = CONVERSATION + [{"role": "user", "content": "Can I claim interest on the deposit?"}]
+    binary = client.post("/download_summary", json=conversation)
+    assert binary.status_code == 200
+    assert binary.content.startswith(b"%PDF")
+
+    legacy = client.post("/download_summary?format=base64", json=conversation)
+    assert legacy.status_code == 200
+    assert base64.b64decode(legacy.text) == binary.content
+    # The second request is served from the summary cache
+    assert len(client.gemini.prompts) == 1
+
+
+def test_download_summary_range(client):
+    full = client.post("/download_summary", json=CONVERSATION).content
+    partial = client.post("/download_summary", json=CONVERSATION, headers={"Range": "bytes=0-99"})
+    assert partial.status_code == 206
+    assert partial.content == full[:100]
+
+
+def test_generate_document_returns_pdf(client):
+    response = client.post("/generate_document", json={"name": "Lakshmi", "case": "tenancy"})
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+
+
+def test_save_pdf_overwrites_a_named_file_of_the_same_size(tmp_path):
+    generator = LegalPDFGenerator(base_dir=str(tmp_path))
+    first = generator.save_pdf(b"%PDF-old", filename="summary")
+    second = generator.save_pdf(b"%PDF-new", filename="summary")
+    assert first == second
+    with open(second, "rb") as f:
+        assert f.read() == b"%PDF-new"
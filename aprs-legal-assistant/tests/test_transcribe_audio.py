@@ -0,0 +1,63 @@
+"""/transcribe_audio transcribes with the shared Telugu ASR instead of loading a model per request"""
+import sys
+from types import ModuleType, SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from audio_codecs import AudioStore
+
+
+class FakeASR:
+    model = object()
+
+    def __init__(self):
+        self.transcribed = []
+
+    def transcribe(self, audio_bytes):
+        self.transcribed.append(audio_bytes)
+        return "నమస్కారం"
+
+
+class FakeTranslationEngine:
+    async def translate_async(self, text, source, target):
+        return "Hello "
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    asr = FakeASR()
+    # local_telugu_asr needs torch and NeMo; only its loader is used here
+    fake_module = ModuleType("backend.local_telugu_asr")
+    fake_module.get_local_telugu_asr = lambda: asr
+    monkeypatch.setitem(sys.modules, "backend.local_telugu_asr", fake_module)
+    monkeypatch.setattr(main, "get_translation_engine", lambda: FakeTranslationEngine())
+    monkeypatch.setattr(main, "audio_store", AudioStore(str(tmp_path / "audio")))
+    for name in ("tel_text_dir", "eng_text_dir"):
+        (tmp_path / name).mkdir()
+        monkeypatch.setattr(main, name, str(tmp_path / name))
+    (tmp_path / "audio" / "question.wav").write_bytes(b"RIFF-audio")
+    return SimpleNamespace(http=TestClient(main.app), asr=asr, tmp_path=tmp_path)
+
+
+def test_transcribe_audio_uses_the_shared_asr(client):
+    for _ in range(2):
+        response = client.http.post("/transcribe_audio", data={"filename": "question.wav"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["teluguText"] == "నమస్కారం"
+        assert body["englishText"] == "Hello"
+    assert client.asr.transcribed == [b"RIFF-audio", b"RIFF-audio"]
+    assert (client.tmp_path / "tel_text_dir" / "question_telugu.txt").read_text(encoding="utf-8") == "నమస్కారం"
+
+
+def test_transcribe_audio_without_a_model_is_unavailable(client):
+    client.asr.model = None
+    response = client.http.post("/transcribe_audio", data={"filename": "question.wav"})
+    assert response.status_code == 503
+
+
+def test_transcribe_audio_unknown_file(client):
+    response = client.http.post("/transcribe_audio", data={"filename": "missing.wav"})
+    assert response.status_code == 404
@@ -0,0 +1,47 @@
+"""
+Voice pipeline: lazy English TTS loading and websocket input validation.
+"""
+import sys
+import time
+import asyncio
+import threading
+from types import ModuleType
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import voice_pipeline
+
+
+def test_concurrent_callers_load_english_tts_once(monkeypatch):
+    loads = []
+
+    class FakeTextToSpeech:
+        def __init__(self):
+            loads.append(threading.get_ident())
+            time.sleep(0.05)
+
+    fake_tts = ModuleType("tts")
+    fake_tts.TextToSpeech = FakeTextToSpeech
+    monkeypatch.setitem(sys.modules, "tts", fake_tts)
+    monkeypatch.setattr(voice_pipeline, "_english_tts", None)
+
+    async def load_concurrently():
+        return await asyncio.gather(*(voice_pipeline.get_english_tts() for _ in range(5)))
+
+    engines = asyncio.run(load_concurrently())
+    assert len(loads) == 1
+    assert all(engine is engines[0] for engine in engines)
+
+
+@pytest.mark.parametrize("frame", ["[1, 2]", "\"start\"", "42", "null", "not json"])
+def test_websocket_rejects_frames_that_are_not_json_objects(frame):
+    app = FastAPI()
+    app.include_router(voice_pipeline.router)
+    with TestClient(app).websocket_connect("/voice-conversation") as websocket:
+        websocket.send_text(frame)
+        assert websocket.receive_json() == {"type": "error", "stage": "input", "detail": "Expected a JSON object"}
+        # The connection stays usable
+        websocket.send_text('{"type": "bogus"}')
+        assert websocket.receive_json()["detail"] == "Unknown message type: bogus"
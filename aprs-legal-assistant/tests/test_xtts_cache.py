@@ -0,0 +1,59 @@
+"""XTTS service: cached lines are served without the model, evicted ones are synthesized again"""
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import xtts_service
+from tts_cache import TTSCache
+
+LINE = {"text": "The court is now in session.", "persona_role": "judge"}
+AUDIO = b"RIFF" + b"\0" * 60
+
+
+class EvictingCache(TTSCache):
+    """Loses every entry right after it is looked up, as a full cache would"""
+
+    def get_path(self, key):
+        path = super().get_path(key)
+        if path is not None:
+            self._memory.pop(key, None)
+            os.remove(path)
+        return path
+
+
+def cache_line(cache):
+    key = cache.key_for(LINE["text"], xtts_service.voice_cache_id(LINE["persona_role"]), "en", 1.0)
+    cache.put(key, AUDIO, {"duration_seconds": 1.5, "sample_rate": 24000})
+
+
+@pytest.fixture
+def client():
+    return TestClient(xtts_service.app)
+
+
+@pytest.mark.parametrize("query", ["?codec=wav", "?format=base64"])
+def test_cached_line_is_served_without_the_model(client, monkeypatch, tmp_path, query):
+    cache = TTSCache("xtts", cache_dir=str(tmp_path))
+    monkeypatch.setattr(xtts_service, "tts_cache", cache)
+    cache_line(cache)
+
+    response = client.post(f"/tts{query}", json=LINE)
+    assert response.status_code == 200
+    if query == "?format=base64":
+        assert response.json()["duration_seconds"] == 1.5
+    else:
+        assert response.content == AUDIO
+        assert response.headers["x-duration-seconds"] == "1.500"
+
+
+@pytest.mark.parametrize("query", ["?codec=wav", "?format=base64"])
+def test_evicted_line_is_synthesized_again(client, monkeypatch, tmp_path, query):
+    cache = EvictingCache("xtts", cache_dir=str(tmp_path))
+    monkeypatch.setattr(xtts_service, "tts_cache", cache)
+    monkeypatch.setattr(xtts_service, "TTS_AVAILABLE", False)
+    cache_line(cache)
+
+    # Without the model installed, falling through to synthesis answers 503
+    response = client.post(f"/tts{query}", json=LINE)
+    assert response.status_code == 503